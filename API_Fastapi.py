@@ -1,259 +1,190 @@
-from fastapi import FastAPI, HTTPException, Request
-from pydantic import BaseModel, Field
-from enum import Enum
-import joblib
-import pandas as pd
+from fastapi import FastAPI, HTTPException, Request, Body, Query, Header, Depends
+from typing import List, Optional
 import traceback
 import logging
 import os
 import time 
 import uuid 
-from logging.handlers import RotatingFileHandler
+import threading
+from log_writer import BatchingRotatingFileHandler, QueuedLogWriter
 from datetime import datetime
-import json
-from fastapi.responses import PlainTextResponse
-
-# ============================================================
-# Définition des Enums pour les champs à choix limités
-# ============================================================
-
-class NAME_CONTRACT_TYPE(str, Enum):
-    Cash_loans = "Cash loans"
-    Revolving_loans = "Revolving loans"
-
-class CODE_GENDER(str, Enum):
-    F = "F"
-    M = "M"
-    XNA = "XNA"
-
-class FLAG_OWN_CAR(str, Enum):
-    N = "N"
-    Y = "Y"
-
-class FLAG_OWN_REALTY(str, Enum):
-    N = "N"
-    Y = "Y"
-
-class NAME_TYPE_SUITE(str, Enum):
-    Unaccompanied = "Unaccompanied"
-    Family = "Family"
-    Spouse_partner = "Spouse, partner"
-    Children = "Children"
-    Other_B = "Other_B"
-    Other_A = "Other_A"
-    Group_of_people = "Group of people"
-
-class NAME_INCOME_TYPE(str, Enum):
-    Working = "Working"
-    Commercial_associate = "Commercial associate"
-    Pensioner = "Pensioner"
-    State_servant = "State servant"
-    Unemployed = "Unemployed"
-    Student = "Student"
-    Businessman = "Businessman"
-    Maternity_leave = "Maternity leave"
-
-class NAME_EDUCATION_TYPE(str, Enum):
-    Secondary = "Secondary / secondary special"
-    Higher = "Higher education"
-    Incomplete_higher = "Incomplete higher"
-    Lower_secondary = "Lower secondary"
-    Academic_degree = "Academic degree"
-
-class NAME_FAMILY_STATUS(str, Enum):
-    Married = "Married"
-    Single = "Single / not married"
-    Civil_marriage = "Civil marriage"
-    Separated = "Separated"
-    Widow = "Widow"
-    Unknown = "Unknown"
-
-class NAME_HOUSING_TYPE(str, Enum):
-    House_apartment = "House / apartment"
-    With_parents = "With parents"
-    Municipal_apartment = "Municipal apartment"
-    Rented_apartment = "Rented apartment"
-    Office_apartment = "Office apartment"
-    Coop_apartment = "Co-op apartment"
-
-class OCCUPATION_TYPE(str, Enum):
-    Laborers = "Laborers"
-    Sales_staff = "Sales staff"
-    Core_staff = "Core staff"
-    Managers = "Managers"
-    Drivers = "Drivers"
-    High_skill_tech_staff = "High skill tech staff"
-    Accountants = "Accountants"
-    Medicine_staff = "Medicine staff"
-    Security_staff = "Security staff"
-    Cooking_staff = "Cooking staff"
-    Cleaning_staff = "Cleaning staff"
-    Private_service_staff = "Private service staff"
-    Low_skill_Laborers = "Low-skill Laborers"
-    Waiters_barmen_staff = "Waiters/barmen staff"
-    Secretaries = "Secretaries"
-    Realty_agents = "Realty agents"
-    HR_staff = "HR staff"
-    IT_staff = "IT staff"
-
-class WEEKDAY_APPR_PROCESS_START(str, Enum):
-    MONDAY = "MONDAY"
-    TUESDAY = "TUESDAY"
-    WEDNESDAY = "WEDNESDAY"
-    THURSDAY = "THURSDAY"
-    FRIDAY = "FRIDAY"
-    SATURDAY = "SATURDAY"
-    SUNDAY = "SUNDAY"
-
-class ORGANIZATION_TYPE(str, Enum):
-    Business_Entity_Type_3 = "Business Entity Type 3"
-    XNA = "XNA"
-    Self_employed = "Self-employed"
-    Other = "Other"
-    Medicine = "Medicine"
-    Business_Entity_Type_2 = "Business Entity Type 2"
-    Government = "Government"
-    School = "School"
-    Trade_type_7 = "Trade: type 7"
-    Kindergarten = "Kindergarten"
-    Construction = "Construction"
-    Business_Entity_Type_1 = "Business Entity Type 1"
-    Transport_type_4 = "Transport: type 4"
-    Trade_type_3 = "Trade: type 3"
-    Industry_type_9 = "Industry: type 9"
-    Industry_type_3 = "Industry: type 3"
-    Security = "Security"
-    Housing = "Housing"
-    Industry_type_11 = "Industry: type 11"
-    Military = "Military"
-    Bank = "Bank"
-    Agriculture = "Agriculture"
-    Police = "Police"
-    Transport_type_2 = "Transport: type 2"
-    Postal = "Postal"
-    Security_Ministries = "Security Ministries"
-    Trade_type_2 = "Trade: type 2"
-    Restaurant = "Restaurant"
-    Services = "Services"
-    University = "University"
-    Industry_type_7 = "Industry: type 7"
-    Transport_type_3 = "Transport: type 3"
-    Industry_type_1 = "Industry: type 1"
-    Hotel = "Hotel"
-    Electricity = "Electricity"
-    Industry_type_4 = "Industry: type 4"
-    Trade_type_6 = "Trade: type 6"
-    Industry_type_5 = "Industry: type 5"
-    Insurance = "Insurance"
-    Telecom = "Telecom"
-    Emergency = "Emergency"
-    Industry_type_2 = "Industry: type 2"
-    Advertising = "Advertising"
-    Realtor = "Realtor"
-    Culture = "Culture"
-    Industry_type_12 = "Industry: type 12"
-    Trade_type_1 = "Trade: type 1"
-    Mobile = "Mobile"
-    Legal_Services = "Legal Services"
-    Cleaning = "Cleaning"
-    Transport_type_1 = "Transport: type 1"
-    Industry_type_6 = "Industry: type 6"
-    Industry_type_10 = "Industry: type 10"
-    Religion = "Religion"
-    Industry_type_13 = "Industry: type 13"
-    Trade_type_4 = "Trade: type 4"
-    Trade_type_5 = "Trade: type 5"
-    Industry_type_8 = "Industry: type 8"
-
-
-# ============================================================
-# Modèle de données (inputs)
-# ============================================================
-
-class ClientData(BaseModel):
-    NAME_CONTRACT_TYPE: NAME_CONTRACT_TYPE
-    CODE_GENDER: CODE_GENDER
-    FLAG_OWN_CAR: FLAG_OWN_CAR
-    FLAG_OWN_REALTY: FLAG_OWN_REALTY
-    CNT_CHILDREN: int = Field(ge=0)
-    AMT_INCOME_TOTAL: float = Field(gt=0)
-    AMT_CREDIT: float = Field(gt=0)
-    AMT_ANNUITY: float = Field(gt=0)
-    AMT_GOODS_PRICE: float = Field(gt=0)
-    NAME_TYPE_SUITE: NAME_TYPE_SUITE
-    NAME_INCOME_TYPE: NAME_INCOME_TYPE
-    NAME_EDUCATION_TYPE: NAME_EDUCATION_TYPE
-    NAME_FAMILY_STATUS: NAME_FAMILY_STATUS
-    NAME_HOUSING_TYPE: NAME_HOUSING_TYPE
-    REGION_POPULATION_RELATIVE: float
-    DAYS_BIRTH: int = Field(le=0)
-    DAYS_EMPLOYED: int = Field(le=0)
-    DAYS_REGISTRATION: int
-    DAYS_ID_PUBLISH: int
-    FLAG_EMP_PHONE: int = Field(ge=0, le=1)
-    FLAG_WORK_PHONE: int = Field(ge=0, le=1)
-    FLAG_PHONE: int = Field(ge=0, le=1)
-    FLAG_EMAIL: int = Field(ge=0, le=1)
-    OCCUPATION_TYPE: OCCUPATION_TYPE
-    CNT_FAM_MEMBERS: float
-    REGION_RATING_CLIENT: int
-    REGION_RATING_CLIENT_W_CITY: int
-    WEEKDAY_APPR_PROCESS_START: WEEKDAY_APPR_PROCESS_START
-    HOUR_APPR_PROCESS_START: int
-    REG_REGION_NOT_LIVE_REGION: int = Field(ge=0, le=1)
-    REG_REGION_NOT_WORK_REGION: int = Field(ge=0, le=1)
-    LIVE_REGION_NOT_WORK_REGION: int = Field(ge=0, le=1)
-    REG_CITY_NOT_LIVE_CITY: int = Field(ge=0, le=1)
-    REG_CITY_NOT_WORK_CITY: int = Field(ge=0, le=1)
-    LIVE_CITY_NOT_WORK_CITY: int = Field(ge=0, le=1)
-    ORGANIZATION_TYPE: ORGANIZATION_TYPE
-    FLOORSMAX_AVG: float
-    LIVINGAREA_AVG: float
-    YEARS_BEGINEXPLUATATION_MODE: float
-    OBS_30_CNT_SOCIAL_CIRCLE: float
-    DEF_30_CNT_SOCIAL_CIRCLE: float
-    DAYS_LAST_PHONE_CHANGE: float
-    PREVIOUS_LOANS_COUNT: float
-    CREDIT_INCOME_PERCENT: float
-    ANNUITY_INCOME_PERCENT: float
-    CREDIT_TERM: float
-    DAYS_EMPLOYED_PERCENT: float
+from fastapi.responses import PlainTextResponse, StreamingResponse, JSONResponse
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from scoring import ModelScorer, LABELS, SCORER_BACKEND, label_from_class
+from micro_batching import MicroBatchScheduler, SchedulerOverloaded, BATCH_SIZE_BUCKETS, QUEUE_WAIT_BUCKETS_MS
+from inference_pool import InferencePool, WorkerDiedError
+import log_reader
+from event_store import EventStore, EventSchema
+from prediction_cache import PredictionCache, canonical_key
+from model_loader import ModelLoader
+from model_registry import ModelRegistry, file_sha256
+from sample_data import load_samples
+import stage_timing
+import json_codec
+import ndjson_stream
+from drift_monitor import DriftMonitor, DriftReference
+from reference_profile import profile_path
+from schemas import ClientData, schema_columns, validate_batch
+import profiling
+from metrics import MetricsRegistry, PROBABILITY_BUCKETS, STAGE_BUCKETS_S, CONTENT_TYPE as METRICS_CONTENT_TYPE
+import hmac
+import numpy as np
 
 # ============================================================
 # Configuration du logger
 # ============================================================
 
-LOG_DIR = "logs"
+# LOG_DIR : dossier des logs et de l'event store (les tests le dirigent vers un dossier temporaire)
+LOG_DIR = os.getenv("LOG_DIR", "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 LOG_FILE = os.path.join(LOG_DIR, "api_logger.log")
+LOG_BACKUP_COUNT = 5
 
 
+# Écriture non bloquante : file bornée + thread d'écriture par lots (voir log_writer.py)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_QUEUE_POLICY = os.getenv("LOG_QUEUE_POLICY", "drop")
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "256"))
+LOG_SAMPLE_RATE = int(os.getenv("LOG_SAMPLE_RATE", "10"))
+
 logger = logging.getLogger("api_logger")
 logger.setLevel(logging.INFO)
-handler = RotatingFileHandler(LOG_FILE, maxBytes=10_000_000, backupCount=5)
+handler = BatchingRotatingFileHandler(LOG_FILE, maxBytes=10_000_000, backupCount=LOG_BACKUP_COUNT)
 handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
 if not logger.handlers:
-    logger.addHandler(handler)
+    log_writer = QueuedLogWriter(handler, maxsize=LOG_QUEUE_SIZE, policy=LOG_QUEUE_POLICY,
+                                 batch_size=LOG_BATCH_SIZE, sample_rate=LOG_SAMPLE_RATE)
+    logger.addHandler(log_writer)
+else:
+    log_writer = next(h for h in logger.handlers if isinstance(h, QueuedLogWriter))
 
-logger.info("Logs écrits dans logs/api_logger.log dans le dossier du projet.")
+logger.info(f"Logs écrits dans {LOG_FILE}.")
 
-#Fonction pour écrire des logs structurés au format JSONL
+#Fonction pour écrire des logs structurés au format JSONL (sérialisés par le thread d'écriture)
 
 def write_log(entry: dict):
     try:
-        logger.info(json.dumps(entry, ensure_ascii=False))
+        logger.info(entry)
     except Exception as e : 
         logger.error(f"Erreur lors de l'écriture du log structuré{e}")
 
+# ============================================================
+# Event store : copie binaire et indexée des événements structurés (voir event_store.py)
+# ============================================================
+
+EVENT_STORE_ENABLED = os.getenv("EVENT_STORE_ENABLED", "1") == "1"
+EVENT_STORE_DIR = os.getenv("EVENT_STORE_DIR", os.path.join(LOG_DIR, "events"))
+
+def _client_fields(prefix: str) -> list:
+    "Colonnes typées des données client, déduites de ClientData (même découpage que le scoring et la dérive)"
+    _, categorical = schema_columns(ClientData)
+    fields = []
+    for name, info in ClientData.model_fields.items():
+        if name in categorical:
+            fields.append((prefix + name, "category", categorical[name]))
+        else:
+            fields.append((prefix + name, "int" if info.annotation is int else "float"))
+    return fields
+
+EVENT_SCHEMAS = [
+    EventSchema("http_request", [
+        ("request_id", "str", 36), ("method", "str", 8), ("path", "str", 64),
+        ("status_code", "int"), ("duration", "float"), ("client_ip", "str", 45), ("model_version", "str", 64),
+    ] + [("stages." + stage, "float") for stage in stage_timing.STAGES]),
+    EventSchema("prediction", [
+        ("request_id", "str", 36), ("prediction", "category", list(LABELS.values())),
+        ("probabilité_defaut", "float"), ("model_version", "str", 64),
+    ] + _client_fields("input_data.")),
+    EventSchema("batch_prediction", [
+        ("request_id", "str", 36), ("n_items", "int"), ("n_errors", "int"), ("n_defaillant", "int"),
+        ("n_solvable", "int"), ("probabilité_defaut_moyenne", "float"), ("duration", "float"),
+        ("model_version", "str", 64),
+    ]),
+    EventSchema("stream_prediction", [
+        ("request_id", "str", 36), ("status", "category", ["complete", "line_too_long", "client_disconnected", "error"]),
+        ("n_items", "int"), ("n_errors", "int"), ("n_defaillant", "int"), ("n_solvable", "int"),
+        ("duration", "float"), ("model_version", "str", 64),
+    ]),
+]
+
+event_store = None
+if EVENT_STORE_ENABLED:
+    try:
+        event_store = EventStore(EVENT_STORE_DIR)
+        for schema in EVENT_SCHEMAS:
+            event_store.register(schema)
+        log_writer.add_sink(event_store.append_entries)
+    except Exception as e:
+        logger.error(f"Event store désactivé : {e}")
+        event_store = None
+
+# ============================================================
+# Métriques exposées par /metrics (voir metrics.py)
+# ============================================================
+
+# METRICS_DIR : répertoire partagé par les workers ; sinon métriques du processus. Il n'est pas vidé
+# ici (les workers ne savent pas s'ils sont les premiers) : le démarrage lance python metrics.py avant uvicorn
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+
+METRICS = MetricsRegistry(METRICS_DIR)
+HTTP_REQUESTS = METRICS.counter("api_http_requests", "Requêtes HTTP par route et code de statut",
+                                ("method", "route", "status"))
+HTTP_DURATION = METRICS.histogram("api_http_request_duration_seconds", "Durée des requêtes HTTP (secondes)",
+                                  ("method", "route"))
+PREDICTIONS = METRICS.counter("api_predictions", "Prédictions par classe", ("endpoint", "prediction"))
+STAGE_DURATION = METRICS.histogram("api_stage_duration_seconds", "Durée des étapes des requêtes (secondes)",
+                                   ("route", "stage"), buckets=STAGE_BUCKETS_S)
+PREDICTION_PROBABILITY = METRICS.histogram("api_prediction_probability", "Probabilité de défaut prédite",
+                                           ("endpoint",), buckets=PROBABILITY_BUCKETS)
+MICROBATCH_BATCH_SIZE = METRICS.histogram("api_microbatch_batch_size", "Taille des lots du micro-batching",
+                                          buckets=BATCH_SIZE_BUCKETS)
+MICROBATCH_QUEUE_WAIT = METRICS.histogram("api_microbatch_queue_wait_seconds",
+                                          "Attente en file du micro-batching (secondes)",
+                                          buckets=[b / 1000 for b in QUEUE_WAIT_BUCKETS_MS])
+
+# SERVER_TIMING_ENABLED : durées par étape (validation, encode, inference, log...) dans l'en-tête
+# Server-Timing, le log http_request et api_stage_duration_seconds (voir stage_timing.py)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "1") == "1"
+
+def record_predictions(endpoint: str, y_pred, y_proba):
+    "Compte les prédictions par classe et observe les probabilités d'un lot"
+    y_pred = np.asarray(y_pred).ravel()
+    n_defaillant = int(y_pred.sum())
+    for y, n in ((1, n_defaillant), (0, len(y_pred) - n_defaillant)):
+        if n:
+            PREDICTIONS.inc(n, endpoint=endpoint, prediction=label_from_class(y))
+    PREDICTION_PROBABILITY.observe_many(y_proba, endpoint=endpoint)
+
 #-----------------------------------------------------------------------------------------------------
 # Création de l'application FastAPI et chargement du modèle
 #-----------------------------------------------------------------------------------------------------
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_writer.start()
+    if MODEL_LOAD_MODE == "startup":
+        start_model_loading()
+    start_registry_watcher()
+    yield
+    _registry_watch_stop.set()
+    # Arrêt propre : les requêtes déjà en file sont traitées avant la fermeture
+    stop_scheduler()
+    if _inference_pool is not None:
+        _inference_pool.close()
+    # Dernier vidage de la file de logs
+    log_writer.stop()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="API de prédiction de solvabilité Client", 
     description="Cette API permet de prédire si un client est solvable ou défaillant, dans le cadre de l'étude de sa demande de prêt, et aide à prendre la décision d'octroi ou de refus de prêt.",
     version="3.0",
+    default_response_class=json_codec.FastJSONResponse,
     )
+# Corps JSON des requêtes décodé par orjson (si installé) ; validation et erreurs 422 inchangées
+app.router.route_class = json_codec.FastJSONRoute
 
 # Middleware de logging
 
@@ -262,10 +193,27 @@ async def log_request_middleware(request: Request, call_next):
     request_id = str(uuid.uuid4())
     request.state.request_id = request_id
     start_time = time.time()
+    timer = stage_timing.start() if SERVER_TIMING_ENABLED else None
     logger.info(f"Début requête {request_id} : {request.method} {request.url.path}")
     response = await call_next(request)
     duration = time.time() - start_time
     status_code = response.status_code
+    # Gabarit de la route (/admin/models/{version}/activate) pour borner le nombre de séries
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", "unmatched")
+    HTTP_REQUESTS.inc(method=request.method, route=route_path, status=status_code)
+    HTTP_DURATION.observe(duration, method=request.method, route=route_path)
+    stages = None
+    if timer is not None:
+        timer.mark("response")
+        stages = timer.durations()
+        response.headers["Server-Timing"] = timer.server_timing(stages)
+        # Seaux mis à jour à la collecte de /metrics, pas pendant la requête
+        STAGE_DURATION.observe_deferred((route_path,), stages)
+    # Version du modèle qui a servi la requête (fixée par l'endpoint), sinon version active
+    model_version = getattr(request.state, "model_version", None) or MODEL_VERSION
+    if model_version is not None:
+        response.headers["X-Model-Version"] = model_version
     logger.info(f"Fin requête {request_id} : {request.method} {request.url.path} - "
             f"Status {response.status_code} - Durée {duration:.3f}s")
     write_log({
@@ -276,20 +224,347 @@ async def log_request_middleware(request: Request, call_next):
         "status_code": status_code,
         "duration": duration,
         "client_ip": request.client.host if request.client else "unknown",
+        "model_version": model_version,
+        "stages": stages,
         "event": "http_request"
     })
+    if not request.url.path.startswith("/admin"):
+        profiling.request_finished()
 
     return response 
 
 # Chargement du modèle
 
-try:
-    model = joblib.load("model.pkl")
-    logger.info("Modèle chargé avec succès.")
-except Exception as e:
-    logger.critical(f"Erreur lors du chargement du modèle : {e}", exc_info=True)
-    print(f" Erreur de chargement du modèle : {e}")
-    model = None
+MODEL_PATH = "model.pkl"
+
+# Registre des versions (models/manifest.json) : s'il a une version active, elle remplace model.pkl
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "models")
+MODEL_REGISTRY_WATCH_INTERVAL = float(os.getenv("MODEL_REGISTRY_WATCH_INTERVAL", "5"))
+model_registry = ModelRegistry(MODEL_REGISTRY_DIR)
+
+def _initial_model():
+    "Chemin et version du modèle à charger au démarrage"
+    try:
+        active = model_registry.active_version()
+        if active is not None:
+            return model_registry.path(active), active
+    except Exception as e:
+        logger.error(f"Registre de modèles illisible, utilisation de {MODEL_PATH} : {e}")
+    return MODEL_PATH, None
+
+# MODEL_LOAD_MODE : "eager" (chargement à l'import) ou "startup" (thread au démarrage, état "loading")
+# MODEL_MMAP : lecture de l'artefact mappé model.mmap.joblib s'il existe (python model_loader.py).
+# Désactivé par défaut : le booster reste désérialisé par worker, la mémoire privée ne baisse pas
+# (performance_results/model_loading.json)
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "eager")
+MODEL_MMAP = os.getenv("MODEL_MMAP", "0") == "1"
+
+model = None
+_loaded_model = None
+MODEL_VERSION = None
+_active_model_path, _initial_version = _initial_model()
+
+def _install_model(loaded):
+    "Publie le modèle chargé au démarrage pour les endpoints"
+    global model, _loaded_model, MODEL_VERSION
+    # Hors registre, la version est le début de l'empreinte sha256 de model.pkl
+    MODEL_VERSION = _initial_version or file_sha256(_active_model_path)[:12]
+    model = _loaded_model = loaded
+
+model_loader = ModelLoader(_active_model_path, use_mmap=MODEL_MMAP, on_loaded=_install_model, backend=SCORER_BACKEND)
+
+def _log_model_loading():
+    if model_loader.state == "ready":
+        logger.info(f"Modèle {MODEL_VERSION} chargé avec succès depuis {model_loader.source} en {model_loader.load_seconds:.3f}s.")
+    else:
+        logger.critical(f"Erreur lors du chargement du modèle : {model_loader.error}")
+        print(f" Erreur de chargement du modèle : {model_loader.error}")
+
+def start_model_loading():
+    "Mode startup : lance le chargement en arrière-plan (sans effet s'il est déjà lancé)"
+    if model_loader.state == "pending":
+        model_loader.start()
+        threading.Thread(target=lambda: model_loader.wait() and _log_model_loading(), daemon=True).start()
+
+if MODEL_LOAD_MODE == "eager":
+    model_loader.load()
+    _log_model_loading()
+
+def model_is_loading() -> bool:
+    "Vrai en mode startup tant que le chargement n'est pas terminé (le lance au besoin)"
+    if MODEL_LOAD_MODE != "startup" or model_loader.state not in ("pending", "loading"):
+        return False
+    start_model_loading()
+    return True
+
+def model_loading_error(request_id: str) -> HTTPException:
+    logger.warning(f"Modèle en cours de chargement - Request ID: {request_id}")
+    return HTTPException(status_code=503, detail="Modèle en cours de chargement, réessayez dans quelques secondes.",
+                         headers={"Retry-After": "1"})
+
+def current_model_version() -> str:
+    "Version du modèle servi (celle du scoreur courant)"
+    return get_scorer().version
+
+# Cache des résultats de prédiction (taille 0 = désactivé)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+prediction_cache = PredictionCache(max_size=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+
+# Scoreur partagé par les endpoints : reconstruit uniquement si le modèle change.
+# Le remplacement à chaud (swap_model) prend le même verrou : un appel concurrent attend la fin
+# de l'échange au lieu de reconstruire un scoreur pour l'ancien modèle.
+_scorer = None
+_swap_lock = threading.RLock()
+
+def get_scorer() -> ModelScorer:
+    global _scorer
+    scorer = _scorer
+    if scorer is None or scorer.model is not model:
+        with _swap_lock:
+            scorer = _scorer
+            if scorer is None or scorer.model is not model:
+                # Modèle remplacé hors registre (tests, notebook) : version dérivée de l'objet
+                version = MODEL_VERSION if model is _loaded_model else f"runtime-{id(model):x}"
+                scorer = _scorer = ModelScorer(model, version=version)
+                # Nouveau modèle : les résultats en cache ne sont plus valides
+                prediction_cache.clear()
+                if model is not None and not scorer.compiled:
+                    logger.warning(f"Encodeur compilé indisponible, utilisation du pipeline complet : {scorer.fallback_reason}")
+    return scorer
+
+# Détection de dérive en continu (voir drift_monitor.py) : histogrammes par fenêtre glissante, scores via /drift
+DRIFT_MONITOR_ENABLED = os.getenv("DRIFT_MONITOR_ENABLED", "1") == "1"
+# Comptes de référence dans les mêmes bins : profil du modèle actif (model.profile.json, voir reference_profile.py)
+# sauf si DRIFT_REFERENCE_PATH désigne un autre fichier ; sans référence, /drift ne sert que les histogrammes
+DRIFT_REFERENCE_PATH = os.getenv("DRIFT_REFERENCE_PATH")
+DRIFT_SLICE_SECONDS = float(os.getenv("DRIFT_SLICE_SECONDS", "300"))
+DRIFT_SLICES = int(os.getenv("DRIFT_SLICES", "12"))
+DRIFT_PSI_THRESHOLD = float(os.getenv("DRIFT_PSI_THRESHOLD", "0.2"))
+
+_drift_monitor = None
+_drift_monitor_lock = threading.Lock()
+
+def get_drift_monitor(scorer: ModelScorer = None) -> DriftMonitor:
+    """Monitor de dérive (créé au premier appel) : bins de la référence, sinon bornes apprises par le modèle."""
+    global _drift_monitor
+    if _drift_monitor is None:
+        with _drift_monitor_lock:
+            if _drift_monitor is None:
+                reference = None
+                path = DRIFT_REFERENCE_PATH or profile_path(_active_model_path)
+                if os.path.exists(path):
+                    try:
+                        reference = DriftReference.load(path)
+                    except Exception as e:
+                        logger.error(f"Référence de dérive illisible ({path}) : {e}")
+                scorer = scorer or get_scorer()
+                _drift_monitor = DriftMonitor.for_schema(
+                    ClientData, reference, encoder=scorer.encoder, slice_seconds=DRIFT_SLICE_SECONDS,
+                    n_slices=DRIFT_SLICES, psi_threshold=DRIFT_PSI_THRESHOLD)
+    return _drift_monitor
+
+def observe_drift(clients: list, y_proba, scorer: ModelScorer):
+    "Ajoute des clients scorés aux fenêtres de dérive (simple ajout à une file sur le chemin de la requête)"
+    if DRIFT_MONITOR_ENABLED:
+        get_drift_monitor(scorer).observe_clients(clients, y_proba)
+
+# Pool de processus d'inférence (désactivé par défaut : 0 worker)
+INFERENCE_POOL_WORKERS = int(os.getenv("INFERENCE_POOL_WORKERS", "0"))
+INFERENCE_POOL_SLOTS = int(os.getenv("INFERENCE_POOL_SLOTS", "64"))
+INFERENCE_POOL_ROWS_PER_SLOT = int(os.getenv("INFERENCE_POOL_ROWS_PER_SLOT", "256"))
+# Attente maximale d'un résultat du pool (worker bloqué ou anneau saturé) : 503 au-delà
+INFERENCE_POOL_TIMEOUT_S = float(os.getenv("INFERENCE_POOL_TIMEOUT_S", "30"))
+
+_inference_pool = None
+_inference_pool_lock = threading.Lock()
+
+def get_inference_pool(scorer: ModelScorer):
+    """Pool de workers (créé au premier appel), uniquement pour le modèle chargé depuis le disque."""
+    global _inference_pool
+    if INFERENCE_POOL_WORKERS <= 0 or not scorer.compiled or scorer.model is not _loaded_model:
+        return None
+    with _inference_pool_lock:
+        if _inference_pool is None:
+            _inference_pool = InferencePool(
+                _active_model_path,
+                n_features=scorer.encoder.n_features,
+                n_workers=INFERENCE_POOL_WORKERS,
+                n_slots=INFERENCE_POOL_SLOTS,
+                rows_per_slot=INFERENCE_POOL_ROWS_PER_SLOT,
+                timeout=INFERENCE_POOL_TIMEOUT_S,
+                backend=SCORER_BACKEND,
+            )
+            logger.info(f"Pool d'inférence démarré : {INFERENCE_POOL_WORKERS} workers")
+    return _inference_pool
+
+def score_clients(clients: list, scorer: ModelScorer = None):
+    """Score une liste de clients (pool de processus si activé). Retourne (classes, probabilités)."""
+    scorer = scorer or get_scorer()
+    pool = get_inference_pool(scorer)
+    if pool is not None:
+        X = scorer.encoder.transform_clients(clients)
+        stage_timing.mark("encode")
+        result = scorer.decide(pool.predict_proba(X))
+        stage_timing.mark("inference")
+        return result
+    return scorer.predict_clients(clients)
+
+# Micro-batching des requêtes /predict concurrentes (désactivé par défaut)
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "0") == "1"
+MICROBATCH_MAX_BATCH_SIZE = int(os.getenv("MICROBATCH_MAX_BATCH_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+MICROBATCH_MAX_QUEUE = int(os.getenv("MICROBATCH_MAX_QUEUE", "1024"))
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    global _scheduler
+    if not MICROBATCH_ENABLED:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = MicroBatchScheduler(
+                score_clients,
+                max_batch_size=MICROBATCH_MAX_BATCH_SIZE,
+                max_wait_ms=MICROBATCH_MAX_WAIT_MS,
+                max_queue=MICROBATCH_MAX_QUEUE,
+                batch_size_metric=MICROBATCH_BATCH_SIZE,
+                queue_wait_metric=MICROBATCH_QUEUE_WAIT,
+            )
+    return _scheduler
+
+def stop_scheduler():
+    "Arrête le scheduler (requêtes en file traitées) ; get_scheduler() en recrée un au prochain appel"
+    global _scheduler
+    with _scheduler_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        scheduler.stop()
+
+def _score_client_uncached(client: ClientData, scorer: ModelScorer = None):
+    scheduler = get_scheduler()
+    if scheduler is not None:
+        # Lots regroupés par scoreur : le résultat est celui de la version de la clé du cache
+        return scheduler.submit(client, scorer or get_scorer()).result()
+    y_pred, y_proba = score_clients([client], scorer)
+    return y_pred[0], y_proba[0]
+
+def score_client(client: ClientData, scorer: ModelScorer = None, data: dict = None):
+    """Score un client (cache, puis micro-batching s'il est activé). Retourne (classe, probabilité).
+    Le scoreur (donc la version du modèle) est fixé par l'appelant pour toute la requête ;
+    data : client.model_dump(mode="json") déjà calculé (réutilisé pour la clé du cache)."""
+    scorer = scorer or get_scorer()
+    key = canonical_key(client, scorer.version, data)
+    return prediction_cache.get_or_compute(key, lambda: _score_client_uncached(client, scorer))
+
+def score_clients_cached(clients: list, scorer: ModelScorer = None):
+    """Score un lot : les clients déjà en cache ne sont pas rescorés. Retourne (classes, probabilités)."""
+    scorer = scorer or get_scorer()
+    if not prediction_cache.enabled:
+        return score_clients(clients, scorer)
+    keys = [canonical_key(c, scorer.version) for c in clients]
+    cached = [prediction_cache.get(k) for k in keys]
+    missing = [i for i, value in enumerate(cached) if value is None]
+    if missing:
+        y_new, p_new = score_clients([clients[i] for i in missing], scorer)
+        for i, y, p in zip(missing, y_new, p_new):
+            cached[i] = (y, p)
+            prediction_cache.put(keys[i], (y, p))
+    y_pred = np.array([y for y, _ in cached], dtype=np.int8)
+    y_proba = np.array([p for _, p in cached], dtype=np.float64)
+    return y_pred, y_proba
+
+
+# ============================================================
+# Remplacement à chaud du modèle (registre de versions)
+# ============================================================
+
+WARMUP_ROWS = 8
+_reload_status = {"state": "idle", "version": None, "error": None}
+_reload_lock = threading.Lock()
+
+def _retire_pool(pool, delay: float = 5.0):
+    "Ferme l'ancien pool d'inférence après un délai de grâce (requêtes en cours terminées)"
+    if pool is not None:
+        threading.Timer(delay, pool.close).start()
+
+def swap_model(version: str) -> str:
+    """Charge et préchauffe une version du registre, puis la publie d'un bloc.
+    Les requêtes en cours terminent avec le scoreur qu'elles ont déjà obtenu."""
+    global model, _loaded_model, MODEL_VERSION, _scorer, _inference_pool, _active_model_path, _drift_monitor, \
+        model_loader
+    path = model_registry.path(version)
+    # Nouveau chargeur : /model/status décrit l'artefact servi (source, durée) après l'échange
+    loader = ModelLoader(path, use_mmap=MODEL_MMAP, backend=SCORER_BACKEND)
+    new_model = loader.load()
+    if loader.state == "failed":
+        raise RuntimeError(f"Chargement de {path} impossible : {loader.error}")
+    scorer = ModelScorer(new_model, version=version)
+    # Préchauffage hors verrou : le scoring continue sur l'ancien modèle pendant ce temps
+    samples = [ClientData(**s) for s in load_samples()[:WARMUP_ROWS]]
+    if samples:
+        scorer.predict_clients(samples)
+    with _swap_lock:
+        old_pool, old_version = _inference_pool, MODEL_VERSION
+        with _inference_pool_lock:
+            _inference_pool = None
+        _active_model_path = path
+        model_loader = loader
+        MODEL_VERSION = version
+        _loaded_model = new_model
+        _scorer = scorer
+        model = new_model
+        prediction_cache.clear()
+        if not DRIFT_REFERENCE_PATH:
+            _drift_monitor = None  # profil de référence du nouveau modèle, rechargé au prochain appel
+    _retire_pool(old_pool)
+    logger.info(f"Modèle remplacé à chaud : {old_version} -> {version}")
+    write_log({
+        "timestamp": datetime.utcnow().isoformat(),
+        "event": "model_swap",
+        "previous_version": old_version,
+        "model_version": version,
+    })
+    return version
+
+def activate_model_version(version: str):
+    "Charge la version, l'échange, puis l'inscrit comme active dans le manifeste (synchrone)"
+    with _reload_lock:
+        _reload_status.update(state="loading", version=version, error=None)
+        try:
+            if version != MODEL_VERSION:
+                swap_model(version)
+            model_registry.activate(version)
+            _reload_status.update(state="idle")
+        except Exception as e:
+            logger.error(f"Échec de l'activation du modèle {version} : {e}", exc_info=True)
+            _reload_status.update(state="failed", error=f"{type(e).__name__}: {e}")
+            raise
+
+def _watch_registry(stop: threading.Event):
+    "Suit le manifeste : une version activée par un autre worker ou en ligne de commande est chargée ici aussi"
+    last_mtime = model_registry.manifest_mtime()
+    while not stop.wait(MODEL_REGISTRY_WATCH_INTERVAL):
+        mtime = model_registry.manifest_mtime()
+        if mtime == last_mtime:
+            continue
+        last_mtime = mtime
+        try:
+            active = model_registry.active_version()
+            if active is not None and active != MODEL_VERSION and not _reload_lock.locked():
+                activate_model_version(active)
+        except Exception as e:
+            logger.error(f"Surveillance du registre de modèles : {e}")
+
+_registry_watch_stop = threading.Event()
+
+def start_registry_watcher():
+    if MODEL_REGISTRY_WATCH_INTERVAL > 0:
+        _registry_watch_stop.clear()
+        threading.Thread(target=_watch_registry, args=(_registry_watch_stop,), name="model-registry-watcher",
+                         daemon=True).start()
 
 
 #-----------------------------------------------------------------------------------------------------
@@ -304,7 +579,8 @@ def home():
     "description" : "Cette API utilise un modèle de Machine Learning pour prédire si un client est solvable ou défaillant",
     "endpoints": {
     "documentation": "/docs",
-    "faire une prédiction": "/predict" }
+    "faire une prédiction": "/predict",
+    "prédiction par lot": "/predict/batch" }
     
     }
 
@@ -313,12 +589,16 @@ def home():
 #------------------------------------------------------------------------------------------------------------------
 
 @app.post("/predict", tags=["Prédiction"], summary="Faire une prédiction", description="Prédit si un client est solvable ou défaillant.")
-
+@profiling.profiled
 def predict(request: Request, client: ClientData):
     "Endpoint de prédiction principale"
+    stage_timing.mark("validation")
     request_id = getattr(request.state, "request_id", "unknown")
     logger.info(f"Requête de prédiction reçue - Request ID: {request_id}")
 
+    if model is None and model_is_loading():
+        raise model_loading_error(request_id)
+
     if model is None:
         logger.critical(f"Modèle non chargé au moment de la prédiction- Request ID: {request_id}")
         write_log({
@@ -330,26 +610,42 @@ def predict(request: Request, client: ClientData):
         raise HTTPException(status_code=500, detail="Modèle non chargé")
 
     try:
-        df = pd.DataFrame([client.dict()])
-        logger.info(f"DataFrame créé avec succès - Shape: {df.shape} - Request ID : {request_id}")
-        y_pred = model.predict(df)[0]
-        y_proba = model.predict_proba(df)[0][1]
-        prediction = "Défaillant" if y_pred == 1 else "Solvable"
+        scorer = get_scorer()
+        request.state.model_version = scorer.version
+        # Un seul dump par requête : clé du cache et log structuré
+        input_data = client.model_dump(mode="json")
+        stage_timing.mark("serialize")
+        y_pred, y_proba = score_client(client, scorer, input_data)
+        stage_timing.mark("score")
+        prediction = label_from_class(y_pred)
         probabilité_defaut = round(float(y_proba), 4)
+        PREDICTIONS.inc(endpoint="predict", prediction=prediction)
+        PREDICTION_PROBABILITY.observe(float(y_proba), endpoint="predict")
+        observe_drift([client], (y_proba,), scorer)
 
         logger.info(f"Prédiction calculée : {prediction} - Probabilité de défaut : {probabilité_defaut}")
         write_log({
             "timestamp": datetime.utcnow().isoformat(),
             "request_id": request.state.request_id,
             "event": "prediction",
-            "input_data": client.dict(),
+            "input_data": input_data,
             "prediction": prediction,
-            "probabilité_defaut": probabilité_defaut
+            "probabilité_defaut": probabilité_defaut,
+            "model_version": scorer.version
         })
-        return {
+        stage_timing.mark("log")
+        # Réponse construite directement (sans passer par jsonable_encoder)
+        return json_codec.FastJSONResponse({
             "prediction": prediction,
-            "probabilité_defaut": probabilité_defaut
-        }
+            "probabilité_defaut": probabilité_defaut,
+            "model_version": scorer.version
+        })
+    except SchedulerOverloaded as e:
+        logger.warning(f"Micro-batching saturé - Request ID : {request_id} : {e}")
+        raise HTTPException(status_code=503, detail="Service surchargé, réessayez plus tard.")
+    except (WorkerDiedError, TimeoutError) as e:
+        logger.error(f"Pool d'inférence indisponible - Request ID : {request_id} : {e}")
+        raise HTTPException(status_code=503, detail="Service surchargé, réessayez plus tard.")
     except Exception as e:
         logger.error(f"Erreur lors de la prédiction - Request ID : {request_id}", exc_info=True)
         print(traceback.format_exc())
@@ -362,19 +658,380 @@ def predict(request: Request, client: ClientData):
         })
         raise HTTPException(status_code=400, detail="Erreur lors de la prédiction. Vérifiez les données d'entrée.")
 
+#------------------------------------------------------------------------------------------------------------------
+# Endpoint de prédiction par lot : une liste de clients validée ensemble et scorée en un seul appel au pipeline
+#------------------------------------------------------------------------------------------------------------------
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+
+# Validation de la liste : schemas.validate_batch (partagée avec batch_score.py)
+
+@app.post("/predict/batch", tags=["Prédiction"], summary="Prédiction par lot", description="Prédit la solvabilité d'une liste de clients. Les erreurs de validation sont renvoyées élément par élément.")
+@profiling.profiled
+def predict_batch(request: Request, items: List[dict] = Body(...)):
+    "Endpoint de prédiction par lot"
+    stage_timing.mark("receive")
+    request_id = getattr(request.state, "request_id", "unknown")
+    logger.info(f"Requête de prédiction par lot reçue ({len(items)} clients) - Request ID: {request_id}")
+
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Lot trop volumineux (maximum {MAX_BATCH_SIZE} clients)")
+
+    if model is None and model_is_loading():
+        raise model_loading_error(request_id)
+
+    if model is None:
+        logger.critical(f"Modèle non chargé au moment de la prédiction par lot - Request ID: {request_id}")
+        write_log({
+            "timestamp": datetime.utcnow().isoformat(),
+            "request_id": request_id,
+            "event": "batch_prediction_error",
+            "error": "Modèle non chargé"
+        })
+        raise HTTPException(status_code=500, detail="Modèle non chargé")
+
+    start_time = time.perf_counter()
+    clients, valid_indexes, errors = validate_batch(items)
+    stage_timing.mark("validation")
+    results = [None] * len(items)
+    for index, item_errors in errors.items():
+        results[index] = {"index": index, "error": item_errors}
+
+    n_defaillant = 0
+    mean_proba = None
+    scorer = get_scorer()
+    request.state.model_version = scorer.version
+    if clients:
+        try:
+            y_pred, y_proba = score_clients_cached(clients, scorer)
+            stage_timing.mark("score")
+        except (WorkerDiedError, TimeoutError) as e:
+            logger.error(f"Pool d'inférence indisponible - Request ID : {request_id} : {e}")
+            raise HTTPException(status_code=503, detail="Service surchargé, réessayez plus tard.")
+        except Exception as e:
+            logger.error(f"Erreur lors de la prédiction par lot - Request ID : {request_id}", exc_info=True)
+            write_log({
+                "timestamp": datetime.utcnow().isoformat(),
+                "request_id": request_id,
+                "event": "batch_prediction_error",
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            })
+            raise HTTPException(status_code=400, detail="Erreur lors de la prédiction. Vérifiez les données d'entrée.")
+
+        for index, y, p in zip(valid_indexes, y_pred, y_proba):
+            results[index] = {
+                "index": index,
+                "prediction": label_from_class(y),
+                "probabilité_defaut": round(float(p), 4)
+            }
+        n_defaillant = int(y_pred.sum())
+        record_predictions("batch", y_pred, y_proba)
+        observe_drift(clients, y_proba, scorer)
+        mean_proba = round(float(y_proba.mean()), 4)
+
+    write_log({
+        "timestamp": datetime.utcnow().isoformat(),
+        "request_id": request_id,
+        "event": "batch_prediction",
+        "n_items": len(items),
+        "n_errors": len(errors),
+        "n_defaillant": n_defaillant,
+        "n_solvable": len(clients) - n_defaillant,
+        "probabilité_defaut_moyenne": mean_proba,
+        "duration": time.perf_counter() - start_time,
+        "model_version": scorer.version
+    })
+    stage_timing.mark("log")
+    return json_codec.FastJSONResponse({
+        "n_items": len(items),
+        "n_errors": len(errors),
+        "model_version": scorer.version,
+        "results": results
+    })
+
+#------------------------------------------------------------------------------------------------------------------
+# Endpoint de prédiction en flux : corps NDJSON lu ligne à ligne, résultats NDJSON renvoyés par mini-lots
+#------------------------------------------------------------------------------------------------------------------
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "256"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", str(64 * 1024)))
+
+def score_stream_batch(start: int, lines: list, scorer: ModelScorer) -> tuple:
+    """Décode, valide et score un mini-lot de lignes NDJSON ; retourne (résultats, nb d'erreurs, nb de défaillants).
+    Pas de cache de prédiction : un flux de millions de clients l'évincerait sans y trouver de doublons."""
+    records, errors = ndjson_stream.decode_lines(lines)
+    valid = [i for i in range(len(records)) if i not in errors]
+    clients, valid_positions, validation_errors = validate_batch([records[i] for i in valid])
+    for position, item_errors in validation_errors.items():
+        errors[valid[position]] = item_errors
+
+    results = [None] * len(records)
+    for i, item_errors in errors.items():
+        results[i] = {"index": start + i, "error": item_errors}
+    n_defaillant = 0
+    if clients:
+        y_pred, y_proba = score_clients(clients, scorer)
+        for position, y, p in zip(valid_positions, y_pred, y_proba):
+            i = valid[position]
+            results[i] = {"index": start + i, "prediction": label_from_class(y), "probabilité_defaut": round(float(p), 4)}
+        n_defaillant = int(y_pred.sum())
+        record_predictions("stream", y_pred, y_proba)
+        observe_drift(clients, y_proba, scorer)
+    return results, len(errors), n_defaillant
+
+
+async def _stream_predictions(request: Request, scorer: ModelScorer, request_id: str):
+    "Génère les résultats NDJSON au fil de la lecture du corps"
+    start_time = time.perf_counter()
+    n_items = n_errors = n_defaillant = 0
+    status = "complete"
+    try:
+        lines = ndjson_stream.iter_lines(request.stream(), STREAM_MAX_LINE_BYTES)
+        async for batch in ndjson_stream.iter_batches(lines, STREAM_BATCH_SIZE):
+            results, batch_errors, batch_defaillant = await run_in_threadpool(
+                score_stream_batch, n_items, batch, scorer)
+            n_items += len(batch)
+            n_errors += batch_errors
+            n_defaillant += batch_defaillant
+            yield ndjson_stream.encode_lines(results)
+    except ndjson_stream.LineTooLong as e:
+        # Réponse déjà commencée : l'erreur est la dernière ligne du flux
+        status = "line_too_long"
+        yield ndjson_stream.encode_lines([{"index": n_items, "error": [{"loc": [], "msg": str(e), "type": "line_too_long"}]}])
+    except ClientDisconnect:
+        status = "client_disconnected"
+        logger.warning(f"Client déconnecté pendant la prédiction en flux - Request ID : {request_id}")
+    except Exception as e:
+        status = "error"
+        logger.error(f"Erreur lors de la prédiction en flux - Request ID : {request_id}", exc_info=True)
+        yield ndjson_stream.encode_lines([{"index": n_items, "error": [{"loc": [], "msg": str(e), "type": "prediction_error"}]}])
+    finally:
+        write_log({
+            "timestamp": datetime.utcnow().isoformat(),
+            "request_id": request_id,
+            "event": "stream_prediction",
+            "status": status,
+            "n_items": n_items,
+            "n_errors": n_errors,
+            "n_defaillant": n_defaillant,
+            "n_solvable": n_items - n_errors - n_defaillant,
+            "duration": time.perf_counter() - start_time,
+            "model_version": scorer.version
+        })
+
+
+@app.post("/predict/stream", tags=["Prédiction"], summary="Prédiction en flux (NDJSON)", description="Prédit la solvabilité d'un flux de clients (un objet JSON par ligne, application/x-ndjson). Les résultats sont renvoyés en NDJSON au fur et à mesure, dans l'ordre des lignes.")
+async def predict_stream(request: Request):
+    "Endpoint de prédiction en flux"
+    request_id = getattr(request.state, "request_id", "unknown")
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in ndjson_stream.ACCEPTED_TYPES:
+        raise HTTPException(status_code=415, detail=f"Corps attendu au format {ndjson_stream.MEDIA_TYPE}")
+
+    if model is None and model_is_loading():
+        raise model_loading_error(request_id)
+
+    if model is None:
+        logger.critical(f"Modèle non chargé au moment de la prédiction en flux - Request ID: {request_id}")
+        raise HTTPException(status_code=500, detail="Modèle non chargé")
+
+    logger.info(f"Requête de prédiction en flux reçue - Request ID: {request_id}")
+    # Toutes les lignes du flux sont scorées par la même version du modèle
+    scorer = get_scorer()
+    request.state.model_version = scorer.version
+    return ndjson_stream.NDJSONStreamingResponse(_stream_predictions(request, scorer, request_id))
+
+#------------------------------------------------------------------------------------------------------------------
+# Statistiques du micro-batching (histogrammes de taille de lot et d'attente en file)
+#------------------------------------------------------------------------------------------------------------------
+
+@app.get("/scheduler/stats", tags=["Monitoring"], summary="Statistiques du micro-batching")
+def scheduler_stats():
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return {"enabled": False}
+    return {"enabled": True, **scheduler.stats()}
+
+#------------------------------------------------------------------------------------------------------------------
+# État du chargement du modèle (MODEL_LOAD_MODE=startup : "loading" tant que le modèle n'est pas prêt)
+#------------------------------------------------------------------------------------------------------------------
+
+@app.get("/model/status", tags=["Monitoring"], summary="État du chargement du modèle")
+def model_status():
+    return {"mode": MODEL_LOAD_MODE, "model_version": MODEL_VERSION, **model_loader.status()}
+
+#------------------------------------------------------------------------------------------------------------------
+# Statistiques du cache de prédiction
+#------------------------------------------------------------------------------------------------------------------
+
+@app.get("/cache/stats", tags=["Monitoring"], summary="Statistiques du cache de prédiction")
+def cache_stats():
+    return {"model_version": current_model_version(), **prediction_cache.stats()}
+
 #------------------------------------------------------------------------------------------------------------------
 # 3eme Endpoint : Gestion des loggs
 #------------------------------------------------------------------------------------------------------------------
 
-@app.get("/logs", tags=["Logg"])
-def get_logs():
+MAX_LOG_LINES = 10_000
+LOG_MEDIA_TYPE = "text/plain; charset=utf-8"
+
+def _stream_filtered_logs(flt: log_reader.LogFilter):
+    """Toutes les lignes filtrées (sauvegardes comprises), lues page par page."""
+    cursor = None
+    while True:
+        lines, next_cursor = log_reader.read_page(LOG_FILE, cursor, 1000, flt, LOG_BACKUP_COUNT)
+        yield from lines
+        if len(lines) < 1000 or next_cursor == cursor:
+            return
+        cursor = next_cursor
+
+
+@app.get("/logs", tags=["Logg"], summary="Lecture des logs", description="Sans paramètre : fichier de log courant. tail=N : N dernières lignes. cursor/limit : pagination à travers les fichiers sauvegardés (curseur suivant dans l'en-tête X-Next-Cursor). Filtres : event, request_id, since, until.")
+def get_logs(
+    tail: Optional[int] = Query(None, ge=1, le=MAX_LOG_LINES),
+    event: Optional[str] = None,
+    request_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LOG_LINES),
+):
+    log_writer.flush()
+    flt = log_reader.LogFilter(event=event, request_id=request_id, since=since, until=until)
     try:
-        with open("logs/api_logger.log", "r") as f:
-            return PlainTextResponse(f.read())
+        if tail is not None:
+            return StreamingResponse(iter(log_reader.tail(LOG_FILE, tail, flt, LOG_BACKUP_COUNT)), media_type=LOG_MEDIA_TYPE)
+        if cursor is not None or limit is not None:
+            lines, next_cursor = log_reader.read_page(LOG_FILE, cursor, limit or 1000, flt, LOG_BACKUP_COUNT)
+            headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+            return StreamingResponse(iter(lines), media_type=LOG_MEDIA_TYPE, headers=headers)
+        if flt.active:
+            return StreamingResponse(_stream_filtered_logs(flt), media_type=LOG_MEDIA_TYPE)
+        if not os.path.exists(LOG_FILE):
+            raise FileNotFoundError(LOG_FILE)
+        return StreamingResponse(log_reader.stream_file(LOG_FILE), media_type=LOG_MEDIA_TYPE)
+    except ValueError as e:
+        return PlainTextResponse(f"Erreur : {e}", status_code=400)
     except Exception as e:
         return PlainTextResponse(f"Erreur : {e}", status_code=500)
 
 
+@app.get("/logs/stats", tags=["Logg"], summary="Statistiques de l'écriture des logs")
+def get_log_stats():
+    return log_writer.stats()
+
+
+#------------------------------------------------------------------------------------------------------------------
+# Administration du modèle : versions du registre, activation à chaud et retour arrière
+#------------------------------------------------------------------------------------------------------------------
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    "Les endpoints d'administration exigent l'en-tête X-Admin-Token (désactivés sans ADMIN_TOKEN)"
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Administration désactivée (ADMIN_TOKEN non défini)")
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Jeton d'administration invalide")
+
+def _start_activation(version: str, wait: bool):
+    if version not in model_registry.versions():
+        raise HTTPException(status_code=404, detail=f"Version inconnue : {version}")
+    if _reload_lock.locked():
+        raise HTTPException(status_code=409, detail=f"Chargement déjà en cours : {_reload_status['version']}")
+    if wait:
+        try:
+            activate_model_version(version)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Échec de l'activation : {e}")
+        return JSONResponse({"active_version": MODEL_VERSION, "reload": dict(_reload_status)})
+    # Chargement et préchauffage en arrière-plan ; le scoring continue sur la version courante
+    threading.Thread(target=lambda: _ignore_errors(activate_model_version, version), daemon=True).start()
+    return JSONResponse(status_code=202, content={"active_version": MODEL_VERSION, "reload": {
+        "state": "loading", "version": version, "error": None}})
+
+def _ignore_errors(fn, *args):
+    try:
+        fn(*args)
+    except Exception:
+        pass  # déjà journalisé et visible dans /admin/models
+
+@app.get("/admin/models", tags=["Administration"], summary="Versions du modèle", dependencies=[Depends(require_admin)])
+def list_models():
+    return {"active_version": MODEL_VERSION, "reload": dict(_reload_status), **model_registry.manifest()}
+
+@app.post("/admin/models/rollback", tags=["Administration"], summary="Revenir à la version précédente",
+          dependencies=[Depends(require_admin)])
+def rollback_model(wait: bool = Query(False, description="Attendre la fin du chargement")):
+    try:
+        version = model_registry.rollback_target()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _start_activation(version, wait)
+
+@app.post("/admin/models/{version}/activate", tags=["Administration"], summary="Activer une version du modèle",
+          dependencies=[Depends(require_admin)])
+def activate_model(version: str, wait: bool = Query(False, description="Attendre la fin du chargement")):
+    return _start_activation(version, wait)
+
+# Profilage à la demande du trafic réel (voir profiling.py) : fichiers écrits dans PROFILE_OUTPUT_DIR
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", profiling.DEFAULT_OUTPUT_DIR)
+
+@app.post("/admin/profile", tags=["Administration"], summary="Profiler les requêtes réelles",
+          description="Profile le trafic pendant `duration` secondes ou `requests` requêtes (mode sampling ou cprofile), puis écrit un fichier pstats et un fichier de piles agrégées (flame graph).",
+          dependencies=[Depends(require_admin)])
+def start_profiling(
+    mode: str = Query("sampling", description="sampling (faible surcoût) ou cprofile (déterministe)"),
+    duration: float = Query(10.0, gt=0, le=profiling.MAX_DURATION_S, description="Durée maximale (secondes)"),
+    requests: Optional[int] = Query(None, ge=1, description="Arrêt après ce nombre de requêtes"),
+    interval_ms: float = Query(profiling.DEFAULT_INTERVAL_MS, ge=1, le=1000, description="Période d'échantillonnage"),
+    wait: bool = Query(False, description="Attendre la fin de la session"),
+):
+    try:
+        session = profiling.start_session(mode=mode, duration=duration, max_requests=requests,
+                                          interval_ms=interval_ms, output_dir=PROFILE_OUTPUT_DIR)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    logger.info(f"Profilage démarré : mode {mode}, {duration} s, {requests or 'toutes les'} requêtes")
+    if wait:
+        session.wait(duration + 60)
+        return session.status()
+    return JSONResponse(status_code=202, content=session.status())
+
+@app.get("/admin/profile", tags=["Administration"], summary="État du profilage", dependencies=[Depends(require_admin)])
+def profiling_status():
+    session = profiling.current_session()
+    if session is None:
+        return {"state": "idle"}
+    return session.status()
+
+#------------------------------------------------------------------------------------------------------------------
+# Métriques au format texte Prometheus (agrégées sur les workers si METRICS_DIR est défini)
+#------------------------------------------------------------------------------------------------------------------
+
+@app.get("/metrics", tags=["Monitoring"], summary="Métriques Prometheus", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(METRICS.render(), media_type=METRICS_CONTENT_TYPE)
+
+#------------------------------------------------------------------------------------------------------------------
+# Dérive des données : PSI / KS par champ sur une fenêtre glissante, contre la référence (voir drift_monitor.py)
+#------------------------------------------------------------------------------------------------------------------
+
+@app.get("/drift", tags=["Monitoring"], summary="Dérive des données", description="Scores de dérive (PSI, KS) par champ et pour la probabilité prédite, sur la fenêtre glissante des dernières prédictions.")
+def drift(
+    request: Request,
+    window: Optional[float] = Query(None, gt=0, description="Fenêtre en secondes (défaut : toute la fenêtre glissante)"),
+    details: bool = Query(False, description="Comptes par bin (fenêtre et référence)"),
+):
+    if not DRIFT_MONITOR_ENABLED:
+        raise HTTPException(status_code=404, detail="Détection de dérive désactivée (DRIFT_MONITOR_ENABLED=0)")
+    if model is None and model_is_loading():
+        raise model_loading_error(getattr(request.state, "request_id", "unknown"))
+    return json_codec.FastJSONResponse(get_drift_monitor().report(window, details))
+
 #------------------------------------------------------------------------------------------------------------------
 # Endpoint pour ignorer l'erreur générée par /favicon
 #------------------------------------------------------------------------------------------------------------------
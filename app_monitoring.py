@@ -1,13 +1,14 @@
 import streamlit as st
 import requests
-import json
 from datetime import datetime
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from pathlib import Path
 import os
-import streamlit.components.v1 as components
+from datetime import timedelta
+from event_store import EventStore
+from log_reader import IncrementalLogReader
+from reference_profile import MODEL_PATH, ReferenceProfile, profile_path
 
 # Configuration de la page
 st.set_page_config(
@@ -19,8 +20,11 @@ st.set_page_config(
 # Configuration des chemins
 API_URL = "http://localhost:8000"
 LOG_PATH = "logs/api_logger.log"
-INPUT_DATA_PATH = "data/input_reference.csv"
-OUTPUT_DATA_PATH = "data/output_reference.csv"
+EVENTS_DIR = "logs/events"
+# Entrées du fichier de logs gardées par événement dans le cache du dashboard (repli sans event store)
+LOG_READER_MAX_ROWS = 50_000
+# Profil de référence compact du modèle (python reference_profile.py data/input_reference.csv --target ...)
+PROFILE_PATH = profile_path(MODEL_PATH)
 REPORTS_DIR = "reports"
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
@@ -33,22 +37,43 @@ def check_api_connection():
     except:
         return False
 
-def load_api_logs():
-    """Charge les logs structurés de l'API"""
+@st.cache_resource
+def get_log_reader():
+    """Lecteur incrémental partagé entre les onglets et les reruns (dernières entrées de chaque événement)"""
+    return IncrementalLogReader(LOG_PATH, max_rows=LOG_READER_MAX_ROWS)
+
+def load_api_logs(event):
+    """Charge les logs structurés de l'API pour un événement (seules les nouvelles lignes sont lues)"""
     if not os.path.exists(LOG_PATH):
         return pd.DataFrame()
-    
-    entries = []
-    with open(LOG_PATH, "r") as f:
-        for line in f:
-            try:
-                msg = line.strip().split(" - ", 2)[-1]
-                log_json = json.loads(msg)
-                if isinstance(log_json, dict):
-                    entries.append(log_json)
-            except:
-                continue
-    return pd.DataFrame(entries)
+    reader = get_log_reader()
+    reader.refresh()
+    return reader.frame(event)
+
+def load_events(event, since=None):
+    """Charge un type d'événement depuis l'event store (seule la fenêtre demandée est lue).
+    Repli sur le fichier de logs texte si l'event store est vide."""
+    store = EventStore(EVENTS_DIR)
+    if event in store.events():
+        events_df = store.read_frame(event, since=since)
+        if not events_df.empty:
+            return events_df
+    logs_df = load_api_logs(event)
+    if logs_df.empty:
+        return logs_df
+    if since is not None and "timestamp" in logs_df:
+        logs_df = logs_df[pd.to_datetime(logs_df["timestamp"]) >= since]
+    return logs_df
+
+@st.cache_resource
+def load_reference_profile(mtime):
+    """Profil de référence (relu seulement si le fichier change : mtime fait partie de la clé du cache)"""
+    return ReferenceProfile.load(PROFILE_PATH)
+
+def get_reference_profile():
+    if not os.path.exists(PROFILE_PATH):
+        return None
+    return load_reference_profile(os.path.getmtime(PROFILE_PATH))
 
 def analyze_predictions(logs_df):
     """Analyse les prédictions à partir des logs"""
@@ -57,8 +82,12 @@ def analyze_predictions(logs_df):
     if pred_logs.empty:
         return None, None, None
     
-    # Extraire les inputs
-    input_df = pd.json_normalize(pred_logs["input_data"])
+    # Extraire les inputs (imbriqués dans les logs texte, colonnes "input_data.*" dans l'event store)
+    if "input_data" in pred_logs:
+        input_df = pd.json_normalize(pred_logs["input_data"])
+    else:
+        input_cols = [c for c in pred_logs.columns if c.startswith("input_data.")]
+        input_df = pred_logs[input_cols].rename(columns=lambda c: c[len("input_data."):])
     input_df.reset_index(drop=True, inplace=True)
     
     # Extraire les outputs
@@ -102,6 +131,14 @@ with col1:
     else:
         st.error("❌ API non disponible")
 
+# Fenêtre d'analyse des onglets de monitoring
+WINDOWS = {"Dernière heure": timedelta(hours=1), "24 dernières heures": timedelta(days=1),
+           "7 derniers jours": timedelta(days=7), "Tout l'historique": None}
+with col2:
+    window_label = st.selectbox("Période analysée", list(WINDOWS), index=1)
+window = WINDOWS[window_label]
+since = datetime.utcnow() - window if window is not None else None
+
 # Création des onglets
 tab1, tab2, tab3= st.tabs([
     "📝 Faire une prédiction", 
@@ -333,7 +370,7 @@ with tab2:
     if st.button("🔄 Rafraîchir les données", key="refresh_dist"):
         st.rerun()
     
-    logs_df = load_api_logs()
+    logs_df = load_events("prediction", since)
     
     if not logs_df.empty:
         input_df, output_df, pred_logs = analyze_predictions(logs_df)
@@ -396,6 +433,38 @@ with tab2:
                               annotation_text="Seuil de décision")
             st.plotly_chart(fig_hist, use_container_width=True)
             
+            # Comparaison avec le profil de référence (données d'entraînement)
+            profile = get_reference_profile()
+            if profile is not None:
+                st.markdown("---")
+                st.subheader("Comparaison avec la référence")
+                score = profile.score
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    if profile.target_rate is not None:
+                        st.metric("Taux de défaut observé (référence)", f"{profile.target_rate*100:.1f}%")
+                with col2:
+                    st.metric("❌ Défaillants prédits (référence)", f"{score['predicted_default_rate']*100:.1f}%")
+                with col3:
+                    st.metric("❌ Défaillants prédits (production)", f"{nb_defaillant/total_predictions*100:.1f}%",
+                              delta=f"{(nb_defaillant/total_predictions - score['predicted_default_rate'])*100:+.1f} pts",
+                              delta_color="inverse")
+                
+                edges = score["edges"]
+                production_counts = pd.cut(output_df["probabilité_defaut"], edges,
+                                           right=False).value_counts(sort=False).to_numpy()
+                fig_ref = go.Figure(data=[
+                    go.Bar(name="Référence", x=edges[:-1], y=[c / max(sum(score["counts"]), 1) for c in score["counts"]],
+                           marker_color="#636efa"),
+                    go.Bar(name="Production", x=edges[:-1], y=production_counts / max(production_counts.sum(), 1),
+                           marker_color="#ef553b"),
+                ])
+                fig_ref.update_layout(title=f"Probabilités de défaut : production vs référence (profil {profile.version})",
+                                      barmode="group", xaxis_title="Probabilité de défaut", yaxis_title="Part des clients")
+                st.plotly_chart(fig_ref, use_container_width=True)
+            else:
+                st.caption(f"Profil de référence absent ({PROFILE_PATH}) : lancez `python reference_profile.py` pour comparer à la référence.")
+            
             # Tableau des dernières prédictions
             st.markdown("---")
             st.subheader("Dernières prédictions")
@@ -418,7 +487,7 @@ with tab3:
     if st.button("🔄 Rafraîchir les métriques", key="refresh_metrics"):
         st.rerun()
     
-    logs_df = load_api_logs()
+    logs_df = load_events("http_request", since)
     
     if not logs_df.empty:
         http_logs = analyze_http_metrics(logs_df)
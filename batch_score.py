@@ -0,0 +1,303 @@
+"""
+Scoring hors ligne d'un fichier de clients CSV ou JSONL (ligne de commande).
+
+Mêmes briques que l'API : chargement par model_loader.load_model, validation par ClientData
+(schemas.validate_batch), encodage compilé et booster natif (scoring.ModelScorer). Chaque ligne
+reçoit donc exactement la prédiction et la probabilité (arrondie à 4 décimales) que renverrait
+/predict ; une ligne invalide reçoit l'erreur de validation que renverrait /predict/batch.
+
+- l'entrée est lue par lots de chunk_size lignes : la mémoire est bornée quelle que soit sa taille ;
+- les lots sont validés, encodés et scorés par un pool de processus (un thread XGBoost par worker),
+  avec au plus 2 lots en attente par worker ;
+- les résultats sont écrits au fil de l'eau, dans l'ordre de l'entrée, en CSV
+  « index,prediction,probabilité_defaut,error » (compressé si la sortie finit par .gz : un membre
+  gzip par lot) ;
+- après chaque lot, un point de reprise <sortie>.checkpoint.json enregistre le nombre de lignes
+  traitées et la taille de la sortie : avec --resume, un traitement interrompu repart de là (la
+  sortie est tronquée au dernier lot complet).
+
+Usage :
+    python batch_score.py clients.csv scores.csv
+    python batch_score.py clients.jsonl scores.csv.gz --chunk-size 20000 --workers 4 --resume
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import math
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import json_codec
+from model_loader import load_model
+from model_registry import file_sha256
+from ndjson_stream import decode_lines
+from schemas import validate_batch
+from scoring import DECISION_THRESHOLD, SCORER_BACKEND, ModelScorer, label_from_class
+
+MODEL_PATH = "model.pkl"
+DEFAULT_CHUNK_SIZE = 10_000
+PENDING_CHUNKS_PER_WORKER = 2
+OUTPUT_COLUMNS = ["index", "prediction", "probabilité_defaut", "error"]
+
+# Le point de reprise n'est valable que pour la même entrée, le même modèle et le même seuil
+_CHECKPOINT_IDENTITY = ("input", "input_size", "input_mtime_ns", "model_version", "threshold", "id_column")
+
+
+def input_format(path: str) -> str:
+    """Format déduit de l'extension (.csv, .jsonl, .ndjson, éventuellement suivie de .gz)."""
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(f"Format d'entrée non reconnu : {path} (attendu : .csv ou .jsonl)")
+
+
+def checkpoint_path(output: str) -> str:
+    return output + ".checkpoint.json"
+
+
+# ============================================================
+# Lecture par lots
+# ============================================================
+
+def read_chunks(path: str, chunk_size: int, skip_rows: int = 0, fmt: str = None):
+    """Produit (indice de la première ligne, lot) ; les skip_rows premières lignes sont sautées.
+
+    Un lot CSV est un DataFrame (flottants relus au bit près, comme json.loads) ; un lot JSONL
+    est une liste de lignes de texte (les lignes vides ne comptent pas)."""
+    fmt = fmt or input_format(path)
+    if fmt == "csv":
+        reader = pd.read_csv(path, chunksize=chunk_size, skiprows=range(1, skip_rows + 1),
+                             float_precision="round_trip")
+        start = skip_rows
+        with reader:
+            for chunk in reader:
+                yield start, chunk
+                start += len(chunk)
+        return
+
+    opener = gzip.open if path.endswith(".gz") else open
+    start, lines, seen = skip_rows, [], 0
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            seen += 1
+            if seen <= skip_rows:
+                continue
+            lines.append(line)
+            if len(lines) == chunk_size:
+                yield start, lines
+                start, lines = start + len(lines), []
+    if lines:
+        yield start, lines
+
+
+def _records(chunk):
+    """Lot -> (dictionnaires à valider, erreurs de décodage par position dans le lot)."""
+    if isinstance(chunk, pd.DataFrame):
+        # Cellule vide : champ absent, comme une clé manquante dans le JSON
+        return [{k: v for k, v in row.items() if not (isinstance(v, float) and math.isnan(v))}
+                for row in chunk.to_dict("records")], {}
+    return decode_lines(chunk)
+
+
+# ============================================================
+# Scoring d'un lot (dans un worker)
+# ============================================================
+
+_scorer = None
+
+
+def _init_worker(model_path: str, threshold: float, backend: str):
+    """Initialisation d'un worker : chargement du modèle, un thread XGBoost par processus."""
+    global _scorer
+    _scorer = ModelScorer(load_model(model_path, backend=backend), threshold=threshold, backend=backend, nthread=1)
+
+
+def score_chunk(start: int, chunk, id_column: str = None, scorer: ModelScorer = None) -> tuple:
+    """Valide et score un lot ; retourne (lignes CSV encodées, nb de lignes, nb d'erreurs, nb de défaillants)."""
+    scorer = scorer or _scorer
+    records, errors = _records(chunk)
+    valid = [i for i in range(len(records)) if i not in errors]
+    clients, valid_positions, validation_errors = validate_batch([records[i] for i in valid])
+    for position, item_errors in validation_errors.items():
+        errors[valid[position]] = item_errors
+
+    rows = [None] * len(records)
+    n_defaillant = 0
+    if clients:
+        y_pred, y_proba = scorer.predict_clients(clients)
+        n_defaillant = int(y_pred.sum())
+        for position, y, p in zip(valid_positions, y_pred, y_proba):
+            rows[valid[position]] = [label_from_class(y), round(float(p), 4), ""]
+    for i, item_errors in errors.items():
+        rows[i] = ["", "", json_codec.dumps(item_errors)]
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for i, (row, record) in enumerate(zip(rows, records)):
+        ids = [record.get(id_column, "") if isinstance(record, dict) else ""] if id_column else []
+        writer.writerow([start + i, *ids, *row])
+    return buffer.getvalue().encode("utf-8"), len(records), len(errors), n_defaillant
+
+
+# ============================================================
+# Écriture incrémentale et point de reprise
+# ============================================================
+
+def _write_checkpoint(path: str, state: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _open_output(output: str, state: dict, resume: bool):
+    """Ouvre la sortie : reprise au dernier lot complet, sinon fichier neuf (état réinitialisé)."""
+    path = checkpoint_path(output)
+    if resume and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        changed = [k for k in _CHECKPOINT_IDENTITY if saved.get(k) != state[k]]
+        if changed:
+            raise ValueError(f"Point de reprise incompatible ({', '.join(changed)} modifié) : relancer sans --resume")
+        if not os.path.exists(output) or os.path.getsize(output) < saved["output_bytes"]:
+            raise ValueError(f"Sortie {output} plus courte que le point de reprise : relancer sans --resume")
+        state.update(saved)
+        f = open(output, "r+b")
+        f.truncate(saved["output_bytes"])  # lot partiellement écrit lors de l'interruption
+        f.seek(saved["output_bytes"])
+        return f
+    return open(output, "wb")
+
+
+def _append(f, data: bytes, compressed: bool):
+    f.write(gzip.compress(data) if compressed else data)
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def run_batch(input_path: str, output: str, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = None,
+              model_path: str = MODEL_PATH, threshold: float = DECISION_THRESHOLD, backend: str = SCORER_BACKEND,
+              id_column: str = None, resume: bool = False, progress=print) -> dict:
+    """Score input_path dans output ; workers=0 : scoring dans le processus courant. Retourne un résumé."""
+    fmt = input_format(input_path)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    stat = os.stat(input_path)
+    state = {
+        "input": os.path.abspath(input_path), "input_size": stat.st_size, "input_mtime_ns": stat.st_mtime_ns,
+        "model_version": file_sha256(model_path)[:12], "threshold": threshold, "id_column": id_column,
+        "chunk_size": chunk_size, "rows": 0, "errors": 0, "n_defaillant": 0, "output_bytes": 0, "complete": False,
+    }
+    compressed = output.endswith(".gz")
+    out = _open_output(output, state, resume)
+    resumed_from = state["rows"]
+    ckpt = checkpoint_path(output)
+
+    if state["output_bytes"] == 0:
+        header = ["index", id_column, *OUTPUT_COLUMNS[1:]] if id_column else OUTPUT_COLUMNS
+        _append(out, (",".join(header) + "\n").encode("utf-8"), compressed)
+        state["output_bytes"] = out.tell()
+        _write_checkpoint(ckpt, state)
+
+    if workers:
+        executor = ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn"), initializer=_init_worker,
+                                       initargs=(model_path, threshold, backend))
+        submit = lambda start, chunk: executor.submit(score_chunk, start, chunk, id_column)
+    else:
+        executor = None
+        scorer = ModelScorer(load_model(model_path, backend=backend), threshold=threshold, backend=backend)
+        submit = lambda start, chunk: _Done(score_chunk(start, chunk, id_column, scorer))
+
+    started = time.perf_counter()
+    pending = deque()
+    chunks = read_chunks(input_path, chunk_size, skip_rows=state["rows"], fmt=fmt) if not state["complete"] else ()
+    max_pending = max(1, workers * PENDING_CHUNKS_PER_WORKER)
+    try:
+        for start, chunk in chunks:
+            pending.append(submit(start, chunk))
+            while len(pending) >= max_pending:
+                _commit(pending.popleft().result(), out, compressed, state, ckpt, started, resumed_from, progress)
+        while pending:
+            _commit(pending.popleft().result(), out, compressed, state, ckpt, started, resumed_from, progress)
+        state["complete"] = True
+        _write_checkpoint(ckpt, state)
+    finally:
+        out.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    seconds = time.perf_counter() - started
+    scored = state["rows"] - resumed_from
+    return {
+        "output": output, "rows": state["rows"], "errors": state["errors"], "n_defaillant": state["n_defaillant"],
+        "resumed_from": resumed_from, "seconds": round(seconds, 3),
+        "rows_per_second": round(scored / seconds, 1) if seconds > 0 else None,
+        "model_version": state["model_version"], "workers": workers,
+    }
+
+
+class _Done:
+    """Résultat déjà calculé, avec l'interface d'un Future (scoring dans le processus courant)."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+def _commit(result: tuple, out, compressed: bool, state: dict, ckpt: str, started: float, resumed_from: int, progress):
+    """Écrit un lot terminé, puis avance le point de reprise."""
+    data, n_rows, n_errors, n_defaillant = result
+    _append(out, data, compressed)
+    state["rows"] += n_rows
+    state["errors"] += n_errors
+    state["n_defaillant"] += n_defaillant
+    state["output_bytes"] = out.tell()
+    _write_checkpoint(ckpt, state)
+    if progress is not None:
+        elapsed = time.perf_counter() - started
+        rate = (state["rows"] - resumed_from) / elapsed if elapsed > 0 else 0.0
+        progress(f"{state['rows']} lignes scorées ({rate:.0f} lignes/s, {state['errors']} erreurs)")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Scoring hors ligne d'un fichier de clients CSV ou JSONL")
+    parser.add_argument("input", help="fichier .csv ou .jsonl (éventuellement .gz)")
+    parser.add_argument("output", help="fichier CSV de sortie (.csv.gz : compressé)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="lignes par lot")
+    parser.add_argument("--workers", type=int, default=None, help="processus de scoring (défaut : nombre de cœurs, 0 : aucun)")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--threshold", type=float, default=DECISION_THRESHOLD, help="seuil de décision")
+    parser.add_argument("--id-column", help="colonne d'identifiant recopiée dans la sortie (ex. SK_ID_CURR)")
+    parser.add_argument("--resume", action="store_true", help="reprendre au dernier lot écrit")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = run_batch(args.input, args.output, args.chunk_size, args.workers, args.model, args.threshold,
+                            id_column=args.id_column, resume=args.resume)
+    except ValueError as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print(f"Interrompu : relancer avec --resume pour reprendre ({checkpoint_path(args.output)})", file=sys.stderr)
+        return 130
+    print(f"Terminé : {summary['rows']} lignes ({summary['errors']} erreurs) en {summary['seconds']} s "
+          f"({summary['rows_per_second']} lignes/s) -> {summary['output']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,451 @@
+"""
+Suite de benchmarks reproductible, avec comparaison à une référence (baseline).
+
+Remplace API_PERFORMANCE_ANALYSIS.ipynb : les mêmes mesures (chargement du modèle, profilage,
+goulots d'étranglement) sont lancées en ligne de commande, avec des résultats comparables
+d'une exécution à l'autre.
+
+Usage :
+    python benchmark_suite.py                          # tous les cas
+    python benchmark_suite.py predict_single http_predict
+    python benchmark_suite.py --quick                  # moins d'itérations (CI)
+    python benchmark_suite.py --save-baseline          # enregistre la référence
+    python benchmark_suite.py --baseline performance_results/baseline.json --threshold 0.15
+    python benchmark_suite.py --profile                # + cprofile_predict.txt et bottlenecks.json
+
+Chaque cas mesure une durée par itération et publie n, moyenne, p50, p95, p99, min, max
+(et lignes/s pour les lots), en médiane de --rounds séries pour lisser le bruit de la machine. Les résultats (performance_results/suite_results.json)
+contiennent aussi l'environnement : versions, CPU, commit git, empreinte du modèle et
+variables de configuration. Avec --baseline, le code de sortie vaut 1 si un cas est plus
+lent que la référence de plus de --threshold (20 % par défaut) sur p50 ou p95.
+"""
+
+import argparse
+import cProfile
+import io
+import json
+import logging
+import os
+import platform
+import pstats
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+
+import numpy as np
+
+from sample_data import load_samples
+
+MODEL_PATH = "model.pkl"
+RESULTS_DIR = "performance_results"
+RESULTS_PATH = os.path.join(RESULTS_DIR, "suite_results.json")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+DEFAULT_THRESHOLD = 0.20
+GATED_METRICS = ("p50_ms", "p95_ms")
+PACKAGES = ("numpy", "pandas", "scikit-learn", "xgboost", "fastapi", "pydantic", "starlette", "joblib")
+CONFIG_VARS = ("SCORER_BACKEND", "XGB_NTHREAD", "XGB_PARALLEL_MIN_ROWS", "DECISION_THRESHOLD", "MODEL_MMAP",
+               "MICROBATCH_ENABLED", "INFERENCE_POOL_WORKERS", "PREDICTION_CACHE_SIZE", "LOG_SAMPLE_RATE")
+
+warnings.filterwarnings("ignore")
+
+
+# ============================================================
+# Mesure et statistiques
+# ============================================================
+
+def measure(fn, n_iter: int, warmup: int = 5) -> np.ndarray:
+    """Exécute fn() n_iter fois (après warmup appels) et retourne les durées en millisecondes."""
+    for _ in range(warmup):
+        fn()
+    times = np.empty(n_iter)
+    for i in range(n_iter):
+        start = time.perf_counter()
+        fn()
+        times[i] = (time.perf_counter() - start) * 1000
+    return times
+
+
+def median_of_rounds(rounds: list) -> dict:
+    """Combine plusieurs séries : médiane de chaque statistique (robuste à une série perturbée)."""
+    combined = {key: float(np.median([r[key] for r in rounds])) for key in rounds[0] if key.endswith(("_ms", "_per_s"))}
+    return {"n": sum(r["n"] for r in rounds), "rows": rounds[0]["rows"], "rounds": len(rounds), **combined}
+
+
+def summarize(times: np.ndarray, rows: int = 1) -> dict:
+    mean = float(np.mean(times))
+    p50, p95, p99 = (float(v) for v in np.percentile(times, [50, 95, 99]))
+    return {
+        "n": int(len(times)),
+        "rows": rows,
+        "mean_ms": mean,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "min_ms": float(np.min(times)),
+        "max_ms": float(np.max(times)),
+        "rows_per_s": rows * 1000 / mean if mean else None,
+    }
+
+
+# ============================================================
+# Environnement
+# ============================================================
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10, check=True).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment() -> dict:
+    from model_registry import file_sha256
+
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "packages": versions,
+        "git_commit": _git("rev-parse", "HEAD"),
+        "git_dirty": bool(status) if status is not None else None,
+        "model_sha256": file_sha256(MODEL_PATH) if os.path.exists(MODEL_PATH) else None,
+        "config": {name: os.environ[name] for name in CONFIG_VARS if name in os.environ},
+    }
+
+
+# Champs d'environnement qui rendent deux mesures difficilement comparables
+COMPARABLE_FIELDS = ("python", "machine", "cpu_count", "packages", "model_sha256", "config")
+
+
+# ============================================================
+# Cas mesurés
+# ============================================================
+
+class Context:
+    """Objets partagés entre les cas, créés à la première utilisation."""
+
+    def __init__(self, quick: bool = False, rounds: int = 3):
+        # Avant tout import de API_Fastapi : bout en bout sans le cache de prédictions
+        # (les mêmes exemples sont rejoués) et sans écrire l'event store dans logs/
+        os.environ.setdefault("PREDICTION_CACHE_SIZE", "0")
+        os.environ.setdefault("EVENT_STORE_DIR", tempfile.mkdtemp(prefix="bench_events_"))
+        self.quick = quick
+        self.rounds = rounds
+        self.samples = load_samples()
+        self._cache = {}
+
+    def iterations(self, full: int) -> int:
+        return max(5, full // 10) if self.quick else full
+
+    def bench(self, fn, full: int, rows: int = 1, warmup: int = 5) -> dict:
+        """Mesure fn() en self.rounds séries de iterations(full) appels."""
+        return median_of_rounds([summarize(measure(fn, self.iterations(full), warmup), rows) for _ in range(self.rounds)])
+
+    def _get(self, name, factory):
+        if name not in self._cache:
+            self._cache[name] = factory()
+        return self._cache[name]
+
+    @property
+    def model(self):
+        import joblib
+        return self._get("model", lambda: joblib.load(MODEL_PATH))
+
+    @property
+    def scorer(self):
+        from scoring import ModelScorer
+        return self._get("scorer", lambda: ModelScorer(self.model))
+
+    @property
+    def client_data(self):
+        from API_Fastapi import ClientData
+        return ClientData
+
+    def clients(self, n: int) -> list:
+        ClientData = self.client_data
+        return [ClientData(**self.samples[i % len(self.samples)]) for i in range(n)]
+
+    @property
+    def http(self):
+        def factory():
+            from fastapi.testclient import TestClient
+            from API_Fastapi import app
+            return TestClient(app)
+        return self._get("http", factory)
+
+
+def case_model_load(ctx: Context) -> dict:
+    """joblib.load(model.pkl) (sans l'artefact mappé)."""
+    import joblib
+    return ctx.bench(lambda: joblib.load(MODEL_PATH), 20, warmup=1)
+
+
+def case_validation(ctx: Context) -> dict:
+    """Validation Pydantic d'un client (ClientData)."""
+    ClientData, sample = ctx.client_data, ctx.samples[0]
+    return ctx.bench(lambda: ClientData(**sample), 2000)
+
+
+def case_encode_single(ctx: Context) -> dict:
+    """Encodage d'un client validé en matrice (encodeur compilé)."""
+    scorer, clients = ctx.scorer, ctx.clients(1)
+    return ctx.bench(lambda: scorer.encoder.transform_clients(clients), 1000)
+
+
+def case_model_single(ctx: Context) -> dict:
+    """Probabilité d'une ligne déjà encodée (booster)."""
+    scorer = ctx.scorer
+    X = scorer.encoder.transform_clients(ctx.clients(1))
+    return ctx.bench(lambda: scorer.predict_encoded(X), 1000)
+
+
+def case_predict_single(ctx: Context) -> dict:
+    """Scoring d'un client validé (encodage + modèle + seuil)."""
+    scorer, clients = ctx.scorer, ctx.clients(1)
+    return ctx.bench(lambda: scorer.predict_clients(clients), 1000)
+
+
+def _case_predict_batch(size: int, full: int):
+    def case(ctx: Context) -> dict:
+        scorer, clients = ctx.scorer, ctx.clients(size)
+        return ctx.bench(lambda: scorer.predict_clients(clients), full, rows=size, warmup=2)
+    case.__doc__ = f"Scoring d'un lot de {size} clients validés."
+    return case
+
+
+def case_logging(ctx: Context) -> dict:
+    """Log structuré d'une prédiction sur le chemin de la requête (QueuedLogWriter)."""
+    from log_writer import BatchingRotatingFileHandler, QueuedLogWriter
+
+    entry = {"event": "prediction", "input_data": ctx.samples[0], "prediction": "Solvable",
+             "probabilité_defaut": 0.1234}
+    with tempfile.TemporaryDirectory() as tmp:
+        target = BatchingRotatingFileHandler(f"{tmp}/suite.log", maxBytes=10_000_000, backupCount=5)
+        target.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        writer = QueuedLogWriter(target, maxsize=100_000)
+        bench_logger = logging.getLogger("benchmark_suite")
+        bench_logger.propagate = False
+        bench_logger.setLevel(logging.INFO)
+        bench_logger.handlers = [writer]
+        result = ctx.bench(lambda: bench_logger.info(entry), 5000)
+        writer.stop()
+    return result
+
+
+def case_metrics_scrape(ctx: Context) -> dict:
+    """Rendu de /metrics (texte Prometheus) pour 20 routes x 3 codes de statut."""
+    from metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    requests = registry.counter("api_http_requests", "Requêtes HTTP", ("method", "route", "status"))
+    duration = registry.histogram("api_http_request_duration_seconds", "Durée", ("method", "route"))
+    for i in range(20):
+        for status in (200, 400, 500):
+            requests.inc(method="POST", route=f"/route_{i}", status=status)
+        duration.observe(0.01 * i, method="POST", route=f"/route_{i}")
+    return ctx.bench(registry.render, 2000)
+
+
+def case_stage_timing(ctx: Context) -> dict:
+    """Instrumentation par étape d'une requête /predict : marques, en-tête Server-Timing, histogrammes."""
+    import stage_timing
+    from metrics import MetricsRegistry, STAGE_BUCKETS_S
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram("api_stage_duration_seconds", "Durée", ("route", "stage"), buckets=STAGE_BUCKETS_S)
+    stages = ("validation", "encode", "inference", "score", "serialize", "log", "response")
+
+    def instrumented_request():
+        timer = stage_timing.start()
+        for stage in stages:
+            stage_timing.mark(stage)
+        durations = timer.durations()
+        timer.server_timing(durations)
+        histogram.observe_deferred(("/predict",), durations)
+
+    return ctx.bench(instrumented_request, 5000)
+
+
+def case_drift_report(ctx: Context) -> dict:
+    """Dérive en continu : comptage d'un lot de 100 clients dans les fenêtres, puis scores PSI / KS de /drift."""
+    from drift_monitor import DriftMonitor, DriftReference
+
+    clients = ctx.clients(100)
+    proba = ctx.scorer.predict_clients(clients)[1]
+    reference = DriftReference.build(ctx.client_data, [c.model_dump() for c in clients], proba)
+    monitor = DriftMonitor.for_schema(ctx.client_data, reference, min_samples=0, flush_interval=0)
+
+    def observe_and_report():
+        monitor.observe_clients(clients, proba)
+        monitor.report()
+
+    return ctx.bench(observe_and_report, 200)
+
+
+def case_http_predict(ctx: Context) -> dict:
+    """POST /predict de bout en bout via l'application ASGI (TestClient)."""
+    http, sample = ctx.http, ctx.samples[0]
+    return ctx.bench(lambda: http.post("/predict", json=sample), 300)
+
+
+def case_http_batch(ctx: Context) -> dict:
+    """POST /predict/batch de 100 clients via l'application ASGI."""
+    http = ctx.http
+    batch = [ctx.samples[i % len(ctx.samples)] for i in range(100)]
+    return ctx.bench(lambda: http.post("/predict/batch", json=batch), 50, rows=100, warmup=2)
+
+
+CASES = {
+    "model_load": case_model_load,
+    "validation": case_validation,
+    "encode_single": case_encode_single,
+    "model_single": case_model_single,
+    "predict_single": case_predict_single,
+    "predict_batch_10": _case_predict_batch(10, 500),
+    "predict_batch_100": _case_predict_batch(100, 200),
+    "predict_batch_1000": _case_predict_batch(1000, 50),
+    "logging": case_logging,
+    "metrics_scrape": case_metrics_scrape,
+    "stage_timing": case_stage_timing,
+    "drift_report": case_drift_report,
+    "http_predict": case_http_predict,
+    "http_batch_100": case_http_batch,
+}
+
+
+# ============================================================
+# Profilage et goulots d'étranglement
+# ============================================================
+
+def profile_predict(ctx: Context, n_iter: int = 200) -> str:
+    """cProfile du scoring d'un client (performance_results/cprofile_predict.txt)."""
+    scorer, clients = ctx.scorer, ctx.clients(1)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _ in range(n_iter):
+        scorer.predict_clients(clients)
+    profiler.disable()
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).strip_dirs().sort_stats("cumulative").print_stats(30)
+    path = Path(RESULTS_DIR) / "cprofile_predict.txt"
+    path.write_text(stream.getvalue(), encoding="utf-8")
+    return str(path)
+
+
+def bottlenecks(cases: dict) -> list:
+    """Décomposition du p50 d'un POST /predict par étape, de la plus coûteuse à la moins coûteuse."""
+    stages = {"validation": "validation", "encodage": "encode_single", "modèle": "model_single", "logging": "logging"}
+    if "http_predict" not in cases or any(case not in cases for case in stages.values()):
+        return []
+    total = cases["http_predict"]["p50_ms"]
+    parts = {stage: cases[case]["p50_ms"] for stage, case in stages.items()}
+    parts["http_et_framework"] = max(total - sum(parts.values()), 0.0)
+    return sorted(({"component": stage, "p50_ms": round(ms, 4), "share_percent": round(100 * ms / total, 1)}
+                   for stage, ms in parts.items()), key=lambda b: -b["p50_ms"])
+
+
+# ============================================================
+# Comparaison à la référence
+# ============================================================
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD, metrics=GATED_METRICS) -> list:
+    """Écart relatif de chaque métrique par rapport à la référence ; regression=True au-delà du seuil."""
+    rows = []
+    for name, current in results["cases"].items():
+        reference = baseline.get("cases", {}).get(name)
+        if reference is None:
+            continue
+        for metric in metrics:
+            before, after = reference.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = after / before - 1
+            rows.append({"case": name, "metric": metric, "baseline": before, "current": after,
+                         "change": change, "regression": change > threshold})
+    return rows
+
+
+def environment_differences(current: dict, reference: dict) -> list:
+    return [field for field in COMPARABLE_FIELDS if current.get(field) != reference.get(field)]
+
+
+def run(names: list, quick: bool = False, rounds: int = 3, profile: bool = False) -> dict:
+    ctx = Context(quick=quick, rounds=rounds)
+    results = {"environment": environment(), "quick": quick, "rounds": rounds, "cases": {}}
+    print(f"Commit {results['environment'].get('git_commit')}, {results['environment'].get('cpu_count')} CPU")
+    for name in names:
+        start = time.perf_counter()
+        results["cases"][name] = CASES[name](ctx)
+        print(f"{name:<20} p50 {results['cases'][name]['p50_ms']:9.3f} ms   "
+              f"p95 {results['cases'][name]['p95_ms']:9.3f} ms   ({time.perf_counter() - start:.1f} s)")
+    if profile:
+        results["profile"] = profile_predict(ctx)
+        results["bottlenecks"] = bottlenecks(results["cases"])
+        with open(Path(RESULTS_DIR) / "bottlenecks.json", "w", encoding="utf-8") as f:
+            json.dump(results["bottlenecks"], f, indent=2, ensure_ascii=False)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Suite de benchmarks de l'API avec seuils de régression")
+    parser.add_argument("cases", nargs="*", help=f"cas à exécuter parmi {', '.join(CASES)} (défaut : tous)")
+    parser.add_argument("--quick", action="store_true", help="10 fois moins d'itérations")
+    parser.add_argument("--rounds", type=int, default=3, help="séries par cas (médiane des statistiques)")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", help="référence à comparer (ex. performance_results/baseline.json)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="ralentissement relatif toléré (0.2 = +20 %%)")
+    parser.add_argument("--metrics", default=",".join(GATED_METRICS), help="métriques contrôlées, séparées par des virgules")
+    parser.add_argument("--save-baseline", nargs="?", const=BASELINE_PATH, metavar="PATH",
+                        help="enregistre aussi les résultats comme référence")
+    parser.add_argument("--profile", action="store_true", help="cProfile du scoring et décomposition du /predict")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"cas inconnu(s) : {', '.join(unknown)}")
+
+    Path(RESULTS_DIR).mkdir(exist_ok=True)
+    results = run(args.cases or list(CASES), quick=args.quick, rounds=args.rounds, profile=args.profile)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Résultats écrits : {path}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    differences = environment_differences(results["environment"], baseline.get("environment", {}))
+    if differences:
+        print(f"Attention : environnement différent de la référence ({', '.join(differences)})")
+    rows = compare(results, baseline, args.threshold, tuple(args.metrics.split(",")))
+    regressions = [r for r in rows if r["regression"]]
+    for r in rows:
+        flag = "RÉGRESSION" if r["regression"] else "ok"
+        print(f"{r['case']:<20} {r['metric']:<7} {r['baseline']:9.3f} -> {r['current']:9.3f} ms  "
+              f"({r['change']:+.1%})  {flag}")
+    if regressions:
+        print(f"{len(regressions)} métrique(s) au-delà du seuil de {args.threshold:.0%}")
+        return 1
+    print(f"Aucune régression au-delà de {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,565 @@
+"""
+Benchmarks des optimisations de l'API.
+
+Usage :
+    python benchmarks.py                 # exécute tous les benchmarks
+    python benchmarks.py fused_scoring   # exécute un benchmark précis
+
+Chaque benchmark écrit ses résultats dans performance_results/<nom>.json. Les durées sont
+mesurées et résumées par measure() et summarize() de benchmark_suite.py (mêmes statistiques
+que la suite de non-régression).
+"""
+
+import json
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from benchmark_suite import measure, summarize
+from sample_data import load_samples
+from scoring import ModelScorer
+
+MODEL_PATH = "model.pkl"
+RESULTS_DIR = "performance_results"
+
+warnings.filterwarnings("ignore")
+
+
+# ============================================================
+# Outils de mesure
+# ============================================================
+
+def _gain(before: dict, after: dict) -> float:
+    return (1 - after["mean_ms"] / before["mean_ms"]) * 100
+
+
+def _save(name: str, results: dict) -> dict:
+    Path(RESULTS_DIR).mkdir(exist_ok=True)
+    with open(Path(RESULTS_DIR) / f"{name}.json", "w") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    return results
+
+
+# ============================================================
+# Benchmarks
+# ============================================================
+
+def bench_fused_scoring(n_iter: int = 200) -> dict:
+    """predict() + predict_proba() (avant) vs scoring en une seule passe (après)."""
+    model = joblib.load(MODEL_PATH)
+    scorer = ModelScorer(model)
+    df = pd.DataFrame([load_samples()[0]])
+
+    def before():
+        model.predict(df)[0]
+        model.predict_proba(df)[0][1]
+
+    def after():
+        scorer.predict(df)
+
+    res_before = summarize(measure(before, n_iter))
+    res_after = summarize(measure(after, n_iter))
+    return _save("fused_scoring", {
+        "iterations": n_iter,
+        "predict_then_proba": res_before,
+        "single_pass": res_after,
+        "gain_percent": _gain(res_before, res_after),
+    })
+
+
+def bench_batch_endpoint(n_single: int = 200, batch_size: int = 1000, n_batches: int = 5) -> dict:
+    """Débit par ligne : POST /predict ligne à ligne vs POST /predict/batch."""
+    from fastapi.testclient import TestClient
+    from API_Fastapi import app
+
+    client = TestClient(app)
+    samples = load_samples()
+    batch = [samples[i % len(samples)] for i in range(batch_size)]
+
+    single_ms = measure(lambda: client.post("/predict", json=samples[0]), n_single)
+    batch_ms = measure(lambda: client.post("/predict/batch", json=batch), n_batches, warmup=1)
+
+    single_rows_per_s = 1000 / float(np.mean(single_ms))
+    batch_rows_per_s = batch_size * 1000 / float(np.mean(batch_ms))
+    return _save("batch_endpoint", {
+        "batch_size": batch_size,
+        "single": dict(summarize(single_ms), rows_per_s=single_rows_per_s),
+        "batch": dict(summarize(batch_ms), rows_per_s=batch_rows_per_s),
+        "speedup_per_row": batch_rows_per_s / single_rows_per_s,
+    })
+
+
+def bench_compiled_encoder(n_iter: int = 200) -> dict:
+    """Préprocesseur scikit-learn (DataFrame + pipeline) vs encodeur compilé, sur une ligne."""
+    from API_Fastapi import ClientData
+
+    model = joblib.load(MODEL_PATH)
+    scorer = ModelScorer(model)
+    sample = load_samples()[0]
+    client = ClientData(**sample)
+
+    def pipeline():
+        model.predict_proba(pd.DataFrame([client.model_dump()]))
+
+    def compiled():
+        scorer.predict_clients([client])
+
+    res_pipeline = summarize(measure(pipeline, n_iter))
+    res_compiled = summarize(measure(compiled, n_iter))
+    encode_only = summarize(measure(lambda: scorer.encoder.transform_clients([client]), n_iter))
+    return _save("compiled_encoder", {
+        "iterations": n_iter,
+        "sklearn_pipeline": res_pipeline,
+        "compiled_encoder": res_compiled,
+        "encode_only": encode_only,
+        "gain_percent": _gain(res_pipeline, res_compiled),
+    })
+
+
+def _concurrent(fn, n_threads: int, n_per_thread: int):
+    """Appelle fn() depuis n_threads threads ; retourne (latences en ms, requêtes/s)."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def worker(_):
+        return measure(fn, n_per_thread, warmup=0)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(n_threads) as pool:
+        times = np.concatenate(list(pool.map(worker, range(n_threads))))
+    return times, len(times) / (time.perf_counter() - start)
+
+
+def bench_micro_batching(n_threads: int = 32, n_per_thread: int = 50) -> dict:
+    """Requêtes unitaires concurrentes : appel direct au modèle vs micro-batching."""
+    from API_Fastapi import ClientData
+    from micro_batching import MicroBatchScheduler
+
+    scorer = ModelScorer(joblib.load(MODEL_PATH))
+    client = ClientData(**load_samples()[0])
+    scheduler = MicroBatchScheduler(scorer.predict_clients, max_batch_size=64, max_wait_ms=2)
+
+    direct_ms, direct_rps = _concurrent(lambda: scorer.predict_clients([client]), n_threads, n_per_thread)
+    batched_ms, batched_rps = _concurrent(lambda: scheduler.submit(client).result(), n_threads, n_per_thread)
+    scheduler.stop()
+    return _save("micro_batching", {
+        "threads": n_threads,
+        "requests": n_threads * n_per_thread,
+        "direct": dict(summarize(direct_ms), requests_per_s=direct_rps),
+        "micro_batching": dict(summarize(batched_ms), requests_per_s=batched_rps),
+        "scheduler": scheduler.stats(),
+    })
+
+
+def bench_inference_pool(worker_counts=(1, 2, 4), n_threads: int = 16, n_per_thread: int = 50, rows: int = 64) -> dict:
+    """Débit du scoring concurrent : threads dans le processus vs pool de 1..N processus."""
+    import os
+    from inference_pool import InferencePool
+
+    scorer = ModelScorer(joblib.load(MODEL_PATH))
+    samples = load_samples()
+    X = scorer.encoder.transform_records([samples[i % len(samples)] for i in range(rows)])
+
+    results = {"cpu_count": os.cpu_count(), "threads": n_threads, "rows_per_request": rows}
+    times, rps = _concurrent(lambda: scorer.classifier.predict_proba(X), n_threads, n_per_thread)
+    results["in_process"] = dict(summarize(times), rows_per_s=rps * rows)
+    for n_workers in worker_counts:
+        pool = InferencePool(MODEL_PATH, n_features=scorer.encoder.n_features, n_workers=n_workers)
+        times, rps = _concurrent(lambda: pool.predict_proba(X), n_threads, n_per_thread)
+        pool.close()
+        results[f"pool_{n_workers}_workers"] = dict(summarize(times), rows_per_s=rps * rows)
+    return _save("inference_pool", results)
+
+
+def bench_logging(n_iter: int = 5000) -> dict:
+    """Coût d'un log structuré sur le chemin de la requête : écriture synchrone vs file + thread."""
+    import logging
+    import tempfile
+    from logging.handlers import RotatingFileHandler
+    from log_writer import BatchingRotatingFileHandler, QueuedLogWriter
+
+    entry = {"event": "prediction", "input_data": load_samples()[0], "prediction": "Solvable",
+             "probabilité_defaut": 0.1234}
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sync_logger = logging.getLogger("bench_sync")
+        sync_logger.propagate = False
+        sync_logger.setLevel(logging.INFO)
+        sync_handler = RotatingFileHandler(f"{tmp}/sync.log", maxBytes=10_000_000, backupCount=5)
+        sync_handler.setFormatter(formatter)
+        sync_logger.handlers = [sync_handler]
+
+        queued_logger = logging.getLogger("bench_queued")
+        queued_logger.propagate = False
+        queued_logger.setLevel(logging.INFO)
+        target = BatchingRotatingFileHandler(f"{tmp}/queued.log", maxBytes=10_000_000, backupCount=5)
+        target.setFormatter(formatter)
+        writer = QueuedLogWriter(target, maxsize=100_000)
+        queued_logger.handlers = [writer]
+
+        sync_ms = measure(lambda: sync_logger.info(json.dumps(entry, ensure_ascii=False)), n_iter)
+        queued_ms = measure(lambda: queued_logger.info(entry), n_iter)
+        writer.stop()
+        sync_handler.close()
+        stats = writer.stats()
+
+    res_sync, res_queued = summarize(sync_ms), summarize(queued_ms)
+    res_sync["p99_ms"] = float(np.percentile(sync_ms, 99))
+    res_queued["p99_ms"] = float(np.percentile(queued_ms, 99))
+    return _save("logging", {
+        "iterations": n_iter,
+        "synchronous": res_sync,
+        "queued": res_queued,
+        "writer": stats,
+        "gain_percent": _gain(res_sync, res_queued),
+    })
+
+
+def bench_event_store(n_days: int = 30, per_day: int = 2000, n_iter: int = 5) -> dict:
+    """Chargement des prédictions des dernières 24 h : relecture du log texte vs event store."""
+    import tempfile
+    from datetime import datetime, timedelta
+    from API_Fastapi import EVENT_SCHEMAS
+    from event_store import EventStore
+
+    sample = load_samples()[0]
+    start = datetime(2025, 1, 1)
+    entries = [
+        {"timestamp": (start + timedelta(seconds=i * 86400 / per_day)).isoformat(), "event": "prediction",
+         "request_id": f"{i:036d}", "input_data": sample, "prediction": "Solvable", "probabilité_defaut": 0.1234}
+        for i in range(n_days * per_day)
+    ]
+    since = start + timedelta(days=n_days - 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = f"{tmp}/api_logger.log"
+        with open(log_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(f"2025-01-01 00:00:00,000 - INFO - {json.dumps(entry, ensure_ascii=False)}\n")
+        store = EventStore(f"{tmp}/events")
+        for schema in EVENT_SCHEMAS:
+            store.register(schema)
+        for i in range(0, len(entries), 256):
+            store.append_entries(entries[i:i + 256])
+
+        def from_text():
+            rows = []
+            with open(log_path, encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line.strip().split(" - ", 2)[-1])
+                    if row["event"] == "prediction" and datetime.fromisoformat(row["timestamp"]) >= since:
+                        rows.append(row)
+            return pd.DataFrame(rows)
+
+        n_text, n_store = len(from_text()), len(store.read_frame("prediction", since=since))
+        text_ms = measure(from_text, n_iter, warmup=1)
+        store_ms = measure(lambda: store.read_frame("prediction", since=since), n_iter, warmup=1)
+
+    res_text, res_store = summarize(text_ms), summarize(store_ms)
+    return _save("event_store", {
+        "history_events": len(entries),
+        "window_events": {"text_log": n_text, "event_store": n_store},
+        "text_log": res_text,
+        "event_store": res_store,
+        "gain_percent": _gain(res_text, res_store),
+    })
+
+
+def bench_incremental_logs(n_history: int = 50_000, n_new: int = 100, n_iter: int = 5) -> dict:
+    """Rafraîchissement du dashboard : relecture complète du log vs lecture incrémentale."""
+    import tempfile
+    from log_reader import IncrementalLogReader
+
+    entry = {"event": "prediction", "input_data": load_samples()[0], "prediction": "Solvable",
+             "probabilité_defaut": 0.1234}
+    line = f"2025-01-01 00:00:00,000 - INFO - {json.dumps(entry, ensure_ascii=False)}\n"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = f"{tmp}/api_logger.log"
+        with open(log_path, "w", encoding="utf-8") as f:
+            f.write(line * n_history)
+
+        def full_reload():
+            rows = []
+            with open(log_path, encoding="utf-8") as f:
+                for raw in f:
+                    rows.append(json.loads(raw.strip().split(" - ", 2)[-1]))
+            return pd.DataFrame(rows)
+
+        reader = IncrementalLogReader(log_path)
+        reader.refresh()
+
+        def incremental_refresh():
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(line * n_new)
+            reader.refresh()
+            return reader.frame("prediction")
+
+        full_ms = measure(full_reload, n_iter, warmup=1)
+        incremental_ms = measure(incremental_refresh, n_iter, warmup=1)
+
+    res_full, res_incremental = summarize(full_ms), summarize(incremental_ms)
+    return _save("incremental_logs", {
+        "history_lines": n_history,
+        "new_lines_per_refresh": n_new,
+        "full_reload": res_full,
+        "incremental": res_incremental,
+        "gain_percent": _gain(res_full, res_incremental),
+    })
+
+
+def bench_prediction_cache(n_iter: int = 500, n_distinct: int = 50) -> dict:
+    """Demandes répétées (n_distinct clients distincts) : scoring systématique vs cache de prédiction."""
+    import API_Fastapi
+    from API_Fastapi import ClientData
+
+    samples = load_samples()
+    clients = [ClientData(**samples[i % len(samples)]) for i in range(n_distinct)]
+    counter = iter(range(10 ** 9))
+
+    def uncached():
+        API_Fastapi._score_client_uncached(clients[next(counter) % n_distinct])
+
+    def cached():
+        API_Fastapi.score_client(clients[next(counter) % n_distinct])
+
+    API_Fastapi.prediction_cache.clear()
+    uncached_ms = measure(uncached, n_iter)
+    cached_ms = measure(cached, n_iter)
+
+    res_uncached, res_cached = summarize(uncached_ms), summarize(cached_ms)
+    return _save("prediction_cache", {
+        "iterations": n_iter,
+        "distinct_clients": min(n_distinct, len(samples)),
+        "uncached": res_uncached,
+        "cached": res_cached,
+        "cache": API_Fastapi.prediction_cache.stats(),
+        "gain_percent": _gain(res_uncached, res_cached),
+    })
+
+
+_STARTUP_PROBE = """
+import json, time
+t0 = time.perf_counter()
+import API_Fastapi
+imported = time.perf_counter() - t0
+API_Fastapi.model_loader.load()
+ready = time.perf_counter() - t0
+status = {}
+with open("/proc/self/status") as f:
+    for line in f:
+        key, _, value = line.partition(":")
+        if key in ("VmRSS", "RssAnon", "RssFile"):
+            status[key] = int(value.split()[0]) / 1024
+print(json.dumps({"import_s": imported, "ready_s": ready, "source": API_Fastapi.model_loader.source,
+                  "rss_mb": status.get("VmRSS"), "rss_private_mb": status.get("RssAnon"),
+                  "rss_file_mb": status.get("RssFile")}))
+"""
+
+
+def bench_model_loading(n_runs: int = 3) -> dict:
+    """Démarrage d'un worker (processus neuf) : chargement à l'import, artefact mappé, chargement différé."""
+    import os
+    import subprocess
+    from model_loader import export_mmap_artifact, mmap_artifact_path
+
+    artifact = mmap_artifact_path("model.pkl")
+    created = not os.path.exists(artifact)
+    export_mmap_artifact("model.pkl")
+    configs = {
+        "eager_pickle": {"MODEL_LOAD_MODE": "eager", "MODEL_MMAP": "0"},
+        "eager_mmap": {"MODEL_LOAD_MODE": "eager", "MODEL_MMAP": "1"},
+        "startup_mmap": {"MODEL_LOAD_MODE": "startup", "MODEL_MMAP": "1"},
+    }
+    results = {}
+    try:
+        for name, env in configs.items():
+            runs = []
+            for _ in range(n_runs):
+                out = subprocess.run([sys.executable, "-c", _STARTUP_PROBE], env={**os.environ, **env},
+                                     capture_output=True, text=True, check=True).stdout
+                runs.append(json.loads(out.strip().splitlines()[-1]))
+            results[name] = {
+                "source": runs[0]["source"],
+                # Délai avant que le worker puisse répondre (import du module), puis avant le modèle prêt
+                "import_s": float(np.median([r["import_s"] for r in runs])),
+                "ready_s": float(np.median([r["ready_s"] for r in runs])),
+                "rss_mb": float(np.median([r["rss_mb"] for r in runs])),
+                "rss_private_mb": float(np.median([r["rss_private_mb"] for r in runs])),
+                "rss_file_mb": float(np.median([r["rss_file_mb"] for r in runs])),
+            }
+    finally:
+        if created:
+            os.remove(artifact)
+    return _save("model_loading", {"runs": n_runs, **results})
+
+
+def bench_native_booster(n_iter: int = 500, batch_size: int = 10_000, n_batches: int = 10, n_rounds: int = 5) -> dict:
+    """Classifieur seul, entrée déjà encodée : wrapper XGBClassifier.predict_proba vs booster natif.
+
+    Les lots sont mesurés en n_rounds manches alternées (wrapper puis natif) : le gain est donné
+    par manche, avec sa médiane et son étendue, plutôt qu'un seul chiffre sensible au bruit."""
+    import os
+
+    from scoring import NativeBooster, XGB_NTHREAD
+
+    model = joblib.load("model.pkl")
+    scorer = ModelScorer(model)
+    classifier = scorer.classifier
+    native = NativeBooster(classifier)
+    X_batch = np.repeat(scorer.encoder.transform_records(load_samples()), batch_size // len(load_samples()) + 1, axis=0)[:batch_size]
+    x_row = X_batch[:1]
+
+    wrapper_row = summarize(measure(lambda: classifier.predict_proba(x_row), n_iter))
+    native_row = summarize(measure(lambda: native.predict_proba(x_row), n_iter))
+    wrapper_batch, native_batch, round_gains = [], [], []
+    for _ in range(n_rounds):
+        wrapper_times = measure(lambda: classifier.predict_proba(X_batch), n_batches, warmup=2)
+        native_times = measure(lambda: native.predict_proba(X_batch), n_batches, warmup=2)
+        wrapper_batch.append(wrapper_times)
+        native_batch.append(native_times)
+        round_gains.append(_gain(summarize(wrapper_times), summarize(native_times)))
+    wrapper_batch, native_batch = np.concatenate(wrapper_batch), np.concatenate(native_batch)
+
+    def throughput(times):
+        return {**summarize(times), "rows_per_s": float(batch_size / (np.mean(times) / 1000))}
+
+    return _save("native_booster", {
+        "xgb_nthread": XGB_NTHREAD,
+        "cpu_count": os.cpu_count(),
+        "single_row": {"wrapper": wrapper_row, "native": native_row, "gain_percent": _gain(wrapper_row, native_row)},
+        "batch": {"batch_size": batch_size, "wrapper": throughput(wrapper_batch), "native": throughput(native_batch),
+                  "gain_percent": _gain(summarize(wrapper_batch), summarize(native_batch)),
+                  "round_gains_percent": round_gains,
+                  "median_gain_percent": float(np.median(round_gains)),
+                  "gain_range_percent": [float(min(round_gains)), float(max(round_gains))]},
+    })
+
+
+def bench_tree_evaluator(batch_sizes=(1, 100, 10_000), budget_rows: int = 100_000) -> dict:
+    """Booster XGBoost natif vs évaluateur NumPy (tree_evaluator.py), entrée déjà encodée."""
+    from tree_evaluator import TreeEnsemble
+
+    model = joblib.load(MODEL_PATH)
+    scorer = ModelScorer(model, backend="xgboost")
+    ensemble = TreeEnsemble.from_classifier(scorer.classifier)
+    encoded = scorer.encoder.transform_records(load_samples())
+
+    results = {"n_trees": ensemble.n_trees, "depth": ensemble.depth}
+    for batch_size in batch_sizes:
+        X = np.repeat(encoded, batch_size // len(encoded) + 1, axis=0)[:batch_size]
+        n_iter = max(10, min(500, budget_rows // batch_size))
+        native = measure(lambda: scorer.booster.predict_proba(X), n_iter, warmup=2)
+        numpy_eval = measure(lambda: ensemble.predict_proba(X), n_iter, warmup=2)
+        results[f"batch_{batch_size}"] = {
+            "iterations": n_iter,
+            "xgboost": {**summarize(native), "rows_per_s": float(batch_size / (np.mean(native) / 1000))},
+            "numpy": {**summarize(numpy_eval), "rows_per_s": float(batch_size / (np.mean(numpy_eval) / 1000))},
+            "gain_percent": _gain(summarize(native), summarize(numpy_eval)),
+        }
+    return _save("tree_evaluator", results)
+
+
+def _legacy_encode(encoder, clients: list) -> np.ndarray:
+    """Encodage tel qu'avant json_codec : getattr champ par champ et .value des Enums."""
+    from enum import Enum
+
+    out = np.zeros((len(clients), encoder.n_features), dtype=np.float32)
+    numeric = np.array([[getattr(c, col) for col in encoder.numeric_columns] for c in clients], dtype=np.float64)
+    encoder._finish_numeric(out, numeric)
+    for i, c in enumerate(clients):
+        for column, table in zip(encoder.categorical_columns, encoder.categorical_tables):
+            value = getattr(c, column)
+            index = table.get(value.value if isinstance(value, Enum) else value)
+            if index is not None:
+                out[i, index] = 1.0
+    return out
+
+
+def bench_serialization(n_iter: int = 2000, batch_size: int = 100) -> dict:
+    """Décodage, clé de cache, encodage, log et réponse d'une requête : json standard vs json_codec."""
+    import hashlib
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    import json_codec
+    from schemas import ClientData, _batch_validator
+
+    scorer = ModelScorer(joblib.load(MODEL_PATH))
+    encoder = scorer.encoder
+    sample = load_samples()[0]
+    body = json.dumps(sample).encode("utf-8")
+    response = {"prediction": "Solvable", "probabilité_defaut": 0.1234, "model_version": "v1"}
+
+    def stdlib_request():
+        client = ClientData.model_validate(json.loads(body))
+        payload = json.dumps(client.model_dump(mode="json"), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+        _legacy_encode(encoder, [client])
+        json.dumps({"event": "prediction", "input_data": client.dict(), **response}, ensure_ascii=False, default=str)
+        JSONResponse(jsonable_encoder(response))
+
+    def fast_request():
+        client = ClientData.model_validate(json_codec.loads(body))
+        data = client.model_dump(mode="json")
+        hashlib.blake2b(json_codec.dumps_bytes(data), digest_size=16).hexdigest()
+        encoder.transform_clients([client])
+        json_codec.dumps({"event": "prediction", "input_data": data, **response})
+        json_codec.FastJSONResponse(response)
+
+    batch_body = json.dumps([load_samples()[i % len(load_samples())] for i in range(batch_size)]).encode("utf-8")
+    results = [{"index": i, "prediction": "Solvable", "probabilité_defaut": 0.1234} for i in range(batch_size)]
+
+    def stdlib_batch():
+        clients = _batch_validator.validate_python(json.loads(batch_body))
+        for c in clients:
+            json.dumps(c.model_dump(mode="json"), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        _legacy_encode(encoder, clients)
+        JSONResponse(jsonable_encoder({"n_items": batch_size, "results": results}))
+
+    def fast_batch():
+        clients = _batch_validator.validate_python(json_codec.loads(batch_body))
+        for c in clients:
+            json_codec.dumps_bytes(c.model_dump(mode="json"))
+        encoder.transform_clients(clients)
+        json_codec.FastJSONResponse({"n_items": batch_size, "results": results})
+
+    single = {"stdlib": summarize(measure(stdlib_request, n_iter)), "fast": summarize(measure(fast_request, n_iter))}
+    batch = {"stdlib": summarize(measure(stdlib_batch, n_iter // 10)), "fast": summarize(measure(fast_batch, n_iter // 10))}
+    return _save("serialization", {
+        "orjson": json_codec.HAS_ORJSON,
+        "single": {**single, "saved_us_per_request": (single["stdlib"]["mean_ms"] - single["fast"]["mean_ms"]) * 1000,
+                   "gain_percent": _gain(single["stdlib"], single["fast"])},
+        f"batch_{batch_size}": {**batch, "saved_us_per_request": (batch["stdlib"]["mean_ms"] - batch["fast"]["mean_ms"]) * 1000,
+                                "gain_percent": _gain(batch["stdlib"], batch["fast"])},
+    })
+
+
+BENCHMARKS = {
+    "fused_scoring": bench_fused_scoring,
+    "batch_endpoint": bench_batch_endpoint,
+    "compiled_encoder": bench_compiled_encoder,
+    "micro_batching": bench_micro_batching,
+    "inference_pool": bench_inference_pool,
+    "logging": bench_logging,
+    "event_store": bench_event_store,
+    "incremental_logs": bench_incremental_logs,
+    "prediction_cache": bench_prediction_cache,
+    "model_loading": bench_model_loading,
+    "native_booster": bench_native_booster,
+    "tree_evaluator": bench_tree_evaluator,
+    "serialization": bench_serialization,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"===== {name} =====")
+        print(json.dumps(BENCHMARKS[name](), indent=2, ensure_ascii=False))
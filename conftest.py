@@ -0,0 +1,39 @@
+# conftest.py
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+import pytest
+
+# Avant tout import de API_Fastapi : logs et event store des tests hors du dossier logs/ versionné
+TEST_LOG_DIR = tempfile.mkdtemp(prefix="test_logs_")
+os.environ.setdefault("LOG_DIR", TEST_LOG_DIR)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(TEST_LOG_DIR, ignore_errors=True)
+
+# ============================================================
+# Fixtures partagées (clients synthétiques, CSV de référence)
+# ============================================================
+
+@pytest.fixture(scope="session")
+def synthetic():
+    #Fabrique de n clients synthétiques valides, reproductibles pour une graine donnée
+    from load_generator import SyntheticPayloads
+
+    def make(n: int, seed: int = 0) -> list:
+        payloads = SyntheticPayloads(seed=seed)
+        return [payloads.next() for _ in range(n)]
+    return make
+
+
+@pytest.fixture(scope="session")
+def write_reference():
+    #Écrit le CSV d'entrée (colonnes de ClientData) et le CSV de la cible, mêmes lignes
+    def write(folder, records, target) -> tuple:
+        pd.DataFrame(records).to_csv(folder / "input_reference.csv", index=False)
+        pd.DataFrame({"TARGET": target}).to_csv(folder / "output_reference.csv", index=False)
+        return str(folder / "input_reference.csv"), str(folder / "output_reference.csv")
+    return write
@@ -0,0 +1,435 @@
+"""
+Détection de dérive des données en continu, dans l'API (endpoint GET /drift).
+
+Au lieu de relire les logs et de relancer un rapport Evidently complet (Data_drfit_analyze.ipynb),
+chaque prédiction incrémente des compteurs à pas fixe :
+- un histogramme à bornes fixes par champ numérique de ClientData (plus une case « valeur manquante ») ;
+- un comptage par catégorie pour les champs Enum (plus une case « autre ») ;
+- l'histogramme des probabilités de défaut prédites.
+
+Tous les compteurs d'une observation tiennent dans un même vecteur (une case par bin, champs mis
+bout à bout). Le chemin des requêtes ne fait qu'ajouter les clients à une file ; un thread les
+compte par lots toutes les flush_interval secondes (et /drift vide la file avant de répondre).
+Le temps est découpé en tranches de slice_seconds ; un anneau de n_slices vecteurs
+garde les dernières tranches, et une fenêtre glissante est la somme des tranches qu'elle couvre.
+La mémoire est fixe et le calcul de /drift ne dépend que du nombre de champs et de bins.
+
+Les scores sont calculés contre une référence (DriftReference : mêmes bins, comptes des données
+d'entraînement, lue dans le profil de référence du modèle construit par reference_profile.py) :
+- PSI (Population Stability Index) pour tous les champs : Σ (p - q) · ln(p / q) ;
+- KS sur les bins ordonnés (écart maximal entre fonctions de répartition) pour les champs numériques
+  et la probabilité prédite.
+
+Sans référence, les bornes sont déduites des moyennes et écarts-types appris par le StandardScaler
+du modèle (quantiles d'une loi normale) et seuls les histogrammes sont servis.
+
+Les compteurs sont propres au processus : avec plusieurs workers uvicorn, /drift décrit le worker
+qui répond.
+"""
+
+import json
+import math
+import operator
+import threading
+import time
+from collections import deque
+from enum import Enum
+
+import numpy as np
+
+from schemas import schema_columns
+
+PROBABILITY_FIELD = "probabilité_defaut"
+DEFAULT_BINS = 10
+PSI_THRESHOLD = 0.2
+MIN_SAMPLES = 100
+FLUSH_INTERVAL_S = 0.5
+MAX_PENDING = 100_000  # clients en attente de comptage au-delà desquels on abandonne
+_EPSILON = 1e-4  # proportion plancher d'un bin vide (PSI fini)
+
+# Quantiles d'une loi normale centrée réduite aux déciles : bornes par défaut (moyenne + z · écart-type)
+_NORMAL_DECILES = (-1.2816, -0.8416, -0.5244, -0.2533, 0.0, 0.2533, 0.5244, 0.8416, 1.2816)
+
+
+def _getter(columns: list):
+    getter = operator.attrgetter(*columns)
+    return getter if len(columns) > 1 else (lambda obj: (getter(obj),))
+
+
+def _category(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+class FeatureLayout:
+    """Bins de tous les champs, mis bout à bout dans un même vecteur de comptes.
+
+    Champ numérique à bornes e_1 < ... < e_k : k + 1 bins (x < e_1, ..., x >= e_k) puis un bin
+    « manquant » ; champ catégoriel : une case par catégorie puis une case « autre » ; la
+    probabilité prédite est binée comme un champ numérique."""
+
+    def __init__(self, numeric: dict, categorical: dict, probability_edges):
+        self.numeric_columns = list(numeric)
+        self.categorical_columns = list(categorical)
+        self.edges = {c: np.asarray(e, dtype=np.float64) for c, e in numeric.items()}
+        self.categories = {c: list(v) for c, v in categorical.items()}
+        self.probability_edges = np.asarray(probability_edges, dtype=np.float64)
+
+        self.slices = {}
+        offset = 0
+        for column in self.numeric_columns:
+            self.slices[column] = slice(offset, offset + len(self.edges[column]) + 2)
+            offset += len(self.edges[column]) + 2
+        for column in self.categorical_columns:
+            self.slices[column] = slice(offset, offset + len(self.categories[column]) + 1)
+            offset += len(self.categories[column]) + 1
+        self.slices[PROBABILITY_FIELD] = slice(offset, offset + len(self.probability_edges) + 1)
+        self.size = offset + len(self.probability_edges) + 1
+
+        # Bornes complétées par +inf : bin = nombre de bornes <= x, calculé pour tous les champs à la fois
+        width = max((len(e) for e in self.edges.values()), default=0)
+        self._padded = np.full((len(self.numeric_columns), width), np.inf)
+        for i, column in enumerate(self.numeric_columns):
+            self._padded[i, :len(self.edges[column])] = self.edges[column]
+        self._numeric_offsets = np.array([self.slices[c].start for c in self.numeric_columns], dtype=np.intp)
+        self._missing = np.array([len(self.edges[c]) + 1 for c in self.numeric_columns], dtype=np.intp)
+        # Catégorie -> case globale ; un membre d'Enum str a le hash et l'égalité de sa valeur
+        self._codes = [{v: self.slices[c].start + j for j, v in enumerate(self.categories[c])}
+                       for c in self.categorical_columns]
+        self._other = [self.slices[c].stop - 1 for c in self.categorical_columns]
+        self._numeric_getter = _getter(self.numeric_columns) if self.numeric_columns else None
+        self._categorical_getter = _getter(self.categorical_columns) if self.categorical_columns else None
+
+    @classmethod
+    def from_schema(cls, schema, edges: dict, probability_edges=None) -> "FeatureLayout":
+        """Champs d'un modèle pydantic (schemas.schema_columns) : Enum -> catégoriel, sinon numérique
+        (bornes fournies par edges)."""
+        numeric_columns, categorical = schema_columns(schema)
+        numeric = {name: edges[name] for name in numeric_columns if name in edges}
+        if probability_edges is None:
+            probability_edges = np.linspace(0, 1, DEFAULT_BINS + 1)[1:-1]
+        return cls(numeric, categorical, probability_edges)
+
+    @staticmethod
+    def default_edges(encoder) -> dict:
+        """Bornes par défaut d'un CompiledEncoder : moyenne + z · écart-type aux déciles d'une loi normale."""
+        z = np.asarray(_NORMAL_DECILES)
+        return {c: np.unique(mean + z * scale) for c, mean, scale in zip(encoder.numeric_columns, encoder.means,
+                                                                         encoder.scales)}
+
+    # ------------------------------------------------------------------
+    # Indices des bins
+    # ------------------------------------------------------------------
+
+    def _numeric_bins(self, values: np.ndarray) -> np.ndarray:
+        """(n, champs numériques) -> cases globales."""
+        bins = np.count_nonzero(self._padded[None, :, :] <= values[:, :, None], axis=2)
+        bins = np.where(np.isnan(values), self._missing, bins)
+        return bins + self._numeric_offsets
+
+    def _categorical_bins(self, rows: list) -> list:
+        codes, other = self._codes, self._other
+        return [codes[k].get(value, other[k]) for row in rows for k, value in enumerate(row)]
+
+    def _probability_bins(self, probabilities) -> np.ndarray:
+        proba = np.asarray(probabilities, dtype=np.float64).ravel()
+        return np.searchsorted(self.probability_edges, proba, side="right") + self.slices[PROBABILITY_FIELD].start
+
+    def _counts(self, numeric_rows: list, categorical_rows: list, probabilities) -> np.ndarray:
+        parts = [self._probability_bins(probabilities)]
+        if numeric_rows:
+            values = np.array(numeric_rows, dtype=np.float64).reshape(len(numeric_rows), len(self.numeric_columns))
+            parts.append(self._numeric_bins(values).ravel())
+        if categorical_rows:
+            parts.append(np.array(self._categorical_bins(categorical_rows), dtype=np.intp))
+        return np.bincount(np.concatenate(parts), minlength=self.size)
+
+    def count_clients(self, clients: list, probabilities) -> np.ndarray:
+        """Vecteur de comptes d'objets ClientData (accès direct aux attributs)."""
+        numeric = [self._numeric_getter(c) for c in clients] if self._numeric_getter else []
+        categorical = [self._categorical_getter(c) for c in clients] if self._categorical_getter else []
+        return self._counts(numeric, categorical, probabilities)
+
+    def count_records(self, records: list, probabilities) -> np.ndarray:
+        """Vecteur de comptes de dictionnaires {champ: valeur} (champ absent : valeur manquante)."""
+        numeric = [[_number(row.get(c)) for c in self.numeric_columns] for row in records]
+        categorical = [[_category(row.get(c)) for c in self.categorical_columns] for row in records]
+        return self._counts(numeric if self.numeric_columns else [], categorical if self.categorical_columns else [],
+                            probabilities)
+
+    # ------------------------------------------------------------------
+    # Sérialisation
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> dict:
+        return {
+            "numeric": {c: self.edges[c].tolist() for c in self.numeric_columns},
+            "categorical": dict(self.categories),
+            "probability_edges": self.probability_edges.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FeatureLayout":
+        return cls(data["numeric"], data["categorical"], data["probability_edges"])
+
+
+def _number(value) -> float:
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+# ============================================================
+# Référence et scores de dérive
+# ============================================================
+
+class DriftReference:
+    """Comptes de référence (données d'entraînement) dans les bins d'un FeatureLayout."""
+
+    def __init__(self, layout: FeatureLayout, counts, version: str = None):
+        self.layout = layout
+        self.counts = np.asarray(counts, dtype=np.float64)
+        self.version = version
+        if len(self.counts) != layout.size:
+            raise ValueError(f"Référence incohérente : {len(self.counts)} comptes pour {layout.size} bins")
+
+    @property
+    def n(self) -> int:
+        return int(self.counts[self.layout.slices[PROBABILITY_FIELD]].sum())
+
+    @staticmethod
+    def quantile_edges(values, n_bins: int = DEFAULT_BINS) -> np.ndarray:
+        """Bornes aux quantiles 1/n_bins ... (n_bins - 1)/n_bins (valeurs manquantes ignorées, doublons retirés)."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return np.empty(0)
+        return np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+
+    @classmethod
+    def build(cls, schema, records: list, probabilities, n_bins: int = DEFAULT_BINS, version: str = None):
+        """Référence construite à partir d'exemples (dictionnaires) et des probabilités prédites pour eux."""
+        edges = {name: cls.quantile_edges([_number(row.get(name)) for row in records], n_bins)
+                 for name in schema_columns(schema)[0]}
+        layout = FeatureLayout.from_schema(schema, edges)
+        return cls(layout, layout.count_records(records, probabilities), version)
+
+    def to_dict(self) -> dict:
+        return {"version": self.version, "layout": self.layout.to_dict(), "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DriftReference":
+        """Référence seule, ou section "drift" d'un profil de référence (reference_profile.py)."""
+        if "drift" in data:
+            data = data["drift"]
+        return cls(FeatureLayout.from_dict(data["layout"]), data["counts"], data.get("version"))
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "DriftReference":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def psi(current: np.ndarray, reference: np.ndarray) -> float:
+    """Population Stability Index entre deux histogrammes (mêmes bins)."""
+    p = np.maximum(current / max(current.sum(), 1), _EPSILON)
+    q = np.maximum(reference / max(reference.sum(), 1), _EPSILON)
+    return float(np.sum((p - q) * np.log(p / q)))
+
+
+def ks(current: np.ndarray, reference: np.ndarray) -> float:
+    """Écart maximal entre les fonctions de répartition de deux histogrammes ordonnés."""
+    if not current.sum() or not reference.sum():
+        return 0.0
+    return float(np.max(np.abs(np.cumsum(current) / current.sum() - np.cumsum(reference) / reference.sum())))
+
+
+# ============================================================
+# Fenêtres glissantes
+# ============================================================
+
+class DriftMonitor:
+    """Comptes par tranche de temps (anneau de n_slices tranches de slice_seconds) et scores de dérive."""
+
+    def __init__(self, layout: FeatureLayout, reference: DriftReference = None, slice_seconds: float = 300,
+                 n_slices: int = 12, psi_threshold: float = PSI_THRESHOLD, min_samples: int = MIN_SAMPLES,
+                 flush_interval: float = FLUSH_INTERVAL_S, max_pending: int = MAX_PENDING, clock=time.time):
+        if reference is not None and reference.layout.size != layout.size:
+            raise ValueError("La référence et le monitor n'ont pas les mêmes bins")
+        self.layout = layout
+        self.reference = reference
+        self.slice_seconds = slice_seconds
+        self.n_slices = n_slices
+        self.psi_threshold = psi_threshold
+        self.min_samples = min_samples
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.clock = clock
+        self.dropped = 0  # clients abandonnés (file pleine ou observation invalide)
+        self._pending_rows = 0  # clients dans la file (max_pending compte des clients, pas des lots)
+        self._pending_lock = threading.Lock()
+        self._counts = np.zeros((n_slices, layout.size), dtype=np.int64)
+        self._epochs = np.full(n_slices, -1, dtype=np.int64)  # numéro de tranche de chaque ligne de l'anneau
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    @classmethod
+    def for_schema(cls, schema, reference: DriftReference = None, encoder=None, **kwargs) -> "DriftMonitor":
+        """Bins de la référence si elle existe, sinon bornes par défaut de l'encodeur du modèle."""
+        if reference is not None:
+            return cls(reference.layout, reference, **kwargs)
+        edges = FeatureLayout.default_edges(encoder) if encoder is not None else {}
+        return cls(FeatureLayout.from_schema(schema, edges), None, **kwargs)
+
+    @property
+    def window_seconds(self) -> float:
+        return self.slice_seconds * self.n_slices
+
+    # ------------------------------------------------------------------
+    # Collecte : le chemin des requêtes ne fait qu'un append, les comptes sont calculés par lots
+    # ------------------------------------------------------------------
+
+    def observe_clients(self, clients: list, probabilities):
+        """Enregistre des objets ClientData et les probabilités prédites pour eux (comptés au prochain flush)."""
+        with self._pending_lock:
+            if self._pending_rows + len(clients) > self.max_pending:
+                self.dropped += len(clients)  # thread de comptage en retard : observation abandonnée
+                return
+            self._pending_rows += len(clients)
+        self._pending.append((int(self.clock() // self.slice_seconds), clients, probabilities))
+        if self._thread is None and self.flush_interval:
+            self._start()
+
+    def observe_records(self, records: list, probabilities):
+        """Compte immédiatement des dictionnaires {champ: valeur}."""
+        self._add(int(self.clock() // self.slice_seconds), self.layout.count_records(records, probabilities))
+
+    def _add(self, epoch: int, counts: np.ndarray):
+        row = epoch % self.n_slices
+        with self._lock:
+            if self._epochs[row] > epoch:
+                return  # tranche déjà sortie de l'anneau
+            if self._epochs[row] != epoch:
+                self._counts[row] = 0
+                self._epochs[row] = epoch
+            self._counts[row] += counts
+
+    def _count_pending(self, entries: list) -> np.ndarray:
+        clients, probabilities = [], []
+        for _, batch_clients, batch_probabilities in entries:
+            clients.extend(batch_clients)
+            probabilities.extend(np.asarray(batch_probabilities, dtype=np.float64).ravel())
+        return self.layout.count_clients(clients, probabilities)
+
+    def flush(self):
+        """Compte les observations en attente, regroupées par tranche de temps.
+
+        Si une observation est invalide, les observations de sa tranche sont recomptées une à une :
+        seule la fautive est abandonnée (comptée dans dropped)."""
+        with self._flush_lock:
+            batches = {}
+            while self._pending:
+                entry = self._pending.popleft()
+                with self._pending_lock:
+                    self._pending_rows -= len(entry[1])
+                batches.setdefault(entry[0], []).append(entry)
+            for epoch, entries in batches.items():
+                try:
+                    self._add(epoch, self._count_pending(entries))
+                except Exception:
+                    for entry in entries:
+                        try:
+                            self._add(epoch, self._count_pending([entry]))
+                        except Exception:
+                            with self._pending_lock:
+                                self.dropped += len(entry[1])
+
+    def _start(self):
+        with self._flush_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, name="drift-monitor", daemon=True)
+                self._thread.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _slices_in(self, seconds: float = None) -> int:
+        if seconds is None:
+            return self.n_slices
+        return min(self.n_slices, max(1, math.ceil(seconds / self.slice_seconds)))
+
+    def window(self, seconds: float = None) -> np.ndarray:
+        """Somme des comptes des tranches couvrant les `seconds` dernières secondes (tranche courante incluse)."""
+        n = self._slices_in(seconds)
+        epoch = int(self.clock() // self.slice_seconds)
+        with self._lock:
+            recent = (self._epochs > epoch - n) & (self._epochs <= epoch)
+            return self._counts[recent].sum(axis=0)
+
+    def report(self, seconds: float = None, details: bool = False) -> dict:
+        """Scores de dérive de la fenêtre : O(champs × bins)."""
+        self.flush()
+        counts = self.window(seconds)
+        layout, reference = self.layout, self.reference
+        n = int(counts[layout.slices[PROBABILITY_FIELD]].sum())
+        enough = reference is not None and n >= self.min_samples
+        features = {}
+        for name, bins in layout.slices.items():
+            current = counts[bins]
+            entry = {"kind": "categorical" if name in layout.categories else "numeric"}
+            if reference is not None:
+                ref = reference.counts[bins]
+                entry["psi"] = round(psi(current, ref), 6)
+                if entry["kind"] == "numeric":
+                    ordered = slice(0, -1) if name != PROBABILITY_FIELD else slice(None)  # sans le bin « manquant »
+                    entry["ks"] = round(ks(current[ordered], ref[ordered]), 6)
+                entry["drift"] = bool(entry["psi"] > self.psi_threshold) if enough else None
+            if details:
+                entry["counts"] = current.tolist()
+                if reference is not None:
+                    entry["reference_counts"] = reference.counts[bins].tolist()
+                entry["bins"] = self._bin_labels(name)
+            features[name] = entry
+
+        prediction = features.pop(PROBABILITY_FIELD)
+        drifted = [name for name, entry in features.items() if entry.get("drift")]
+        return {
+            "window_seconds": self.slice_seconds * self._slices_in(seconds),
+            "n": n,
+            "dropped": self.dropped,
+            "reference": None if reference is None else {"version": reference.version, "n": reference.n},
+            "psi_threshold": self.psi_threshold,
+            "enough_data": enough,
+            "n_drifted": len(drifted) if enough else None,
+            "share_drifted": round(len(drifted) / len(features), 4) if enough and features else None,
+            "drifted_features": drifted if enough else None,
+            "prediction": prediction,
+            "features": features,
+        }
+
+    def _bin_labels(self, name: str) -> list:
+        if name in self.layout.categories:
+            return self.layout.categories[name] + ["autre"]
+        edges = self.layout.probability_edges if name == PROBABILITY_FIELD else self.layout.edges[name]
+        bounds = ["-inf"] + [f"{e:g}" for e in edges] + ["inf"]
+        labels = [f"[{lo}, {hi})" for lo, hi in zip(bounds, bounds[1:])]
+        return labels if name == PROBABILITY_FIELD else labels + ["manquant"]
+
+    def reset(self):
+        with self._flush_lock:
+            self._pending.clear()
+            with self._pending_lock:
+                self._pending_rows = 0
+        with self._lock:
+            self._counts[:] = 0
+            self._epochs[:] = -1
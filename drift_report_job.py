@@ -0,0 +1,523 @@
+"""
+Rapport de dérive planifié : échantillons bornés, rapport Evidently calculé en parallèle, résultats en cache.
+
+Remplace le rapport Evidently de Data_drfit_analyze.ipynb, calculé sur l'intégralité des données
+de référence et de production et reconstruit à chaque exécution :
+- référence : échantillon stratifié sur TARGET (allocation proportionnelle) de --reference-size
+  lignes, tiré en une passe par lots sur les CSV puis gardé en cache pour chaque version de la
+  référence (taille et date de modification des CSV) ;
+- production : au plus --max-rows prédictions de la fenêtre, tirées dans l'event store sans lire
+  les autres (EventStore.read avec max_rows) : la durée du job ne dépend pas du volume des logs ;
+- le rapport Evidently (DataDriftPreset) sur ces deux échantillons, les colonnes étant réparties en
+  sous-ensembles sur un pool de processus ; les rapports partiels sont réunis en un seul rapport
+  (HTML et snapshot JSON). Règles par défaut d'Evidently : jusqu'à 1000 lignes de référence, KS
+  (numérique) ou test Z / khi-deux (catégoriel) avec p < 0.05 ; au-delà, distance de Wasserstein
+  normalisée ou distance de Jensen-Shannon, seuil 0.1. Le PSI est donné en plus. Le jeu de données
+  dérive quand au moins la moitié des champs dérive. Sans Evidently installé (ou --engine scipy), les
+  mêmes règles sont appliquées par des tests scipy et le rapport HTML est un simple tableau ;
+- la fin de la fenêtre est arrondie à --align-minutes et la clé du cache combine la version de la
+  référence, la fenêtre, l'empreinte de l'échantillon de production et les paramètres :
+  reports/drift_report.html et reports/drift_summary.json ne sont réécrits que si elle change, et
+  le rapport HTML, le snapshot Evidently et le résumé de chaque clé restent dans reports/cache/.
+
+Comme dans le notebook, TARGET compare la cible observée de la référence à la classe prédite.
+
+Usage :
+    python drift_report_job.py                                  # une exécution (cron)
+    python drift_report_job.py --window-hours 24 --every 60     # toutes les heures
+    python drift_report_job.py --reference-size 20000 --max-rows 50000 --workers 4
+    python drift_report_job.py --engine scipy                   # sans Evidently
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import math
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from drift_monitor import psi
+from event_store import EventStore
+from schemas import schema_columns
+
+try:
+    from evidently import DataDefinition, Dataset, Report, Run
+    from evidently.legacy.renderers.html_widgets import CounterData, counter, header_text
+    from evidently.presets import DataDriftPreset
+except ImportError:  # dépendance optionnelle : repli sur les tests scipy
+    Report = None
+
+HAS_EVIDENTLY = Report is not None
+
+INPUT_DATA_PATH = "data/input_reference.csv"
+OUTPUT_DATA_PATH = "data/output_reference.csv"
+EVENTS_DIR = "logs/events"
+REPORTS_DIR = "reports"
+TARGET_COLUMN = "TARGET"
+INPUT_PREFIX = "input_data."
+
+DEFAULT_REFERENCE_SIZE = 10_000
+DEFAULT_MAX_ROWS = 50_000
+DEFAULT_CHUNK_SIZE = 50_000
+SMALL_SAMPLE = 1000         # au-delà : distances plutôt que tests statistiques (règle d'Evidently)
+P_VALUE_THRESHOLD = 0.05
+DISTANCE_THRESHOLD = 0.1
+DRIFT_SHARE = 0.5
+PSI_BINS = 10
+METHOD_VERSION = 2          # à incrémenter si les tests changent : invalide le cache
+
+
+def file_identity(path: str) -> dict:
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _digest(obj, length: int = 16) -> str:
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:length]
+
+
+def reference_version(input_path: str, target_path: str = None) -> str:
+    """Version de la référence : empreinte de la taille et de la date de modification des CSV."""
+    return _digest([file_identity(input_path), file_identity(target_path) if target_path else None], 12)
+
+
+def aligned_window(now: float, window_hours: float, align_minutes: float) -> tuple:
+    """(début, fin) en secondes epoch ; fin arrondie à align_minutes pour que les exécutions
+    successives d'une même période partagent la même fenêtre."""
+    step = max(align_minutes, 1e-9) * 60
+    until = math.floor(now / step) * step
+    return until - window_hours * 3600, until
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# ============================================================
+# Échantillons
+# ============================================================
+
+def proportional_allocation(totals: dict, size: int) -> dict:
+    """Taille de l'échantillon de chaque strate, proportionnelle à son effectif (plus forts restes)."""
+    n = sum(totals.values())
+    if n <= size:
+        return dict(totals)
+    quotas = {k: size * v / n for k, v in totals.items()}
+    allocation = {k: int(q) for k, q in quotas.items()}
+    for k in sorted(quotas, key=lambda k: quotas[k] - allocation[k], reverse=True)[:size - sum(allocation.values())]:
+        allocation[k] += 1
+    return allocation
+
+
+def stratified_sample(input_path: str, target_path: str = None, size: int = DEFAULT_REFERENCE_SIZE,
+                      seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> tuple:
+    """Échantillon stratifié sur TARGET, en une passe par lots : chaque ligne reçoit une clé
+    aléatoire et chaque strate garde ses `size` plus petites clés (tirage uniforme sans remise),
+    tronquées ensuite à l'allocation proportionnelle. Retourne (échantillon, effectifs, allocation)."""
+    rng = np.random.default_rng(seed)
+    targets = (pd.read_csv(target_path, usecols=[TARGET_COLUMN], chunksize=chunk_size) if target_path else None)
+    kept, totals, start = None, Counter(), 0
+    for chunk in pd.read_csv(input_path, chunksize=chunk_size, float_precision="round_trip"):
+        chunk.index = range(start, start + len(chunk))
+        start += len(chunk)
+        if targets is not None:
+            target = next(targets, None)
+            if target is None or len(target) != len(chunk):
+                raise ValueError(f"{target_path} n'a pas le même nombre de lignes que {input_path}")
+            chunk[TARGET_COLUMN] = target[TARGET_COLUMN].to_numpy()
+        stratum = chunk[TARGET_COLUMN].astype(str) if targets is not None else pd.Series("all", index=chunk.index)
+        totals.update(stratum.value_counts().to_dict())
+        chunk["_stratum"], chunk["_key"] = stratum, rng.random(len(chunk))
+        kept = chunk if kept is None else pd.concat([kept, chunk])
+        kept = kept.sort_values("_key", kind="stable").groupby("_stratum", sort=False).head(size)
+
+    if kept is None:
+        return pd.DataFrame(), {}, {}
+    allocation = proportional_allocation(dict(totals), size)
+    rank = kept.groupby("_stratum", sort=False).cumcount()
+    sample = kept[rank < kept["_stratum"].map(allocation)].sort_index()
+    return sample.drop(columns=["_stratum", "_key"]), dict(totals), allocation
+
+
+def load_reference_sample(input_path: str, target_path: str, size: int, seed: int, cache_dir: str,
+                          progress=print) -> tuple:
+    """Échantillon de référence (relu depuis le cache s'il existe pour cette version). Retourne
+    (échantillon, informations sur la référence)."""
+    version = reference_version(input_path, target_path)
+    path = os.path.join(cache_dir, f"reference_{version}_{size}_{seed}.pkl")
+    if os.path.exists(path):
+        return pd.read_pickle(path)
+    started = time.perf_counter()
+    sample, totals, allocation = stratified_sample(input_path, target_path, size, seed)
+    info = {"version": version, "rows": int(sum(totals.values())), "sample_rows": len(sample),
+            "strata": {k: {"rows": int(totals[k]), "sample_rows": int(allocation[k])} for k in totals}}
+    os.makedirs(cache_dir, exist_ok=True)
+    pd.to_pickle((sample, info), path + ".tmp")
+    os.replace(path + ".tmp", path)
+    if progress:
+        progress(f"Échantillon de référence {version} : {len(sample)} lignes sur {info['rows']} "
+                 f"en {time.perf_counter() - started:.1f}s")
+    return sample, info
+
+
+def load_production_sample(events_dir: str, since: float, until: float, max_rows: int, seed: int) -> tuple:
+    """Prédictions de la fenêtre (au plus max_rows, tirées sans lire les autres) et empreinte du tirage."""
+    frame = EventStore(events_dir).read_frame("prediction", since, until, max_rows=max_rows, seed=seed)
+    if len(frame) and "prediction" in frame:
+        frame[TARGET_COLUMN] = frame["prediction"].map({"Solvable": 0, "Défaillant": 1})
+    frame = frame.rename(columns=lambda c: c[len(INPUT_PREFIX):] if c.startswith(INPUT_PREFIX) else c)
+    fingerprint = hashlib.sha256(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes()).hexdigest()
+    return frame, fingerprint[:16]
+
+
+# ============================================================
+# Tests par champ (exécutés dans les workers)
+# ============================================================
+
+def _clean(kind: str, values: np.ndarray) -> np.ndarray:
+    """Valeurs non manquantes ; catégories en texte (mêmes libellés des deux côtés)."""
+    if kind == "numeric":
+        return values[~np.isnan(values)]
+    return np.array([str(v) for v in values if not pd.isna(v)], dtype=object)
+
+
+def _counts(kind: str, reference: np.ndarray, current: np.ndarray) -> tuple:
+    """Comptes (référence, production) par catégorie, ou par décile de la référence pour un champ numérique."""
+    if kind == "numeric":
+        edges = np.unique(np.quantile(reference, np.linspace(0, 1, PSI_BINS + 1)[1:-1]))
+        return (np.bincount(np.searchsorted(edges, reference, side="right"), minlength=len(edges) + 1),
+                np.bincount(np.searchsorted(edges, current, side="right"), minlength=len(edges) + 1))
+    categories = sorted(set(reference) | set(current))
+    return (pd.Series(reference).value_counts().reindex(categories, fill_value=0).to_numpy(),
+            pd.Series(current).value_counts().reindex(categories, fill_value=0).to_numpy())
+
+
+def _describe(name: str, kind: str, reference: np.ndarray, current: np.ndarray) -> dict:
+    """Entrée du résumé commune aux deux moteurs : effectifs et PSI ; le test reste à remplir."""
+    entry = {"feature": name, "kind": kind, "n_reference": len(reference), "n_current": len(current),
+             "method": None, "score": None, "threshold": None, "drift": None, "psi": None}
+    if len(reference) and len(current):
+        ref_counts, cur_counts = _counts(kind, reference, current)
+        entry["psi"] = round(psi(cur_counts, ref_counts), 6)
+    return entry
+
+
+def evidently_drift(task: tuple) -> tuple:
+    """Rapport Evidently (DataDriftPreset) d'un sous-ensemble de colonnes : task = ([(nom, type)],
+    référence, production). Retourne (entrées par champ, snapshot sérialisé ou None)."""
+    columns, reference, current = task
+    entries = {name: _describe(name, kind, _clean(kind, reference[name].to_numpy()),
+                               _clean(kind, current[name].to_numpy()))
+               for name, kind in columns}
+    # Un champ vide d'un côté n'est pas testable : laissé sans résultat, comme avec scipy
+    tested = [(name, kind) for name, kind in columns if entries[name]["psi"] is not None]
+    if not tested:
+        return list(entries.values()), None
+
+    names = [name for name, _ in tested]
+    definition = DataDefinition(numerical_columns=[name for name, kind in tested if kind == "numeric"],
+                                categorical_columns=[name for name, kind in tested if kind == "categorical"])
+    snapshot = Report([DataDriftPreset(columns=names, drift_share=DRIFT_SHARE)], include_tests=True).run(
+        Dataset.from_pandas(current[names], data_definition=definition),
+        Dataset.from_pandas(reference[names], data_definition=definition))
+    result = snapshot.dict()
+    drifted = {test["metric_config"]["params"]["column"]: test["status"] == "FAIL"
+               for test in result["tests"] if test["id"] == "drift"}
+    for metric in result["metrics"]:
+        config = metric["config"]
+        if config["type"] == "evidently:metric_v2:ValueDrift":
+            entries[config["column"]].update(method=config["method"], score=float(metric["value"]),
+                                             threshold=config["threshold"], drift=drifted[config["column"]])
+    return list(entries.values()), snapshot.dumps()
+
+
+def _numeric_drift(reference: np.ndarray, current: np.ndarray) -> dict:
+    from scipy import stats
+
+    if len(reference) <= SMALL_SAMPLE:
+        score = float(stats.ks_2samp(reference, current).pvalue)
+        return {"method": "ks", "score": score, "threshold": P_VALUE_THRESHOLD, "drift": score < P_VALUE_THRESHOLD}
+    score = float(stats.wasserstein_distance(reference, current) / max(np.std(reference), 0.001))
+    return {"method": "wasserstein", "score": score, "threshold": DISTANCE_THRESHOLD,
+            "drift": score >= DISTANCE_THRESHOLD}
+
+
+def _categorical_drift(reference: np.ndarray, current: np.ndarray) -> dict:
+    from scipy import stats
+    from scipy.spatial import distance
+
+    ref_counts, cur_counts = _counts("categorical", reference, current)
+    if len(reference) <= SMALL_SAMPLE:
+        if len(ref_counts) < 2:
+            score = 1.0
+        else:
+            score = float(stats.chi2_contingency(np.vstack([ref_counts, cur_counts]), correction=False).pvalue)
+        return {"method": "chisquare", "score": score, "threshold": P_VALUE_THRESHOLD,
+                "drift": score < P_VALUE_THRESHOLD}
+    score = float(distance.jensenshannon(ref_counts / ref_counts.sum(), cur_counts / cur_counts.sum()))
+    return {"method": "jensenshannon", "score": score, "threshold": DISTANCE_THRESHOLD,
+            "drift": score >= DISTANCE_THRESHOLD}
+
+
+def feature_drift(task: tuple) -> dict:
+    """Repli sans Evidently : test scipy d'un champ avec les règles par défaut du DataDriftPreset,
+    task = (nom, "numeric" | "categorical", référence, production)."""
+    name, kind, reference, current = task
+    reference, current = _clean(kind, reference), _clean(kind, current)
+    entry = _describe(name, kind, reference, current)
+    if entry["psi"] is None:
+        return entry
+    result = _numeric_drift(reference, current) if kind == "numeric" else _categorical_drift(reference, current)
+    return {**entry, **result, "drift": bool(result["drift"])}
+
+
+def _prepare(reference: pd.DataFrame, current: pd.DataFrame) -> tuple:
+    """Champs communs [(nom, "numeric" | "categorical")] et colonnes converties des deux côtés :
+    numériques en flottants, TARGET (0/1 lus en flottants d'un côté, entiers de l'autre) en
+    catégories 0.0 / 1.0."""
+    numeric, categorical = schema_columns()
+    columns = [(name, "numeric") for name in numeric if name in reference and name in current]
+    columns += [(name, "categorical") for name in categorical if name in reference and name in current]
+    if TARGET_COLUMN in reference and TARGET_COLUMN in current:
+        columns.append((TARGET_COLUMN, "categorical"))
+
+    def convert(frame: pd.DataFrame) -> pd.DataFrame:
+        data = {}
+        for name, kind in columns:
+            if kind == "numeric" or name == TARGET_COLUMN:
+                data[name] = pd.to_numeric(frame[name], errors="coerce").to_numpy(np.float64)
+            else:
+                data[name] = frame[name].to_numpy(object)
+        return pd.DataFrame(data)
+
+    return columns, convert(reference), convert(current)
+
+
+def default_engine() -> str:
+    return "evidently" if HAS_EVIDENTLY else "scipy"
+
+
+def compute_drift(reference: pd.DataFrame, current: pd.DataFrame, workers: int = None, engine: str = None) -> tuple:
+    """Tests de tous les champs communs, répartis sur `workers` processus (0 : dans ce processus).
+    Avec Evidently, les colonnes sont réparties en un sous-ensemble par processus, chacun calculant
+    son rapport DataDriftPreset ; avec scipy (repli), un test par champ. Retourne (entrées par champ,
+    snapshots Evidently sérialisés, un par sous-ensemble ; aucun avec scipy)."""
+    engine = engine or default_engine()
+    if engine == "evidently" and not HAS_EVIDENTLY:
+        raise ValueError("Evidently n'est pas installé : utiliser engine='scipy'")
+    columns, reference, current = _prepare(reference, current)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if engine == "evidently":
+        n_parts = max(1, min(workers, len(columns)))
+        subsets = [columns[i::n_parts] for i in range(n_parts)]
+        tasks = [(subset, reference[[name for name, _ in subset]], current[[name for name, _ in subset]])
+                 for subset in subsets if subset]
+        function = evidently_drift
+    else:
+        tasks = [(name, kind, reference[name].to_numpy(), current[name].to_numpy()) for name, kind in columns]
+        function = feature_drift
+
+    if workers <= 0 or len(tasks) <= 1:
+        results = [function(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=mp.get_context("spawn")) as pool:
+            results = list(pool.map(function, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    if engine == "evidently":
+        return [entry for entries, _ in results for entry in entries], [part for _, part in results if part]
+    return results, []
+
+
+# ============================================================
+# Rapport
+# ============================================================
+
+def merge_snapshots(parts: list, summary: dict) -> "Run":
+    """Rapport Evidently unique à partir des rapports des sous-ensembles de colonnes : métriques
+    réunies, tableaux par champ concaténés, compteurs du jeu de données recalculés sur tous les champs."""
+    parts = [json.loads(part) for part in parts]
+    merged = {**parts[0], "metric_results": {}, "top_level_metrics": [], "widgets": [], "tests_widgets": []}
+    table = None
+    for part in parts:
+        merged["metric_results"].update(part["metric_results"])
+        merged["top_level_metrics"] += part["top_level_metrics"]
+        for widget in part["widgets"]:
+            if widget["type"] != "big_table":
+                continue
+            if table is None:
+                table = widget
+            else:
+                table["params"]["data"] += widget["params"]["data"]
+                table["additionalGraphs"] += widget["additionalGraphs"]
+
+    n_features, n_drifted = summary["n_features"], summary["n_drifted"]
+    detected = "detected" if summary["dataset_drift"] else "NOT detected"
+    merged["widgets"] = [
+        counter(counters=[CounterData(f"Dataset Drift is {detected}. Dataset drift detection threshold is "
+                                      f"{DRIFT_SHARE}", "Dataset Drift")]).dict(),
+        counter(counters=[CounterData.int("Columns", n_features), CounterData.int("Drifted Columns", n_drifted),
+                          CounterData.float("Share of Drifted Columns", summary["share_drifted"], 3)]).dict(),
+        header_text(label="Data Drift Summary").dict(),
+    ]
+    if table is not None:
+        table["title"] = (f"Drift is detected for {round(summary['share_drifted'] * 100, 3)}% of columns "
+                          f"({n_drifted} out of {n_features}).")
+        table["params"]["rowsPerPage"] = min(len(table["params"]["data"]), 10)
+        merged["widgets"].append(table)
+    return Run.load_dict(merged)
+
+
+def render_html(summary: dict) -> str:
+    """Rapport HTML du repli scipy (sans Evidently)."""
+    rows = []
+    for f in summary["features"]:
+        score = "" if f["score"] is None else f"{f['score']:.4g}"
+        status = {True: "Dérive", False: "Stable", None: "Pas de données"}[f["drift"]]
+        rows.append(f'<tr class="{"drift" if f["drift"] else ""}"><td>{html.escape(f["feature"])}</td>'
+                    f'<td>{f["kind"]}</td><td>{f["method"] or ""}</td><td>{score}</td><td>{f["threshold"] or ""}</td>'
+                    f'<td>{"" if f["psi"] is None else f["psi"]}</td><td>{status}</td></tr>')
+    window = summary["window"]
+    return f"""<!DOCTYPE html>
+<html lang="fr"><head><meta charset="utf-8"><title>Rapport de dérive</title>
+<style>body{{font-family:sans-serif;margin:2em}}table{{border-collapse:collapse}}td,th{{border:1px solid #ccc;padding:4px 8px}}
+tr.drift{{background:#fde0dc}}</style></head><body>
+<h1>Rapport de dérive des données</h1>
+<p>Fenêtre : {window["since"]} → {window["until"]} — {summary["current_rows"]} prédictions échantillonnées,
+référence {summary["reference"]["version"]} ({summary["reference"]["sample_rows"]} lignes sur {summary["reference"]["rows"]}).</p>
+<p><b>{"Dérive détectée" if summary["dataset_drift"] else "Pas de dérive"}</b> :
+{summary["n_drifted"]} champs sur {summary["n_features"]} ({summary["share_drifted"]:.0%}, seuil {summary["drift_share_threshold"]:.0%}).</p>
+<table><tr><th>Champ</th><th>Type</th><th>Méthode</th><th>Score</th><th>Seuil</th><th>PSI</th><th>Statut</th></tr>
+{"".join(rows)}
+</table><p>Généré le {summary["generated_at"]} (clé {summary["cache_key"]}).</p></body></html>
+"""
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def run_job(input_path: str = INPUT_DATA_PATH, target_path: str = OUTPUT_DATA_PATH, events_dir: str = EVENTS_DIR,
+            reports_dir: str = REPORTS_DIR, window_hours: float = 24, align_minutes: float = 60,
+            reference_size: int = DEFAULT_REFERENCE_SIZE, max_rows: int = DEFAULT_MAX_ROWS, workers: int = None,
+            seed: int = 0, now: float = None, progress=print, engine: str = None) -> dict:
+    """Une exécution du job. Le résumé retourné porte "status" : "generated" (tests calculés),
+    "cached" (rapport et résultats relus du cache, puis recopiés), "unchanged" (rapport déjà à jour,
+    rien n'est réécrit) ou "empty" (aucune prédiction dans la fenêtre)."""
+    started = time.perf_counter()
+    engine = engine or default_engine()
+    cache_dir = os.path.join(reports_dir, "cache")
+    since, until = aligned_window(time.time() if now is None else now, window_hours, align_minutes)
+
+    reference, reference_info = load_reference_sample(input_path, target_path, reference_size, seed, cache_dir,
+                                                      progress)
+    current, fingerprint = load_production_sample(events_dir, since, until, max_rows, seed)
+    window = {"since": _iso(since), "until": _iso(until)}
+    if current.empty:
+        return {"status": "empty", "window": window, "reference": reference_info}
+
+    key = _digest([METHOD_VERSION, engine, reference_info["version"], since, until, fingerprint, reference_size,
+                   max_rows, seed])
+    summary_path = os.path.join(reports_dir, "drift_summary.json")
+    html_path = os.path.join(reports_dir, "drift_report.html")
+    if os.path.exists(summary_path) and os.path.exists(html_path):
+        with open(summary_path, encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous.get("cache_key") == key:
+            return {**previous, "status": "unchanged"}
+
+    cache_path = os.path.join(cache_dir, f"drift_{key}.json")
+    cache_html = os.path.join(cache_dir, f"drift_{key}.html")
+    if os.path.exists(cache_path) and os.path.exists(cache_html):
+        with open(cache_path, encoding="utf-8") as f:
+            summary, status = json.load(f), "cached"
+        with open(cache_html, "rb") as f:
+            report_html = f.read()
+    else:
+        features, parts = compute_drift(reference, current, workers, engine)
+        features = sorted(features, key=lambda f: (f["drift"] is not True, f["feature"]))
+        tested = [f for f in features if f["drift"] is not None]
+        n_drifted = sum(f["drift"] for f in tested)
+        share = n_drifted / len(tested) if tested else 0.0
+        summary = {
+            "cache_key": key,
+            "engine": engine,
+            "generated_at": datetime.utcnow().isoformat(),
+            "window": window,
+            "reference": reference_info,
+            "current_rows": len(current),
+            "max_rows": max_rows,
+            "n_features": len(tested),
+            "n_drifted": n_drifted,
+            "share_drifted": round(share, 4),
+            "drift_share_threshold": DRIFT_SHARE,
+            "dataset_drift": bool(tested) and share >= DRIFT_SHARE,
+            "drifted_features": [f["feature"] for f in tested if f["drift"]],
+            "features": features,
+            "duration_s": round(time.perf_counter() - started, 3),
+        }
+        os.makedirs(cache_dir, exist_ok=True)
+        if parts:
+            # Snapshot Evidently complet, relisible avec evidently.Run.load
+            snapshot = merge_snapshots(parts, summary)
+            _write_atomic(os.path.join(cache_dir, f"drift_{key}.evidently.json"), snapshot.dumps().encode("utf-8"))
+            report_html = snapshot.get_html_str(as_iframe=False).encode("utf-8")
+        else:
+            report_html = render_html(summary).encode("utf-8")
+        _write_atomic(cache_html, report_html)
+        _write_atomic(cache_path, json.dumps(summary, ensure_ascii=False).encode("utf-8"))
+        status = "generated"
+
+    _write_atomic(html_path, report_html)
+    _write_atomic(summary_path, json.dumps(summary, ensure_ascii=False, indent=2).encode("utf-8"))
+    return {**summary, "status": status}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rapport de dérive échantillonné, parallèle et mis en cache.")
+    parser.add_argument("--input", default=INPUT_DATA_PATH, help="Données de référence (CSV)")
+    parser.add_argument("--target", default=OUTPUT_DATA_PATH, help=f"Cible de référence (CSV, colonne {TARGET_COLUMN})")
+    parser.add_argument("--events-dir", default=EVENTS_DIR)
+    parser.add_argument("--reports-dir", default=REPORTS_DIR)
+    parser.add_argument("--window-hours", type=float, default=24)
+    parser.add_argument("--align-minutes", type=float, default=60, help="Arrondi de la fin de la fenêtre")
+    parser.add_argument("--reference-size", type=int, default=DEFAULT_REFERENCE_SIZE)
+    parser.add_argument("--max-rows", type=int, default=DEFAULT_MAX_ROWS, help="Prédictions échantillonnées au plus")
+    parser.add_argument("--workers", type=int, default=None, help="Processus (défaut : nombre de cœurs, 0 : aucun)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=["evidently", "scipy"], default=None,
+                        help="Calcul de la dérive (défaut : Evidently s'il est installé)")
+    parser.add_argument("--every", type=float, default=0, help="Relance toutes les N minutes (0 : une exécution)")
+    args = parser.parse_args(argv)
+
+    while True:
+        try:
+            summary = run_job(args.input, args.target or None, args.events_dir, args.reports_dir, args.window_hours,
+                              args.align_minutes, args.reference_size, args.max_rows, args.workers, args.seed,
+                              progress=lambda message: print(message, file=sys.stderr), engine=args.engine)
+            if summary["status"] == "empty":
+                print(f"Aucune prédiction entre {summary['window']['since']} et {summary['window']['until']}")
+            else:
+                print(f"[{summary['status']}] {summary['n_drifted']}/{summary['n_features']} champs en dérive "
+                      f"({summary['current_rows']} prédictions) -> {os.path.join(args.reports_dir, 'drift_report.html')}")
+        except Exception as e:
+            if not args.every:
+                raise
+            print(f"Échec du rapport de dérive : {e}", file=sys.stderr)
+        if not args.every:
+            return 0
+        time.sleep(args.every * 60)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
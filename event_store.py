@@ -0,0 +1,360 @@
+"""
+Event store binaire, en ajout seul, pour les événements structurés de l'API.
+
+Les entrées "prediction", "http_request", ... sont écrites en plus du fichier de logs texte
+dans des segments partitionnés par type d'événement et par jour (UTC) :
+
+    <racine>/<événement>/schema.json        description des colonnes (types, catégories)
+    <racine>/<événement>/AAAA-MM-JJ.bin     enregistrements numpy à taille fixe, bout à bout
+    <racine>/<événement>/AAAA-MM-JJ.idx     index : (ts_min, ts_max, offset en octets, n) par bloc écrit
+
+Un lecteur ne lit que l'index des jours concernés puis la seule plage d'octets couvrant
+la fenêtre demandée : le coût d'un chargement dépend de la fenêtre, pas de l'historique.
+Les colonnes sont typées (float64, int64, chaînes courtes, catégories codées sur int16).
+L'index est écrit après les données : une écriture interrompue est simplement ignorée
+et tronquée à la réouverture du segment.
+
+Plusieurs processus (workers uvicorn) peuvent écrire dans le même store : chaque ajout et
+chaque réparation d'un segment se font sous un verrou fcntl.flock propre à l'événement
+(<événement>/append.lock), la déclaration des schémas sous un verrou global (.register.lock).
+
+Un changement de schéma archive le dossier de l'événement (<événement>.AAAAMMJJTHHMMSS) ;
+la lecture parcourt aussi ces archives, chacune relue avec son propre schema.json puis
+convertie dans le schéma courant (colonnes absentes : valeur manquante).
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # hors POSIX : verrou limité aux threads du processus
+    fcntl = None
+
+FIELD_KINDS = ("float", "int", "str", "category")
+INDEX_DTYPE = np.dtype([("ts_min", "<f8"), ("ts_max", "<f8"), ("offset", "<i8"), ("n", "<i8")])
+SECONDS_PER_DAY = 86400
+
+
+def _value(v):
+    """Valeur brute d'un Enum (les Enum str sont hachés par nom)."""
+    return getattr(v, "value", v)
+
+
+def _get(entry: dict, path: str):
+    """Valeur d'un champ, éventuellement imbriqué ("input_data.AMT_CREDIT")."""
+    for key in path.split("."):
+        if not isinstance(entry, dict):
+            return None
+        entry = entry.get(key)
+    return entry
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Verrou exclusif entre processus, posé sur un fichier dédié."""
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _to_epoch(moment) -> float:
+    """datetime (naïf = UTC), chaîne ISO ou nombre -> secondes depuis l'epoch."""
+    if moment is None or isinstance(moment, (int, float)):
+        return moment
+    if isinstance(moment, str):
+        moment = datetime.fromisoformat(moment)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class EventSchema:
+    """Colonnes d'un type d'événement.
+
+    fields : liste de tuples (nom, type[, argument]) avec type parmi
+    "float", "int", "str" (argument : taille maximale en octets) et
+    "category" (argument : liste des valeurs possibles).
+    Le nom est aussi le chemin du champ dans l'entrée (ex. "input_data.AMT_CREDIT").
+    """
+
+    def __init__(self, event: str, fields: list):
+        self.event = event
+        self.fields = [tuple(f) for f in fields]
+        for field in self.fields:
+            if field[1] not in FIELD_KINDS:
+                raise ValueError(f"Type de champ inconnu pour {event}.{field[0]} : {field[1]}")
+        self.categories = {f[0]: list(f[2]) for f in self.fields if f[1] == "category"}
+        self._codes = {name: {v: i for i, v in enumerate(values)} for name, values in self.categories.items()}
+        self.dtype = np.dtype([("ts", "<f8")] + [(f[0], self._field_dtype(f)) for f in self.fields])
+
+    @staticmethod
+    def _field_dtype(field):
+        kind = field[1]
+        if kind == "float":
+            return "<f8"
+        if kind == "int":
+            return "<i8"
+        if kind == "str":
+            return f"S{field[2]}"
+        return "<i2"
+
+    def to_json(self) -> dict:
+        return {"event": self.event, "fields": [list(f) for f in self.fields]}
+
+    @classmethod
+    def from_json(cls, data: dict):
+        return cls(data["event"], data["fields"])
+
+    def to_records(self, entries: list) -> np.ndarray:
+        """Convertit des entrées dict en enregistrements, colonne par colonne."""
+        records = np.zeros(len(entries), dtype=self.dtype)
+        stamps = [e.get("timestamp") or datetime.utcnow().isoformat() for e in entries]
+        records["ts"] = np.array(stamps, dtype="datetime64[us]").astype(np.int64) / 1e6
+        for field in self.fields:
+            name, kind = field[0], field[1]
+            values = [_value(_get(e, name)) for e in entries]
+            if kind == "float":
+                records[name] = [np.nan if v is None else v for v in values]
+            elif kind == "int":
+                records[name] = [-1 if v is None else v for v in values]
+            elif kind == "str":
+                records[name] = [b"" if v is None else str(v).encode("utf-8") for v in values]
+            else:
+                codes = self._codes[name]
+                records[name] = [codes.get(v, -1) for v in values]
+        return records
+
+    def convert(self, records: np.ndarray, source: "EventSchema") -> np.ndarray:
+        """Enregistrements écrits avec un autre schéma (archive), ramenés à celui-ci : colonnes
+        communes copiées (catégories recodées par valeur), colonnes nouvelles manquantes."""
+        if source.to_json() == self.to_json():
+            return records
+        out = np.zeros(len(records), dtype=self.dtype)
+        out["ts"] = records["ts"]
+        previous = {f[0]: f[1] for f in source.fields}
+        for field in self.fields:
+            name, kind = field[0], field[1]
+            old = previous.get(name)
+            if kind == "category" and old == "category":
+                lookup = [self._codes[name].get(v, -1) for v in source.categories[name]]
+                out[name] = np.array(lookup + [-1], dtype=np.int16)[records[name]]  # code -1 -> -1
+            elif old == kind or (old in ("float", "int") and kind in ("float", "int")):
+                out[name] = records[name]  # chaînes : tronquées ou complétées à la nouvelle taille
+            else:
+                out[name] = {"float": np.nan, "int": -1, "str": b"", "category": -1}[kind]
+        return out
+
+
+class EventStore:
+    """Écriture (thread d'écriture des logs) et lecture par fenêtre des segments d'événements."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.schemas = {}
+        self._archived = {}  # dossier d'archive -> schéma relu
+        self._checked = set()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Schémas
+    # ------------------------------------------------------------------
+
+    def _schema_path(self, event: str) -> str:
+        return os.path.join(self.root, event, "schema.json")
+
+    def register(self, schema: EventSchema):
+        """Déclare un type d'événement. Si le schéma sur disque est différent (nouvelle colonne...),
+        les anciens segments sont archivés dans <événement>.AAAAMMJJTHHMMSS (toujours lus, voir read)
+        et un nouveau dossier est créé."""
+        path = self._schema_path(schema.event)
+        os.makedirs(self.root, exist_ok=True)
+        with _file_lock(os.path.join(self.root, ".register.lock")):
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    existing = json.load(f)
+                if existing != schema.to_json():
+                    folder = os.path.dirname(path)
+                    archive = f"{folder}.{datetime.utcnow():%Y%m%dT%H%M%S}"
+                    suffix = 1
+                    while os.path.exists(archive):
+                        archive, suffix = f"{folder}.{datetime.utcnow():%Y%m%dT%H%M%S}-{suffix}", suffix + 1
+                    os.rename(folder, archive)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump(schema.to_json(), f, ensure_ascii=False)
+                os.replace(path + ".tmp", path)
+        self.schemas[schema.event] = schema
+        self._checked = {key for key in self._checked if key[0] != schema.event}
+
+    def schema(self, event: str) -> EventSchema:
+        if event not in self.schemas:
+            path = self._schema_path(event)
+            if not os.path.exists(path):
+                return None
+            with open(path, encoding="utf-8") as f:
+                self.schemas[event] = EventSchema.from_json(json.load(f))
+        return self.schemas[event]
+
+    def events(self) -> list:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(e for e in os.listdir(self.root) if "." not in e and os.path.exists(self._schema_path(e)))
+
+    def archives(self, event: str) -> list:
+        """Dossiers archivés d'un événement, du plus ancien au plus récent."""
+        if not os.path.isdir(self.root):
+            return []
+        prefix = event + "."
+        return sorted(os.path.join(self.root, name) for name in os.listdir(self.root)
+                      if name.startswith(prefix) and os.path.exists(os.path.join(self.root, name, "schema.json")))
+
+    def _archived_schema(self, folder: str) -> EventSchema:
+        if folder not in self._archived:
+            with open(os.path.join(folder, "schema.json"), encoding="utf-8") as f:
+                self._archived[folder] = EventSchema.from_json(json.load(f))
+        return self._archived[folder]
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def _segment(self, event: str, day: str):
+        base = os.path.join(self.root, event, day)
+        return base + ".bin", base + ".idx"
+
+    def _repair(self, data_path: str, index_path: str, itemsize: int):
+        """Tronque les écritures interrompues (données non indexées, entrée d'index partielle)."""
+        if not os.path.exists(index_path):
+            if os.path.exists(data_path):
+                os.truncate(data_path, 0)
+            return
+        index_size = os.path.getsize(index_path)
+        index_size -= index_size % INDEX_DTYPE.itemsize
+        os.truncate(index_path, index_size)
+        end = 0
+        if index_size:
+            last = np.fromfile(index_path, dtype=INDEX_DTYPE, count=1, offset=index_size - INDEX_DTYPE.itemsize)[0]
+            end = int(last["offset"]) + int(last["n"]) * itemsize
+        if os.path.exists(data_path) and os.path.getsize(data_path) > end:
+            os.truncate(data_path, end)
+
+    def _append_segment(self, event: str, day: str, records: np.ndarray):
+        # Appelé sous le verrou de l'événement : offset, données et index sont cohérents entre processus
+        data_path, index_path = self._segment(event, day)
+        if (event, day) not in self._checked:
+            self._repair(data_path, index_path, records.dtype.itemsize)
+            self._checked.add((event, day))
+        offset = os.path.getsize(data_path) if os.path.exists(data_path) else 0
+        with open(data_path, "ab") as f:
+            f.write(records.tobytes())
+        block = np.array([(records["ts"].min(), records["ts"].max(), offset, len(records))], dtype=INDEX_DTYPE)
+        with open(index_path, "ab") as f:
+            f.write(block.tobytes())
+
+    def append(self, event: str, entries: list):
+        schema = self.schemas[event]
+        records = schema.to_records(entries)
+        days = (records["ts"] // SECONDS_PER_DAY).astype(np.int64).astype("datetime64[D]").astype(str)
+        with self._lock, _file_lock(os.path.join(self.root, event, "append.lock")):
+            for day in np.unique(days):
+                self._append_segment(event, day, records[days == day])
+
+    def append_entries(self, entries: list):
+        """Sink du QueuedLogWriter : range les entrées des événements déclarés, ignore les autres."""
+        by_event = {}
+        for entry in entries:
+            event = entry.get("event")
+            if event in self.schemas:
+                by_event.setdefault(event, []).append(entry)
+        for event, group in by_event.items():
+            self.append(event, group)
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def _days(self, folder: str, t0: float, t1: float) -> list:
+        days = sorted(name[:-4] for name in os.listdir(folder) if name.endswith(".idx"))
+        first = np.datetime64(int(t0 // SECONDS_PER_DAY), "D").astype(str) if np.isfinite(t0) else None
+        last = np.datetime64(int(t1 // SECONDS_PER_DAY), "D").astype(str) if np.isfinite(t1) else None
+        return [d for d in days if (first is None or d >= first) and (last is None or d <= last)]
+
+    def read(self, event: str, since=None, until=None, max_rows: int = None, seed: int = 0) -> np.ndarray:
+        """Enregistrements d'un événement dont le timestamp est dans [since, until], archives
+        comprises (converties dans le schéma courant).
+
+        Avec max_rows, au plus max_rows enregistrements tirés uniformément (sans remise) parmi les
+        blocs de la fenêtre : seules les lignes tirées sont lues (segments mappés en mémoire), le
+        coût ne dépend plus du volume de la fenêtre."""
+        schema = self.schema(event)
+        if schema is None:
+            return np.empty(0, dtype=np.dtype([("ts", "<f8")]))
+        t0 = _to_epoch(since) if since is not None else -np.inf
+        t1 = _to_epoch(until) if until is not None else np.inf
+
+        sources = [(folder, self._archived_schema(folder)) for folder in self.archives(event)]
+        sources.append((os.path.join(self.root, event), schema))
+        ranges = []  # (fichier, schéma du fichier, offset, nombre d'enregistrements)
+        for folder, source in sources:
+            itemsize = source.dtype.itemsize
+            for day in self._days(folder, t0, t1):
+                data_path, index_path = os.path.join(folder, day + ".bin"), os.path.join(folder, day + ".idx")
+                index = np.fromfile(index_path, dtype=INDEX_DTYPE)
+                selected = np.flatnonzero((index["ts_max"] >= t0) & (index["ts_min"] <= t1))
+                if not len(selected):
+                    continue
+                # Les blocs sont contigus : une seule plage du premier au dernier bloc retenu
+                start = int(index["offset"][selected[0]])
+                stop = int(index["offset"][selected[-1]]) + int(index["n"][selected[-1]]) * itemsize
+                ranges.append((data_path, source, start, (stop - start) // itemsize))
+
+        total = sum(count for _, _, _, count in ranges)
+        positions = None
+        if max_rows is not None and total > max_rows:
+            positions = np.sort(np.random.default_rng(seed).choice(total, max_rows, replace=False))
+        parts, first = [], 0
+        for data_path, source, start, count in ranges:
+            if positions is None:
+                records = np.fromfile(data_path, dtype=source.dtype, count=count, offset=start)
+            else:
+                local = positions[np.searchsorted(positions, first):np.searchsorted(positions, first + count)] - first
+                records = np.array(np.memmap(data_path, dtype=source.dtype, mode="r", offset=start, shape=(count,))[local])
+            first += count
+            # Les blocs en bord de fenêtre peuvent déborder : filtre final sur le timestamp
+            parts.append(schema.convert(records[(records["ts"] >= t0) & (records["ts"] <= t1)], source))
+        if not parts:
+            return np.empty(0, dtype=schema.dtype)
+        return np.concatenate(parts)
+
+    def read_frame(self, event: str, since=None, until=None, max_rows: int = None, seed: int = 0) -> pd.DataFrame:
+        """Même lecture, en DataFrame : chaînes et catégories décodées, colonne "timestamp"."""
+        schema = self.schema(event)
+        records = self.read(event, since, until, max_rows, seed)
+        frame = pd.DataFrame({"timestamp": pd.to_datetime(np.round(records["ts"] * 1e6).astype(np.int64), unit="us")})
+        if schema is None:
+            return frame
+        for field in schema.fields:
+            name, kind = field[0], field[1]
+            column = records[name]
+            if kind == "str":
+                frame[name] = [v.decode("utf-8", errors="replace") for v in column]
+            elif kind == "category":
+                lookup = np.array(schema.categories[name] + [None], dtype=object)
+                frame[name] = lookup[column]  # code -1 -> None
+            else:
+                frame[name] = column
+        frame["event"] = event
+        return frame
@@ -0,0 +1,255 @@
+"""
+Encodeur compilé : remplace le ColumnTransformer scikit-learn au moment de l'inférence.
+
+Au chargement du modèle, les préprocesseurs ajustés de model.pkl (SimpleImputer,
+StandardScaler, OneHotEncoder) sont convertis une seule fois en tables précalculées :
+- constantes d'imputation, moyennes et écarts-types pour les variables numériques,
+- tables valeur -> indice de colonne pour les variables catégorielles,
+- ordre des colonnes de sortie figé.
+
+Les champs des clients sont ensuite écrits directement dans une matrice float32
+préallouée, sans DataFrame ni validations scikit-learn à chaque requête.
+
+Les tables sont exportées dans model.encoder.json (python tree_evaluator.py, avec les
+arbres) : relues par CompiledEncoder.load, elles évitent de désérialiser le pipeline.
+"""
+
+import json
+import os
+from enum import Enum
+from operator import attrgetter
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+
+# scikit-learn n'est importé qu'à la compilation de l'encodeur (chargement du modèle) :
+# un worker démarré en mode MODEL_LOAD_MODE=startup n'en paie pas le coût à l'import.
+
+
+def _steps(transformer) -> list:
+    from sklearn.pipeline import Pipeline
+
+    if isinstance(transformer, Pipeline):
+        return [step for _, step in transformer.steps if step not in (None, "passthrough")]
+    return [transformer]
+
+
+def _value(v):
+    """Valeur brute d'un champ (les Enums de ClientData sont ramenés à leur valeur)."""
+    return v.value if isinstance(v, Enum) else v
+
+
+def _is_missing(v) -> bool:
+    """Valeur manquante au sens de SimpleImputer(missing_values=np.nan) : NaN uniquement."""
+    return isinstance(v, float) and v != v
+
+
+_UNKNOWN = object()
+
+
+def encoder_artifact_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".encoder.json"
+
+
+def _plain(v):
+    """Scalaire NumPy ramené au type Python (sérialisable en JSON, même clé de table)."""
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def _tuple_getter(columns: list):
+    if not columns:
+        return lambda row: ()
+    if len(columns) == 1:
+        getter = attrgetter(columns[0])
+        return lambda row: (getter(row),)
+    return attrgetter(*columns)
+
+
+class CompiledEncoder:
+    """Encodeur précalculé équivalent au ColumnTransformer ajusté du pipeline."""
+
+    def __init__(self, preprocessor: "ColumnTransformer"):
+        from sklearn.compose import ColumnTransformer
+        from sklearn.impute import SimpleImputer
+        from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+        if not isinstance(preprocessor, ColumnTransformer):
+            raise ValueError(f"Préprocesseur non supporté : {type(preprocessor).__name__}")
+        if preprocessor.sparse_output_:
+            raise ValueError("Sortie creuse (sparse) non supportée")
+
+        self.n_features = len(preprocessor.get_feature_names_out())
+
+        numeric_columns, numeric_index = [], []
+        medians, means, scales = [], [], []
+        self.categorical_columns = []
+        self.categorical_fill = []
+        self.categorical_tables = []
+
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == "drop" or len(columns) == 0:
+                continue
+            out = preprocessor.output_indices_[name]
+            steps = _steps(transformer)
+
+            if all(isinstance(s, (SimpleImputer, StandardScaler)) for s in steps):
+                imputer = next((s for s in steps if isinstance(s, SimpleImputer)), None)
+                scaler = next((s for s in steps if isinstance(s, StandardScaler)), None)
+                if imputer is not None and np.isnan(imputer.statistics_.astype(float)).any():
+                    raise ValueError(f"Imputation vide dans '{name}' non supportée")
+                n = len(columns)
+                numeric_columns.extend(columns)
+                numeric_index.extend(range(out.start, out.start + n))
+                medians.extend(imputer.statistics_ if imputer is not None else [0.0] * n)
+                means.extend(scaler.mean_ if scaler is not None and scaler.mean_ is not None else [0.0] * n)
+                scales.extend(scaler.scale_ if scaler is not None and scaler.scale_ is not None else [1.0] * n)
+
+            elif isinstance(steps[-1], OneHotEncoder) and all(isinstance(s, SimpleImputer) for s in steps[:-1]):
+                encoder = steps[-1]
+                if encoder.handle_unknown != "ignore" or getattr(encoder, "_infrequent_enabled", False):
+                    raise ValueError(f"OneHotEncoder de '{name}' non supporté")
+                imputer = steps[0] if len(steps) > 1 else None
+                position = out.start
+                for i, column in enumerate(columns):
+                    table = {}
+                    dropped = encoder.drop_idx_[i] if encoder.drop_idx_ is not None else None
+                    for j, category in enumerate(encoder.categories_[i]):
+                        if j == dropped:
+                            continue
+                        table[category] = position
+                        position += 1
+                    self.categorical_columns.append(column)
+                    self.categorical_fill.append(imputer.statistics_[i] if imputer is not None else None)
+                    self.categorical_tables.append(table)
+                if position != out.stop:
+                    raise ValueError(f"Nombre de colonnes incohérent pour '{name}'")
+            else:
+                raise ValueError(f"Transformateur '{name}' non supporté")
+
+        self._set_numeric(numeric_columns, numeric_index, medians, means, scales)
+
+    def _set_numeric(self, columns: list, index, medians, means, scales):
+        self.numeric_columns = list(columns)
+        # Lecture de tous les attributs en un appel ; toujours un tuple, même pour une seule colonne
+        self._numeric_getter = _tuple_getter(self.numeric_columns)
+        self._categorical_getter = _tuple_getter(self.categorical_columns)
+        self._enum_codes = [{} for _ in self.categorical_columns]  # id(membre d'Enum) -> colonne
+        self.numeric_index = np.asarray(index, dtype=np.intp)
+        self.medians = np.asarray(medians, dtype=np.float64)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.scales = np.asarray(scales, dtype=np.float64)
+
+    @classmethod
+    def from_pipeline(cls, pipeline: "Pipeline") -> "CompiledEncoder":
+        """Compile le premier étage d'un pipeline (préprocesseur) en encodeur précalculé."""
+        from sklearn.pipeline import Pipeline
+
+        if not isinstance(pipeline, Pipeline):
+            raise ValueError(f"Modèle non supporté : {type(pipeline).__name__}")
+        return cls(pipeline.steps[0][1])
+
+    # ------------------------------------------------------------------
+    # Sérialisation (sans scikit-learn)
+    # ------------------------------------------------------------------
+
+    def save(self, path: str) -> str:
+        state = {
+            "n_features": self.n_features,
+            "numeric_columns": self.numeric_columns,
+            "numeric_index": self.numeric_index.tolist(),
+            "medians": self.medians.tolist(),
+            "means": self.means.tolist(),
+            "scales": self.scales.tolist(),
+            "categorical_columns": self.categorical_columns,
+            "categorical_fill": [_plain(v) for v in self.categorical_fill],
+            # Paires [catégorie, colonne] : les catégories non textuelles gardent leur type
+            "categorical_tables": [[[_plain(k), v] for k, v in table.items()] for table in self.categorical_tables],
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledEncoder":
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        encoder = cls.__new__(cls)
+        encoder.n_features = state["n_features"]
+        encoder.categorical_columns = state["categorical_columns"]
+        encoder.categorical_fill = state["categorical_fill"]
+        encoder.categorical_tables = [{k: v for k, v in pairs} for pairs in state["categorical_tables"]]
+        encoder._set_numeric(state["numeric_columns"], state["numeric_index"], state["medians"], state["means"],
+                             state["scales"])
+        return encoder
+
+    # ------------------------------------------------------------------
+    # Encodage
+    # ------------------------------------------------------------------
+
+    def _finish_numeric(self, out: np.ndarray, values: np.ndarray):
+        """Imputation + standardisation en float64 (mêmes opérations que scikit-learn)."""
+        values = np.where(np.isnan(values), self.medians, values)
+        values -= self.means
+        values /= self.scales
+        out[:, self.numeric_index] = values
+
+    def _code(self, k: int, value):
+        """Colonne one-hot d'une valeur catégorielle (None si catégorie inconnue)."""
+        value = _value(value)
+        if _is_missing(value):
+            value = self.categorical_fill[k]
+        return self.categorical_tables[k].get(value)
+
+    def _encode(self, numeric_rows: list, categorical_rows: list) -> np.ndarray:
+        n = len(numeric_rows)
+        out = np.zeros((n, self.n_features), dtype=np.float32)
+        numeric = np.array(numeric_rows, dtype=np.float64).reshape(n, len(self.numeric_columns))
+        self._finish_numeric(out, numeric)
+
+        # Les membres d'Enum (ClientData) sont des singletons : leur colonne est mémorisée par id(),
+        # ce qui évite .value et le hachage de la chaîne à chaque requête
+        enum_codes = self._enum_codes
+        for i, values in enumerate(categorical_rows):
+            for k, value in enumerate(values):
+                codes = enum_codes[k]
+                index = codes.get(id(value), _UNKNOWN)
+                if index is _UNKNOWN:
+                    index = self._code(k, value)
+                    if isinstance(value, Enum):
+                        codes[id(value)] = index
+                if index is not None:
+                    out[i, index] = 1.0
+        return out
+
+    def transform_clients(self, clients: list) -> np.ndarray:
+        """Encode des objets ClientData (accès direct aux attributs)."""
+        numeric, categorical = self._numeric_getter, self._categorical_getter
+        return self._encode([numeric(c) for c in clients], [categorical(c) for c in clients])
+
+    def transform_records(self, records: list) -> np.ndarray:
+        """Encode des dictionnaires {champ: valeur}."""
+        return self._encode([[row.get(c) for c in self.numeric_columns] for row in records],
+                            [[row.get(c) for c in self.categorical_columns] for row in records])
+
+    def transform_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """Encode un DataFrame de façon vectorisée (colonne par colonne)."""
+        out = np.zeros((len(df), self.n_features), dtype=np.float32)
+        numeric = df[self.numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        self._finish_numeric(out, numeric)
+
+        rows = np.arange(len(df))
+        for column, fill, table in zip(self.categorical_columns, self.categorical_fill, self.categorical_tables):
+            values = df[column].map(_value)
+            if fill is not None:
+                values = values.where(~values.map(_is_missing).astype(bool), fill)
+            index = values.map(table).to_numpy(dtype=np.float64, na_value=np.nan)
+            known = ~np.isnan(index)
+            out[rows[known], index[known].astype(np.intp)] = 1.0
+        return out
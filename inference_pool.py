@@ -0,0 +1,247 @@
+"""
+Pool de processus d'inférence avec tampons de features en mémoire partagée.
+
+Chaque worker est démarré une fois et garde sa propre copie du classifieur de model.pkl
+(lu depuis l'artefact mappé model.mmap.joblib s'il existe, voir model_loader.py).
+Les lignes déjà encodées (float32, voir fast_preprocessing.py) sont écrites dans un
+anneau de slots en mémoire partagée : seuls les numéros de slot transitent par les
+files multiprocessing, jamais les données elles-mêmes. Le scoring échappe ainsi au GIL
+du worker uvicorn.
+
+Chaque worker a sa propre file de tâches (le slot est confié au worker le moins chargé) :
+le thread collecteur sait ainsi quels slots un worker détient. Il surveille les workers ;
+si l'un s'arrête (crash, OOM, kill), ses requêtes en cours échouent aussitôt avec
+WorkerDiedError, ses slots sont rendus à l'anneau et il est redémarré.
+"""
+
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+LIVENESS_INTERVAL_S = 0.5   # période de vérification des workers par le collecteur
+
+
+class WorkerDiedError(RuntimeError):
+    """Un worker s'est arrêté pendant le scoring d'une requête."""
+
+
+def _attach(name: str, shape: tuple, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _worker_main(index, model_path, backend, input_name, output_name, input_shape, output_shape, tasks, results):
+    """Boucle d'un worker : lit un slot, score ses lignes, écrit les probabilités."""
+    from model_loader import load_model
+
+    from scoring import CompiledModel, NativeBooster
+
+    model = load_model(model_path, backend=backend)  # artefact mappé (ou arbres NumPy) s'il existe
+    if isinstance(model, CompiledModel):
+        predict = model.trees.predict_proba
+    else:
+        classifier = model.steps[-1][1]
+        try:
+            # Booster natif, un thread par worker quelle que soit la taille du slot
+            predict = NativeBooster(classifier, nthread=1).predict_proba
+        except ValueError:
+            if hasattr(classifier, "set_params"):
+                classifier.set_params(n_jobs=1)  # un cœur par worker
+            predict = lambda X: classifier.predict_proba(X)[:, 1]
+    shm_in, inputs = _attach(input_name, input_shape, np.float32)
+    shm_out, outputs = _attach(output_name, output_shape, np.float64)
+    results.put(("ready", index, None))
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            slot, n_rows, ticket = task
+            try:
+                outputs[slot, :n_rows] = predict(inputs[slot, :n_rows])
+                results.put((slot, ticket, None))
+            except Exception as e:
+                results.put((slot, ticket, f"{type(e).__name__}: {e}"))
+    finally:
+        del inputs, outputs
+        shm_in.close()
+        shm_out.close()
+
+
+class InferencePool:
+    """Pool de n_workers processus partageant un anneau de n_slots tampons de features.
+
+    predict_proba attend au plus `timeout` secondes (TimeoutError au-delà), y compris pour
+    obtenir un slot libre quand l'anneau est plein."""
+
+    def __init__(self, model_path: str, n_features: int, n_workers: int = 2, n_slots: int = 64,
+                 rows_per_slot: int = 256, start_method: str = "spawn", timeout: float = 30.0, backend: str = None):
+        self.n_workers = n_workers
+        self.n_slots = n_slots
+        self.rows_per_slot = rows_per_slot
+        self.timeout = timeout
+        self.restarts = 0
+        input_shape = (n_slots, rows_per_slot, n_features)
+        output_shape = (n_slots, rows_per_slot)
+
+        self._shm_in = shared_memory.SharedMemory(create=True, size=int(np.prod(input_shape)) * 4)
+        self._shm_out = shared_memory.SharedMemory(create=True, size=int(np.prod(output_shape)) * 8)
+        self._inputs = np.ndarray(input_shape, dtype=np.float32, buffer=self._shm_in.buf)
+        self._outputs = np.ndarray(output_shape, dtype=np.float64, buffer=self._shm_out.buf)
+
+        self._ctx = mp.get_context(start_method)
+        self._worker_args = (model_path, backend, self._shm_in.name, self._shm_out.name, input_shape, output_shape)
+        self._results = self._ctx.Queue()
+        self._free_slots = queue.Queue()
+        for slot in range(n_slots):
+            self._free_slots.put(slot)
+        self._pending = {}                  # slot -> (future, n_rows, index du worker, ticket)
+        self._in_flight = [0] * n_workers   # slots confiés à chaque worker
+        self._tickets = 0                   # distingue les utilisations successives d'un même slot
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._tasks = [None] * n_workers
+        self._workers = [None] * n_workers
+        for index in range(n_workers):
+            self._start_worker(index)
+        for _ in range(n_workers):
+            status, _, error = self._results.get(timeout=120)
+            if status != "ready":
+                raise RuntimeError(f"Échec du démarrage d'un worker d'inférence : {error}")
+        self._last_check = time.monotonic()
+
+        self._collector = threading.Thread(target=self._collect, name="inference-pool-collector", daemon=True)
+        self._collector.start()
+
+    def _start_worker(self, index: int):
+        # Nouvelle file à chaque démarrage : les tâches de l'ancien worker ont déjà échoué
+        self._tasks[index] = self._ctx.Queue()
+        self._workers[index] = self._ctx.Process(
+            target=_worker_main, args=(index, *self._worker_args, self._tasks[index], self._results), daemon=True)
+        self._workers[index].start()
+
+    # ------------------------------------------------------------------
+    # Soumission
+    # ------------------------------------------------------------------
+
+    def _submit_chunk(self, X: np.ndarray, timeout: float = None) -> Future:
+        try:
+            slot = self._free_slots.get(timeout=timeout)  # bloque si l'anneau est plein (contre-pression)
+        except queue.Empty:
+            raise TimeoutError(f"Aucun slot d'inférence libre après {timeout}s") from None
+        future = Future()
+        self._inputs[slot, :len(X)] = X
+        with self._lock:
+            index = min(range(self.n_workers), key=self._in_flight.__getitem__)
+            self._in_flight[index] += 1
+            self._tickets += 1
+            self._pending[slot] = (future, len(X), index, self._tickets)
+            self._tasks[index].put((slot, len(X), self._tickets))
+        return future
+
+    def submit(self, X: np.ndarray, timeout: float = None) -> Future:
+        """Soumet une matrice float32 déjà encodée ; le Future reçoit les probabilités de défaut
+        (WorkerDiedError si le worker qui la score s'arrête). timeout borne l'attente de slots libres
+        pour l'ensemble du lot, pas pour chaque morceau."""
+        if len(X) == 0:
+            future = Future()
+            future.set_result(np.empty(0, dtype=np.float64))
+            return future
+        if len(X) <= self.rows_per_slot:
+            return self._submit_chunk(X, timeout)
+        # Lots plus grands qu'un slot : découpés et répartis sur plusieurs workers, sous une seule échéance
+        deadline = None if timeout is None else time.monotonic() + timeout
+        chunks = [self._submit_chunk(X[i:i + self.rows_per_slot],
+                                     None if deadline is None else max(deadline - time.monotonic(), 0.0))
+                  for i in range(0, len(X), self.rows_per_slot)]
+        future = Future()
+
+        def gather(_):
+            if all(c.done() for c in chunks) and not future.done():
+                errors = [c.exception() for c in chunks if c.exception() is not None]
+                if errors:
+                    future.set_exception(errors[0])
+                else:
+                    future.set_result(np.concatenate([c.result() for c in chunks]))
+
+        for chunk in chunks:
+            chunk.add_done_callback(gather)
+        return future
+
+    def predict_proba(self, X: np.ndarray, timeout: float = None) -> np.ndarray:
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        future = self.submit(X, timeout)
+        return future.result(timeout=max(deadline - time.monotonic(), 0.0))
+
+    # ------------------------------------------------------------------
+
+    def _collect(self):
+        while True:
+            try:
+                slot, ticket, error = self._results.get(timeout=LIVENESS_INTERVAL_S)
+            except queue.Empty:
+                slot = ticket = None
+            if time.monotonic() - self._last_check >= LIVENESS_INTERVAL_S:
+                self._check_workers()
+            if slot is None:
+                if self._closed:
+                    return
+                continue
+            if slot == "ready":
+                continue  # worker redémarré
+            with self._lock:
+                entry = self._pending.get(slot)
+                if entry is None or entry[3] != ticket:
+                    continue  # slot rendu à la mort de son worker (et peut-être déjà réattribué)
+                del self._pending[slot]
+                self._in_flight[entry[2]] -= 1
+            future, n_rows = entry[:2]
+            if error is None:
+                result = self._outputs[slot, :n_rows].copy()
+            self._free_slots.put(slot)
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(error))
+
+    def _check_workers(self):
+        """Fait échouer les requêtes d'un worker arrêté, rend ses slots et le redémarre."""
+        self._last_check = time.monotonic()
+        for index, worker in enumerate(self._workers):
+            if worker.is_alive() or self._closed:
+                continue
+            with self._lock:
+                lost = [(slot, entry[0]) for slot, entry in self._pending.items() if entry[2] == index]
+                for slot, _ in lost:
+                    del self._pending[slot]
+                self._in_flight[index] = 0
+                self._start_worker(index)
+                self.restarts += 1
+            for slot, future in lost:
+                self._free_slots.put(slot)
+                future.set_exception(WorkerDiedError(
+                    f"Worker d'inférence {index} arrêté (code {worker.exitcode}) pendant le scoring"))
+
+    def close(self):
+        self._closed = True
+        for tasks in self._tasks:
+            tasks.put(None)
+        for worker in self._workers:
+            worker.join(5)
+            if worker.is_alive():
+                worker.terminate()
+        self._results.put((None, None, None))
+        self._collector.join(5)
+        del self._inputs, self._outputs
+        self._shm_in.close()
+        self._shm_in.unlink()
+        self._shm_out.close()
+        self._shm_out.unlink()
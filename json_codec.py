@@ -0,0 +1,79 @@
+"""
+Encodage et décodage JSON rapides (orjson si installé, sinon module json standard).
+
+Utilisé sur le chemin de chaque requête :
+- lecture du corps des requêtes (FastJSONRoute) : orjson.loads ; en cas d'erreur, le corps est
+  relu par json.loads pour produire exactement la même erreur 422 qu'auparavant ;
+- réponses (FastJSONResponse) et logs structurés (dumps) : orjson.dumps ;
+- clé du cache de prédiction (dumps_bytes).
+
+orjson écrit les flottants au format le plus court (1e-5 au lieu de 1e-05) et NaN en null ;
+les types numpy et les Enum sont sérialisés directement, le reste via str().
+"""
+
+import json
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+if HAS_ORJSON:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj) -> bytes:
+        return orjson.dumps(obj, default=str, option=_OPTIONS)
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj, default=str, option=_OPTIONS).decode("utf-8")
+
+    def loads(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # NaN, grands entiers... : même résultat (ou même erreur) que le module standard
+            return json.loads(data)
+else:
+    def dumps_bytes(obj) -> bytes:
+        return dumps(obj).encode("utf-8")
+
+    def dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+
+    loads = json.loads
+
+
+class FastJSONResponse(JSONResponse):
+    """Réponse JSON sérialisée par orjson (module standard à défaut)."""
+
+    def render(self, content) -> bytes:
+        if HAS_ORJSON:
+            return orjson.dumps(content, option=_OPTIONS)
+        return super().render(content)
+
+
+class FastJSONRequest(Request):
+    """Requête dont le corps JSON est décodé par json_codec.loads."""
+
+    async def json(self):
+        if not hasattr(self, "_json"):
+            self._json = loads(await self.body())
+        return self._json
+
+
+class FastJSONRoute(APIRoute):
+    """Route FastAPI qui passe une FastJSONRequest à l'endpoint (validation inchangée)."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            return await handler(FastJSONRequest(request.scope, request.receive))
+
+        return route_handler
@@ -0,0 +1,385 @@
+"""
+Générateur de charge asyncio pour l'API (à lancer contre une instance démarrée).
+
+Deux modes :
+- boucle ouverte (--rates) : les requêtes partent à des instants planifiés (débit fixe, ou
+  arrivées de Poisson avec --poisson), qu'elles aient reçu une réponse ou non. La latence
+  est mesurée depuis l'instant planifié : un blocage du serveur retarde toutes les requêtes
+  qui auraient dû partir pendant ce temps, et apparaît donc dans les percentiles (pas
+  d'omission coordonnée). Le temps de service (depuis l'envoi effectif) est aussi relevé.
+- boucle fermée (--concurrency) : N clients enchaînent les requêtes sans pause.
+
+Chaque palier produit un histogramme des latences (percentiles à 1 % près), le débit obtenu
+et les taux d'erreur par cause ; les paliers successifs forment la courbe de saturation
+(latence en fonction du débit), écrite dans performance_results/load_test.json et .md.
+
+Usage :
+    uvicorn API_Fastapi:app --port 7860 &
+    python load_generator.py --rates 5,10,20,50 --duration 10
+    python load_generator.py --concurrency 1,4,16 --route /predict/batch --batch-size 100
+    python load_generator.py --payloads synthetic --rates 20 --poisson
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+from pathlib import Path
+
+import httpx
+
+from benchmark_suite import environment
+from sample_data import load_samples
+
+RESULTS_DIR = "performance_results"
+DEFAULT_OUTPUT = str(Path(RESULTS_DIR) / "load_test")
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+# Ratios recalculés par le générateur synthétique (mêmes définitions que les données d'entraînement)
+DERIVED_FIELDS = {
+    "CREDIT_INCOME_PERCENT": ("AMT_CREDIT", "AMT_INCOME_TOTAL"),
+    "ANNUITY_INCOME_PERCENT": ("AMT_ANNUITY", "AMT_INCOME_TOTAL"),
+    "CREDIT_TERM": ("AMT_ANNUITY", "AMT_CREDIT"),
+    "DAYS_EMPLOYED_PERCENT": ("DAYS_EMPLOYED", "DAYS_BIRTH"),
+}
+
+
+# ============================================================
+# Données envoyées
+# ============================================================
+
+class SamplePayloads:
+    """Rejoue les clients de data/samples.json à tour de rôle."""
+
+    def __init__(self, samples: list = None):
+        self.samples = samples or load_samples()
+        self._next = 0
+
+    def next(self) -> dict:
+        payload = self.samples[self._next % len(self.samples)]
+        self._next += 1
+        return payload
+
+
+class SyntheticPayloads(SamplePayloads):
+    """Clients synthétiques : chaque champ vient d'un exemple tiré au hasard, les montants et
+    durées sont perturbés (bruit multiplicatif, signe conservé) et les ratios recalculés.
+    Les clients sont tous différents : le cache de prédictions ne les sert pas."""
+
+    def __init__(self, samples: list = None, noise: float = 0.2, seed: int = 0):
+        super().__init__(samples)
+        self.noise = noise
+        self.rng = random.Random(seed)
+
+    def next(self) -> dict:
+        payload = {}
+        for field in self.samples[0]:
+            value = self.rng.choice(self.samples)[field]
+            if isinstance(value, float):
+                # Les valeurs entières écrites en float (DAYS_REGISTRATION: -2322.0) restent entières
+                noisy = value * math.exp(self.rng.gauss(0, self.noise))
+                value = float(round(noisy)) if value.is_integer() else noisy
+            elif isinstance(value, int) and field.startswith("DAYS_"):
+                value = int(value * math.exp(self.rng.gauss(0, self.noise)))
+            payload[field] = value
+        for field, (numerator, denominator) in DERIVED_FIELDS.items():
+            if field in payload and payload.get(denominator):
+                payload[field] = payload[numerator] / payload[denominator]
+        return payload
+
+
+def build_body(payloads, route: str, batch_size: int):
+    if route.rstrip("/").endswith("/batch"):
+        return [payloads.next() for _ in range(batch_size)]
+    return payloads.next()
+
+
+# ============================================================
+# Mesures
+# ============================================================
+
+class LatencyHistogram:
+    """Histogramme à classes géométriques : chaque percentile est exact à `precision` près,
+    en mémoire constante quel que soit le nombre de requêtes."""
+
+    def __init__(self, precision: float = 0.01, min_ms: float = 0.01):
+        self.precision = precision
+        self.min_ms = min_ms
+        self._log_base = math.log1p(precision)
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, ms: float):
+        index = int(math.log(max(ms, self.min_ms) / self.min_ms) / self._log_base)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def _upper(self, index: int) -> float:
+        return self.min_ms * (1 + self.precision) ** (index + 1)
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return None
+        rank = math.ceil(q / 100 * self.count)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper(index), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        result = {"count": self.count, "mean_ms": self.total / self.count, "max_ms": self.max}
+        for q in PERCENTILES:
+            result[f"p{q:g}_ms"] = self.percentile(q)
+        return result
+
+    def buckets(self) -> list:
+        """[(borne supérieure en ms, effectif)] des classes non vides."""
+        return [(round(self._upper(i), 4), self.counts[i]) for i in sorted(self.counts)]
+
+
+class StepResult:
+    """Résultats d'un palier de charge."""
+
+    def __init__(self, route: str, mode: str, level: float, rows_per_request: int):
+        self.route = route
+        self.mode = mode
+        self.level = level
+        self.rows_per_request = rows_per_request
+        self.latency = LatencyHistogram()
+        self.service = LatencyHistogram()
+        self.status_codes = {}
+        self.errors = {}
+        self.ok = 0
+        self.scheduled = 0
+        self.max_send_lag_ms = 0.0
+        self.elapsed = 0.0
+
+    def record(self, status, latency_ms: float, service_ms: float):
+        key = str(status)
+        if isinstance(status, int):
+            self.status_codes[key] = self.status_codes.get(key, 0) + 1
+        if isinstance(status, int) and status < 400:
+            self.ok += 1
+        else:
+            self.errors[key] = self.errors.get(key, 0) + 1
+        if latency_ms is not None:
+            self.latency.record(latency_ms)
+            self.service.record(service_ms)
+
+    @property
+    def completed(self) -> int:
+        return self.latency.count
+
+    def summary(self) -> dict:
+        ok = self.ok
+        attempted = self.scheduled or self.completed
+        error_count = sum(self.errors.values())
+        return {
+            "route": self.route,
+            "mode": self.mode,
+            "target_rps" if self.mode == "open" else "concurrency": self.level,
+            "rows_per_request": self.rows_per_request,
+            "duration_s": round(self.elapsed, 3),
+            "scheduled": self.scheduled,
+            "completed": self.completed,
+            "ok": ok,
+            "achieved_rps": ok / self.elapsed if self.elapsed else 0.0,
+            "rows_per_s": ok * self.rows_per_request / self.elapsed if self.elapsed else 0.0,
+            "error_rate": error_count / attempted if attempted else 0.0,
+            "errors": self.errors,
+            "status_codes": self.status_codes,
+            "max_send_lag_ms": round(self.max_send_lag_ms, 3),
+            "latency": self.latency.summary(),
+            "service_time": self.service.summary(),
+            "latency_histogram": self.latency.buckets(),
+        }
+
+
+# ============================================================
+# Génération de charge
+# ============================================================
+
+async def _send(client: httpx.AsyncClient, route: str, body, intended: float, result: StepResult, timeout: float):
+    loop = asyncio.get_running_loop()
+    sent = loop.time()
+    try:
+        response = await client.post(route, json=body, timeout=timeout)
+        status = response.status_code
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    done = loop.time()
+    result.record(status, (done - intended) * 1000, (done - sent) * 1000)
+
+
+async def run_open_loop(client: httpx.AsyncClient, route: str, payloads, rate: float, duration: float,
+                        batch_size: int = 100, poisson: bool = False, max_in_flight: int = 1000,
+                        timeout: float = 30.0, seed: int = 0) -> StepResult:
+    """Envoie rate requêtes/s pendant duration secondes, sans attendre les réponses."""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    rows = batch_size if route.rstrip("/").endswith("/batch") else 1
+    result = StepResult(route, "open", rate, rows)
+    in_flight = set()
+    start = loop.time()
+    offset = 0.0
+    while offset < duration:
+        intended = start + offset
+        delay = intended - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        result.max_send_lag_ms = max(result.max_send_lag_ms, (loop.time() - intended) * 1000)
+        result.scheduled += 1
+        if len(in_flight) >= max_in_flight:
+            # Le générateur lui-même sature : compté comme erreur plutôt que d'attendre
+            result.record("client_saturated", None, None)
+        else:
+            task = asyncio.create_task(_send(client, route, build_body(payloads, route, batch_size), intended,
+                                             result, timeout))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        offset += rng.expovariate(rate) if poisson else 1 / rate
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    result.elapsed = loop.time() - start
+    return result
+
+
+async def run_closed_loop(client: httpx.AsyncClient, route: str, payloads, concurrency: int, duration: float,
+                          batch_size: int = 100, timeout: float = 30.0) -> StepResult:
+    """concurrency clients enchaînent les requêtes pendant duration secondes."""
+    loop = asyncio.get_running_loop()
+    rows = batch_size if route.rstrip("/").endswith("/batch") else 1
+    result = StepResult(route, "closed", concurrency, rows)
+    start = loop.time()
+    deadline = start + duration
+
+    async def worker():
+        while loop.time() < deadline:
+            result.scheduled += 1
+            await _send(client, route, build_body(payloads, route, batch_size), loop.time(), result, timeout)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = loop.time() - start
+    return result
+
+
+# ============================================================
+# Courbe de saturation et rapport
+# ============================================================
+
+def saturation_curve(steps: list) -> list:
+    return [{
+        "level": s["target_rps"] if s["mode"] == "open" else s["concurrency"],
+        "achieved_rps": round(s["achieved_rps"], 2),
+        "p50_ms": s["latency"].get("p50_ms"),
+        "p99_ms": s["latency"].get("p99_ms"),
+        "error_rate": round(s["error_rate"], 4),
+    } for s in steps]
+
+
+def max_sustainable(steps: list, slo_p99_ms: float, max_error_rate: float = 0.01) -> float:
+    """Plus haut palier tenu : débit atteint à 90 % (boucle ouverte), p99 et erreurs sous les seuils."""
+    best = None
+    for s in steps:
+        p99 = s["latency"].get("p99_ms")
+        keeps_up = s["mode"] != "open" or s["achieved_rps"] >= 0.9 * s["target_rps"]
+        if not keeps_up or p99 is None or p99 > slo_p99_ms or s["error_rate"] > max_error_rate:
+            break
+        best = round(s["achieved_rps"], 2)
+    return best
+
+
+def markdown_report(report: dict) -> str:
+    lines = [f"# Test de charge — {report['url']}", "",
+             f"Mode : {report['mode']}, {report['duration_s']} s par palier, données : {report['payloads']}, "
+             f"SLO p99 : {report['slo_p99_ms']} ms", ""]
+    for route, section in report["routes"].items():
+        level = "RPS visé" if report["mode"] == "open" else "Concurrence"
+        lines += [f"## {route}", "", f"Débit max. tenu : {section['max_sustainable_rps']} req/s", "",
+                  f"| {level} | RPS obtenu | p50 (ms) | p99 (ms) | Erreurs |", "|---|---|---|---|---|"]
+        for point in section["saturation_curve"]:
+            p50, p99 = (f"{v:.1f}" if v is not None else "-" for v in (point["p50_ms"], point["p99_ms"]))
+            lines.append(f"| {point['level']:g} | {point['achieved_rps']:.1f} | {p50} | {p99} | {point['error_rate']:.2%} |")
+        lines.append("")
+    return "\n".join(lines)
+
+
+async def run_load_test(url: str, routes: list, mode: str, levels: list, duration: float, payloads,
+                        batch_size: int = 100, poisson: bool = False, slo_p99_ms: float = 200.0,
+                        timeout: float = 30.0, transport=None) -> dict:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    report = {"url": url, "mode": mode, "duration_s": duration, "batch_size": batch_size, "poisson": poisson,
+              "payloads": type(payloads).__name__, "slo_p99_ms": slo_p99_ms, "routes": {}}
+    async with httpx.AsyncClient(base_url=url, limits=limits, transport=transport) as client:
+        for route in routes:
+            steps = []
+            for level in levels:
+                if mode == "open":
+                    step = await run_open_loop(client, route, payloads, level, duration, batch_size, poisson,
+                                               timeout=timeout)
+                else:
+                    step = await run_closed_loop(client, route, payloads, int(level), duration, batch_size, timeout)
+                steps.append(step.summary())
+                latency = steps[-1]["latency"]
+                print(f"{route:<16} {mode} {level:>8g}  {steps[-1]['achieved_rps']:8.1f} req/s  "
+                      f"p50 {latency.get('p50_ms') or 0:8.1f} ms  p99 {latency.get('p99_ms') or 0:8.1f} ms  "
+                      f"erreurs {steps[-1]['error_rate']:.2%}")
+            report["routes"][route] = {
+                "steps": steps,
+                "saturation_curve": saturation_curve(steps),
+                "max_sustainable_rps": max_sustainable(steps, slo_p99_ms),
+            }
+    return report
+
+
+def write_report(report: dict, output: str = DEFAULT_OUTPUT) -> tuple:
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    json_path, md_path = f"{output}.json", f"{output}.md"
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    with open(md_path, "w", encoding="utf-8") as f:
+        f.write(markdown_report(report))
+    return json_path, md_path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Générateur de charge pour l'API de prédiction")
+    parser.add_argument("--url", default="http://127.0.0.1:7860")
+    parser.add_argument("--route", action="append", help="route testée, répétable (défaut : /predict)")
+    levels = parser.add_mutually_exclusive_group()
+    levels.add_argument("--rates", help="paliers de débit en req/s, ex. 5,10,20 (boucle ouverte, défaut)")
+    levels.add_argument("--concurrency", help="paliers de concurrence, ex. 1,4,16 (boucle fermée)")
+    parser.add_argument("--duration", type=float, default=10.0, help="durée de chaque palier (s)")
+    parser.add_argument("--batch-size", type=int, default=100, help="clients par requête sur les routes /batch")
+    parser.add_argument("--payloads", choices=("samples", "synthetic"), default="samples")
+    parser.add_argument("--poisson", action="store_true", help="arrivées de Poisson au lieu d'un débit régulier")
+    parser.add_argument("--slo-p99", type=float, default=200.0, help="p99 maximal (ms) pour le débit max. tenu")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="préfixe des fichiers .json et .md")
+    args = parser.parse_args(argv)
+
+    mode = "closed" if args.concurrency else "open"
+    levels = [float(v) for v in (args.concurrency or args.rates or "5,10,20,50").split(",")]
+    payloads = SyntheticPayloads() if args.payloads == "synthetic" else SamplePayloads()
+    report = asyncio.run(run_load_test(args.url, args.route or ["/predict"], mode, levels, args.duration, payloads,
+                                       args.batch_size, args.poisson, args.slo_p99, args.timeout))
+    report["environment"] = environment()
+    for path in write_report(report, args.output):
+        print(f"Rapport écrit : {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+Lecture des logs de l'API à mémoire constante.
+
+Le fichier courant (logs/api_logger.log) et ses sauvegardes du RotatingFileHandler
+(api_logger.log.1 ... .N, de la plus récente à la plus ancienne) sont lus par blocs,
+sans jamais charger un fichier entier en mémoire :
+- stream_file()  : contenu brut d'un fichier par morceaux,
+- read_page()    : page de lignes filtrées à partir d'un curseur (inode:offset), qui
+                   traverse les fichiers sauvegardés dans l'ordre chronologique,
+- tail()         : N dernières lignes filtrées, en lisant les fichiers à rebours,
+- IncrementalLogReader : table des entrées structurées mise à jour avec les seules
+                   nouvelles lignes (dashboard Streamlit).
+"""
+
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+import json_codec
+
+CHUNK_SIZE = 64 * 1024
+LINE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+INCREMENTAL_MAX_ROWS = 50_000  # entrées gardées par événement dans IncrementalLogReader
+
+
+# ============================================================
+# Analyse d'une ligne
+# ============================================================
+
+def parse_line(line: str):
+    """Découpe une ligne 'asctime - LEVEL - message' ; retourne (asctime, level, message) ou None."""
+    parts = line.rstrip("\n").split(" - ", 2)
+    if len(parts) != 3:
+        return None
+    return parts[0], parts[1], parts[2]
+
+
+def parse_entry(line: str):
+    """Entrée structurée (dict JSON) d'une ligne de log, ou None pour les messages texte."""
+    parsed = parse_line(line)
+    if parsed is None or not parsed[2].startswith("{"):
+        return None
+    try:
+        entry = json_codec.loads(parsed[2])
+    except ValueError:
+        return None
+    return entry if isinstance(entry, dict) else None
+
+
+def _line_time(value: datetime):
+    """Borne au format de asctime (heure locale du serveur) ; une date avec fuseau y est convertie."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.strftime(LINE_TIME_FORMAT)
+
+
+class LogFilter:
+    """Filtre de lignes : événement, request_id (entrées structurées) et intervalle de temps (heure de la ligne)."""
+
+    def __init__(self, event: str = None, request_id: str = None, since: datetime = None, until: datetime = None):
+        self.event = event
+        self.request_id = request_id
+        self.since = _line_time(since)
+        self.until = _line_time(until)
+
+    @property
+    def active(self) -> bool:
+        return any(v is not None for v in (self.event, self.request_id, self.since, self.until))
+
+    def match(self, line: str) -> bool:
+        # Pré-filtres textuels avant le décodage JSON
+        if self.request_id is not None and self.request_id not in line:
+            return False
+        if self.event is not None and self.event not in line:
+            return False
+        if self.since is not None or self.until is not None:
+            # asctime ('YYYY-MM-DD HH:MM:SS,mmm') se compare directement comme une chaîne
+            stamp = line[:19]
+            if len(stamp) < 19 or not stamp[:4].isdigit():
+                return False
+            if self.since is not None and stamp < self.since:
+                return False
+            if self.until is not None and stamp > self.until:
+                return False
+        if self.event is not None or self.request_id is not None:
+            entry = parse_entry(line)
+            if entry is None:
+                return False
+            if self.event is not None and entry.get("event") != self.event:
+                return False
+            if self.request_id is not None and entry.get("request_id") != self.request_id:
+                return False
+        return True
+
+
+# ============================================================
+# Fichiers et curseurs
+# ============================================================
+
+def log_files(path: str, backup_count: int = 5) -> list:
+    """Fichiers existants, du plus ancien (api_logger.log.N) au plus récent (api_logger.log)."""
+    candidates = [f"{path}.{i}" for i in range(backup_count, 0, -1)] + [path]
+    return [p for p in candidates if os.path.exists(p)]
+
+
+def encode_cursor(inode: int, offset: int) -> str:
+    return f"{inode}:{offset}"
+
+
+def decode_cursor(cursor: str):
+    try:
+        inode, offset = cursor.split(":")
+        return int(inode), int(offset)
+    except ValueError:
+        raise ValueError(f"Curseur invalide : {cursor}")
+
+
+def stream_file(path: str, chunk_size: int = CHUNK_SIZE):
+    """Contenu brut d'un fichier, morceau par morceau."""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def read_page(path: str, cursor: str = None, limit: int = 1000, flt: LogFilter = None, backup_count: int = 5):
+    """Lit au plus `limit` lignes filtrées à partir du curseur.
+
+    Sans curseur, la lecture commence au début du plus ancien fichier disponible.
+    Retourne (lignes, curseur suivant) ; le curseur suivant pointe juste après la
+    dernière ligne complète lue (éventuellement dans un fichier plus récent).
+    """
+    flt = flt or LogFilter()
+    files = [(p, os.stat(p).st_ino) for p in log_files(path, backup_count)]
+    if not files:
+        return [], cursor
+
+    start_index, offset = 0, 0
+    if cursor is not None:
+        inode, offset = decode_cursor(cursor)
+        matches = [i for i, (_, ino) in enumerate(files) if ino == inode]
+        if matches:
+            start_index = matches[0]
+        else:
+            offset = 0  # fichier sorti de la rotation : reprise au plus ancien disponible
+
+    lines = []
+    next_cursor = encode_cursor(files[start_index][1], offset)
+    for index in range(start_index, len(files)):
+        file_path, inode = files[index]
+        position = offset if index == start_index else 0
+        with open(file_path, "rb") as f:
+            f.seek(position)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # ligne en cours d'écriture : relue au prochain appel
+                position += len(raw)
+                line = raw.decode("utf-8", errors="replace")
+                if flt.match(line):
+                    lines.append(line)
+                if len(lines) >= limit:
+                    return lines, encode_cursor(inode, position)
+        next_cursor = encode_cursor(inode, position)
+    return lines, next_cursor
+
+
+def _reverse_lines(path: str, chunk_size: int = CHUNK_SIZE):
+    """Lignes d'un fichier de la dernière à la première, en lisant des blocs depuis la fin."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+        while position > 0:
+            size = min(chunk_size, position)
+            position -= size
+            f.seek(position)
+            parts = (f.read(size) + remainder).split(b"\n")
+            remainder = parts[0]
+            for raw in reversed(parts[1:]):
+                if raw:
+                    yield raw
+        if remainder:
+            yield remainder
+
+
+def tail(path: str, n: int, flt: LogFilter = None, backup_count: int = 5) -> list:
+    """N dernières lignes filtrées (ordre chronologique), en remontant dans les sauvegardes si besoin."""
+    flt = flt or LogFilter()
+    lines = []
+    for file_path in reversed(log_files(path, backup_count)):
+        for raw in _reverse_lines(file_path):
+            line = raw.decode("utf-8", errors="replace") + "\n"
+            if flt.match(line):
+                lines.append(line)
+                if len(lines) >= n:
+                    return lines[::-1]
+    return lines[::-1]
+
+
+# ============================================================
+# Lecture incrémentale (dashboard)
+# ============================================================
+
+class IncrementalLogReader:
+    """Lecteur incrémental des entrées structurées du log, pour le dashboard Streamlit.
+
+    Le lecteur mémorise l'inode et l'offset du dernier octet lu : chaque refresh() ne
+    décode que les lignes ajoutées depuis l'appel précédent. Après une rotation du
+    RotatingFileHandler, la fin de l'ancien fichier (devenu api_logger.log.1, ...) est
+    lue avant le nouveau fichier. Les entrées sont rangées par événement dans une
+    table partagée entre les onglets et les reruns, limitée aux max_rows entrées les plus
+    récentes de chaque événement (la mémoire du cache Streamlit ne croît pas avec l'historique).
+    """
+
+    def __init__(self, path: str, backup_count: int = 5, max_rows: int = INCREMENTAL_MAX_ROWS):
+        self.path = path
+        self.backup_count = backup_count
+        self.max_rows = max_rows
+        self.inode = None
+        self.offset = 0
+        self._chunks = {}   # événement -> liste de DataFrames ajoutés
+        self._rows = {}     # événement -> nombre d'entrées gardées
+        self._frames = {}   # événement -> DataFrame concaténé (cache)
+        self._lock = threading.Lock()
+
+    def _pending_files(self, files: list) -> list:
+        """(chemin, inode, offset de départ) des fichiers à lire depuis la dernière position."""
+        if self.inode is not None:
+            for index, (path, inode) in enumerate(files):
+                if inode == self.inode:
+                    offset = self.offset if os.path.getsize(path) >= self.offset else 0  # fichier tronqué
+                    return [(path, inode, offset)] + [(p, i, 0) for p, i in files[index + 1:]]
+        # Premier appel, ou fichier sorti de la rotation : lecture de tout ce qui est disponible
+        return [(p, i, 0) for p, i in files]
+
+    def refresh(self) -> int:
+        """Lit les nouvelles lignes complètes ; retourne le nombre d'entrées structurées ajoutées."""
+        with self._lock:
+            files = [(p, os.stat(p).st_ino) for p in log_files(self.path, self.backup_count)]
+            entries = []
+            for path, inode, offset in self._pending_files(files):
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    for raw in f:
+                        if not raw.endswith(b"\n"):
+                            break  # ligne en cours d'écriture : relue au prochain refresh
+                        offset += len(raw)
+                        entry = parse_entry(raw.decode("utf-8", errors="replace"))
+                        if entry is not None:
+                            entries.append(entry)
+                self.inode, self.offset = inode, offset
+            self._append(entries)
+            return len(entries)
+
+    def _append(self, entries: list):
+        by_event = {}
+        for entry in entries:
+            by_event.setdefault(entry.get("event"), []).append(entry)
+        for event, rows in by_event.items():
+            chunks = self._chunks.setdefault(event, [])
+            chunks.append(pd.DataFrame(rows))
+            self._rows[event] = self._rows.get(event, 0) + len(rows)
+            if self.max_rows and self._rows[event] > self.max_rows:
+                # Fenêtre bornée : les entrées les plus anciennes sont oubliées
+                chunks[:] = [pd.concat(chunks, ignore_index=True).iloc[-self.max_rows:].reset_index(drop=True)]
+                self._rows[event] = len(chunks[0])
+            self._frames.pop(event, None)
+
+    def frame(self, event: str) -> pd.DataFrame:
+        """Entrées d'un événement (DataFrame mis en cache jusqu'au prochain ajout)."""
+        with self._lock:
+            if event not in self._frames:
+                chunks = self._chunks.get(event, [])
+                if len(chunks) > 1:
+                    # Les morceaux sont fusionnés une fois : le prochain ajout ne concatène que deux tables
+                    chunks[:] = [pd.concat(chunks, ignore_index=True)]
+                self._frames[event] = chunks[0] if chunks else pd.DataFrame()
+            return self._frames[event]
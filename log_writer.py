@@ -0,0 +1,212 @@
+"""
+Écriture non bloquante des logs de l'API.
+
+Le logger "api_logger" ne fait plus d'E/S sur le chemin de la requête : chaque LogRecord
+est déposé tel quel dans une file bornée en mémoire. Un thread d'écriture dédié sérialise
+les entrées structurées (json_codec.dumps : orjson si installé), les formate et les écrit
+par lots dans le fichier tournant, avec un seul flush par lot.
+
+Quand la file est pleine, la politique configurée s'applique :
+- "drop"   : l'entrée est abandonnée (comptée dans "dropped"),
+- "block"  : l'appelant attend au plus block_timeout secondes (compté dans "delayed"),
+- "sample" : au-delà de 80 % de remplissage, seule une entrée sur sample_rate est gardée.
+Les entrées de niveau ERROR et plus ne sont jamais échantillonnées (politique "block").
+
+Le thread d'écriture ne s'arrête jamais sur une erreur : une entrée impossible à sérialiser
+est abandonnée (comptée dans "serialize_errors"), un lot dont l'écriture échoue (disque plein...)
+est compté dans "write_errors", et le thread passe au lot suivant.
+
+Des « sinks » peuvent être ajoutés (add_sink) : ils reçoivent, depuis le thread d'écriture,
+la liste des entrées structurées (dict) de chaque lot, avant leur sérialisation
+(ex. : l'event store binaire de event_store.py).
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from logging.handlers import RotatingFileHandler
+
+import json_codec
+
+POLICIES = ("drop", "block", "sample")
+
+
+class BatchingRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler capable d'écrire un lot d'entrées avec un seul flush."""
+
+    def emit_batch(self, records: list):
+        self.acquire()
+        try:
+            for record in records:
+                try:
+                    if self.shouldRollover(record):
+                        self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                    self.stream.write(self.format(record) + self.terminator)
+                except Exception:
+                    self.handleError(record)
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            self.release()
+
+
+class QueuedLogWriter(logging.Handler):
+    """Handler qui délègue l'écriture à un thread de fond via une file bornée."""
+
+    def __init__(self, target: BatchingRotatingFileHandler, maxsize: int = 10_000, policy: str = "drop",
+                 batch_size: int = 256, sample_rate: int = 10, block_timeout: float = 0.05):
+        super().__init__()
+        if policy not in POLICIES:
+            raise ValueError(f"Politique de file inconnue : {policy} (attendu : {', '.join(POLICIES)})")
+        self.target = target
+        self.policy = policy
+        self.batch_size = batch_size
+        self.sample_rate = max(1, sample_rate)
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._high_water = int(maxsize * 0.8)
+        self._sample_counter = 0
+        self._counters = {"enqueued": 0, "written": 0, "dropped": 0, "sampled_out": 0, "delayed": 0, "batches": 0,
+                          "sink_errors": 0, "serialize_errors": 0, "write_errors": 0}
+        self._counters_lock = threading.Lock()
+        self._sinks = []
+        self._thread = None
+        self.start()
+        atexit.register(self.stop)
+
+    def start(self):
+        """Démarre (ou redémarre après stop()) le thread d'écriture."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def add_sink(self, sink):
+        """Ajoute un consommateur appelé avec la liste des entrées structurées de chaque lot."""
+        self._sinks.append(sink)
+
+    def _count(self, name: str, n: int = 1):
+        with self._counters_lock:
+            self._counters[name] += n
+
+    # ------------------------------------------------------------------
+    # Côté requête : dépôt dans la file, sans formatage ni E/S
+    # ------------------------------------------------------------------
+
+    def handle(self, record: logging.LogRecord):
+        # Pas de verrou du handler : la file est déjà thread-safe
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record: logging.LogRecord):
+        policy = "block" if record.levelno >= logging.ERROR else self.policy
+
+        if policy == "sample" and self._queue.qsize() >= self._high_water:
+            self._sample_counter += 1
+            if self._sample_counter % self.sample_rate:
+                self._count("sampled_out")
+                return
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            if policy != "block":
+                self._count("dropped")
+                return
+            self._count("delayed")
+            try:
+                self._queue.put(record, timeout=self.block_timeout)
+            except queue.Full:
+                self._count("dropped")
+                return
+        self._count("enqueued")
+
+    # ------------------------------------------------------------------
+    # Thread d'écriture
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _serialize(record: logging.LogRecord):
+        """Les entrées structurées (dict) sont sérialisées en JSON dans le thread d'écriture."""
+        if isinstance(record.msg, dict):
+            record.msg = json_codec.dumps(record.msg)
+            record.args = None
+
+    def _dispatch(self, records: list):
+        entries = [r.msg for r in records if isinstance(r.msg, dict)]
+        if not entries:
+            return
+        for sink in self._sinks:
+            try:
+                sink(entries)
+            except Exception:
+                # Un sink défaillant ne doit jamais bloquer l'écriture du fichier de logs
+                self._count("sink_errors")
+
+    def _write(self, records: list):
+        self._dispatch(records)
+        serialized = []
+        for r in records:
+            try:
+                self._serialize(r)
+            except Exception:
+                self._count("serialize_errors")
+                continue
+            serialized.append(r)
+        if not serialized:
+            return
+        try:
+            self.target.emit_batch(serialized)
+        except Exception:
+            self._count("write_errors", len(serialized))
+            return
+        self._count("written", len(serialized))
+        self._count("batches")
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            try:
+                self._write([r for r in batch if r is not None])
+            finally:
+                # task_done même après une erreur : flush() ne doit jamais rester bloqué
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Attend que toutes les entrées déjà en file soient écrites."""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self):
+        """Vide la file puis arrête le thread d'écriture (appelé à l'arrêt de l'API)."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(10)
+        try:
+            self.target.flush()
+        except Exception:
+            self._count("write_errors")
+
+    def close(self):
+        self.stop()
+        self.target.close()
+        super().close()
+
+    def stats(self) -> dict:
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {"policy": self.policy, "queue_size": self._queue.qsize(), "queue_maxsize": self._queue.maxsize, **counters}
@@ -0,0 +1,481 @@
+"""
+Métriques en mémoire de l'API (histogrammes à seaux fixes).
+
+Histogram : histogramme simple, lu en JSON (statistiques du micro-batching).
+
+MetricsRegistry : familles de métriques exposées par /metrics au format texte Prometheus
+(compteurs et histogrammes étiquetés). Chaque série occupe une case float64 d'un tableau ;
+une mise à jour coûte une recherche dans un dict et une addition sous un verrou non contendu.
+Avec un répertoire partagé (METRICS_DIR), le tableau est un fichier mappé en mémoire par
+processus (metrics_<pid>.bin, séries listées dans metrics_<pid>.json) : la collecte somme
+les fichiers de tous les workers, sans passer par les logs. Les fichiers des workers arrêtés
+restent comptés (les compteurs du service ne diminuent pas quand un worker redémarre) : le
+répertoire est donc vidé par le processus maître avant le lancement des workers
+(python metrics.py, voir clear_directory), sans quoi le service redémarré additionne les
+valeurs de l'exécution précédente.
+
+HistogramFamily.observe_deferred dépose un dict de valeurs sans toucher aux seaux : les
+histogrammes du chemin de la requête (durées par étape) sont agrégés au moment de la collecte.
+"""
+
+import bisect
+import glob
+import json
+import mmap
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+import numpy as np
+
+DEFAULT_CAPACITY = 8192
+LATENCY_BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STAGE_BUCKETS_S = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+PROBABILITY_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Observations différées (observe_deferred) : agrégées à la collecte et par un thread toutes les
+# DEFERRED_INTERVAL_S secondes ; au-delà de DEFERRED_MAX dépôts en attente, les plus anciens sont perdus
+DEFERRED_MAX = 100_000
+DEFERRED_INTERVAL_S = 1.0
+
+
+class Histogram:
+    """Histogramme à seaux fixes (bornes supérieures incluses), thread-safe."""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(float(b) for b in buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # dernier seau : +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        """Comptes cumulés par borne supérieure, somme et nombre d'observations."""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, running = {}, 0
+        for bound, c in zip(self.buckets + [float("inf")], counts):
+            running += c
+            cumulative["+Inf" if bound == float("inf") else f"{bound:g}"] = running
+        return {"buckets": cumulative, "sum": total, "count": count}
+
+
+# ============================================================
+# Familles de métriques (format d'exposition Prometheus)
+# ============================================================
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values) -> str:
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+def _sample(name: str, *label_parts) -> str:
+    labels = ",".join(p for p in label_parts if p)
+    return f"{name}{{{labels}}}" if labels else name
+
+
+def _bound(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def clear_directory(directory: str) -> int:
+    """Supprime les fichiers de métriques d'un répertoire partagé ; retourne le nombre de fichiers.
+
+    À appeler avant le démarrage des workers (aucun ne doit encore écrire dans le répertoire)."""
+    removed = 0
+    for path in glob.glob(os.path.join(directory, "metrics_*")):
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+class _Values:
+    """Cases float64 des séries du processus : en mémoire, ou fichier mappé dans un répertoire partagé."""
+
+    def __init__(self, directory: str = None, capacity: int = DEFAULT_CAPACITY):
+        self.directory = directory
+        self.capacity = capacity
+        self.keys = []  # clé de série par case
+        self.overflow = 0
+        size = capacity * 8
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            base = os.path.join(directory, f"metrics_{os.getpid()}")
+            self.data_path, self.index_path = base + ".bin", base + ".json"
+            with open(self.data_path, "wb") as f:
+                f.truncate(size)
+            with open(self.data_path, "r+b") as f:
+                self._buffer = mmap.mmap(f.fileno(), size)
+        else:
+            self._buffer = bytearray(size)
+        self.view = memoryview(self._buffer).cast("d")
+
+    def allocate(self, keys: list) -> int:
+        """Réserve des cases contiguës pour de nouvelles séries ; None si la capacité est atteinte."""
+        start = len(self.keys)
+        if start + len(keys) > self.capacity:
+            self.overflow += len(keys)
+            return None
+        self.keys.extend(keys)
+        if self.directory:
+            tmp = self.index_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.keys, f, ensure_ascii=False)
+            os.replace(tmp, self.index_path)
+        return start
+
+
+class _Family:
+    kind = None
+    suffix = ""
+
+    def __init__(self, registry, name: str, documentation: str, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._slots = {}  # valeurs d'étiquettes -> première case
+
+    def _slot(self, labelvalues: tuple):
+        slot = self._slots.get(labelvalues)
+        if slot is None:
+            with self.registry._lock:
+                slot = self._slots.get(labelvalues)
+                if slot is None:
+                    slot = self.registry._values.allocate(self._series_keys(labelvalues))
+                    if slot is None:
+                        return None
+                    self._slots[labelvalues] = slot
+        return slot
+
+    def _reset(self):
+        self._slots = {}
+
+    def _drain(self):
+        """Agrège les observations différées (aucune pour un compteur)."""
+
+    @property
+    def exposed_name(self) -> str:
+        return self.name + self.suffix
+
+
+class CounterFamily(_Family):
+    """Compteur étiqueté : inc(montant, étiquette=valeur, ...)."""
+
+    kind = "counter"
+    suffix = "_total"
+
+    def _series_keys(self, labelvalues):
+        return [[self.exposed_name, _labels(self.labelnames, labelvalues), ""]]
+
+    def inc(self, amount: float = 1.0, **labels):
+        slot = self._slot(tuple(str(labels[n]) for n in self.labelnames))
+        if slot is None:
+            return
+        values = self.registry._values.view
+        with self.registry._lock:
+            values[slot] += amount
+
+    def _plan(self, positions: dict, missing: int):
+        entries = sorted((labels, pos) for (sample, labels, _), pos in positions.items() if sample == self.exposed_name)
+        return [_sample(self.exposed_name, labels) + " " for labels, _ in entries], [pos for _, pos in entries], 0
+
+
+class HistogramFamily(_Family):
+    """Histogramme étiqueté à seaux fixes : observe(valeur, ...) ou observe_many(tableau, ...)."""
+
+    kind = "histogram"
+
+    def __init__(self, registry, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS_S):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = [float(b) for b in sorted(buckets)]
+        self._edges = np.array(self.buckets)
+        self._deferred = deque(maxlen=DEFERRED_MAX)  # (étiquettes fixes, {dernière étiquette: valeur})
+
+    def _series_keys(self, labelvalues):
+        labels = _labels(self.labelnames, labelvalues)
+        keys = [[self.name + "_bucket", labels, _bound(b)] for b in self.buckets + [float("inf")]]
+        return keys + [[self.name + "_sum", labels, ""], [self.name + "_count", labels, ""]]
+
+    def observe(self, value: float, **labels):
+        slot = self._slot(tuple(str(labels[n]) for n in self.labelnames))
+        if slot is None:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        n = len(self.buckets) + 1
+        values = self.registry._values.view
+        with self.registry._lock:
+            values[slot + index] += 1
+            values[slot + n] += value
+            values[slot + n + 1] += 1
+
+    def observe_labelled(self, observations):
+        """Observations de plusieurs séries, [(valeurs d'étiquettes, valeur), ...], sous un seul verrou."""
+        for labelvalues, _ in observations:
+            if labelvalues not in self._slots:
+                self._slot(labelvalues)
+        slots, buckets, n = self._slots, self.buckets, len(self.buckets) + 1
+        values = self.registry._values.view
+        with self.registry._lock:
+            for labelvalues, value in observations:
+                slot = slots.get(labelvalues)
+                if slot is not None:
+                    values[slot + bisect.bisect_left(buckets, value)] += 1
+                    values[slot + n] += value
+                    values[slot + n + 1] += 1
+
+    def observe_deferred(self, prefix: tuple, values: dict):
+        """Dépose {valeur de la dernière étiquette: valeur} pour les étiquettes `prefix`, sans les agréger.
+
+        Chemin de la requête : un append (deque, thread-safe). Les seaux sont mis à jour à la collecte
+        (render, collect) et, hors requête, par le thread d'agrégation du registre : les fichiers
+        METRICS_DIR des workers qui ne reçoivent pas la collecte restent à jour."""
+        self._deferred.append((prefix, values))
+        if self.registry._drainer is None:
+            self.registry._start_drainer()
+
+    def _reset(self):
+        super()._reset()
+        self._deferred.clear()  # dépôts du processus parent : déjà comptés par lui
+
+    def _drain(self):
+        series = {}  # valeurs d'étiquettes -> valeurs observées
+        while True:
+            try:
+                prefix, values = self._deferred.popleft()
+            except IndexError:
+                break
+            for key, value in values.items():
+                labelvalues = prefix + (key,)
+                observed = series.get(labelvalues)
+                if observed is None:
+                    series[labelvalues] = [value]
+                else:
+                    observed.append(value)
+        for labelvalues, observed in series.items():
+            # Un passage vectorisé par série (comme observe_many)
+            self.observe_many(observed, **dict(zip(self.labelnames, labelvalues)))
+
+    def observe_many(self, observed, **labels):
+        """Observation vectorisée d'un lot de valeurs (un seul passage sous verrou)."""
+        observed = np.asarray(observed, dtype=np.float64).ravel()
+        if not len(observed):
+            return
+        slot = self._slot(tuple(str(labels[n]) for n in self.labelnames))
+        if slot is None:
+            return
+        counts = np.bincount(np.searchsorted(self._edges, observed, side="left"), minlength=len(self.buckets) + 1)
+        n = len(self.buckets) + 1
+        values = self.registry._values.view
+        total = float(observed.sum())
+        with self.registry._lock:
+            for index in np.flatnonzero(counts):
+                values[slot + int(index)] += float(counts[index])
+            values[slot + n] += total
+            values[slot + n + 1] += len(observed)
+
+    def _plan(self, positions: dict, missing: int):
+        samples = {self.name + "_bucket", self.name + "_sum", self.name + "_count"}
+        by_labels = {}
+        for (sample, labels, le), pos in positions.items():
+            if sample in samples:
+                by_labels.setdefault(labels, {})[(sample, le)] = pos
+        bounds = [_bound(b) for b in self.buckets + [float("inf")]]
+        prefixes, plan_positions = [], []
+        for labels, series in sorted(by_labels.items()):
+            for le in bounds:
+                prefixes.append(_sample(self.name + "_bucket", labels, 'le="' + le + '"') + " ")
+                plan_positions.append(series.get((self.name + "_bucket", le), missing))
+            for sample in (self.name + "_sum", self.name + "_count"):
+                prefixes.append(_sample(sample, labels) + " ")
+                plan_positions.append(series.get((sample, ""), missing))
+        # Largeur d'un groupe (seaux + somme + nombre) : les seaux sont cumulés au rendu
+        return prefixes, plan_positions, len(bounds) + 2
+
+
+class MetricsRegistry:
+    """Familles de métriques d'un processus, et rendu agrégé sur tous les workers (directory)."""
+
+    def __init__(self, directory: str = None, capacity: int = DEFAULT_CAPACITY):
+        self.directory = directory
+        self.capacity = capacity
+        self.families = {}
+        self._lock = threading.Lock()
+        self._values = _Values(directory, capacity)
+        self._index_cache = {}  # chemin d'index -> (mtime, clés)
+        self._render_lock = threading.Lock()
+        self._positions = {}  # clé de série -> position dans les valeurs agrégées
+        self._source_maps = {}  # processus -> positions de ses cases
+        self._plan = None
+        self._drainer = None
+        if hasattr(os, "register_at_fork"):
+            # Un worker issu d'un fork (gunicorn --preload) écrit dans son propre fichier
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._values = _Values(self.directory, self.capacity)
+        self._source_maps.pop("local", None)
+        self._drainer = None  # le thread d'agrégation n'existe pas dans l'enfant
+        for family in self.families.values():
+            family._reset()
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> CounterFamily:
+        return self._register(CounterFamily(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS_S) -> HistogramFamily:
+        return self._register(HistogramFamily(self, name, documentation, labelnames, buckets))
+
+    def _register(self, family):
+        if family.name in self.families:
+            raise ValueError(f"Métrique déjà déclarée : {family.name}")
+        self.families[family.name] = family
+        return family
+
+    # ------------------------------------------------------------------
+    # Collecte
+    # ------------------------------------------------------------------
+
+    def _read_index(self, path: str) -> list:
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return []
+        cached = self._index_cache.get(path)
+        if cached is None or cached[0] != mtime:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    cached = (mtime, json.load(f))
+            except (OSError, ValueError):
+                return cached[1] if cached else []
+            self._index_cache[path] = cached
+        return cached[1]
+
+    def _sources(self) -> list:
+        """(identifiant, clés, valeurs) de chaque processus : le processus courant, ou chaque fichier du répertoire."""
+        if not self.directory:
+            with self._lock:
+                n = len(self._values.keys)
+                values = np.array(self._values.view[:n])
+            return [("local", self._values.keys, values)]
+        sources = []
+        for index_path in glob.glob(os.path.join(self.directory, "metrics_*.json")):
+            keys = self._read_index(index_path)
+            try:
+                values = np.fromfile(index_path[:-5] + ".bin", dtype=np.float64, count=len(keys))
+            except (OSError, ValueError):
+                continue
+            sources.append((index_path, keys, values))
+        return sources
+
+    def _gather(self) -> np.ndarray:
+        """Valeurs sommées sur les processus, par position de série (dernière case : 0 pour les séries absentes)."""
+        sources = self._sources()
+        mapped = []
+        for source, keys, values in sources:
+            n = len(values)
+            cached = self._source_maps.get(source)
+            if cached is None or len(cached) < n:
+                # Les séries d'un processus ne font que s'ajouter : seules les nouvelles clés sont indexées
+                known = [] if cached is None else cached.tolist()
+                for key in keys[len(known):n]:
+                    known.append(self._positions.setdefault(tuple(key), len(self._positions)))
+                cached = np.array(known, dtype=np.intp)
+                self._source_maps[source] = cached
+            mapped.append((cached[:n], values))
+        totals = np.zeros(len(self._positions) + 1)
+        for positions, values in mapped:
+            totals[positions] += values
+        return totals
+
+    def _render_plan(self) -> list:
+        if self._plan is None or self._plan[0] != len(self._positions):
+            missing = len(self._positions)
+            families = []
+            for family in self.families.values():
+                header = (f"# HELP {family.exposed_name} {family.documentation}\n"
+                          f"# TYPE {family.exposed_name} {family.kind}")
+                prefixes, positions, width = family._plan(self._positions, missing)
+                families.append((header, prefixes, np.array(positions, dtype=np.intp), width))
+            self._plan = (missing, families)
+        return self._plan[1]
+
+    def _drain(self):
+        for family in list(self.families.values()):
+            family._drain()
+
+    def _start_drainer(self):
+        """Thread d'agrégation des observations différées (s'arrête avec le registre)."""
+        with self._lock:
+            if self._drainer is not None:
+                return
+            reference = weakref.ref(self)
+
+            def run():
+                while True:
+                    time.sleep(DEFERRED_INTERVAL_S)
+                    registry = reference()
+                    if registry is None:
+                        return
+                    registry._drain()
+                    del registry
+
+            self._drainer = threading.Thread(target=run, name="metrics-drain", daemon=True)
+            self._drainer.start()
+
+    def collect(self) -> dict:
+        """Valeur de chaque série (clé : (échantillon, étiquettes, le)), sommée sur les processus."""
+        self._drain()
+        with self._render_lock:
+            totals = self._gather()
+            return {key: float(totals[pos]) for key, pos in self._positions.items()}
+
+    def render(self) -> str:
+        """Texte au format d'exposition Prometheus (version 0.0.4).
+
+        Le plan de rendu (préfixes des lignes et positions des valeurs) n'est recalculé qu'à
+        l'apparition de nouvelles séries : une collecte ne fait que sommer et formater des nombres.
+        """
+        self._drain()
+        with self._render_lock:
+            totals = self._gather()
+            plan = self._render_plan()
+        lines = []
+        for header, prefixes, positions, width in plan:
+            lines.append(header)
+            values = totals[positions]
+            if width:
+                groups = values.reshape(-1, width)
+                groups[:, :width - 2] = np.cumsum(groups[:, :width - 2], axis=1)
+            lines.extend(map(str.__add__, prefixes, map(_number, values.tolist())))
+        return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Lancé par le processus maître, avant les workers : python metrics.py [répertoire]
+    directory = sys.argv[1] if len(sys.argv) > 1 else os.getenv("METRICS_DIR")
+    if directory:
+        print(f"Métriques de l'exécution précédente supprimées : {clear_directory(directory)} fichier(s)")
@@ -0,0 +1,145 @@
+"""
+Micro-batching dynamique des requêtes /predict concurrentes.
+
+Les requêtes unitaires sont placées dans une file ; un thread dédié les regroupe et
+exécute un seul appel vectorisé au modèle dès que la taille maximale du lot est atteinte
+ou que le plus ancien élément a attendu max_wait_ms. Chaque appelant récupère ensuite
+sa propre ligne via un Future. Un lot ne mélange pas les contextes de soumission (submit(item,
+contexte), par exemple le scoreur de la requête) : chaque lot est scoré par score_fn(liste, contexte).
+
+stop() ne bloque jamais sur la file : il lève un drapeau (Event) et réveille le thread par un
+put_nowait ; le thread s'arrête dès que la file est vide, après avoir traité les éléments restants.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import Histogram
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+QUEUE_WAIT_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100]
+
+
+class SchedulerOverloaded(Exception):
+    """La file d'attente du scheduler est pleine."""
+
+
+class MicroBatchScheduler:
+    """Regroupe les requêtes unitaires en lots scorés par score_fn(liste) -> (classes, probas).
+
+    Éléments soumis avec un contexte : score_fn(liste, contexte). batch_size_metric et
+    queue_wait_metric (HistogramFamily sans étiquette, attente en secondes) reçoivent les mêmes
+    observations que les histogrammes de stats()."""
+
+    def __init__(self, score_fn, max_batch_size: int = 64, max_wait_ms: float = 2.0, max_queue: int = 1024,
+                 batch_size_metric=None, queue_wait_metric=None):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.batch_size_histogram = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_histogram = Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self.batch_size_metric = batch_size_metric
+        self.queue_wait_metric = queue_wait_metric
+        self.rejected = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._running = True
+        self._stopping = threading.Event()
+        self._carry = None  # premier élément d'un autre contexte, tête du lot suivant
+        self._thread = threading.Thread(target=self._run, name="micro-batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, item, context=None) -> Future:
+        """Ajoute un élément à la file ; le Future reçoit (classe, probabilité).
+
+        Les éléments de contextes différents ne sont jamais scorés dans le même lot."""
+        if not self._running:
+            raise SchedulerOverloaded("Scheduler arrêté")
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter(), context))
+        except queue.Full:
+            self.rejected += 1
+            raise SchedulerOverloaded(f"File d'attente pleine ({self.max_queue} requêtes)")
+        return future
+
+    def stop(self, timeout: float = 5.0):
+        """Arrête le thread après avoir traité les éléments déjà en file."""
+        self._running = False
+        self._stopping.set()
+        try:
+            self._queue.put_nowait(None)  # réveil du thread s'il attend une file vide
+        except queue.Full:
+            pass  # file pleine : le thread est occupé et verra le drapeau une fois la file vidée
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            # Éléments déposés pendant l'arrêt (après la dernière vérification du thread)
+            while True:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is not None:
+                    entry[1].set_exception(SchedulerOverloaded("Scheduler arrêté"))
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize(),
+            "rejected": self.rejected,
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "queue_wait_ms": self.queue_wait_histogram.snapshot(),
+        }
+
+    # ------------------------------------------------------------------
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                break  # réveil de stop() : le lot en cours est traité, puis l'arrêt est vérifié
+            if entry[3] is not first[3]:
+                self._carry = entry  # autre contexte : tête du lot suivant
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            if self._carry is None and self._stopping.is_set() and self._queue.empty():
+                return
+            first, self._carry = self._carry, None
+            if first is None:
+                first = self._queue.get()
+            if first is None:
+                continue
+            batch = self._collect(first)
+            flushed_at = time.perf_counter()
+            waits = [flushed_at - enqueued_at for _, _, enqueued_at, _ in batch]
+            self.batch_size_histogram.observe(len(batch))
+            for wait in waits:
+                self.queue_wait_histogram.observe(wait * 1000)
+            if self.batch_size_metric is not None:
+                self.batch_size_metric.observe(len(batch))
+            if self.queue_wait_metric is not None:
+                self.queue_wait_metric.observe_many(waits)
+
+            items, context = [item for item, _, _, _ in batch], first[3]
+            try:
+                classes, proba = self.score_fn(items) if context is None else self.score_fn(items, context)
+            except Exception as e:
+                for _, future, _, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _, _), y, p in zip(batch, classes, proba):
+                future.set_result((y, p))
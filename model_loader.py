@@ -0,0 +1,137 @@
+"""
+Chargement du modèle : artefact mappé en mémoire et chargement différé au démarrage.
+
+- Artefact mappé (MODEL_MMAP=1) : model.mmap.joblib est une copie non compressée de
+  model.pkl produite par export_mmap_artifact() (python model_loader.py). Il est relu
+  avec joblib.load(mmap_mode="r") : les tableaux numpy du pipeline sont des pages en
+  lecture seule du fichier, partagées par tous les workers d'une même machine au lieu
+  d'être copiées dans chacun. Le booster XGBoost, lui, est toujours désérialisé par
+  worker (XGBoost reconstruit ses arbres dans sa propre mémoire) : la mémoire privée d'un
+  worker ne baisse pas, d'où MODEL_MMAP=0 par défaut dans l'API.
+- Chargement différé (MODEL_LOAD_MODE=startup) : l'import du module ne charge rien ;
+  le modèle est chargé dans un thread au démarrage de l'application. Pendant ce temps,
+  l'état est "loading" et les endpoints de prédiction répondent 503.
+- Backend numpy (SCORER_BACKEND=numpy) : si model.trees.npz et model.encoder.json existent
+  (python tree_evaluator.py), ils sont relus à la place de model.pkl (scoring.CompiledModel),
+  sans désérialiser le pipeline ni importer XGBoost.
+"""
+
+import os
+import threading
+import time
+
+import joblib
+
+from tree_evaluator import trees_artifact_path
+
+LOAD_MODES = ("eager", "startup")
+STATES = ("pending", "loading", "ready", "failed")
+
+
+def mmap_artifact_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".mmap.joblib"
+
+
+def export_mmap_artifact(model_path: str) -> str:
+    """Écrit l'artefact non compressé (mappable) à côté de model.pkl ; retourne son chemin."""
+    target = mmap_artifact_path(model_path)
+    tmp = target + ".tmp"
+    joblib.dump(joblib.load(model_path), tmp, compress=0)
+    os.replace(tmp, target)
+    return target
+
+
+def model_source(model_path: str, use_mmap: bool = True, backend: str = None) -> str:
+    """Fichier effectivement chargé : les arbres NumPy (backend "numpy"), sinon l'artefact mappé,
+    s'ils existent et ne sont pas plus anciens que model.pkl."""
+    if backend == "numpy":
+        from scoring import CompiledModel
+
+        if CompiledModel.available(model_path):
+            return trees_artifact_path(model_path)
+    mmap_path = mmap_artifact_path(model_path)
+    if use_mmap and os.path.exists(mmap_path) and os.path.getmtime(mmap_path) >= os.path.getmtime(model_path):
+        return mmap_path
+    return model_path
+
+
+def load_model(model_path: str, use_mmap: bool = True, backend: str = None):
+    source = model_source(model_path, use_mmap, backend)
+    if source == trees_artifact_path(model_path):
+        from scoring import CompiledModel
+
+        return CompiledModel.load(model_path)
+    if source != model_path:
+        return joblib.load(source, mmap_mode="r")
+    return joblib.load(model_path)
+
+
+class ModelLoader:
+    """Chargement du modèle avec un état explicite : pending -> loading -> ready | failed."""
+
+    def __init__(self, model_path: str, use_mmap: bool = True, on_loaded=None, backend: str = None):
+        self.model_path = model_path
+        self.use_mmap = use_mmap
+        self.backend = backend
+        self.on_loaded = on_loaded
+        self.state = "pending"
+        self.model = None
+        self.error = None
+        self.load_seconds = None
+        self.source = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+
+    def load(self):
+        """Charge le modèle de façon synchrone ; retourne le modèle, ou None en cas d'échec."""
+        with self._lock:
+            if self.state in ("ready", "failed"):
+                return self.model
+            self.state = "loading"
+            start = time.perf_counter()
+            try:
+                self.source = model_source(self.model_path, self.use_mmap, self.backend)
+                self.model = load_model(self.model_path, self.use_mmap, self.backend)
+                if self.on_loaded is not None:
+                    self.on_loaded(self.model)
+                self.state = "ready"
+            except Exception as e:
+                self.model = None
+                self.error = f"{type(e).__name__}: {e}"
+                self.state = "failed"
+            finally:
+                self.load_seconds = time.perf_counter() - start
+                self._done.set()
+            return self.model
+
+    def start(self):
+        """Lance le chargement dans un thread (sans effet s'il est déjà lancé ou terminé)."""
+        with self._lock:
+            if self.state != "pending" or self._thread is not None:
+                return
+            self.state = "loading"
+            self._thread = threading.Thread(target=self.load, name="model-loader", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def loading(self) -> bool:
+        return self.state == "loading"
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "source": self.source,
+            "load_seconds": round(self.load_seconds, 4) if self.load_seconds is not None else None,
+            "error": self.error,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "model.pkl"
+    print(f"Artefact mappé écrit : {export_mmap_artifact(path)}")
@@ -0,0 +1,175 @@
+"""
+Registre local des versions du modèle.
+
+    models/
+    ├── manifest.json          {"active": "v2", "previous": "v1", "versions": {...}}
+    ├── v1/model.pkl
+    └── v2/model.pkl (+ model.mmap.joblib, voir model_loader.py, model.profile.json, voir reference_profile.py,
+                           et model.trees.npz / model.encoder.json, voir tree_evaluator.py)
+
+Chaque version est une copie immuable de l'artefact, avec son empreinte sha256. Le manifeste
+est réécrit de façon atomique (fichier temporaire + os.replace) : un worker qui le relit
+voit soit l'ancienne, soit la nouvelle version active, jamais un fichier partiel.
+
+Usage en ligne de commande :
+    python model_registry.py register model.pkl [--version v2] [--activate]
+    python model_registry.py activate v1
+    python model_registry.py rollback
+    python model_registry.py list
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from datetime import datetime
+
+from model_loader import export_mmap_artifact
+
+MANIFEST_NAME = "manifest.json"
+ARTIFACT_NAME = "model.pkl"
+PROFILE_SUFFIX = ".profile.json"  # profil de référence rangé à côté de l'artefact (reference_profile.py)
+# Fichiers copiés avec l'artefact s'ils existent : profil, arbres et encodeur NumPy (tree_evaluator.py)
+SIDECAR_SUFFIXES = (PROFILE_SUFFIX, ".trees.npz", ".encoder.json")
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Versions du modèle, version active et version précédente (pour le retour arrière)."""
+
+    def __init__(self, root: str = "models"):
+        self.root = root
+        self._lock = threading.Lock()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST_NAME)
+
+    def manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {"active": None, "previous": None, "versions": {}}
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write(self, manifest: dict):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def manifest_mtime(self) -> float:
+        try:
+            return os.path.getmtime(self.manifest_path)
+        except OSError:
+            return None
+
+    # ------------------------------------------------------------------
+
+    def versions(self) -> dict:
+        return self.manifest()["versions"]
+
+    def active_version(self) -> str:
+        return self.manifest()["active"]
+
+    def previous_version(self) -> str:
+        return self.manifest()["previous"]
+
+    def path(self, version: str) -> str:
+        if version not in self.versions():
+            raise ValueError(f"Version inconnue : {version}")
+        return os.path.join(self.root, version, ARTIFACT_NAME)
+
+    def register(self, source_path: str, version: str = None, description: str = "") -> str:
+        """Copie un artefact dans le registre ; la version par défaut est le début de son sha256."""
+        sha256 = file_sha256(source_path)
+        version = version or sha256[:12]
+        if not VERSION_PATTERN.match(version):
+            raise ValueError(f"Nom de version invalide : {version}")
+        with self._lock:
+            manifest = self.manifest()
+            if version in manifest["versions"]:
+                if manifest["versions"][version]["sha256"] != sha256:
+                    raise ValueError(f"La version {version} existe déjà avec un autre contenu")
+                return version
+            folder = os.path.join(self.root, version)
+            os.makedirs(folder, exist_ok=True)
+            target = os.path.join(folder, ARTIFACT_NAME)
+            shutil.copyfile(source_path, target)
+            export_mmap_artifact(target)
+            for suffix in SIDECAR_SUFFIXES:
+                sidecar = os.path.splitext(source_path)[0] + suffix
+                if os.path.exists(sidecar):
+                    shutil.copyfile(sidecar, os.path.splitext(target)[0] + suffix)
+            manifest["versions"][version] = {
+                "file": os.path.join(version, ARTIFACT_NAME),
+                "sha256": sha256,
+                "description": description,
+                "registered_at": datetime.utcnow().isoformat(),
+            }
+            self._write(manifest)
+        return version
+
+    def activate(self, version: str) -> dict:
+        """Déclare la version active ; l'ancienne version active devient la version précédente."""
+        with self._lock:
+            manifest = self.manifest()
+            if version not in manifest["versions"]:
+                raise ValueError(f"Version inconnue : {version}")
+            if manifest["active"] != version:
+                manifest["previous"] = manifest["active"]
+                manifest["active"] = version
+                manifest["activated_at"] = datetime.utcnow().isoformat()
+                self._write(manifest)
+            return manifest
+
+    def rollback_target(self) -> str:
+        previous = self.previous_version()
+        if previous is None:
+            raise ValueError("Aucune version précédente")
+        return previous
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Registre des versions du modèle")
+    parser.add_argument("--root", default=os.getenv("MODEL_REGISTRY_DIR", "models"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    register = commands.add_parser("register")
+    register.add_argument("path")
+    register.add_argument("--version")
+    register.add_argument("--description", default="")
+    register.add_argument("--activate", action="store_true")
+    activate = commands.add_parser("activate")
+    activate.add_argument("version")
+    commands.add_parser("rollback")
+    commands.add_parser("list")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == "register":
+        version = registry.register(args.path, args.version, args.description)
+        print(f"Version enregistrée : {version}")
+        if args.activate:
+            registry.activate(version)
+            print(f"Version active : {version}")
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"Version active : {args.version}")
+    elif args.command == "rollback":
+        version = registry.rollback_target()
+        registry.activate(version)
+        print(f"Version active : {version}")
+    else:
+        print(json.dumps(registry.manifest(), ensure_ascii=False, indent=2))
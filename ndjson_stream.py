@@ -0,0 +1,95 @@
+"""
+Lecture et écriture NDJSON (un objet JSON par ligne) en flux, pour POST /predict/stream.
+
+Le corps de la requête est découpé en lignes au fil de sa réception, les lignes sont regroupées en
+mini-lots de batch_size, et chaque lot scoré est renvoyé aussitôt : la mémoire du serveur est
+bornée par la taille d'un mini-lot (plus une ligne incomplète d'au plus max_line_bytes), quelle
+que soit la taille du corps. Le corps suivant n'est lu qu'une fois les résultats du lot envoyés :
+un client qui ne lit pas ses résultats ralentit l'envoi de ses données (contre-pression TCP).
+"""
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+import json_codec
+
+MEDIA_TYPE = "application/x-ndjson"
+# Types acceptés pour le corps (le paramètre charset éventuel est ignoré)
+ACCEPTED_TYPES = (MEDIA_TYPE, "application/jsonl")
+
+
+class LineTooLong(ValueError):
+    """Ligne NDJSON plus longue que max_line_bytes (lecture interrompue)."""
+
+
+async def iter_lines(chunks, max_line_bytes: int):
+    """Découpe un flux de blocs d'octets en lignes non vides (sans le saut de ligne)."""
+    pending = b""
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if len(line) > max_line_bytes:
+                raise LineTooLong(f"Ligne de plus de {max_line_bytes} octets")
+            if line.strip():
+                yield line
+        if len(pending) > max_line_bytes:
+            raise LineTooLong(f"Ligne de plus de {max_line_bytes} octets")
+    if pending.strip():
+        yield pending
+
+
+async def iter_batches(lines, batch_size: int):
+    """Regroupe les lignes en listes d'au plus batch_size éléments (les lignes lues avant une
+    LineTooLong forment un dernier lot, puis l'exception est propagée)."""
+    batch = []
+    try:
+        async for line in lines:
+            batch.append(line)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    except LineTooLong:
+        if batch:
+            yield batch
+        raise
+    if batch:
+        yield batch
+
+
+def decode_lines(lines: list) -> tuple:
+    """Décode des lignes JSON ; retourne (objets, erreurs par position). Une ligne invalide donne {}."""
+    records, errors = [], {}
+    for i, line in enumerate(lines):
+        try:
+            records.append(json_codec.loads(line))
+        except ValueError as e:
+            records.append({})
+            errors[i] = [{"loc": [], "msg": f"JSON invalide : {e}", "type": "json_invalid"}]
+    return records, errors
+
+
+def encode_lines(items: list) -> bytes:
+    """Objets -> bloc NDJSON (une ligne par objet)."""
+    return b"".join(json_codec.dumps_bytes(item) + b"\n" for item in items)
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """Réponse NDJSON envoyée pendant la lecture du corps de la requête.
+
+    StreamingResponse surveille la déconnexion du client en lisant lui-même les messages de la
+    requête (ASGI < 2.4), ce qui volerait des blocs du corps : ici seul le générateur les lit,
+    et une déconnexion est signalée par request.stream() (ClientDisconnect)."""
+
+    media_type = MEDIA_TYPE
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
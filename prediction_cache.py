@@ -0,0 +1,153 @@
+"""
+Cache des résultats de prédiction.
+
+Les systèmes amont renvoient souvent des demandes identiques (relances, double clic,
+re-scoring de fichiers inchangés). La clé est un hachage canonique des données client
+validées et de la version du modèle : deux JSON équivalents (ordre des champs, 1 vs 1.0
+sur un champ float) donnent la même clé ; NaN, +inf, -inf et null donnent des clés distinctes.
+
+- éviction LRU au-delà de max_size entrées, expiration après ttl secondes,
+- déduplication des requêtes concurrentes identiques : une seule est scorée, les
+  autres attendent son résultat,
+- clear() invalide tout le cache (changement de modèle).
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import json_codec
+
+
+def canonical_key(client, model_version: str, data: dict = None) -> str:
+    """Clé stable d'un ClientData validé pour une version de modèle.
+
+    `data` : client.model_dump(mode="json") déjà calculé par l'appelant (un seul dump par requête).
+    L'ordre des champs d'un dump est celui du modèle : le JSON est canonique sans tri des clés.
+    """
+    data = client.model_dump(mode="json") if data is None else data
+    payload = json_codec.dumps_bytes(data)
+    if b"null" in payload:
+        # orjson écrit NaN, +inf et -inf comme None : le module standard les distingue (NaN, Infinity, -Infinity)
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.blake2b(payload, digest_size=16).hexdigest()
+    return f"{model_version}:{digest}"
+
+
+class PredictionCache:
+    """Cache LRU + TTL thread-safe avec coalescence des calculs en cours."""
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # clé -> (expiration, valeur)
+        self._in_flight = {}           # clé -> Future du calcul en cours
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expirations": 0,
+                          "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _lookup(self, key: str, now: float):
+        """Valeur en cache ou None (appelé sous verrou)."""
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < now:
+            del self._entries[key]
+            self._counters["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return item
+
+    def _store(self, key: str, value, now: float):
+        """Ajoute une entrée et applique l'éviction LRU (appelé sous verrou)."""
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def get(self, key: str):
+        """Valeur en cache ou None (sans calcul)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._lookup(key, time.monotonic())
+            self._counters["hits" if item is not None else "misses"] += 1
+            return item[1] if item is not None else None
+
+    def put(self, key: str, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._store(key, value, time.monotonic())
+
+    def get_or_compute(self, key: str, compute):
+        """Retourne la valeur en cache, sinon calcule compute() une seule fois pour tous les appelants."""
+        if not self.enabled:
+            return compute()
+        with self._lock:
+            item = self._lookup(key, time.monotonic())
+            if item is not None:
+                self._counters["hits"] += 1
+                return item[1]
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._counters["coalesced"] += 1
+                owner = False
+            else:
+                future = self._in_flight[key] = Future()
+                self._counters["misses"] += 1
+                generation = self._generation
+                owner = True
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+            # Un résultat calculé avant une invalidation n'est pas mis en cache
+            if generation == self._generation:
+                self._store(key, value, time.monotonic())
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        """Invalide toutes les entrées (nouveau modèle)."""
+        with self._lock:
+            self._entries.clear()
+            self._in_flight.clear()
+            self._generation += 1
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+            in_flight = len(self._in_flight)
+        lookups = counters["hits"] + counters["misses"] + counters["coalesced"]
+        return {
+            "enabled": self.enabled,
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "in_flight": in_flight,
+            "hit_rate": round((counters["hits"] + counters["coalesced"]) / lookups, 4) if lookups else None,
+            **counters,
+        }
@@ -0,0 +1,303 @@
+"""
+Profilage à la demande du trafic réel (endpoint POST /admin/profile).
+
+Deux modes :
+- "cprofile" : profileur déterministe. Chaque appel d'un endpoint décoré par @profiled est profilé
+  dans le thread qui l'exécute (un cProfile.Profile par requête, fusionnés à la fin). Comptes
+  d'appels exacts, mais le code Python profilé est nettement ralenti.
+- "sampling" : un thread relève la pile de tous les threads (sys._current_frames) toutes les
+  interval_ms. Surcoût faible et indépendant du nombre d'appels ; temps statistiques. Les threads
+  inactifs (attente sur un verrou, une file, le sélecteur de la boucle d'événements) sont ignorés.
+
+Une session s'arrête après `duration` secondes ou `max_requests` requêtes (hors /admin), puis écrit
+dans performance_results/ :
+- profile_<horodatage>_<mode>.pstats : lisible avec pstats ou snakeviz (en mode sampling, les
+  comptes sont des échantillons et les temps sont estimés à partir de ceux-ci) ;
+- profile_<horodatage>_<mode>.collapsed : piles agrégées au format de flamegraph.pl / speedscope
+  (« fonction;fonction;... poids », en échantillons ou en microsecondes).
+
+Hors session, aucun profileur n'est installé : les hooks se réduisent à un test `is None`.
+"""
+
+import cProfile
+import functools
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+PROFILE_MODES = ("cprofile", "sampling")
+MAX_DURATION_S = 300
+DEFAULT_INTERVAL_MS = 5.0
+DEFAULT_OUTPUT_DIR = "performance_results"
+TOP_FUNCTIONS = 15
+MAX_STACK_DEPTH = 128
+
+# Fonctions feuilles d'un thread inactif : ces échantillons ne sont pas comptés
+_IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("queue.py", "get"),
+    ("selectors.py", "select"), ("thread.py", "_worker"),
+}
+
+
+def _label(func: tuple) -> str:
+    filename, line, name = func
+    if filename == "~":  # fonction C (cProfile) : « <built-in method time.sleep> »
+        return name.replace(";", ",")
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+
+def _func_key(code) -> tuple:
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+class ProfilingSession:
+    """Session de profilage bornée en durée et en nombre de requêtes."""
+
+    def __init__(self, mode: str = "sampling", duration: float = 10.0, max_requests: int = None,
+                 interval_ms: float = DEFAULT_INTERVAL_MS, output_dir: str = DEFAULT_OUTPUT_DIR, on_stop=None):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Mode de profilage inconnu : {mode} (attendu : {', '.join(PROFILE_MODES)})")
+        if not 0 < duration <= MAX_DURATION_S:
+            raise ValueError(f"Durée de profilage hors bornes : {duration} s (maximum {MAX_DURATION_S} s)")
+        self.mode = mode
+        self.duration = duration
+        self.max_requests = max_requests
+        self.interval = interval_ms / 1000
+        self.output_dir = output_dir
+        self.on_stop = on_stop
+        self.state = "running"
+        self.started_at = datetime.utcnow()
+        self.requests = 0
+        self.samples = 0
+        self.idle_samples = 0
+        self.files = None
+        self.top = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._stop = threading.Event()
+        self._profiles = []
+        self._stacks = Counter()
+        if mode == "sampling":
+            self._thread = threading.Thread(target=self._sample_loop, name="profiling-sampler", daemon=True)
+        else:
+            self._thread = threading.Thread(target=self._wait_deadline, name="profiling-timer", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Collecte
+    # ------------------------------------------------------------------
+
+    def accepting(self) -> bool:
+        return self.state == "running"
+
+    def request_finished(self):
+        """Compte une requête ; la session s'arrête (en arrière-plan) à max_requests."""
+        with self._lock:
+            self.requests += 1
+            reached = self.max_requests is not None and self.requests >= self.max_requests
+        if reached:
+            self._stop.set()
+
+    def profile_call(self, fn, *args, **kwargs):
+        """Exécute fn sous cProfile dans le thread courant (mode cprofile)."""
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python >= 3.12 : un seul profileur actif par interpréteur, la requête concurrente n'est pas profilée
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            with self._lock:
+                if self.state == "running":
+                    self._profiles.append(profiler)
+
+    def _wait_deadline(self):
+        self._stop.wait(self.duration)
+        self.stop()
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        deadline = time.perf_counter() + self.duration
+        while not self._stop.wait(self.interval) and time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    self.idle_samples += 1
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_func_key(frame.f_code))
+                    frame = frame.f_back
+                stack.append(("~", 0, f"thread:{names.get(ident, ident)}"))
+                self._stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Résultats
+    # ------------------------------------------------------------------
+
+    def _sampled_stats(self) -> dict:
+        """Dictionnaire au format pstats construit à partir des piles échantillonnées."""
+        stats = {}
+        for stack, count in self._stacks.items():
+            seconds = count * self.interval
+            seen = set()
+            for depth, func in enumerate(stack):
+                cc, nc, tt, ct, callers = stats.get(func, (0, 0, 0.0, 0.0, {}))
+                leaf = depth == len(stack) - 1
+                if func not in seen:
+                    cc, nc, ct = cc + count, nc + count, ct + seconds
+                    seen.add(func)
+                if leaf:
+                    tt += seconds
+                if depth:
+                    e_nc, e_cc, e_tt, e_ct = callers.get(stack[depth - 1], (0, 0, 0.0, 0.0))
+                    callers[stack[depth - 1]] = (e_nc + count, e_cc + count, e_tt + (seconds if leaf else 0.0),
+                                                 e_ct + seconds)
+                stats[func] = (cc, nc, tt, ct, callers)
+        return stats
+
+    def _profiled_stats(self) -> dict:
+        if not self._profiles:
+            return {}
+        merged = pstats.Stats(self._profiles[0])
+        for profiler in self._profiles[1:]:
+            merged.add(profiler)
+        return merged.stats
+
+    @staticmethod
+    def collapsed_from_stats(stats: dict, min_weight_us: float = 1.0) -> Counter:
+        """Piles (µs) reconstruites depuis le graphe d'appels de cProfile : le temps propre d'une
+        fonction est réparti entre ses appelants au prorata du temps cumulé de chaque arc."""
+        callees = {}
+        for func, (_, _, _, _, callers) in stats.items():
+            for caller, edge in callers.items():
+                callees.setdefault(caller, []).append((func, edge[3]))
+        stacks = Counter()
+
+        def walk(func, path, inclusive):
+            _, _, tt, ct, _ = stats[func]
+            share = inclusive / ct if ct else 0.0
+            if tt * share * 1e6 >= min_weight_us:
+                stacks[";".join(_label(f) for f in path)] += round(tt * share * 1e6)
+            if len(path) >= MAX_STACK_DEPTH:
+                return
+            for child, edge_ct in callees.get(func, ()):
+                if child not in path and edge_ct * share * 1e6 >= min_weight_us:
+                    walk(child, path + (child,), edge_ct * share)
+
+        for func, (_, _, _, ct, callers) in stats.items():
+            if not callers:
+                walk(func, (func,), ct)
+        return stacks
+
+    def _write(self):
+        stats = self._sampled_stats() if self.mode == "sampling" else self._profiled_stats()
+        if self.mode == "sampling":
+            collapsed = Counter({";".join(_label(f) for f in stack): n for stack, n in self._stacks.items()})
+        else:
+            collapsed = self.collapsed_from_stats(stats)
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"profile_{self.started_at:%Y%m%dT%H%M%S}_{self.mode}")
+        with open(base + ".pstats", "wb") as f:
+            marshal.dump(stats, f)
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, weight in sorted(collapsed.items()):
+                f.write(f"{stack} {weight}\n")
+        self.files = {"pstats": base + ".pstats", "collapsed": base + ".collapsed"}
+        ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:TOP_FUNCTIONS]
+        self.top = [{"function": _label(func), "calls": nc, "tottime_s": round(tt, 6), "cumtime_s": round(ct, 6)}
+                    for func, (_, nc, tt, ct, _) in ranked]
+
+    def stop(self):
+        """Arrête la collecte et écrit les fichiers (une seule fois)."""
+        with self._lock:
+            if self.state != "running":
+                return
+            self.state = "writing"
+        self._stop.set()
+        try:
+            self._write()
+            self.state = "done"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+        finally:
+            self._done.set()
+            if self.on_stop is not None:
+                self.on_stop(self)
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def status(self) -> dict:
+        return {
+            "state": self.state, "mode": self.mode, "started_at": self.started_at.isoformat(),
+            "duration": self.duration, "max_requests": self.max_requests, "requests": self.requests,
+            "interval_ms": self.interval * 1000 if self.mode == "sampling" else None,
+            "samples": self.samples if self.mode == "sampling" else None,
+            "idle_samples": self.idle_samples if self.mode == "sampling" else None,
+            "files": self.files, "top": self.top, "error": self.error,
+        }
+
+
+# ============================================================
+# Session courante et hooks de l'API
+# ============================================================
+
+_session = None
+_last_session = None
+_session_lock = threading.Lock()
+
+
+def _clear_session(session):
+    global _session
+    with _session_lock:
+        if _session is session:
+            _session = None
+
+
+def start_session(**kwargs) -> ProfilingSession:
+    """Démarre une session ; RuntimeError si une autre est en cours."""
+    global _session, _last_session
+    with _session_lock:
+        if _session is not None:
+            raise RuntimeError("Profilage déjà en cours")
+        _session = _last_session = ProfilingSession(on_stop=_clear_session, **kwargs)
+        return _session
+
+
+def current_session() -> ProfilingSession:
+    """Session en cours, sinon la dernière terminée (None si aucune)."""
+    return _session or _last_session
+
+
+def request_finished():
+    """Hook du middleware : compte la requête si une session est en cours."""
+    session = _session
+    if session is not None:
+        session.request_finished()
+
+
+def profiled(fn):
+    """Décorateur d'endpoint synchrone : profilé par cProfile pendant une session en mode cprofile."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        session = _session
+        if session is None or session.mode != "cprofile" or not session.accepting():
+            return fn(*args, **kwargs)
+        return session.profile_call(fn, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,281 @@
+"""
+Profil de référence compact : les données d'entraînement résumées une fois pour toutes.
+
+data/input_reference.csv et data/output_reference.csv (307 000 lignes) ne sont relus qu'à la
+construction du profil :
+    python reference_profile.py data/input_reference.csv --target data/output_reference.csv
+
+Le profil est écrit à côté du modèle (model.pkl -> model.profile.json, quelques dizaines de Ko)
+et contient, pour les champs de ClientData :
+- champs numériques : centiles, moyenne, écart-type et nombre de valeurs manquantes ;
+- champs catégoriels : effectif de chaque catégorie (plus « autre » et « manquant ») ;
+- le taux de défaut observé (colonne TARGET) ;
+- la distribution des probabilités prédites par le modèle : histogramme, centiles, nombre de
+  défauts observés par bin et part des clients au-delà du seuil de décision ;
+- une section "drift" : bornes aux déciles et comptes au format de drift_monitor.DriftReference.
+
+La version du profil est une empreinte des fichiers sources, du modèle et du nombre de bins :
+reconstruire le profil à partir des mêmes entrées donne la même version. Le chargement (un JSON,
+sans pandas) prend quelques millisecondes ; le profil est lu par l'API (/drift), app_monitoring.py
+et Data_drfit_analyze.ipynb.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import json_codec
+from drift_monitor import DEFAULT_BINS, PROBABILITY_FIELD, PSI_THRESHOLD, DriftMonitor, DriftReference, FeatureLayout
+from model_loader import load_model
+from model_registry import PROFILE_SUFFIX, file_sha256
+from schemas import ClientData, schema_columns
+from scoring import DECISION_THRESHOLD, ModelScorer
+
+MODEL_PATH = "model.pkl"
+FORMAT_VERSION = 1
+TARGET_COLUMN = "TARGET"
+DEFAULT_CHUNK_SIZE = 50_000
+SCORE_BINS = 20
+PERCENTILES = np.linspace(0, 100, 101)
+
+
+def profile_path(model_path: str) -> str:
+    """Chemin du profil associé à un modèle : model.pkl -> model.profile.json."""
+    return os.path.splitext(model_path)[0] + PROFILE_SUFFIX
+
+
+def _percentiles(values: np.ndarray) -> list:
+    return np.percentile(values, PERCENTILES).tolist() if len(values) else None
+
+
+def _numeric_summary(values: np.ndarray) -> dict:
+    present = values[~np.isnan(values)]
+    return {
+        "missing": int(len(values) - len(present)),
+        "mean": float(present.mean()) if len(present) else None,
+        "std": float(present.std()) if len(present) else None,
+        "percentiles": _percentiles(present),
+    }
+
+
+# ============================================================
+# Construction (lecture des CSV par lots)
+# ============================================================
+
+def _read_target(path: str, chunk_size: int):
+    for chunk in pd.read_csv(path, usecols=[TARGET_COLUMN], chunksize=chunk_size):
+        yield chunk[TARGET_COLUMN].to_numpy(dtype=np.float64)
+
+
+def build_profile(input_path: str, target_path: str = None, model_path: str = MODEL_PATH,
+                  n_bins: int = DEFAULT_BINS, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  threshold: float = DECISION_THRESHOLD, progress=print) -> dict:
+    """Lit les données de référence par lots de chunk_size lignes et retourne le profil (dictionnaire).
+
+    Les valeurs numériques sont gardées en mémoire (float64, une colonne par champ) pour des
+    quantiles exacts ; le reste est cumulé lot par lot."""
+    started = time.perf_counter()
+    numeric_columns, categorical_columns = schema_columns()
+    scorer = ModelScorer(load_model(model_path), threshold=threshold)
+
+    values = {c: [] for c in numeric_columns}
+    frequencies = {c: Counter() for c in categorical_columns}
+    scores, targets = [], []
+    target_chunks = _read_target(target_path, chunk_size) if target_path else None
+    reader = pd.read_csv(input_path, chunksize=chunk_size, float_precision="round_trip")
+    with reader:
+        for chunk in reader:
+            missing = [c for c in numeric_columns + list(categorical_columns) if c not in chunk]
+            if missing:
+                raise ValueError(f"Colonnes absentes de {input_path} : {missing}")
+            for column in numeric_columns:
+                values[column].append(pd.to_numeric(chunk[column], errors="coerce").to_numpy(dtype=np.float64))
+            for column in categorical_columns:
+                frequencies[column].update(chunk[column].where(chunk[column].notna(), None).tolist())
+            scores.append(scorer.predict_proba(chunk))
+            if target_chunks is not None:
+                target = next(target_chunks, np.empty(0))
+                if len(target) != len(chunk):
+                    raise ValueError(f"{target_path} n'a pas le même nombre de lignes que {input_path}")
+                targets.append(target)
+            if progress:
+                progress(f"{sum(len(s) for s in scores)} lignes lues")
+    if target_chunks is not None and next(target_chunks, None) is not None:
+        raise ValueError(f"{target_path} a plus de lignes que {input_path}")
+
+    values = {c: np.concatenate(v) if v else np.empty(0) for c, v in values.items()}
+    proba = np.concatenate(scores) if scores else np.empty(0)
+    target = np.concatenate(targets) if targets else None
+
+    # Section "drift" : bornes aux quantiles 1/n_bins ..., comptes calculés colonne par colonne
+    edges = {c: DriftReference.quantile_edges(v, n_bins) for c, v in values.items()}
+    layout = FeatureLayout.from_schema(ClientData, edges)
+    counts = np.zeros(layout.size, dtype=np.int64)
+    for column, v in values.items():
+        present = v[~np.isnan(v)]
+        bins = np.bincount(np.searchsorted(layout.edges[column], present, side="right"),
+                           minlength=len(layout.edges[column]) + 1)
+        counts[layout.slices[column]] = np.append(bins, len(v) - len(present))
+    for column, freq in frequencies.items():
+        known = [freq.get(value, 0) for value in layout.categories[column]]
+        counts[layout.slices[column]] = known + [sum(freq.values()) - sum(known)]
+    counts[layout.slices[PROBABILITY_FIELD]] = np.bincount(
+        np.searchsorted(layout.probability_edges, proba, side="right"), minlength=len(layout.probability_edges) + 1)
+
+    sources = {"input": input_path, "input_sha256": file_sha256(input_path),
+               "target": target_path, "target_sha256": file_sha256(target_path) if target_path else None,
+               "model": model_path, "model_sha256": file_sha256(model_path)}
+    identity = json.dumps([FORMAT_VERSION, sources["input_sha256"], sources["target_sha256"],
+                           sources["model_sha256"], n_bins, threshold])
+    version = hashlib.sha256(identity.encode("utf-8")).hexdigest()[:12]
+
+    score_edges = np.linspace(0, 1, SCORE_BINS + 1)
+    score_bins = np.clip(np.searchsorted(score_edges, proba, side="right") - 1, 0, SCORE_BINS - 1)
+    profile = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "model_version": sources["model_sha256"][:12],
+        "created_at": datetime.utcnow().isoformat(),
+        "sources": sources,
+        "n_rows": int(len(proba)),
+        "target_rate": float(np.nanmean(target)) if target is not None and len(target) else None,
+        "numeric": {c: _numeric_summary(v) for c, v in values.items()},
+        "categorical": {
+            c: {"counts": {value: freq.get(value, 0) for value in categorical_columns[c]},
+                "other": sum(n for value, n in freq.items() if value is not None and value not in categorical_columns[c]),
+                "missing": freq.get(None, 0)}
+            for c, freq in frequencies.items()
+        },
+        "score": {
+            "threshold": threshold,
+            "edges": score_edges.tolist(),
+            "counts": np.bincount(score_bins, minlength=SCORE_BINS).tolist(),
+            "positives": (np.bincount(score_bins, weights=np.nan_to_num(target), minlength=SCORE_BINS).astype(int).tolist()
+                          if target is not None else None),
+            "percentiles": _percentiles(proba),
+            "mean": float(proba.mean()) if len(proba) else None,
+            "predicted_default_rate": float((proba > threshold).mean()) if len(proba) else None,
+        },
+        "drift": DriftReference(layout, counts, version).to_dict(),
+    }
+    if progress:
+        progress(f"Profil {version} : {len(proba)} lignes en {time.perf_counter() - started:.1f}s")
+    return profile
+
+
+# ============================================================
+# Profil chargé
+# ============================================================
+
+class ReferenceProfile:
+    """Accès en lecture à un profil de référence (statistiques par champ, référence de dérive)."""
+
+    def __init__(self, data: dict):
+        if data.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Format de profil non supporté : {data.get('format_version')}")
+        self.data = data
+        self._drift_reference = None
+
+    @property
+    def version(self) -> str:
+        return self.data["version"]
+
+    @property
+    def model_version(self) -> str:
+        return self.data["model_version"]
+
+    @property
+    def n_rows(self) -> int:
+        return self.data["n_rows"]
+
+    @property
+    def target_rate(self) -> float:
+        return self.data["target_rate"]
+
+    @property
+    def numeric(self) -> dict:
+        return self.data["numeric"]
+
+    @property
+    def categorical(self) -> dict:
+        return self.data["categorical"]
+
+    @property
+    def score(self) -> dict:
+        return self.data["score"]
+
+    @property
+    def drift_reference(self) -> DriftReference:
+        if self._drift_reference is None:
+            self._drift_reference = DriftReference.from_dict(self.data["drift"])
+        return self._drift_reference
+
+    def quantile(self, column: str, q: float) -> float:
+        """Quantile q (entre 0 et 1) d'un champ numérique, ou de la probabilité prédite (PROBABILITY_FIELD)."""
+        percentiles = self.score["percentiles"] if column == PROBABILITY_FIELD else self.numeric[column]["percentiles"]
+        return None if percentiles is None else float(np.interp(q * 100, PERCENTILES, percentiles))
+
+    def category_frequencies(self, column: str) -> dict:
+        """Part de chaque catégorie d'un champ (valeurs manquantes exclues)."""
+        entry = self.categorical[column]
+        total = sum(entry["counts"].values()) + entry["other"]
+        return {value: n / total if total else 0.0 for value, n in entry["counts"].items()}
+
+    def drift_report(self, records: list, probabilities, psi_threshold: float = PSI_THRESHOLD) -> dict:
+        """Scores de dérive (PSI, KS) de dictionnaires {champ: valeur} contre le profil, sans relire les CSV."""
+        reference = self.drift_reference
+        monitor = DriftMonitor(reference.layout, reference, n_slices=1, psi_threshold=psi_threshold,
+                               min_samples=0, flush_interval=0, clock=lambda: 0.0)
+        monitor.observe_records(records, probabilities)
+        report = monitor.report()
+        del report["window_seconds"], report["dropped"]
+        return report
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(json_codec.dumps_bytes(self.data))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ReferenceProfile":
+        with open(path, "rb") as f:
+            return cls(json_codec.loads(f.read()))
+
+    @classmethod
+    def for_model(cls, model_path: str = MODEL_PATH) -> "ReferenceProfile":
+        """Profil rangé à côté d'un modèle (None s'il n'a pas encore été construit)."""
+        path = profile_path(model_path)
+        return cls.load(path) if os.path.exists(path) else None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Construit le profil de référence compact d'un modèle.")
+    parser.add_argument("input", help="Données de référence (CSV, colonnes de ClientData)")
+    parser.add_argument("--target", default=None, help=f"CSV de la cible (colonne {TARGET_COLUMN}, mêmes lignes)")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--output", default=None, help="Chemin du profil (défaut : à côté du modèle)")
+    parser.add_argument("--bins", type=int, default=DEFAULT_BINS, help="Nombre de bins des champs numériques")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--threshold", type=float, default=DECISION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    profile = ReferenceProfile(build_profile(args.input, args.target, args.model, n_bins=args.bins,
+                                             chunk_size=args.chunk_size, threshold=args.threshold,
+                                             progress=lambda message: print(message, file=sys.stderr)))
+    output = args.output or profile_path(args.model)
+    profile.save(output)
+    print(f"{output} : version {profile.version}, {profile.n_rows} lignes, {os.path.getsize(output) // 1024} Ko")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
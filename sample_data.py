@@ -0,0 +1,33 @@
+"""
+Chargement des exemples de clients (data/samples.json) pour les tests et les benchmarks.
+"""
+
+import json
+
+SAMPLES_PATH = "data/samples.json"
+
+
+def load_samples(path: str = SAMPLES_PATH) -> list:
+    """Charge les exemples de clients.
+
+    Le fichier data/samples.json contient plusieurs objets JSON concaténés (séparés par
+    des lignes vides) et non une liste : on les décode donc un par un.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    decoder = json.JSONDecoder()
+    samples = []
+    pos = 0
+    while True:
+        # Sauter les espaces / lignes vides entre deux objets
+        while pos < len(content) and content[pos].isspace():
+            pos += 1
+        if pos >= len(content):
+            break
+        obj, pos = decoder.raw_decode(content, pos)
+        if isinstance(obj, list):
+            samples.extend(obj)
+        else:
+            samples.append(obj)
+    return samples
@@ -0,0 +1,182 @@
+"""
+Couche de scoring partagée par tous les endpoints de prédiction.
+
+Le pipeline (ColumnTransformer + XGBoost) n'est exécuté qu'une seule fois par appel :
+on calcule la probabilité de défaut, puis la classe est déduite d'un seuil de décision
+configurable (au lieu d'enchaîner model.predict() puis model.predict_proba()).
+
+Quand le préprocesseur du modèle peut être compilé (voir fast_preprocessing.py), les
+clients sont encodés directement en matrice float32 et seul le classifieur est appelé.
+Sinon, on retombe sur le pipeline scikit-learn complet.
+
+Pour un XGBClassifier binaire, le booster est extrait au chargement et appelé directement
+(Booster.inplace_predict), sans les validations du wrapper scikit-learn : mêmes arbres,
+mêmes paramètres, donc probabilités identiques au bit près. Deux copies du booster fixent
+le nombre de threads : 1 pour les petites requêtes (déjà parallélisées par les requêtes
+concurrentes), XGB_NTHREAD pour les lots d'au moins XGB_PARALLEL_MIN_ROWS lignes.
+
+XGB_NTHREAD vaut par défaut cpu_count // nombre de processus qui scorent (WEB_CONCURRENCY
+workers uvicorn, chacun avec INFERENCE_POOL_WORKERS processus de pool), au moins 1 : avec
+N workers, N lots concurrents ne lancent pas chacun cpu_count threads.
+
+SCORER_BACKEND=numpy remplace le booster par l'évaluateur NumPy de tree_evaluator.py
+(mêmes marges, probabilités à un ulp float32 près, sans XGBoost pendant le scoring). Si les
+artefacts model.trees.npz et model.encoder.json existent (python tree_evaluator.py),
+model_loader.load_model les relit à la place de model.pkl (CompiledModel) : le pipeline
+n'est pas désérialisé et XGBoost n'est jamais importé.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+import stage_timing
+from fast_preprocessing import CompiledEncoder, encoder_artifact_path
+from tree_evaluator import TreeEnsemble, iteration_range, trees_artifact_path
+
+# Seuil de décision : probabilité de défaut au-delà de laquelle le client est "Défaillant".
+# 0.5 reproduit exactement le comportement de XGBClassifier.predict().
+DECISION_THRESHOLD = float(os.getenv("DECISION_THRESHOLD", "0.5"))
+
+LABELS = {0: "Solvable", 1: "Défaillant"}
+
+
+def default_nthread() -> int:
+    """Cœurs partagés entre les processus qui scorent : cpu_count // (workers uvicorn x workers du pool)."""
+    processes = max(1, int(os.getenv("WEB_CONCURRENCY", "1"))) * max(1, int(os.getenv("INFERENCE_POOL_WORKERS", "0")))
+    return max(1, (os.cpu_count() or 1) // processes)
+
+
+# Threads XGBoost : 1 par requête unitaire, XGB_NTHREAD (défaut : default_nthread()) pour les gros lots
+XGB_NTHREAD = int(os.getenv("XGB_NTHREAD", "0")) or default_nthread()
+XGB_PARALLEL_MIN_ROWS = int(os.getenv("XGB_PARALLEL_MIN_ROWS", "1024"))
+
+# Évaluation des arbres : "xgboost" (booster natif) ou "numpy" (tree_evaluator.TreeEnsemble)
+SCORER_BACKENDS = ("xgboost", "numpy")
+SCORER_BACKEND = os.getenv("SCORER_BACKEND", "xgboost")
+
+
+def label_from_class(y) -> str:
+    """Convertit la classe prédite (0/1) en libellé renvoyé par l'API."""
+    return LABELS[int(y)]
+
+
+class NativeBooster:
+    """Appel direct du booster d'un XGBClassifier binaire (équivalent à predict_proba()[:, 1])."""
+
+    def __init__(self, classifier, nthread: int = XGB_NTHREAD, parallel_min_rows: int = XGB_PARALLEL_MIN_ROWS):
+        if type(classifier).__name__ != "XGBClassifier":
+            raise ValueError(f"Classifieur non supporté : {type(classifier).__name__}")
+        if classifier.objective != "binary:logistic" or getattr(classifier, "n_classes_", 2) != 2:
+            raise ValueError(f"Objectif non supporté : {classifier.objective}")
+        if classifier.booster == "gblinear":
+            raise ValueError("Booster gblinear non supporté")
+        self.missing = classifier.missing
+        self.iteration_range = iteration_range(classifier)
+        self.parallel_min_rows = parallel_min_rows
+        # Copies indépendantes : le booster du modèle (et ses n_jobs) n'est pas modifié
+        self.single = classifier.get_booster().copy()
+        self.single.set_param({"nthread": 1})
+        self.parallel = classifier.get_booster().copy()
+        self.parallel.set_param({"nthread": nthread})
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        booster = self.parallel if len(X) >= self.parallel_min_rows else self.single
+        proba = booster.inplace_predict(X, iteration_range=self.iteration_range, predict_type="value",
+                                        missing=self.missing, validate_features=False)
+        return np.asarray(proba, dtype=np.float64)
+
+
+class CompiledModel:
+    """Modèle relu des artefacts NumPy (encodeur compilé + arbres), à la place du pipeline de model.pkl."""
+
+    def __init__(self, encoder: CompiledEncoder, trees: TreeEnsemble):
+        self.encoder = encoder
+        self.trees = trees
+
+    @staticmethod
+    def available(model_path: str) -> bool:
+        """Artefacts présents et pas plus anciens que model.pkl."""
+        paths = (trees_artifact_path(model_path), encoder_artifact_path(model_path))
+        return all(os.path.exists(p) and os.path.getmtime(p) >= os.path.getmtime(model_path) for p in paths)
+
+    @classmethod
+    def load(cls, model_path: str) -> "CompiledModel":
+        return cls(CompiledEncoder.load(encoder_artifact_path(model_path)),
+                   TreeEnsemble.load(trees_artifact_path(model_path)))
+
+    def predict_proba(self, df) -> np.ndarray:
+        """Comme Pipeline.predict_proba() : colonnes (classe 0, classe 1)."""
+        proba = self.trees.predict_proba(self.encoder.transform_frame(df))
+        return np.column_stack([1 - proba, proba])
+
+
+class ModelScorer:
+    """Scoring en une seule passe : une transformation, une probabilité, un seuil."""
+
+    def __init__(self, model, threshold: float = DECISION_THRESHOLD, version: str = None,
+                 backend: str = SCORER_BACKEND, nthread: int = XGB_NTHREAD):
+        if backend not in SCORER_BACKENDS:
+            raise ValueError(f"Backend de scoring inconnu : {backend}")
+        self.model = model
+        self.backend = backend
+        self.version = version
+        self.threshold = threshold
+        self.encoder = None
+        self.classifier = None
+        self.booster = None
+        self.fallback_reason = None
+        if isinstance(model, CompiledModel):
+            # Artefacts NumPy : évaluateur NumPy quel que soit le backend demandé
+            self.encoder, self.booster = model.encoder, model.trees
+            return
+        try:
+            self.encoder = CompiledEncoder.from_pipeline(model)
+            self.classifier = model.steps[-1][1]
+        except Exception as e:
+            self.fallback_reason = str(e)
+            return
+        try:
+            self.booster = (TreeEnsemble.from_classifier(self.classifier) if backend == "numpy"
+                            else NativeBooster(self.classifier, nthread=nthread))
+        except Exception:
+            self.booster = None  # autre classifieur : appel via predict_proba()
+
+    @property
+    def compiled(self) -> bool:
+        return self.encoder is not None
+
+    def decide(self, proba: np.ndarray):
+        """Applique le seuil de décision aux probabilités de défaut."""
+        classes = (proba > self.threshold).astype(np.int8)
+        return classes, proba
+
+    def predict_encoded(self, X: np.ndarray) -> np.ndarray:
+        """Probabilité de défaut pour une matrice déjà encodée (booster natif ou NumPy si disponible)."""
+        if self.booster is not None:
+            return self.booster.predict_proba(X)
+        return np.asarray(self.classifier.predict_proba(X), dtype=np.float64)[:, 1]
+
+    def predict_proba(self, df) -> np.ndarray:
+        """Probabilité de défaut (classe 1) pour chaque ligne du DataFrame."""
+        if self.encoder is not None:
+            return self.predict_encoded(self.encoder.transform_frame(df))
+        return np.asarray(self.model.predict_proba(df), dtype=np.float64)[:, 1]
+
+    def predict(self, df):
+        """Retourne (classes, probabilités) à partir d'un unique appel au pipeline."""
+        return self.decide(self.predict_proba(df))
+
+    def predict_clients(self, clients: list):
+        """Comme predict(), à partir d'objets ClientData (chemin rapide sans DataFrame)."""
+        if self.encoder is None:
+            df = pd.DataFrame([c.model_dump() for c in clients])
+            stage_timing.mark("dataframe")
+            result = self.predict(df)
+            stage_timing.mark("inference")
+            return result
+        X = self.encoder.transform_clients(clients)
+        stage_timing.mark("encode")
+        result = self.decide(self.predict_encoded(X))
+        stage_timing.mark("inference")
+        return result
@@ -0,0 +1,63 @@
+"""
+Découpage de la latence d'une requête par étape (en-tête Server-Timing, log structuré, histogrammes).
+
+Le middleware crée un StageTimer par requête et le rend courant (contextvar, propagé au thread
+qui exécute l'endpoint). Chaque étape appelle mark("nom") à sa fin : sa durée est le temps écoulé
+depuis la marque précédente. Des marques posées plus bas (encode, inference dans le scoreur)
+découpent donc l'étape englobante sans double compte. Hors requête (tests, benchmarks, thread du
+micro-batching), mark() ne fait rien. Coût d'une marque : un perf_counter() et une addition
+dans un dict ; l'en-tête est formaté en un seul appel (gabarit mis en cache par suite d'étapes)
+et les histogrammes ne sont agrégés qu'à la collecte de /metrics (observe_deferred).
+"""
+
+import contextvars
+from time import perf_counter
+
+# Étapes marquées par l'API (colonnes stages.* de l'événement http_request)
+STAGES = ("receive", "validation", "dataframe", "encode", "inference", "score", "serialize", "log", "response")
+
+_current = contextvars.ContextVar("stage_timer", default=None)
+_formats = {}  # suite d'étapes -> gabarit de l'en-tête Server-Timing
+
+
+class StageTimer:
+    """Durées (secondes) des étapes d'une requête, dans l'ordre de leur première fin."""
+
+    __slots__ = ("start", "last", "stages")
+
+    def __init__(self):
+        self.start = self.last = perf_counter()
+        self.stages = {}
+
+    def mark(self, name: str):
+        now = perf_counter()
+        stages = self.stages
+        stages[name] = stages.get(name, 0.0) + (now - self.last)
+        self.last = now
+
+    def durations(self) -> dict:
+        """Durée par étape (une étape marquée plusieurs fois est cumulée)."""
+        return self.stages
+
+    def server_timing(self, durations: dict = None) -> str:
+        """Valeur de l'en-tête Server-Timing (millisecondes), avec la durée totale."""
+        durations = self.stages if durations is None else durations
+        names = tuple(durations)
+        template = _formats.get(names)
+        if template is None:
+            template = _formats[names] = ", ".join(n.replace("%", "%%") + ";dur=%.3f" for n in names + ("total",))
+        return template % (*[seconds * 1000 for seconds in durations.values()], (self.last - self.start) * 1000)
+
+
+def start() -> StageTimer:
+    """Démarre le chronométrage de la requête courante."""
+    timer = StageTimer()
+    _current.set(timer)
+    return timer
+
+
+def mark(name: str):
+    """Termine l'étape `name` de la requête courante (sans effet hors requête chronométrée)."""
+    timer = _current.get()
+    if timer is not None:
+        timer.mark(name)
@@ -0,0 +1,110 @@
+# test_batch_score.py
+import gzip
+import json
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import API_Fastapi
+import batch_score
+from load_generator import SyntheticPayloads
+from sample_data import load_samples
+
+
+def write_jsonl(path, rows, extra_lines=()):
+    #Fichier JSONL : un client par ligne, suivi de lignes brutes éventuelles
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+        for line in extra_lines:
+            f.write(line + "\n")
+    return str(path)
+
+
+def read_output(path):
+    #Sortie CSV (compressée ou non) -> DataFrame, cellules vides en ""
+    return pd.read_csv(path, keep_default_na=False, dtype={"prediction": str, "error": str})
+
+# ============================================================
+# Tests du scoring hors ligne
+# ============================================================
+
+def test_results_identical_to_predict(tmp_path): #Mêmes libellés et probabilités que /predict, en CSV comme en JSONL
+    samples = load_samples()
+    invalid = {**samples[0], "CODE_GENDER": "Z"}
+    jsonl = write_jsonl(tmp_path / "clients.jsonl", samples + [invalid], extra_lines=["", "{pas du json"])
+    csv_path = tmp_path / "clients.csv"
+    pd.DataFrame(samples).to_csv(csv_path, index=False)
+
+    summary = batch_score.run_batch(jsonl, str(tmp_path / "scores.csv"), chunk_size=3, workers=0, progress=None)
+    assert summary["rows"] == len(samples) + 2 and summary["errors"] == 2
+    batch_score.run_batch(str(csv_path), str(tmp_path / "scores_csv.csv"), chunk_size=4, workers=0, progress=None)
+
+    scores = read_output(tmp_path / "scores.csv")
+    assert list(scores["index"]) == list(range(len(samples) + 2))
+    lines = (tmp_path / "scores.csv").read_text(encoding="utf-8").splitlines()
+    assert lines[:len(samples) + 1] == (tmp_path / "scores_csv.csv").read_text(encoding="utf-8").splitlines()
+
+    client = TestClient(API_Fastapi.app)
+    API_Fastapi.prediction_cache.clear()
+    for sample, row in zip(samples, scores.itertuples()):
+        expected = client.post("/predict", json=sample).json()
+        assert (row.prediction, float(row.probabilité_defaut), row.error) == (
+            expected["prediction"], expected["probabilité_defaut"], "")
+
+    # Erreurs : celles de /predict/batch, puis le décodage JSON
+    expected_error = client.post("/predict/batch", json=[invalid]).json()["results"][0]["error"]
+    assert json.loads(scores["error"].iloc[-2]) == expected_error
+    assert json.loads(scores["error"].iloc[-1])[0]["type"] == "json_invalid"
+    API_Fastapi.prediction_cache.clear()  # les tests suivants doivent atteindre le scoring
+
+# ==============================================================================================
+
+def test_process_pool_gzip_output(tmp_path): #Pool de processus : sortie compressée identique au scoring local
+    payloads = SyntheticPayloads(seed=3)
+    rows = [{"SK_ID_CURR": 1000 + i, **payloads.next()} for i in range(40)]
+    jsonl = write_jsonl(tmp_path / "clients.jsonl", rows)
+
+    local = batch_score.run_batch(jsonl, str(tmp_path / "local.csv"), chunk_size=7, workers=0,
+                                  id_column="SK_ID_CURR", progress=None)
+    pooled = batch_score.run_batch(jsonl, str(tmp_path / "pool.csv.gz"), chunk_size=7, workers=1,
+                                   id_column="SK_ID_CURR", progress=None)
+    assert pooled["rows"] == local["rows"] == 40 and pooled["rows_per_second"] > 0
+
+    with gzip.open(tmp_path / "pool.csv.gz", "rb") as f:
+        assert f.read() == (tmp_path / "local.csv").read_bytes()
+    assert list(read_output(tmp_path / "local.csv")["SK_ID_CURR"]) == list(range(1000, 1040))
+
+# ==============================================================================================
+
+def test_resume_after_interruption(tmp_path, monkeypatch): #Reprise au dernier lot écrit, sortie identique
+    payloads = SyntheticPayloads(seed=5)
+    jsonl = write_jsonl(tmp_path / "clients.jsonl", [payloads.next() for _ in range(25)])
+    batch_score.run_batch(jsonl, str(tmp_path / "reference.csv"), chunk_size=4, workers=0, progress=None)
+
+    output = str(tmp_path / "scores.csv.gz")
+    original = batch_score._write_checkpoint
+
+    def interrupted(path, state):
+        original(path, state)
+        if state["rows"] == 12:
+            with open(output, "ab") as f:
+                f.write(b"lot partiellement ecrit")
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(batch_score, "_write_checkpoint", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        batch_score.run_batch(jsonl, output, chunk_size=4, workers=0, progress=None)
+    monkeypatch.setattr(batch_score, "_write_checkpoint", original)
+
+    summary = batch_score.run_batch(jsonl, output, chunk_size=4, workers=0, resume=True, progress=None)
+    assert summary["resumed_from"] == 12 and summary["rows"] == 25
+    with gzip.open(output, "rb") as f:
+        assert f.read() == (tmp_path / "reference.csv").read_bytes()
+
+    # Entrée modifiée : le point de reprise est refusé
+    with open(jsonl, "a", encoding="utf-8") as f:
+        f.write(json.dumps(load_samples()[0]) + "\n")
+    with pytest.raises(ValueError, match="input_size"):
+        batch_score.run_batch(jsonl, output, chunk_size=4, workers=0, resume=True, progress=None)
@@ -0,0 +1,61 @@
+# test_benchmark_suite.py
+import json
+import time
+
+import numpy as np
+import pytest
+
+import benchmark_suite
+from benchmark_suite import compare, median_of_rounds, summarize
+
+
+def fake_results(p50, p95):
+    return {"environment": {"python": "3.11"}, "cases": {"predict_single": {"p50_ms": p50, "p95_ms": p95}}}
+
+
+@pytest.fixture
+def sleepy_case(monkeypatch, tmp_path):
+    #Un seul cas très court, et des résultats écrits dans tmp_path (variables d'environnement restaurées)
+    monkeypatch.setenv("PREDICTION_CACHE_SIZE", "0")
+    monkeypatch.setenv("EVENT_STORE_DIR", str(tmp_path / "events"))
+    monkeypatch.setattr(benchmark_suite, "CASES", {"sleep": lambda ctx: ctx.bench(lambda: time.sleep(0.001), 20)})
+    monkeypatch.setattr(benchmark_suite, "environment", lambda: {"python": "test"})
+    return tmp_path
+
+# ============================================================
+# Tests de la suite de benchmarks
+# ============================================================
+
+def test_summary_percentiles(): #Percentiles, débit et médiane des séries
+    stats = summarize(np.arange(1, 101, dtype=float), rows=10)
+    assert stats["n"] == 100
+    assert stats["p50_ms"] == pytest.approx(50.5)
+    assert stats["p99_ms"] == pytest.approx(99.01)
+    assert stats["rows_per_s"] == pytest.approx(10 * 1000 / 50.5)
+
+    combined = median_of_rounds([summarize(np.full(10, v)) for v in (1.0, 2.0, 50.0)])
+    assert combined["p95_ms"] == 2.0 and combined["n"] == 30 and combined["rounds"] == 3
+
+# ==============================================================================================
+
+def test_compare_flags_regressions(): #Seul l'écart au-delà du seuil est une régression
+    rows = compare(fake_results(1.1, 2.6), fake_results(1.0, 2.0), threshold=0.2)
+
+    assert [(r["metric"], r["regression"]) for r in rows] == [("p50_ms", False), ("p95_ms", True)]
+    assert rows[1]["change"] == pytest.approx(0.3)
+    assert compare(fake_results(1.0, 2.0), {"cases": {}}) == []
+
+# ==============================================================================================
+
+def test_gate_exit_code(sleepy_case): #Code de sortie 1 au-delà du seuil, 0 sinon
+    output, baseline = sleepy_case / "results.json", sleepy_case / "baseline.json"
+    assert benchmark_suite.main(["--quick", "--rounds", "1", "--output", str(output), "--save-baseline", str(baseline)]) == 0
+    results = json.loads(output.read_text(encoding="utf-8"))
+    assert set(results["cases"]["sleep"]) >= {"p50_ms", "p95_ms", "p99_ms", "mean_ms", "n"}
+
+    saved = json.loads(baseline.read_text(encoding="utf-8"))
+    saved["cases"]["sleep"]["p50_ms"] /= 10
+    baseline.write_text(json.dumps(saved), encoding="utf-8")
+    assert benchmark_suite.main(["--quick", "--rounds", "1", "--output", str(output), "--baseline", str(baseline)]) == 1
+    assert benchmark_suite.main(["--quick", "--rounds", "1", "--output", str(output), "--baseline", str(baseline),
+                                 "--threshold", "100"]) == 0
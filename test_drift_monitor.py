@@ -0,0 +1,143 @@
+# test_drift_monitor.py
+import math
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import API_Fastapi
+from API_Fastapi import ClientData
+from drift_monitor import DriftMonitor, DriftReference, FeatureLayout, PROBABILITY_FIELD, psi
+from schemas import schema_columns
+
+
+class FakeClock:
+    #Horloge contrôlée par le test
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def small_layout():
+    #Un champ numérique (bornes 0 et 10), un champ catégoriel, probabilité en 2 bins
+    return FeatureLayout({"x": [0.0, 10.0]}, {"c": ["a", "b"]}, [0.5])
+
+
+# ============================================================
+# Tests des bins et des fenêtres glissantes
+# ============================================================
+
+def test_bins_missing_and_unknown_values(synthetic): #Bornes [a, b), valeur manquante et catégorie inconnue
+    layout = small_layout()
+    records = [{"x": -1, "c": "a"}, {"x": 0, "c": "b"}, {"x": 10, "c": "z"}, {"c": "a"}, {"x": float("nan")}]
+    counts = layout.count_records(records, [0.1, 0.5, 0.9, 0.2, 0.3])
+    assert counts[layout.slices["x"]].tolist() == [1, 1, 1, 2]
+    assert counts[layout.slices["c"]].tolist() == [2, 1, 2]
+    assert counts[layout.slices[PROBABILITY_FIELD]].tolist() == [3, 2]
+
+    # Objets ClientData (membres d'Enum) et dictionnaires comptés dans les mêmes cases
+    edges = {name: [0.0] for name, info in ClientData.model_fields.items() if info.annotation in (int, float)}
+    layout = FeatureLayout.from_schema(ClientData, edges)
+    records = synthetic(5)
+    clients = [ClientData(**r) for r in records]
+    assert np.array_equal(layout.count_clients(clients, np.full(5, 0.3)), layout.count_records(records, [0.3] * 5))
+
+# ==============================================================================================
+
+def test_sliding_window_expires_old_slices(): #Les tranches plus anciennes que la fenêtre ne comptent plus
+    clock = FakeClock()
+    monitor = DriftMonitor(small_layout(), slice_seconds=10, n_slices=3, flush_interval=0, clock=clock)
+    monitor.observe_records([{"x": 1, "c": "a"}] * 4, [0.2] * 4)
+    clock.now += 10
+    monitor.observe_records([{"x": 1, "c": "b"}], [0.7])
+
+    assert monitor.report()["n"] == 5
+    assert monitor.report(seconds=10)["n"] == 1
+    clock.now += 20  # la première tranche sort de la fenêtre de 30 s
+    assert monitor.report()["n"] == 1
+    clock.now += 100
+    assert monitor.report()["n"] == 0
+
+# ==============================================================================================
+
+def test_pending_bounded_in_clients_and_bad_entry_dropped_alone(synthetic): #File bornée en clients ; seule l'observation invalide est perdue
+    monitor = DriftMonitor.for_schema(ClientData, flush_interval=0, max_pending=10)
+    clients = [ClientData(**record) for record in synthetic(8)]
+    monitor.observe_clients(clients[:6], np.full(6, 0.2))
+    monitor.observe_clients(clients[6:8], np.full(2, 0.2))
+    monitor.observe_clients(clients[:3], np.full(3, 0.2))  # 8 + 3 > 10 : lot abandonné
+    assert monitor.dropped == 3
+
+    monitor.observe_clients([{"AMT_CREDIT": 1.0}], [0.4])  # dict au lieu de ClientData : comptage impossible
+    report = monitor.report()
+    assert report["n"] == 8 and report["dropped"] == 4
+    monitor.observe_clients(clients[:10], np.full(8, 0.2))  # la file est de nouveau vide
+    assert monitor.report()["n"] == 16
+
+# ==============================================================================================
+
+def test_psi_and_reference_roundtrip(tmp_path, synthetic): #Même distribution : pas de dérive ; décalage : dérive détectée
+    records = synthetic(600, seed=1)
+    proba = np.random.default_rng(0).uniform(0, 1, len(records))
+    reference = DriftReference.build(ClientData, records, proba, version="v1")
+    reference.save(str(tmp_path / "ref.json"))
+    loaded = DriftReference.load(str(tmp_path / "ref.json"))
+    assert loaded.version == "v1" and loaded.n == 600 and np.array_equal(loaded.counts, reference.counts)
+    # Même découpage des champs que le scoring (schemas.schema_columns) et l'event store de l'API
+    numeric, categorical = schema_columns(ClientData)
+    assert reference.layout.numeric_columns == numeric and reference.layout.categories == categorical
+    event_fields = next(s for s in API_Fastapi.EVENT_SCHEMAS if s.event == "prediction").fields
+    assert {f[0][len("input_data."):] for f in event_fields
+            if f[1] == "category" and f[0].startswith("input_data.")} == set(categorical)
+
+    monitor = DriftMonitor.for_schema(ClientData, loaded, min_samples=100, flush_interval=0)
+    same = synthetic(400, seed=2)
+    monitor.observe_clients([ClientData(**r) for r in same], np.random.default_rng(1).uniform(0, 1, 400))
+    report = monitor.report()
+    assert report["n"] == 400 and report["enough_data"]
+    assert report["features"]["AMT_CREDIT"]["drift"] is False
+    assert report["prediction"]["psi"] < 0.1
+
+    monitor.reset()
+    shifted = [{**r, "AMT_CREDIT": r["AMT_CREDIT"] * 3} for r in same]
+    monitor.observe_clients([ClientData(**r) for r in shifted], np.full(400, 0.95))
+    report = monitor.report()
+    assert report["features"]["AMT_CREDIT"]["drift"] is True and report["features"]["AMT_CREDIT"]["ks"] > 0.3
+    assert report["prediction"]["drift"] is True and "AMT_CREDIT" in report["drifted_features"]
+    assert psi(np.array([5, 5]), np.array([5, 5])) == 0.0 and math.isfinite(psi(np.array([10, 0]), np.array([0, 10])))
+
+# ============================================================
+# Tests de l'endpoint /drift
+# ============================================================
+
+@pytest.fixture
+def fresh_monitor(tmp_path):
+    #Monitor recréé avec une référence temporaire, puis remis à zéro après le test
+    with patch.object(API_Fastapi, "DRIFT_REFERENCE_PATH", str(tmp_path / "drift_reference.json")), \
+            patch.object(API_Fastapi, "_drift_monitor", None):
+        yield tmp_path
+
+
+def test_drift_endpoint(fresh_monitor, synthetic): #Histogrammes sans référence ; scores et dérive avec référence
+    client = TestClient(API_Fastapi.app)
+    records = synthetic(300, seed=3)
+    assert client.post("/predict/batch", json=records[:20]).status_code == 200
+
+    report = client.get("/drift?details=true").json()
+    assert report["reference"] is None and report["n"] == 20
+    assert sum(report["features"]["CODE_GENDER"]["counts"]) == 20 and "psi" not in report["features"]["AMT_CREDIT"]
+
+    scorer = API_Fastapi.get_scorer()
+    _, proba = scorer.predict_clients([ClientData(**r) for r in records])
+    DriftReference.build(ClientData, records, proba, version="ref").save(str(fresh_monitor / "drift_reference.json"))
+    API_Fastapi._drift_monitor = None
+    shifted = [{**r, "AMT_INCOME_TOTAL": r["AMT_INCOME_TOTAL"] * 20} for r in synthetic(150, seed=4)]
+    assert client.post("/predict/batch", json=shifted).status_code == 200
+
+    report = client.get("/drift?window=600").json()
+    assert report["reference"] == {"version": "ref", "n": 300} and report["window_seconds"] == 600
+    assert report["n"] == 150 and report["features"]["AMT_INCOME_TOTAL"]["drift"] is True
+    assert client.get("/drift?window=0").status_code == 422
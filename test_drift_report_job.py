@@ -0,0 +1,141 @@
+# test_drift_report_job.py
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import drift_report_job
+from API_Fastapi import EVENT_SCHEMAS
+from event_store import EventStore
+
+NOW = datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.fixture
+def reference_csv(tmp_path, synthetic, write_reference):
+    #CSV de référence et cible (positive_rate de défauts, placés en tête de fichier)
+    def write(n: int = 600, positive_rate: float = 0.1):
+        return write_reference(tmp_path, synthetic(n, seed=1), (np.arange(n) < n * positive_rate).astype(float))
+    return write
+
+
+def write_predictions(events_dir, records, start: datetime, step=timedelta(seconds=10)):
+    #Événements "prediction" tels que les écrit l'API
+    store = EventStore(str(events_dir))
+    for schema in EVENT_SCHEMAS:
+        store.register(schema)
+    store.append_entries([
+        {"timestamp": (start + i * step).isoformat(), "event": "prediction", "request_id": f"req-{i}",
+         "input_data": record, "prediction": "Défaillant" if i % 4 == 0 else "Solvable",
+         "probabilité_defaut": 0.3, "model_version": "test"}
+        for i, record in enumerate(records)
+    ])
+
+# ============================================================
+# Tests des échantillons et des tests par champ
+# ============================================================
+
+def test_stratified_sample_keeps_target_share(tmp_path, reference_csv): #Allocation proportionnelle par strate, tirage reproductible
+    input_path, target_path = reference_csv(n=600, positive_rate=0.1)
+    sample, totals, allocation = drift_report_job.stratified_sample(input_path, target_path, size=50, chunk_size=128)
+    assert totals == {"1.0": 60, "0.0": 540} and allocation == {"1.0": 5, "0.0": 45}
+    assert len(sample) == 50 and (sample["TARGET"] == 1).sum() == 5
+
+    # Les lignes tirées sont celles du fichier, à leur position d'origine
+    full = pd.read_csv(input_path)
+    assert np.array_equal(full.loc[sample.index, "AMT_CREDIT"].to_numpy(), sample["AMT_CREDIT"].to_numpy())
+    again, _, _ = drift_report_job.stratified_sample(input_path, target_path, size=50, chunk_size=600)
+    assert list(again.index) == list(sample.index)
+
+    assert drift_report_job.proportional_allocation({"a": 1, "b": 1, "c": 1}, 2) in ({"a": 1, "b": 1, "c": 0},
+                                                                                    {"a": 1, "b": 0, "c": 1},
+                                                                                    {"a": 0, "b": 1, "c": 1})
+
+# ==============================================================================================
+
+def test_scipy_fallback_methods_and_parallel_pool(synthetic): #Repli scipy : tests statistiques en petit échantillon, distances au-delà
+    rng = np.random.default_rng(0)
+    small = drift_report_job.feature_drift(("x", "numeric", rng.normal(0, 1, 500), rng.normal(1, 1, 500)))
+    assert small["method"] == "ks" and small["drift"] is True
+    large = drift_report_job.feature_drift(("x", "numeric", rng.normal(0, 1, 5000), rng.normal(0, 1, 800)))
+    assert large["method"] == "wasserstein" and large["drift"] is False and large["psi"] < 0.1
+
+    ref = np.array(["a"] * 3000 + ["b"] * 2000, dtype=object)
+    assert drift_report_job.feature_drift(("c", "categorical", ref, ref[:1000]))["method"] == "jensenshannon"
+    shifted = drift_report_job.feature_drift(("c", "categorical", ref[::10], np.array(["b"] * 300, dtype=object)))
+    assert shifted["method"] == "chisquare" and shifted["drift"] is True
+
+    reference = pd.DataFrame(synthetic(300, seed=2))
+    current = pd.DataFrame(synthetic(200, seed=3)).assign(AMT_CREDIT=lambda df: df["AMT_CREDIT"] * 3)
+    local, parts = drift_report_job.compute_drift(reference, current, workers=0, engine="scipy")
+    assert parts == [] and drift_report_job.compute_drift(reference, current, workers=1, engine="scipy")[0] == local
+    assert {f["feature"]: f["drift"] for f in local}["AMT_CREDIT"] is True
+
+# ==============================================================================================
+
+def test_evidently_report_split_across_pool(synthetic): #Un rapport DataDriftPreset par sous-ensemble de colonnes ; mêmes résultats qu'en un seul
+    pytest.importorskip("evidently")
+    reference = pd.DataFrame(synthetic(300, seed=2))
+    current = pd.DataFrame(synthetic(200, seed=3)).assign(AMT_CREDIT=lambda df: df["AMT_CREDIT"] * 3)
+    reference["TARGET"], current["TARGET"] = (np.arange(300) < 30).astype(float), np.arange(200) % 4 == 0
+
+    single, single_parts = drift_report_job.compute_drift(reference, current, workers=0, engine="evidently")
+    split, split_parts = drift_report_job.compute_drift(reference, current, workers=2, engine="evidently")
+    assert len(single_parts) == 1 and len(split_parts) == 2
+    # Scores égaux à l'arrondi près (ordre des catégories dans les sommes du khi-deux)
+    results = {f["feature"]: f for f in single}
+    for entry in split:
+        assert entry == {**results[entry["feature"]], "score": pytest.approx(results[entry["feature"]]["score"])}
+    assert results["AMT_CREDIT"]["method"] == "K-S p_value" and results["AMT_CREDIT"]["drift"] is True
+    assert results["TARGET"]["drift"] is True and results["CODE_GENDER"]["kind"] == "categorical"
+
+    # Rapports partiels réunis : une ligne par champ testé dans le tableau, compteurs sur tous les champs
+    tested = [f for f in split if f["drift"] is not None]
+    summary = {"n_features": len(tested), "n_drifted": sum(f["drift"] for f in tested), "dataset_drift": False,
+               "share_drifted": round(sum(f["drift"] for f in tested) / len(tested), 4)}
+    snapshot = drift_report_job.merge_snapshots(split_parts, summary)
+    merged = json.loads(snapshot.dumps())
+    table = [w for w in merged["widgets"] if w["type"] == "big_table"]
+    assert len(table) == 1 and len(table[0]["params"]["data"]) == len(tested)
+    assert sum(m["config"]["type"].endswith("ValueDrift") for m in snapshot.dict()["metrics"]) == len(tested)
+
+# ============================================================
+# Tests du job (cache et régénération)
+# ============================================================
+
+def test_job_regenerates_only_when_inputs_change(tmp_path, synthetic, reference_csv): #Rapport réécrit seulement si la fenêtre ou les données changent
+    input_path, target_path = reference_csv()
+    events_dir, reports_dir = tmp_path / "events", str(tmp_path / "reports")
+    write_predictions(events_dir, synthetic(300, seed=4), datetime(2025, 3, 1, 11, 5))
+
+    def run(now=NOW):
+        return drift_report_job.run_job(input_path, target_path, str(events_dir), reports_dir, window_hours=1,
+                                        align_minutes=60, reference_size=200, max_rows=120, workers=0, now=now,
+                                        progress=None)
+
+    first = run()
+    assert first["status"] == "generated" and first["current_rows"] == 120 and first["reference"]["sample_rows"] == 200
+    assert first["window"] == {"since": "2025-03-01T11:00:00", "until": "2025-03-01T12:00:00"}
+    html_path = os.path.join(reports_dir, "drift_report.html")
+    mtime = os.stat(html_path).st_mtime_ns
+    with open(os.path.join(reports_dir, "drift_summary.json"), encoding="utf-8") as f:
+        assert json.load(f)["cache_key"] == first["cache_key"]
+
+    # Même fenêtre alignée, mêmes données : rien n'est recalculé ni réécrit
+    again = run(NOW + 600)
+    assert again["status"] == "unchanged" and os.stat(html_path).st_mtime_ns == mtime
+
+    # Nouvelle fenêtre avec une dérive nette, puis retour à la première : relue depuis le cache
+    shifted = [{**r, "AMT_CREDIT": r["AMT_CREDIT"] * 5, "AMT_INCOME_TOTAL": r["AMT_INCOME_TOTAL"] * 5}
+               for r in synthetic(100, seed=5)]
+    write_predictions(events_dir, shifted, datetime(2025, 3, 1, 12, 10))
+    later = run(NOW + 3600)
+    assert later["status"] == "generated" and {"AMT_CREDIT", "AMT_INCOME_TOTAL"} <= set(later["drifted_features"])
+    back = run()
+    assert back["status"] == "cached" and back["cache_key"] == first["cache_key"]
+    assert "AMT_CREDIT" in open(html_path, encoding="utf-8").read()
+
+    assert run(NOW + 10 * 3600)["status"] == "empty"
@@ -0,0 +1,155 @@
+# test_event_store.py
+import logging
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from event_store import INDEX_DTYPE, EventSchema, EventStore
+from log_writer import BatchingRotatingFileHandler, QueuedLogWriter
+
+SCHEMA = EventSchema("http_request", [
+    ("request_id", "str", 36), ("path", "str", 64), ("status_code", "int"), ("duration", "float"),
+    ("prediction", "category", ["Solvable", "Défaillant"]),
+])
+
+
+def make_entries(start, n, step=timedelta(hours=1)):
+    return [
+        {"timestamp": (start + i * step).isoformat(), "event": "http_request", "request_id": f"req-{i}",
+         "path": "/predict", "status_code": 200 + i % 2, "duration": i / 10,
+         "prediction": "Défaillant" if i % 3 == 0 else "Solvable"}
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / "events"))
+    store.register(SCHEMA)
+    return store
+
+# ============================================================
+# Tests de l'event store
+# ============================================================
+
+def test_roundtrip_partitioned_by_day(store): #Écriture par lots sur plusieurs jours puis relecture typée
+    entries = make_entries(datetime(2025, 1, 1), 72)
+    for i in range(0, 72, 10):
+        store.append_entries(entries[i:i + 10] + [{"event": "autre"}])
+
+    assert sorted(os.listdir(os.path.join(store.root, "http_request"))) == [
+        "2025-01-01.bin", "2025-01-01.idx", "2025-01-02.bin", "2025-01-02.idx",
+        "2025-01-03.bin", "2025-01-03.idx", "append.lock", "schema.json"]
+
+    frame = store.read_frame("http_request")
+    assert len(frame) == 72
+    assert frame["request_id"].tolist() == [e["request_id"] for e in entries]
+    assert frame["prediction"].tolist() == [e["prediction"] for e in entries]
+    assert frame["status_code"].dtype == np.int64
+    assert frame["timestamp"].iloc[5] == datetime(2025, 1, 1, 5)
+
+# ==============================================================================================
+
+def test_window_reads_only_requested_range(store): #Seule la fenêtre demandée est retournée
+    store.append_entries(make_entries(datetime(2025, 1, 1), 72))
+    since, until = datetime(2025, 1, 2, 6), datetime(2025, 1, 2, 8)
+    records = store.read("http_request", since=since, until=until)
+    assert [r.decode() for r in records["request_id"]] == ["req-30", "req-31", "req-32"]
+    assert len(store.read("http_request", since=datetime(2030, 1, 1))) == 0
+
+# ==============================================================================================
+
+def test_sampled_read_is_bounded(store): #Au plus max_rows lignes tirées dans la fenêtre, tirage reproductible
+    entries = make_entries(datetime(2025, 1, 1), 200, step=timedelta(minutes=30))
+    for i in range(0, 200, 7):
+        store.append_entries(entries[i:i + 7])
+    since, until = datetime(2025, 1, 1, 12), datetime(2025, 1, 3, 12)
+
+    window = store.read("http_request", since=since, until=until)
+    sample = store.read("http_request", since=since, until=until, max_rows=20, seed=1)
+    assert 0 < len(sample) <= 20 and set(sample["request_id"]) <= set(window["request_id"])
+    assert np.all(np.diff(sample["ts"]) > 0)
+    assert np.array_equal(sample, store.read("http_request", since=since, until=until, max_rows=20, seed=1))
+    assert np.array_equal(store.read("http_request", since=since, until=until, max_rows=1000), window)
+    assert len(store.read_frame("http_request", max_rows=15)) == 15
+
+# ==============================================================================================
+
+def test_interrupted_write_is_truncated(store): #Données non indexées ignorées puis tronquées
+    store.append_entries(make_entries(datetime(2025, 1, 1), 5))
+    data_path = os.path.join(store.root, "http_request", "2025-01-01.bin")
+    with open(data_path, "ab") as f:
+        f.write(b"\x00" * 17)
+
+    reopened = EventStore(store.root)
+    reopened.register(SCHEMA)
+    assert len(reopened.read("http_request")) == 5
+    reopened.append_entries(make_entries(datetime(2025, 1, 1, 12), 2))
+    assert len(reopened.read("http_request")) == 7
+    assert os.path.getsize(data_path) == 7 * SCHEMA.dtype.itemsize
+
+# ==============================================================================================
+
+def test_schema_change_keeps_history_readable(store): #Ancien dossier archivé, toujours relu et converti dans le nouveau schéma
+    store.append_entries(make_entries(datetime(2025, 1, 1), 3))
+    store.register(EventSchema("http_request", [
+        ("request_id", "str", 36), ("model_version", "str", 16), ("duration", "int"),
+        ("prediction", "category", ["Défaillant", "Solvable"]),
+    ]))
+    assert store.events() == ["http_request"] and len(store.archives("http_request")) == 1
+
+    store.append_entries([{**make_entries(datetime(2025, 1, 2), 1)[0], "request_id": "new", "model_version": "v2"}])
+    frame = store.read_frame("http_request")
+    assert list(frame["request_id"]) == ["req-0", "req-1", "req-2", "new"]
+    assert list(frame["model_version"]) == ["", "", "", "v2"]
+    assert list(frame["prediction"]) == ["Défaillant", "Solvable", "Solvable", "Défaillant"]
+    assert list(frame["duration"]) == [0, 0, 0, 0]  # float -> int
+    assert len(store.read("http_request", since=datetime(2025, 1, 2))) == 1
+
+
+def _append_from_process(root, start_hour):
+    store = EventStore(root)
+    store.register(SCHEMA)
+    for i in range(20):
+        store.append_entries(make_entries(datetime(2025, 1, 1, start_hour) + timedelta(seconds=i), 5,
+                                          step=timedelta(milliseconds=1)))
+
+
+def test_concurrent_processes_keep_index_consistent(tmp_path): #Ajouts de plusieurs processus : index et données alignés
+    import multiprocessing
+
+    root = str(tmp_path / "events")
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_append_from_process, args=(root, hour)) for hour in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+    assert all(process.exitcode == 0 for process in processes)
+
+    store = EventStore(root)
+    store.register(SCHEMA)
+    records = store.read("http_request")
+    assert len(records) == 3 * 20 * 5 and len(store.archives("http_request")) == 0
+    index = np.fromfile(os.path.join(root, "http_request", "2025-01-01.idx"), dtype=INDEX_DTYPE)
+    assert np.array_equal(index["offset"], np.cumsum([0] + list(index["n"][:-1])) * SCHEMA.dtype.itemsize)
+
+# ==============================================================================================
+
+def test_log_writer_sink(tmp_path, store): #Les entrées structurées du logger alimentent l'event store
+    writer = QueuedLogWriter(BatchingRotatingFileHandler(tmp_path / "api.log"))
+    writer.add_sink(store.append_entries)
+    logger = logging.getLogger("test_event_sink")
+    logger.handlers = [writer]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    for entry in make_entries(datetime(2025, 1, 1), 3):
+        logger.info(entry)
+    logger.info("message texte")
+    writer.stop()
+
+    assert len(store.read("http_request")) == 3
+    assert writer.stats()["sink_errors"] == 0
@@ -0,0 +1,109 @@
+# test_inference_pool.py
+import os
+import signal
+import time
+from concurrent.futures import Future
+from unittest.mock import patch
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from inference_pool import InferencePool, WorkerDiedError
+from sample_data import load_samples
+from scoring import ModelScorer
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    return ModelScorer(joblib.load("model.pkl"))
+
+
+@pytest.fixture(scope="module")
+def pool(scorer):
+    pool = InferencePool("model.pkl", n_features=scorer.encoder.n_features, n_workers=2, n_slots=4, rows_per_slot=4)
+    yield pool
+    pool.close()
+
+# ============================================================
+# Tests du pool de processus d'inférence
+# ============================================================
+
+def test_pool_matches_in_process_scoring(scorer, pool): #Mêmes probabilités que le scoring dans le processus
+    X = scorer.encoder.transform_frame(pd.DataFrame(load_samples()))
+    expected = scorer.classifier.predict_proba(X)[:, 1]
+
+    np.testing.assert_array_equal(pool.predict_proba(X[:1]), expected[:1])
+    # Lot plus grand qu'un slot : découpé sur plusieurs slots / workers
+    np.testing.assert_array_equal(pool.predict_proba(X), expected)
+
+# ==============================================================================================
+
+def test_pool_concurrent_submissions(scorer, pool): #Plus de requêtes que de slots : contre-pression sans perte
+    X = scorer.encoder.transform_frame(pd.DataFrame(load_samples()))
+    futures = [pool.submit(X[i % len(X):i % len(X) + 1]) for i in range(20)]
+    results = [f.result(timeout=30)[0] for f in futures]
+
+    expected = scorer.classifier.predict_proba(X)[:, 1]
+    assert results == [expected[i % len(X)] for i in range(20)]
+
+# ==============================================================================================
+
+def test_chunks_share_one_deadline(scorer, pool): #Lot découpé : l'attente des slots est bornée pour tout le lot
+    X = scorer.encoder.transform_frame(pd.DataFrame(load_samples()))[:3].repeat(4, axis=0)
+    timeouts = []
+
+    def slow_chunk(chunk, timeout=None):
+        timeouts.append(timeout)
+        time.sleep(0.1)  # slot libéré lentement
+        future = Future()
+        future.set_result(np.zeros(len(chunk)))
+        return future
+
+    with patch.object(pool, "_submit_chunk", slow_chunk):
+        assert len(pool.submit(X, timeout=1.0).result(timeout=5)) == len(X)
+    assert len(timeouts) == 3 and timeouts[0] <= 1.0
+    assert timeouts[1] <= 0.9 and timeouts[2] <= 0.8
+
+# ==============================================================================================
+
+def test_dead_worker_fails_pending_and_restarts(scorer): #Worker tué : requêtes en cours en erreur, worker redémarré ; attente bornée
+    X = scorer.encoder.transform_frame(pd.DataFrame(load_samples()))
+    expected = scorer.classifier.predict_proba(X)[:, 1]
+    pool = InferencePool("model.pkl", n_features=scorer.encoder.n_features, n_workers=1, n_slots=2, rows_per_slot=4)
+    try:
+        worker = pool._workers[0]
+        os.kill(worker.pid, signal.SIGSTOP)  # worker figé : la requête reste en attente
+        with pytest.raises(TimeoutError):
+            pool.predict_proba(X[:1], timeout=0.5)
+        pending = pool.submit(X[:1])
+        os.kill(worker.pid, signal.SIGKILL)
+        with pytest.raises(WorkerDiedError):
+            pending.result(timeout=30)
+
+        # Worker redémarré, slots rendus à l'anneau : le pool score de nouveau
+        np.testing.assert_array_equal(pool.predict_proba(X, timeout=60), expected)
+        assert pool.restarts == 1 and pool._free_slots.qsize() == pool.n_slots
+    finally:
+        pool.close()
+
+# ==============================================================================================
+
+def test_predict_through_pool(scorer): #L'API score via le pool quand INFERENCE_POOL_WORKERS > 0
+    from unittest.mock import patch
+    from fastapi.testclient import TestClient
+    import API_Fastapi
+
+    sample = load_samples()[0]
+    expected = round(float(scorer.predict(pd.DataFrame([sample]))[1][0]), 4)
+    with patch('API_Fastapi.INFERENCE_POOL_WORKERS', 1):
+        try:
+            response = TestClient(API_Fastapi.app).post("/predict", json=sample)
+            assert API_Fastapi._inference_pool is not None
+        finally:
+            if API_Fastapi._inference_pool is not None:
+                API_Fastapi._inference_pool.close()
+                API_Fastapi._inference_pool = None
+    assert response.status_code == 200
+    assert response.json()["probabilité_defaut"] == expected
@@ -3,6 +3,7 @@ import pytest
 from fastapi.testclient import TestClient
 import joblib
 import pandas as pd
+import json
 from API_Fastapi import app, ClientData
 
 client = TestClient(app)
@@ -240,3 +241,47 @@ def test_response_format(sample_client_data): #Test du format de réponse
         assert 0 <= data["probabilité_defaut"] <= 1
 
 
+
+# ==============================================================================
+
+def test_batch_prediction(sample_client_data, different_client_data): #Test de la prédiction par lot
+
+    invalid_data = dict(sample_client_data, CODE_GENDER="Z")  # Enum invalide
+    batch = [sample_client_data, invalid_data, different_client_data]
+
+    response = client.post("/predict/batch", json=batch)
+    assert response.status_code in [200, 500]
+
+    if response.status_code == 200:
+        data = response.json()
+        assert data["n_items"] == 3
+        assert data["n_errors"] == 1
+
+        # L'ordre des entrées est conservé et les erreurs sont rapportées par élément
+        results = data["results"]
+        assert [r["index"] for r in results] == [0, 1, 2]
+        assert results[1]["error"][0]["loc"] == ["CODE_GENDER"]
+
+        # Mêmes résultats que la route unitaire /predict
+        for index, payload in [(0, sample_client_data), (2, different_client_data)]:
+            single = client.post("/predict", json=payload).json()
+            assert results[index]["prediction"] == single["prediction"]
+            assert results[index]["probabilité_defaut"] == single["probabilité_defaut"]
+
+# ==============================================================================
+
+def test_logs_tail_filtered(sample_client_data): #Lecture filtrée des derniers logs
+
+    response = client.post("/predict", json=sample_client_data)
+    request_id_lines = client.get("/logs", params={"event": "http_request", "tail": 1})
+    assert request_id_lines.status_code == 200
+
+    entry = json.loads(request_id_lines.text.strip().split(" - ", 2)[-1])
+    assert entry["event"] == "http_request"
+    assert entry["path"] == "/predict"
+    assert entry["status_code"] == response.status_code
+
+    page = client.get("/logs", params={"limit": 5})
+    assert page.status_code == 200
+    assert "X-Next-Cursor" in page.headers
+    assert client.get("/logs", params={"cursor": "invalide"}).status_code == 400
@@ -0,0 +1,77 @@
+# test_json_codec.py
+import json
+from enum import Enum
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import API_Fastapi
+import json_codec
+from API_Fastapi import ClientData
+from sample_data import load_samples
+
+
+class Color(str, Enum):
+    RED = "rouge"
+
+
+def reference_app():
+    #Application FastAPI standard (décodage json, JSONResponse) : référence des erreurs 422
+    app = FastAPI()
+
+    @app.post("/predict")
+    def predict(client: ClientData):
+        return {}
+
+    return app
+
+# ============================================================
+# Tests de l'encodage / décodage JSON
+# ============================================================
+
+def test_dumps_and_loads(): #Types numpy et Enum sérialisés ; décodage identique au module standard
+    entry = {"p": np.float32(0.25), "y": np.int8(1), "color": Color.RED, "texte": "défaillant", "when": object}
+    decoded = json_codec.loads(json_codec.dumps(entry))
+    assert decoded["p"] == 0.25 and decoded["y"] == 1 and decoded["color"] == "rouge"
+    assert decoded["texte"] == "défaillant" and decoded["when"] == str(object)
+    assert json_codec.loads(json_codec.dumps_bytes([1, 2])) == [1, 2]
+
+    # Cas refusés par orjson mais acceptés par json : même résultat
+    assert np.isnan(json_codec.loads('{"x": NaN}')["x"])
+    with pytest.raises(json.JSONDecodeError):
+        json_codec.loads(b'{"x": ')
+
+# ==============================================================================================
+
+@pytest.mark.parametrize("body", [
+    json.dumps({**load_samples()[0], "AMT_CREDIT": "beaucoup"}),
+    json.dumps({**load_samples()[0], "CODE_GENDER": "Z"}),
+    json.dumps({k: v for k, v in load_samples()[0].items() if k != "AMT_CREDIT"}),
+    json.dumps([load_samples()[0]]),
+    '{"AMT_CREDIT": ',
+])
+def test_validation_errors_unchanged(body): #Mêmes erreurs 422 que FastAPI avec le module json standard
+    headers = {"Content-Type": "application/json"}
+    expected = TestClient(reference_app()).post("/predict", content=body, headers=headers)
+    response = TestClient(API_Fastapi.app).post("/predict", content=body, headers=headers)
+    assert response.status_code == expected.status_code == 422
+    assert response.json() == expected.json()
+
+# ==============================================================================================
+
+def test_single_model_dump_per_prediction(monkeypatch): #Un seul dump du client par requête /predict
+    calls = []
+    original = ClientData.model_dump
+
+    def counting_dump(self, *args, **kwargs):
+        calls.append(kwargs.get("mode"))
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(ClientData, "model_dump", counting_dump)
+    API_Fastapi.prediction_cache.clear()
+    response = TestClient(API_Fastapi.app).post("/predict", json=load_samples()[4])
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert calls == ["json"]
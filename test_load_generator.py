@@ -0,0 +1,118 @@
+# test_load_generator.py
+import asyncio
+import json
+import time
+
+import httpx
+import numpy as np
+import pytest
+from fastapi import Body, FastAPI
+
+from API_Fastapi import ClientData
+from load_generator import (LatencyHistogram, SamplePayloads, SyntheticPayloads, max_sustainable, run_closed_loop,
+                            run_load_test, run_open_loop, write_report)
+
+
+def stalling_app(stall_on: int, stall_s: float):
+    #Application minimale : la requête n° stall_on bloque la boucle d'événements (comme un GC ou un verrou)
+    app = FastAPI()
+    calls = {"n": 0}
+
+    @app.post("/predict")
+    async def predict(payload: dict = Body(...)):
+        calls["n"] += 1
+        if calls["n"] == stall_on:
+            time.sleep(stall_s)
+        return {"prediction": "Solvable"}
+
+    @app.post("/predict/batch")
+    async def predict_batch(payload: list = Body(...)):
+        return {"n": len(payload)}
+
+    @app.post("/broken")
+    async def broken(payload: dict = Body(...)):
+        raise RuntimeError("erreur serveur")
+
+    return app
+
+
+def asgi_client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://test")
+
+# ============================================================
+# Tests du générateur de charge
+# ============================================================
+
+def test_histogram_percentiles(): #Percentiles à 1 % près en mémoire bornée
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(2, 1, 20_000)
+    histogram = LatencyHistogram()
+    for v in values:
+        histogram.record(float(v))
+
+    for q in (50, 90, 99, 99.9):
+        assert histogram.percentile(q) == pytest.approx(np.percentile(values, q), rel=0.02)
+    assert len(histogram.counts) < 1500
+    assert histogram.summary()["max_ms"] == values.max()
+
+# ==============================================================================================
+
+def test_synthetic_payloads_are_valid_and_distinct(): #Clients synthétiques valides et tous différents
+    payloads = SyntheticPayloads(seed=1)
+    generated = [payloads.next() for _ in range(200)]
+
+    for payload in generated:
+        ClientData(**payload)
+    assert len({json.dumps(p, sort_keys=True) for p in generated}) == 200
+    assert SamplePayloads().next() == SamplePayloads().samples[0]
+
+# ==============================================================================================
+
+def test_open_loop_counts_stalled_requests(): #Boucle ouverte : un blocage pénalise toutes les requêtes planifiées pendant ce temps
+    async def scenario():
+        async with asgi_client(stalling_app(stall_on=5, stall_s=0.3)) as client:
+            return await run_open_loop(client, "/predict", SamplePayloads(), rate=100, duration=1.0)
+
+    summary = asyncio.run(scenario()).summary()
+    assert summary["scheduled"] == 100 and summary["ok"] == 100
+    histogram = dict(summary["latency_histogram"])
+    delayed = sum(count for upper, count in histogram.items() if upper > 100)
+    # Sans correction, un seul échantillon lent ; ici les ~30 requêtes dues pendant le blocage
+    assert delayed >= 10
+    assert summary["latency"]["p99_ms"] >= 250
+    assert summary["service_time"]["p50_ms"] < summary["latency"]["p99_ms"]
+
+# ==============================================================================================
+
+def test_closed_loop_errors_and_report(tmp_path): #Boucle fermée, erreurs par code et rapport écrit
+    async def scenario():
+        async with asgi_client(stalling_app(stall_on=-1, stall_s=0)) as client:
+            return await run_closed_loop(client, "/broken", SamplePayloads(), concurrency=2, duration=0.2)
+
+    summary = asyncio.run(scenario()).summary()
+    assert summary["ok"] == 0 and summary["error_rate"] == 1.0
+    assert set(summary["errors"]) == {"500"}
+
+    report = asyncio.run(run_load_test("http://test", ["/predict", "/predict/batch"], "open", [20, 40], 0.3,
+                                       SamplePayloads(), batch_size=10,
+                                       transport=httpx.ASGITransport(app=stalling_app(-1, 0))))
+    batch = report["routes"]["/predict/batch"]
+    assert [p["level"] for p in batch["saturation_curve"]] == [20, 40]
+    assert batch["steps"][0]["rows_per_request"] == 10
+    assert batch["max_sustainable_rps"] is not None
+
+    json_path, md_path = write_report(report, str(tmp_path / "load"))
+    assert json.loads(open(json_path, encoding="utf-8").read())["mode"] == "open"
+    assert "| RPS visé |" in open(md_path, encoding="utf-8").read()
+
+# ==============================================================================================
+
+def test_max_sustainable_stops_at_first_failing_step(): #Le débit tenu s'arrête au premier palier hors SLO
+    def step(target, achieved, p99, errors=0.0):
+        return {"mode": "open", "target_rps": target, "achieved_rps": achieved, "error_rate": errors,
+                "latency": {"p99_ms": p99}}
+
+    steps = [step(10, 10, 20), step(50, 49, 80), step(100, 70, 90), step(200, 200, 50)]
+    assert max_sustainable(steps, slo_p99_ms=100) == 49
+    assert max_sustainable(steps[:2], slo_p99_ms=50) == 10
+    assert max_sustainable([step(10, 10, 20, errors=0.5)], slo_p99_ms=100) is None
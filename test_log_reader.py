@@ -0,0 +1,126 @@
+# test_log_reader.py
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+import pytest
+
+import log_reader
+from log_reader import LogFilter
+
+
+@pytest.fixture
+def rotated_log(tmp_path): #Log réparti sur plusieurs fichiers par le RotatingFileHandler
+    path = str(tmp_path / "api_logger.log")
+    handler = RotatingFileHandler(path, maxBytes=2000, backupCount=5)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logger = logging.getLogger(f"test_reader_{tmp_path.name}")
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    for i in range(60):
+        event = "prediction" if i % 2 else "http_request"
+        logger.info(json.dumps({"event": event, "request_id": f"req-{i}", "i": i}))
+    handler.close()
+    return path
+
+
+def entries(lines):
+    return [log_reader.parse_entry(line)["i"] for line in lines]
+
+# ============================================================
+# Tests de la lecture des logs
+# ============================================================
+
+def test_log_files_order(rotated_log): #Du plus ancien au plus récent
+    files = log_reader.log_files(rotated_log)
+    assert len(files) > 2
+    assert files[-1] == rotated_log
+    assert files[0].endswith(f".{len(files) - 1}")
+
+# ==============================================================================================
+
+def test_pages_span_rotated_files(rotated_log): #La pagination traverse les sauvegardes sans perte ni doublon
+    first_available = entries(log_reader.read_page(rotated_log, limit=1)[0])[0]
+    seen, cursor = [], None
+    while True:
+        lines, cursor = log_reader.read_page(rotated_log, cursor, limit=7)
+        seen.extend(entries(lines))
+        if len(lines) < 7:
+            break
+    assert seen == list(range(first_available, 60))
+
+# ==============================================================================================
+
+def test_tail_and_filters(rotated_log): #tail=N, filtre par événement et par request_id
+    assert entries(log_reader.tail(rotated_log, 3)) == [57, 58, 59]
+    assert entries(log_reader.tail(rotated_log, 3, LogFilter(event="prediction"))) == [55, 57, 59]
+    assert entries(log_reader.tail(rotated_log, 5, LogFilter(request_id="req-42"))) == [42]
+
+    lines, _ = log_reader.read_page(rotated_log, limit=100, flt=LogFilter(until=datetime(2000, 1, 1)))
+    assert lines == []
+
+# ==============================================================================================
+
+def test_filter_request_id_exact_and_aware_bounds(monkeypatch): #request_id comparé à l'entrée ; bornes UTC converties en heure locale
+    line = '2025-03-01 13:00:00,000 - INFO - {"event": "prediction", "request_id": "req-1"}\n'
+    assert LogFilter(request_id="req-1").match(line)
+    assert not LogFilter(request_id="req-").match(line)
+    assert not LogFilter(request_id="req-1").match("2025-03-01 13:00:00,000 - WARNING - Erreur - Request ID: req-1\n")
+    assert not LogFilter(event="prediction", request_id="req-2").match(line)
+
+    monkeypatch.setenv("TZ", "Europe/Paris")  # UTC+1 en mars
+    time.tzset()
+    try:
+        assert LogFilter(since=datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)).match(line)
+        assert not LogFilter(since=datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc)).match(line)
+        assert LogFilter(since=datetime(2025, 3, 1, 13, 0)).match(line)  # date naïve : heure locale
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+# ==============================================================================================
+
+def test_invalid_cursor(rotated_log):
+    with pytest.raises(ValueError):
+        log_reader.read_page(rotated_log, cursor="pas-un-curseur")
+
+# ==============================================================================================
+
+def test_incremental_reader_across_rollover(tmp_path): #Seules les nouvelles lignes sont lues, y compris après rotation
+    path = str(tmp_path / "api_logger.log")
+    handler = RotatingFileHandler(path, maxBytes=500, backupCount=5)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logger = logging.getLogger(f"test_incremental_{tmp_path.name}")
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    reader = log_reader.IncrementalLogReader(path)
+    logger.info(json.dumps({"event": "prediction", "i": 0}))
+    logger.info("message texte")
+    assert reader.refresh() == 1
+
+    for i in range(1, 20):
+        logger.info(json.dumps({"event": "prediction", "i": i}))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('2025-01-01 00:00:00,000 - INFO - {"event": "prediction", "i": 20}')  # ligne incomplète
+    assert len(log_reader.log_files(path)) > 1
+    assert reader.refresh() == 19
+    assert reader.frame("prediction")["i"].tolist() == list(range(20))
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n")
+    assert reader.refresh() == 1
+    assert reader.frame("prediction")["i"].tolist() == list(range(21))
+    assert reader.frame("http_request").empty
+
+    # Fenêtre bornée : seules les max_rows entrées les plus récentes restent en mémoire
+    reader.max_rows = 15
+    for i in range(21, 25):
+        logger.info(json.dumps({"event": "prediction", "i": i}))
+    assert reader.refresh() == 4
+    assert reader.frame("prediction")["i"].tolist() == list(range(10, 25))
+    handler.close()
@@ -0,0 +1,112 @@
+# test_log_writer.py
+import json
+import logging
+import threading
+
+import pytest
+
+from log_writer import BatchingRotatingFileHandler, QueuedLogWriter
+
+
+class BlockingHandler(BatchingRotatingFileHandler): #Handler dont l'écriture attend un signal
+    def __init__(self, path):
+        super().__init__(path)
+        self.gate = threading.Event()
+
+    def emit_batch(self, records):
+        self.gate.wait(5)
+        super().emit_batch(records)
+
+
+def make_logger(name, writer):
+    logger = logging.getLogger(name)
+    logger.handlers = [writer]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+# ============================================================
+# Tests de l'écriture non bloquante des logs
+# ============================================================
+
+def test_structured_entries_written_as_json(tmp_path): #Les dicts sont sérialisés par le thread d'écriture
+    handler = BatchingRotatingFileHandler(tmp_path / "api.log")
+    handler.setFormatter(logging.Formatter('%(levelname)s - %(message)s'))
+    writer = QueuedLogWriter(handler)
+    logger = make_logger("test_structured", writer)
+
+    logger.info({"event": "prediction", "probabilité_defaut": 0.42})
+    logger.info("message texte")
+    writer.stop()
+
+    lines = (tmp_path / "api.log").read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0].split(" - ", 1)[1]) == {"event": "prediction", "probabilité_defaut": 0.42}
+    assert lines[1] == "INFO - message texte"
+    assert writer.stats()["written"] == 2
+
+# ==============================================================================================
+
+@pytest.mark.parametrize("policy, counter", [("drop", "dropped"), ("block", "delayed")])
+def test_full_queue_policies(tmp_path, policy, counter): #Comportement quand la file est pleine
+    handler = BlockingHandler(tmp_path / "api.log")
+    writer = QueuedLogWriter(handler, maxsize=2, policy=policy, block_timeout=0.01)
+    logger = make_logger(f"test_{policy}", writer)
+
+    for i in range(10):
+        logger.info({"i": i})
+    handler.gate.set()
+    writer.stop()
+
+    stats = writer.stats()
+    assert stats[counter] > 0
+    assert stats["enqueued"] + stats["dropped"] == 10
+    assert stats["written"] == stats["enqueued"]
+
+# ==============================================================================================
+
+def test_sample_policy_keeps_errors(tmp_path): #Échantillonnage au-delà du seuil, jamais pour les erreurs
+    handler = BlockingHandler(tmp_path / "api.log")
+    writer = QueuedLogWriter(handler, maxsize=10, policy="sample", sample_rate=2, block_timeout=1)
+    logger = make_logger("test_sample", writer)
+
+    for i in range(9):
+        logger.info({"i": i})
+    threading.Timer(0.05, handler.gate.set).start()
+    logger.error("erreur critique")
+    writer.stop()
+
+    stats = writer.stats()
+    assert stats["sampled_out"] > 0
+    assert "erreur critique" in (tmp_path / "api.log").read_text(encoding="utf-8")
+
+# ==============================================================================================
+
+def test_writer_survives_bad_entries_and_write_errors(tmp_path): #Erreurs comptées, le thread continue d'écrire
+    class FailingOnceHandler(BatchingRotatingFileHandler):
+        failures = 1
+
+        def emit_batch(self, records):
+            if self.failures:
+                self.failures -= 1
+                raise OSError("disque plein")
+            super().emit_batch(records)
+
+    writer = QueuedLogWriter(FailingOnceHandler(tmp_path / "api.log"))
+    logger = make_logger("test_errors", writer)
+
+    logger.info({"lost": 1})
+    writer.flush()
+    logger.info({(1, 2): "clé non sérialisable"})
+    logger.info({"ok": 1})
+    writer.stop()
+
+    stats = writer.stats()
+    assert stats["write_errors"] == 1 and stats["serialize_errors"] == 1 and stats["written"] == 1
+    lines = (tmp_path / "api.log").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [{"ok": 1}]
+
+# ==============================================================================================
+
+def test_unknown_policy(tmp_path):
+    with pytest.raises(ValueError):
+        QueuedLogWriter(BatchingRotatingFileHandler(tmp_path / "api.log"), policy="unknown")
@@ -0,0 +1,129 @@
+# test_metrics.py
+import multiprocessing
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+import API_Fastapi
+from metrics import CONTENT_TYPE, MetricsRegistry, clear_directory
+from sample_data import load_samples
+
+
+def sample_value(text: str, sample: str) -> float:
+    #Valeur d'un échantillon du texte Prometheus (0 s'il est absent)
+    for line in text.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def observe_in_child(registry):
+    #Worker issu d'un fork : écrit dans son propre fichier du répertoire partagé
+    registry.families["jobs"].inc(3, queue="a")
+    registry.families["latency_seconds"].observe(0.5)
+
+# ============================================================
+# Tests des métriques Prometheus
+# ============================================================
+
+def test_exposition_format(): #Compteurs suffixés _total, seaux cumulés, somme et nombre
+    registry = MetricsRegistry()
+    jobs = registry.counter("jobs", "Travaux traités", ("queue",))
+    latency = registry.histogram("latency_seconds", "Durée", buckets=(0.1, 1.0))
+    jobs.inc(queue="a")
+    jobs.inc(2, queue='b"c')
+    latency.observe(0.05)
+    latency.observe_many([0.1, 0.5, 7.0])
+
+    text = registry.render()
+    assert "# TYPE jobs_total counter" in text
+    assert "# TYPE latency_seconds histogram" in text
+    assert sample_value(text, 'jobs_total{queue="a"}') == 1
+    assert sample_value(text, 'jobs_total{queue="b\\"c"}') == 2
+    assert [sample_value(text, f'latency_seconds_bucket{{le="{le}"}}') for le in ("0.1", "1.0", "+Inf")] == [2, 3, 4]
+    assert sample_value(text, "latency_seconds_sum") == pytest.approx(7.65)
+    assert sample_value(text, "latency_seconds_count") == 4
+    with pytest.raises(ValueError):
+        registry.counter("jobs", "doublon")
+
+# ==============================================================================================
+
+def test_deferred_observations_aggregated_at_collection(): #Dépôt sans mise à jour des seaux ; agrégé au rendu
+    registry = MetricsRegistry()
+    stages = registry.histogram("stage_seconds", "Durée", ("route", "stage"), buckets=(0.001, 0.01))
+    stages.observe_deferred(("/predict",), {"encode": 0.0005, "inference": 0.002})
+    stages.observe_deferred(("/predict",), {"encode": 0.02})
+    assert registry._values.keys == [] and len(stages._deferred) == 2
+
+    text = registry.render()
+    assert [sample_value(text, f'stage_seconds_bucket{{route="/predict",stage="encode",le="{le}"}}')
+            for le in ("0.001", "0.01", "+Inf")] == [1, 1, 2]
+    assert sample_value(text, 'stage_seconds_count{route="/predict",stage="inference"}') == 1
+    assert sample_value(text, 'stage_seconds_sum{route="/predict",stage="encode"}') == pytest.approx(0.0205)
+    assert not stages._deferred and registry._drainer.is_alive()
+
+# ==============================================================================================
+
+def test_capacity_overflow_is_ignored(): #Au-delà de la capacité, les nouvelles séries sont ignorées sans erreur
+    registry = MetricsRegistry(capacity=3)
+    jobs = registry.counter("jobs", "Travaux traités", ("queue",))
+    for queue in "abcde":
+        jobs.inc(queue=queue)
+    text = registry.render()
+    assert len(re.findall(r"^jobs_total", text, flags=re.M)) == 3
+    assert registry._values.overflow == 2
+
+# ==============================================================================================
+
+def test_shared_directory_aggregates_workers(tmp_path): #La collecte somme les fichiers de tous les processus
+    registry = MetricsRegistry(str(tmp_path))
+    jobs = registry.counter("jobs", "Travaux traités", ("queue",))
+    latency = registry.histogram("latency_seconds", "Durée", buckets=(0.1, 1.0))
+    jobs.inc(queue="a")
+    latency.observe(0.05)
+
+    ctx = multiprocessing.get_context("fork")
+    for _ in range(2):
+        child = ctx.Process(target=observe_in_child, args=(registry,))
+        child.start()
+        child.join(30)
+        assert child.exitcode == 0
+
+    assert len(list(tmp_path.glob("metrics_*.bin"))) == 3
+    text = registry.render()
+    assert sample_value(text, 'jobs_total{queue="a"}') == 7
+    assert sample_value(text, 'latency_seconds_bucket{le="1.0"}') == 3
+    assert sample_value(text, "latency_seconds_count") == 3
+
+    # Redémarrage du service : le répertoire vidé avant les workers ne compte plus l'exécution précédente
+    assert clear_directory(str(tmp_path)) == 6
+    restarted = MetricsRegistry(str(tmp_path))
+    restarted.counter("jobs", "Travaux traités", ("queue",)).inc(queue="a")
+    assert sample_value(restarted.render(), 'jobs_total{queue="a"}') == 1
+
+# ==============================================================================================
+
+def test_metrics_endpoint_after_predictions(): #Requêtes par route, prédictions par classe et probabilités
+    client = TestClient(API_Fastapi.app)
+    samples = load_samples()[:5]
+    before = client.get("/metrics").text
+
+    assert client.post("/predict", json=samples[0]).status_code == 200
+    assert client.post("/predict/batch", json=samples).status_code == 200
+    response = client.get("/metrics")
+    assert response.headers["content-type"] == CONTENT_TYPE
+    text = response.text
+
+    def delta(sample):
+        return sample_value(text, sample) - sample_value(before, sample)
+
+    assert delta('api_http_requests_total{method="POST",route="/predict",status="200"}') == 1
+    assert delta('api_http_request_duration_seconds_count{method="POST",route="/predict/batch"}') == 1
+    assert delta('api_prediction_probability_count{endpoint="predict"}') == 1
+    assert delta('api_prediction_probability_count{endpoint="batch"}') == 5
+    assert sum(delta(f'api_predictions_total{{endpoint="batch",prediction="{label}"}}')
+               for label in ("Solvable", "Défaillant")) == 5
+
+    client.get("/admin/models/inconnue/activate")
+    assert 'route="/admin/models/{version}/activate"' in client.get("/metrics").text
@@ -0,0 +1,151 @@
+# test_micro_batching.py
+import threading
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+import API_Fastapi
+from metrics import MetricsRegistry
+from micro_batching import BATCH_SIZE_BUCKETS, MicroBatchScheduler, SchedulerOverloaded
+from sample_data import load_samples
+
+
+def fake_score(items): #Score factice : la probabilité est la valeur soumise
+    proba = np.array(items, dtype=float)
+    return (proba > 0.5).astype(np.int8), proba
+
+# ============================================================
+# Tests du scheduler
+# ============================================================
+
+def test_each_caller_gets_its_own_row(): #Chaque appelant récupère sa propre ligne
+    batches = []
+
+    def score(items):
+        batches.append(len(items))
+        return fake_score(items)
+
+    scheduler = MicroBatchScheduler(score, max_batch_size=8, max_wait_ms=20)
+    values = [i / 20 for i in range(20)]
+    results = [None] * len(values)
+
+    def call(i):
+        results[i] = scheduler.submit(values[i]).result(timeout=5)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(values))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    scheduler.stop()
+
+    assert [p for _, p in results] == values
+    assert [y for y, _ in results] == [int(v > 0.5) for v in values]
+    assert max(batches) <= 8
+    assert len(batches) < len(values)  # les requêtes concurrentes ont été regroupées
+    assert scheduler.stats()["batch_size"]["count"] == len(batches)
+
+# ==============================================================================================
+
+def test_queue_depth_is_bounded(): #Rejet quand la file est pleine
+    release = threading.Event()
+
+    def slow_score(items):
+        release.wait(5)
+        return fake_score(items)
+
+    scheduler = MicroBatchScheduler(slow_score, max_batch_size=1, max_wait_ms=0, max_queue=1)
+    first = scheduler.submit(0.1)
+    time.sleep(0.05)  # le premier élément est en cours de scoring
+    scheduler.submit(0.2)
+    with pytest.raises(SchedulerOverloaded):
+        scheduler.submit(0.3)
+    release.set()
+    assert first.result(timeout=5)[1] == 0.1
+    scheduler.stop()
+    assert scheduler.stats()["rejected"] == 1
+
+# ==============================================================================================
+
+def test_scoring_error_propagates(): #Une erreur de scoring est transmise à tous les appelants du lot
+    def failing(items):
+        raise ValueError("boom")
+
+    scheduler = MicroBatchScheduler(failing, max_wait_ms=1)
+    with pytest.raises(ValueError):
+        scheduler.submit(0.1).result(timeout=5)
+    scheduler.stop()
+
+# ==============================================================================================
+
+def test_stop_does_not_block_on_full_queue(): #stop() sans attente sur une file pleine ; les éléments restants sont traités
+    release = threading.Event()
+
+    def slow_score(items):
+        release.wait(5)
+        return fake_score(items)
+
+    scheduler = MicroBatchScheduler(slow_score, max_batch_size=1, max_wait_ms=0, max_queue=1)
+    first = scheduler.submit(0.1)
+    time.sleep(0.05)  # le premier élément est en cours de scoring
+    second = scheduler.submit(0.2)  # file pleine
+
+    start = time.perf_counter()
+    scheduler.stop(timeout=0.2)
+    assert time.perf_counter() - start < 1
+    release.set()
+    assert first.result(timeout=5)[1] == 0.1 and second.result(timeout=5)[1] == 0.2
+    scheduler._thread.join(5)
+    assert not scheduler._thread.is_alive()
+    with pytest.raises(SchedulerOverloaded):
+        scheduler.submit(0.3)
+
+def test_batches_grouped_by_context_and_exported(): #Un lot par contexte (scoreur) ; histogrammes reportés dans le registre
+    release, calls = threading.Event(), []
+
+    def score(items, context):
+        release.wait(5)
+        calls.append((context, list(items)))
+        return fake_score([v + context for v in items])
+
+    registry = MetricsRegistry()
+    sizes = registry.histogram("batch_size", "Taille des lots", buckets=BATCH_SIZE_BUCKETS)
+    waits = registry.histogram("queue_wait_seconds", "Attente en file", buckets=[0.001, 0.1])
+    scheduler = MicroBatchScheduler(score, max_batch_size=8, max_wait_ms=50,
+                                    batch_size_metric=sizes, queue_wait_metric=waits)
+    # Contextes alternés : l'ancien scoreur garde ses éléments, le nouveau aussi
+    futures = [scheduler.submit(v, context) for v, context in ((0.1, 0), (0.2, 0), (0.3, 1), (0.4, 0), (0.5, 1))]
+    release.set()
+    results = [f.result(timeout=5)[1] for f in futures]
+    scheduler.stop()
+
+    assert results == pytest.approx([0.1, 0.2, 1.3, 0.4, 1.5])
+    assert calls == [(0, [0.1, 0.2]), (1, [0.3]), (0, [0.4]), (1, [0.5])]
+    text = registry.render()
+    assert "batch_size_count 4" in text and "batch_size_sum 5" in text and "queue_wait_seconds_count 5" in text
+
+# ============================================================
+# Test de l'API avec micro-batching activé
+# ============================================================
+
+@patch('API_Fastapi.MICROBATCH_ENABLED', True)
+def test_predict_with_micro_batching():
+    client = TestClient(API_Fastapi.app)
+    sample = load_samples()[0]
+    API_Fastapi.prediction_cache.clear()  # la requête doit passer par le scheduler, pas par le cache
+    try:
+        expected = API_Fastapi.get_scorer().predict_clients([API_Fastapi.ClientData(**sample)])[1][0]
+        response = client.post("/predict", json=sample)
+        assert response.status_code == 200
+        assert response.json()["probabilité_defaut"] == round(float(expected), 4)
+
+        stats = client.get("/scheduler/stats").json()
+        assert stats["enabled"] is True
+        assert stats["batch_size"]["count"] == 1
+        assert "api_microbatch_queue_wait_seconds_count" in client.get("/metrics").text
+    finally:
+        API_Fastapi.stop_scheduler()
+    assert API_Fastapi._scheduler is None
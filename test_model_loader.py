@@ -0,0 +1,78 @@
+# test_model_loader.py
+import shutil
+import threading
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import API_Fastapi
+import model_loader
+from model_loader import ModelLoader, export_mmap_artifact, load_model
+from sample_data import load_samples
+
+
+class GatedLoader(ModelLoader): #Chargement qui attend un signal
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gate = threading.Event()
+
+    def load(self):
+        self.gate.wait(5)
+        return super().load()
+
+# ============================================================
+# Tests du chargement du modèle
+# ============================================================
+
+def test_mmap_artifact_same_predictions(tmp_path): #L'artefact mappé donne les mêmes prédictions
+    path = str(tmp_path / "model.pkl")
+    shutil.copy("model.pkl", path)
+    reference = load_model(path)
+    artifact = export_mmap_artifact(path)
+
+    assert model_loader.model_source(path) == artifact
+    mapped = load_model(path)
+    X = pd.DataFrame(load_samples())
+    np.testing.assert_array_equal(mapped.predict_proba(X), reference.predict_proba(X))
+    assert model_loader.model_source(path, use_mmap=False) == path
+
+# ==============================================================================================
+
+def test_loader_states(tmp_path): #pending -> loading -> ready, ou failed avec l'erreur
+    loaded = []
+    loader = GatedLoader("model.pkl", on_loaded=loaded.append)
+    assert loader.state == "pending"
+    loader.start()
+    assert loader.state == "loading"
+    loader.gate.set()
+    assert loader.wait(30)
+    assert loader.state == "ready"
+    assert loaded == [loader.model]
+
+    missing = ModelLoader(str(tmp_path / "absent.pkl"))
+    assert missing.load() is None
+    assert missing.state == "failed"
+    assert "absent.pkl" in missing.status()["error"]
+
+# ==============================================================================================
+
+def test_predict_returns_503_while_loading(): #Mode startup : 503 pendant le chargement, puis prédiction
+    client = TestClient(API_Fastapi.app)
+    sample = load_samples()[0]
+    loader = GatedLoader(API_Fastapi.MODEL_PATH, on_loaded=API_Fastapi._install_model)
+    with patch.object(API_Fastapi, "MODEL_LOAD_MODE", "startup"), \
+         patch.object(API_Fastapi, "model_loader", loader), \
+         patch.object(API_Fastapi, "model", None), \
+         patch.object(API_Fastapi, "_loaded_model", None), \
+         patch.object(API_Fastapi, "MODEL_VERSION", None):
+        response = client.post("/predict", json=sample)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert client.get("/model/status").json()["state"] == "loading"
+
+        loader.gate.set()
+        loader.wait(30)
+        assert client.post("/predict", json=sample).status_code == 200
+    assert client.get("/model/status").json()["state"] == "ready"
@@ -0,0 +1,92 @@
+# test_model_registry.py
+import time
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import API_Fastapi
+from model_registry import ModelRegistry
+from sample_data import load_samples
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture
+def registry(tmp_path): #Registre temporaire avec deux versions du même artefact
+    registry = ModelRegistry(str(tmp_path / "models"))
+    registry.register("model.pkl", "v1", "première version")
+    registry.register("model.pkl", "v2", "seconde version")
+    return registry
+
+
+@pytest.fixture
+def api(registry): #API branchée sur le registre temporaire ; l'état du modèle est restauré après le test
+    with ExitStack() as stack:
+        for name, value in [("model_registry", registry), ("ADMIN_TOKEN", "secret")]:
+            stack.enter_context(patch.object(API_Fastapi, name, value))
+        for name in ("model", "_loaded_model", "MODEL_VERSION", "_scorer", "_active_model_path", "model_loader"):
+            stack.enter_context(patch.object(API_Fastapi, name, getattr(API_Fastapi, name)))
+        yield TestClient(API_Fastapi.app)
+
+# ============================================================
+# Tests du registre et du remplacement à chaud du modèle
+# ============================================================
+
+def test_registry_manifest(registry): #Activation, version précédente et retour arrière
+    assert set(registry.versions()) == {"v1", "v2"}
+    assert registry.active_version() is None
+    registry.activate("v1")
+    registry.activate("v2")
+    assert (registry.active_version(), registry.previous_version()) == ("v2", "v1")
+    assert registry.rollback_target() == "v1"
+    with pytest.raises(ValueError):
+        registry.activate("v3")
+    with pytest.raises(ValueError):
+        registry.register("README.md", "v1")
+
+# ==============================================================================================
+
+def test_admin_requires_token(api):
+    assert api.get("/admin/models").status_code == 401
+    assert api.get("/admin/models", headers={"X-Admin-Token": "faux"}).status_code == 401
+    with patch.object(API_Fastapi, "ADMIN_TOKEN", None):
+        assert api.get("/admin/models", headers=ADMIN).status_code == 403
+    assert api.post("/admin/models/v9/activate", headers=ADMIN).status_code == 404
+
+# ==============================================================================================
+
+def test_activate_and_rollback(api, registry): #La version active est indiquée dans la réponse et l'en-tête
+    sample = load_samples()[0]
+    assert api.post("/admin/models/v1/activate?wait=true", headers=ADMIN).status_code == 200
+    assert api.post("/admin/models/v2/activate?wait=true", headers=ADMIN).json()["active_version"] == "v2"
+
+    response = api.post("/predict", json=sample)
+    assert response.json()["model_version"] == "v2"
+    assert response.headers["X-Model-Version"] == "v2"
+    assert registry.active_version() == "v2"
+
+    assert api.post("/admin/models/rollback?wait=true", headers=ADMIN).json()["active_version"] == "v1"
+    assert api.post("/predict/batch", json=[sample]).json()["model_version"] == "v1"
+    status = api.get("/model/status").json()
+    assert status["model_version"] == "v1" and status["state"] == "ready"
+    assert status["source"] == registry.path("v1")
+
+# ==============================================================================================
+
+def test_swap_without_failed_requests(api): #Activation en arrière-plan : aucune requête perdue pendant l'échange
+    sample = load_samples()[0]
+    assert api.post("/admin/models/v1/activate", headers=ADMIN).status_code == 202
+
+    statuses, versions = [], set()
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        response = api.post("/predict", json=sample)
+        statuses.append(response.status_code)
+        versions.add(response.json().get("model_version"))
+        if API_Fastapi._reload_status["state"] != "loading" and "v1" in versions:
+            break
+
+    assert set(statuses) == {200}
+    assert "v1" in versions
@@ -0,0 +1,133 @@
+# test_ndjson_stream.py
+import asyncio
+import json
+import socket
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+import uvicorn
+from fastapi.testclient import TestClient
+
+import API_Fastapi
+import ndjson_stream
+from sample_data import load_samples
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+def ndjson_body(rows, extra_lines=()):
+    #Corps NDJSON : un client par ligne, puis des lignes brutes éventuelles
+    return ("".join(json.dumps(row) + "\n" for row in rows) + "".join(line + "\n" for line in extra_lines)).encode()
+
+
+def in_chunks(body: bytes, size: int):
+    #Corps envoyé en blocs de taille fixe (coupés au milieu des lignes)
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+async def collect(agen):
+    return [item async for item in agen]
+
+
+async def from_list(chunks):
+    for chunk in chunks:
+        yield chunk
+
+# ============================================================
+# Tests du découpage en lignes et en mini-lots
+# ============================================================
+
+def test_iter_lines_and_batches(): #Lignes recollées entre les blocs, lignes vides ignorées, dernière ligne sans saut
+    chunks = [b'{"a"', b': 1}\n\n  \n{"b": 2}\n{"c"', b": 3}"]
+    lines = asyncio.run(collect(ndjson_stream.iter_lines(from_list(chunks), max_line_bytes=100)))
+    assert lines == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+    batches = asyncio.run(collect(ndjson_stream.iter_batches(from_list(lines), 2)))
+    assert batches == [[b'{"a": 1}', b'{"b": 2}'], [b'{"c": 3}']]
+
+    too_long = ndjson_stream.iter_lines(from_list([b"x" * 50, b"x" * 60]), max_line_bytes=100)
+    with pytest.raises(ndjson_stream.LineTooLong):
+        asyncio.run(collect(too_long))
+
+# ============================================================
+# Tests de l'endpoint /predict/stream
+# ============================================================
+
+def test_stream_results_match_batch(): #Mêmes résultats que /predict/batch, dans l'ordre, erreurs ligne par ligne
+    samples = load_samples()
+    invalid = {**samples[1], "CNT_CHILDREN": -1}
+    rows = samples + [invalid]
+    client = TestClient(API_Fastapi.app)
+
+    with patch.object(API_Fastapi, "STREAM_BATCH_SIZE", 3):
+        response = client.post("/predict/stream", content=in_chunks(ndjson_body(rows, ["{pas du json"]), 97),
+                               headers=NDJSON)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = [json.loads(line) for line in response.text.splitlines()]
+
+    expected = client.post("/predict/batch", json=rows).json()["results"]
+    assert results[:-1] == expected
+    assert results[-1]["index"] == len(rows) and results[-1]["error"][0]["type"] == "json_invalid"
+
+# ==============================================================================================
+
+def test_stream_rejects_other_content_types_and_long_lines(): #415 hors NDJSON ; ligne trop longue : dernière ligne en erreur
+    client = TestClient(API_Fastapi.app)
+    assert client.post("/predict/stream", json=load_samples()[0]).status_code == 415
+
+    body = ndjson_body(load_samples()[:2]) + b'{"x": "' + b"y" * 5000 + b'"}\n' + ndjson_body(load_samples()[:1])
+    with patch.object(API_Fastapi, "STREAM_MAX_LINE_BYTES", 4000):
+        response = client.post("/predict/stream", content=body, headers=NDJSON)
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert results[-1]["error"][0]["type"] == "line_too_long"
+
+# ==============================================================================================
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def read_until(sock, marker: bytes, buffer: bytes = b"", timeout: float = 10) -> bytes:
+    #Lit la socket jusqu'à ce que marker apparaisse dans les données reçues
+    deadline = time.time() + timeout
+    while marker not in buffer and time.time() < deadline:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        buffer += chunk
+    return buffer
+
+
+def test_first_results_before_end_of_body(): #Serveur réel : résultats du premier lot reçus avant la fin de l'envoi
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(API_Fastapi.app, port=port, lifespan="off", log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    try:
+        while not server.started:
+            time.sleep(0.05)
+        samples = load_samples()
+        with patch.object(API_Fastapi, "STREAM_BATCH_SIZE", 4), socket.create_connection(("127.0.0.1", port)) as sock:
+            sock.sendall(b"POST /predict/stream HTTP/1.1\r\nHost: test\r\nContent-Type: application/x-ndjson\r\n"
+                         b"Transfer-Encoding: chunked\r\n\r\n")
+            first = ndjson_body(samples[:4])
+            sock.sendall(b"%x\r\n%s\r\n" % (len(first), first))
+
+            # Corps encore ouvert : le premier mini-lot est déjà scoré et renvoyé
+            received = read_until(sock, b'"index":3')
+            assert b"200 OK" in received and b'"index":3' in received and b'"index":4' not in received
+
+            rest = ndjson_body(samples[4:])
+            sock.sendall(b"%x\r\n%s\r\n0\r\n\r\n" % (len(rest), rest))
+            received = read_until(sock, b"\r\n0\r\n\r\n", received)
+        assert b'"index":%d' % (len(samples) - 1) in received
+    finally:
+        server.should_exit = True
+        thread.join(10)
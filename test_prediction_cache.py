@@ -0,0 +1,100 @@
+# test_prediction_cache.py
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import API_Fastapi
+from API_Fastapi import ClientData
+from model_loader import load_model
+from prediction_cache import PredictionCache, canonical_key
+from sample_data import load_samples
+
+# ============================================================
+# Tests du cache de prédiction
+# ============================================================
+
+def test_canonical_key(): #Même clé pour des JSON équivalents, clé différente par version de modèle
+    sample = dict(load_samples()[0], CNT_FAM_MEMBERS=2.0)
+    reordered = dict(reversed(list(sample.items())), CNT_FAM_MEMBERS=2)
+    assert canonical_key(ClientData(**sample), "v1") == canonical_key(ClientData(**reordered), "v1")
+    assert canonical_key(ClientData(**sample), "v1") != canonical_key(ClientData(**sample), "v2")
+
+    # Valeurs non finies : orjson les écrit toutes en null, elles doivent rester distinctes
+    keys = {canonical_key(ClientData(**dict(sample, REGION_POPULATION_RELATIVE=value)), "v1")
+            for value in (float("nan"), float("inf"), float("-inf"), 0.0)}
+    assert len(keys) == 4
+
+# ==============================================================================================
+
+def test_lru_and_ttl(): #Éviction de l'entrée la moins récemment utilisée, puis expiration
+    cache = PredictionCache(max_size=2, ttl=0.05)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("c") is None
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+
+# ==============================================================================================
+
+def test_concurrent_identical_requests_coalesced(): #Un seul calcul pour des requêtes identiques simultanées
+    cache = PredictionCache()
+    calls = []
+    gate = threading.Event()
+
+    def compute():
+        calls.append(1)
+        gate.wait(5)
+        return 42
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert results == [42] * 8
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 7
+
+# ==============================================================================================
+
+def test_failed_computation_not_cached():
+    cache = PredictionCache()
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("k", lambda: (_ for _ in ()).throw(RuntimeError("échec")))
+    assert cache.get_or_compute("k", lambda: 1) == 1
+
+# ==============================================================================================
+
+def test_predict_uses_cache_and_invalidates_on_model_change(): #Deuxième appel servi par le cache, vidé si le modèle change
+    client = TestClient(API_Fastapi.app)
+    sample = load_samples()[1]
+    API_Fastapi.prediction_cache.clear()
+
+    first = client.post("/predict", json=sample).json()
+    second = client.post("/predict", json=sample).json()
+    assert first == second
+    stats = client.get("/cache/stats").json()
+    assert stats["hits"] >= 1
+    assert stats["model_version"] == API_Fastapi.MODEL_VERSION
+
+    invalidations = stats["invalidations"]
+    original = API_Fastapi.model
+    try:
+        API_Fastapi.model = load_model(API_Fastapi.MODEL_PATH)
+        client.post("/predict", json=sample)
+        assert API_Fastapi.prediction_cache.stats()["invalidations"] == invalidations + 1
+    finally:
+        API_Fastapi.model = original
@@ -0,0 +1,98 @@
+# test_profiling.py
+import marshal
+import pstats
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import API_Fastapi
+import profiling
+from profiling import ProfilingSession
+from sample_data import load_samples
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+def busy_work(n: int = 20_000) -> int:
+    #Fonction Python coûteuse, pour être vue par l'échantillonneur
+    return sum(i * i for i in range(n))
+
+
+@pytest.fixture
+def api(tmp_path): #API avec administration activée et résultats écrits dans tmp_path
+    with patch.object(API_Fastapi, "ADMIN_TOKEN", "secret"), \
+            patch.object(API_Fastapi, "PROFILE_OUTPUT_DIR", str(tmp_path)):
+        yield TestClient(API_Fastapi.app)
+
+# ============================================================
+# Tests du profilage à la demande
+# ============================================================
+
+def test_sampling_session_writes_pstats_and_collapsed(tmp_path): #Piles agrégées des threads actifs
+    stop = threading.Event()
+    worker = threading.Thread(target=lambda: [busy_work() for _ in iter(stop.is_set, True)], name="busy")
+    worker.start()
+    try:
+        session = ProfilingSession("sampling", duration=0.5, interval_ms=2, output_dir=str(tmp_path))
+        assert session.wait(10)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert session.state == "done" and session.samples > 0
+    collapsed = open(session.files["collapsed"], encoding="utf-8").read().splitlines()
+    busy = [line for line in collapsed if line.startswith("thread:busy;") and "busy_work" in line]
+    assert busy and all(int(line.rsplit(" ", 1)[1]) > 0 for line in busy)
+    stats = pstats.Stats(session.files["pstats"])
+    assert any(func[2] == "busy_work" for func in stats.stats)
+
+# ==============================================================================================
+
+def test_collapsed_from_cprofile_call_graph(): #Temps propre réparti entre les appelants, sans perte
+    stats = {
+        ("a.py", 1, "root"): (1, 1, 0.001, 0.010, {}),
+        ("a.py", 5, "left"): (1, 1, 0.004, 0.004, {("a.py", 1, "root"): (1, 1, 0.004, 0.004)}),
+        ("a.py", 9, "shared"): (2, 2, 0.005, 0.005, {("a.py", 1, "root"): (1, 1, 0.002, 0.002),
+                                                      ("a.py", 5, "left"): (1, 1, 0.003, 0.003)}),
+    }
+    stacks = ProfilingSession.collapsed_from_stats(stats)
+    assert stacks["root (a.py:1)"] == 1000
+    assert stacks["root (a.py:1);shared (a.py:9)"] == 2000
+    assert stacks["root (a.py:1);left (a.py:5);shared (a.py:9)"] == 3000
+
+# ==============================================================================================
+
+def test_profile_endpoint_cprofile(api, tmp_path): #Session déterministe bornée par le nombre de requêtes
+    assert api.post("/admin/profile").status_code == 401
+    assert api.post("/admin/profile?mode=inconnu", headers=ADMIN).status_code == 422
+
+    response = api.post("/admin/profile?mode=cprofile&requests=3&duration=30", headers=ADMIN)
+    assert response.status_code == 202
+    assert api.post("/admin/profile", headers=ADMIN).status_code == 409
+    for sample in load_samples()[:3]:
+        assert api.post("/predict", json=sample).status_code == 200
+    profiling.current_session().wait(10)
+
+    status = api.get("/admin/profile", headers=ADMIN).json()
+    assert status["state"] == "done" and status["requests"] == 3
+    assert status["files"]["pstats"].startswith(str(tmp_path))
+    stats = marshal.load(open(status["files"]["pstats"], "rb"))
+    assert any(func[2] == "predict" for func in stats)
+    assert any("predict (API_Fastapi.py" in line for line in open(status["files"]["collapsed"], encoding="utf-8"))
+    assert status["top"]
+
+    # Hors session, l'endpoint n'est plus profilé
+    assert profiling._session is None
+    assert api.post("/predict", json=load_samples()[0]).status_code == 200
+
+# ==============================================================================================
+
+def test_profile_endpoint_sampling_wait(api): #Mode échantillonnage borné en durée, réponse à la fin
+    started = time.perf_counter()
+    status = api.post("/admin/profile?duration=0.3&interval_ms=5&wait=true", headers=ADMIN).json()
+    assert time.perf_counter() - started >= 0.3
+    assert status["state"] == "done" and status["mode"] == "sampling"
+    assert status["files"]["collapsed"].endswith("_sampling.collapsed")
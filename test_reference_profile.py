@@ -0,0 +1,112 @@
+# test_reference_profile.py
+import shutil
+from collections import Counter
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import API_Fastapi
+from drift_monitor import PROBABILITY_FIELD, DriftReference
+from model_loader import load_model
+from model_registry import ModelRegistry
+from reference_profile import ReferenceProfile, build_profile, profile_path
+from scoring import ModelScorer
+
+
+@pytest.fixture(scope="module")
+def reference(tmp_path_factory, synthetic, write_reference):
+    #Profil construit une fois à partir de 500 clients synthétiques, lus par lots de 150 lignes
+    tmp_path = tmp_path_factory.mktemp("profile")
+    records = synthetic(500, seed=1)
+    target = np.random.default_rng(0).integers(0, 2, len(records))
+    input_path, target_path = write_reference(tmp_path, records, target)
+    profile = build_profile(input_path, target_path, "model.pkl", chunk_size=150, progress=None)
+    return tmp_path, records, target, profile
+
+# ============================================================
+# Tests de la construction du profil
+# ============================================================
+
+def test_profile_summarises_reference(reference): #Statistiques identiques à celles calculées sur les données complètes
+    _, records, target, data = reference
+    profile = ReferenceProfile(data)
+    frame = pd.DataFrame(records)
+    proba = ModelScorer(load_model("model.pkl")).predict_proba(frame)
+
+    assert profile.n_rows == 500 and profile.target_rate == pytest.approx(target.mean())
+    assert profile.quantile("AMT_CREDIT", 0.5) == pytest.approx(frame["AMT_CREDIT"].median())
+    assert profile.numeric["AMT_CREDIT"]["mean"] == pytest.approx(frame["AMT_CREDIT"].mean())
+    assert profile.categorical["CODE_GENDER"]["counts"] == {k: Counter(frame["CODE_GENDER"]).get(k, 0)
+                                                            for k in profile.categorical["CODE_GENDER"]["counts"]}
+    assert sum(profile.category_frequencies("CODE_GENDER").values()) == pytest.approx(1.0)
+
+    score = profile.score
+    assert sum(score["counts"]) == 500 and sum(score["positives"]) == target.sum()
+    assert score["predicted_default_rate"] == pytest.approx((proba > score["threshold"]).mean())
+    assert profile.quantile(PROBABILITY_FIELD, 0.9) == pytest.approx(np.quantile(proba, 0.9))
+
+    # Comptes calculés colonne par colonne = comptage des dictionnaires par le monitor
+    drift = profile.drift_reference
+    assert drift.version == profile.version and drift.n == 500
+    assert np.array_equal(drift.counts, drift.layout.count_records(records, proba))
+
+# ==============================================================================================
+
+def test_profile_roundtrip_and_version(reference): #Même version pour les mêmes entrées ; relu comme référence de dérive
+    tmp_path, records, target, data = reference
+    profile = ReferenceProfile(data)
+    path = str(tmp_path / "model.profile.json")
+    profile.save(path)
+    loaded = ReferenceProfile.load(path)
+    assert loaded.data == ReferenceProfile(data).data
+    assert np.array_equal(DriftReference.load(path).counts, profile.drift_reference.counts)
+
+    rebuilt = build_profile(str(tmp_path / "input_reference.csv"), str(tmp_path / "output_reference.csv"),
+                            "model.pkl", chunk_size=400, progress=None)
+    assert rebuilt["version"] == data["version"]
+    other_bins = build_profile(str(tmp_path / "input_reference.csv"), None, "model.pkl", n_bins=5, progress=None)
+    assert other_bins["version"] != data["version"] and other_bins["target_rate"] is None
+
+    pd.DataFrame({"TARGET": target[:-1]}).to_csv(tmp_path / "short_target.csv", index=False)
+    with pytest.raises(ValueError, match="nombre de lignes"):
+        build_profile(str(tmp_path / "input_reference.csv"), str(tmp_path / "short_target.csv"), "model.pkl",
+                      chunk_size=150, progress=None)
+
+# ==============================================================================================
+
+def test_drift_report_from_profile(reference, synthetic): #Dérive calculée contre le profil, sans relire les CSV
+    _, _, _, data = reference
+    profile = ReferenceProfile(data)
+    same = synthetic(300, seed=2)
+    report = profile.drift_report(same, np.full(300, 0.1))
+    assert report["reference"]["version"] == profile.version and report["n"] == 300
+    assert report["features"]["AMT_CREDIT"]["drift"] is False
+
+    shifted = [{**r, "AMT_CREDIT": r["AMT_CREDIT"] * 3} for r in same]
+    assert profile.drift_report(shifted, np.full(300, 0.1))["features"]["AMT_CREDIT"]["drift"] is True
+
+# ============================================================
+# Tests des consommateurs du profil (API, registre)
+# ============================================================
+
+def test_api_and_registry_use_profile_next_to_model(reference): #/drift lit le profil du modèle actif ; copié par le registre
+    tmp_path, records, _, data = reference
+    model_path = str(tmp_path / "model.pkl")
+    shutil.copyfile("model.pkl", model_path)
+    ReferenceProfile(data).save(profile_path(model_path))
+
+    with patch.object(API_Fastapi, "DRIFT_REFERENCE_PATH", None), \
+            patch.object(API_Fastapi, "_active_model_path", model_path), \
+            patch.object(API_Fastapi, "_drift_monitor", None):
+        client = TestClient(API_Fastapi.app)
+        assert client.post("/predict/batch", json=records[:20]).status_code == 200
+        report = client.get("/drift").json()
+        assert report["reference"] == {"version": data["version"], "n": 500} and report["n"] == 20
+
+    registry = ModelRegistry(str(tmp_path / "models"))
+    version = registry.register(model_path, version="v1")
+    assert ReferenceProfile.for_model(registry.path(version)).version == data["version"]
+    assert ReferenceProfile.for_model(str(tmp_path / "absent.pkl")) is None
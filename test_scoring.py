@@ -0,0 +1,122 @@
+# test_scoring.py
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import MagicMock
+
+from API_Fastapi import ClientData
+from fast_preprocessing import CompiledEncoder
+from sample_data import load_samples
+from scoring import ModelScorer, NativeBooster, default_nthread, label_from_class
+from tree_evaluator import iteration_range
+
+
+@pytest.fixture(scope="module")
+def model():
+    return joblib.load("model.pkl")
+
+
+@pytest.fixture(scope="module")
+def samples_df():
+    return pd.DataFrame(load_samples())
+
+# ============================================================
+# Tests de la couche de scoring
+# ============================================================
+
+def test_scorer_single_pipeline_call(): #Un seul appel au pipeline par scoring
+    mock_model = MagicMock()
+    mock_model.predict_proba.return_value = [[0.3, 0.7], [0.9, 0.1]]
+
+    classes, proba = ModelScorer(mock_model).predict(pd.DataFrame([{}, {}]))
+
+    assert mock_model.predict_proba.call_count == 1
+    mock_model.predict.assert_not_called()
+    assert list(classes) == [1, 0]
+    assert list(proba) == [0.7, 0.1]
+
+# ==============================================================================================
+
+def test_scorer_custom_threshold(): #Le seuil de décision est configurable
+    mock_model = MagicMock()
+    mock_model.predict_proba.return_value = [[0.7, 0.3]]
+
+    classes, _ = ModelScorer(mock_model, threshold=0.2).predict(pd.DataFrame([{}]))
+    assert label_from_class(classes[0]) == "Défaillant"
+
+# ==============================================================================================
+
+def test_scorer_matches_pipeline(model, samples_df): #Mêmes résultats que predict()/predict_proba()
+    classes, proba = ModelScorer(model).predict(samples_df)
+
+    np.testing.assert_array_equal(classes, model.predict(samples_df))
+    np.testing.assert_array_equal(proba, model.predict_proba(samples_df)[:, 1])
+
+# ============================================================
+# Tests de l'encodeur compilé
+# ============================================================
+
+def test_compiled_encoder_parity(model, samples_df): #Même matrice que le ColumnTransformer sur data/samples.json
+    encoder = CompiledEncoder.from_pipeline(model)
+    expected = model.steps[0][1].transform(samples_df).astype(np.float32)
+
+    np.testing.assert_array_equal(encoder.transform_frame(samples_df), expected)
+    np.testing.assert_array_equal(encoder.transform_records(samples_df.to_dict("records")), expected)
+    clients = [ClientData(**record) for record in samples_df.to_dict("records")]
+    np.testing.assert_array_equal(encoder.transform_clients(clients), expected)
+
+# ==============================================================================================
+
+def test_compiled_encoder_missing_and_unknown(model, samples_df): #Imputation et catégories inconnues
+    df = samples_df.copy()
+    df.loc[0, "AMT_ANNUITY"] = np.nan
+    df.loc[1, "OCCUPATION_TYPE"] = None
+    df.loc[2, "ORGANIZATION_TYPE"] = "Catégorie inconnue"
+
+    encoder = CompiledEncoder.from_pipeline(model)
+    expected = model.steps[0][1].transform(df).astype(np.float32)
+    np.testing.assert_array_equal(encoder.transform_frame(df), expected)
+
+# ==============================================================================================
+
+def test_compiled_scorer_matches_pipeline(model, samples_df): #Le chemin rapide donne les mêmes probabilités
+    scorer = ModelScorer(model)
+    assert scorer.compiled
+
+    clients = [ClientData(**record) for record in samples_df.to_dict("records")]
+    classes, proba = scorer.predict_clients(clients)
+    np.testing.assert_array_equal(classes, model.predict(samples_df))
+    np.testing.assert_array_equal(proba, model.predict_proba(samples_df)[:, 1])
+
+# ==============================================================================================
+
+@pytest.mark.parametrize("n_rows", [1, 7, 2048]) #Ligne unique, petit lot et lot scoré avec plusieurs threads
+def test_native_booster_bit_identical(model, n_rows):
+    classifier = model.steps[-1][1]
+    n_features = CompiledEncoder.from_pipeline(model).n_features
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n_rows, n_features)).astype(np.float32)
+    X[rng.random(X.shape) < 0.05] = np.nan
+
+    expected = classifier.predict_proba(X)[:, 1].astype(np.float64)
+    native = NativeBooster(classifier, nthread=4, parallel_min_rows=1024).predict_proba(X)
+    assert native.tobytes() == expected.tobytes()
+    assert ModelScorer(model).booster is not None
+
+# ==============================================================================================
+
+def test_nthread_default_and_public_iteration_range(model, monkeypatch): #Cœurs partagés entre processus ; arbres via l'API publique
+    monkeypatch.setattr("os.cpu_count", lambda: 8)
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    monkeypatch.setenv("INFERENCE_POOL_WORKERS", "0")
+    assert default_nthread() == 4
+    monkeypatch.setenv("INFERENCE_POOL_WORKERS", "3")
+    assert default_nthread() == 1
+
+    classifier = model.steps[-1][1]
+    assert iteration_range(classifier) == (0, 0)
+    classifier = type(classifier)(n_estimators=20, early_stopping_rounds=2)
+    classifier.fit(np.random.default_rng(0).normal(size=(200, 3)), np.arange(200) % 2,
+                   eval_set=[(np.zeros((10, 3)), np.arange(10) % 2)], verbose=False)
+    assert iteration_range(classifier) == (0, classifier.best_iteration + 1)
@@ -0,0 +1,83 @@
+# test_stage_timing.py
+import contextvars
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import API_Fastapi
+import stage_timing
+from sample_data import load_samples
+
+
+def parse_server_timing(header: str) -> dict:
+    #En-tête Server-Timing -> {étape: durée en ms}
+    durations = {}
+    for part in header.split(", "):
+        name, dur = part.split(";dur=")
+        durations[name] = float(dur)
+    return durations
+
+# ============================================================
+# Tests du découpage de la latence par étape
+# ============================================================
+
+def timed_steps():
+    #Étapes chronométrées dans un contexte isolé (le chronomètre ne fuit pas dans les autres tests)
+    timer = stage_timing.start()
+    time.sleep(0.01)
+    stage_timing.mark("a")
+    stage_timing.mark("b")
+    time.sleep(0.005)
+    stage_timing.mark("a")
+    return timer
+
+
+def test_marks_partition_elapsed_time(): #Chaque étape dure depuis la marque précédente ; total = somme des étapes
+    timer = contextvars.Context().run(timed_steps)
+    assert stage_timing._current.get() is None
+
+    durations = timer.durations()
+    assert list(durations) == ["a", "b"]
+    assert durations["a"] >= 0.015 and durations["b"] < 0.005
+    header = parse_server_timing(timer.server_timing())
+    assert header["total"] == pytest.approx(sum(durations.values()) * 1000, abs=0.002)
+
+# ==============================================================================================
+
+def test_mark_outside_request_is_noop(): #Sans chronométrage en cours (autre contexte), mark() ne fait rien
+    context = contextvars.Context()
+    assert context.run(stage_timing._current.get) is None
+    context.run(stage_timing.mark, "encode")
+
+# ==============================================================================================
+
+def test_predict_server_timing_header(): #Étapes de /predict dans l'en-tête et les histogrammes par étape
+    client = TestClient(API_Fastapi.app)
+    API_Fastapi.prediction_cache.clear()
+    sample = load_samples()[2]
+
+    response = client.post("/predict", json=sample)
+    assert response.status_code == 200
+    first = parse_server_timing(response.headers["server-timing"])
+    assert ["validation", "serialize", "encode", "inference", "score", "log", "response", "total"] == list(first)
+    assert sum(v for k, v in first.items() if k != "total") <= first["total"] + 0.01
+
+    # Deuxième appel servi par le cache : ni encodage ni inférence
+    second = parse_server_timing(client.post("/predict", json=sample).headers["server-timing"])
+    assert "encode" not in second and "score" in second
+
+    batch = parse_server_timing(client.post("/predict/batch", json=load_samples()[:5]).headers["server-timing"])
+    assert {"receive", "validation", "score", "log", "response"} <= set(batch)
+
+    metrics = client.get("/metrics").text
+    assert 'api_stage_duration_seconds_count{route="/predict",stage="inference"}' in metrics
+
+# ==============================================================================================
+
+def test_server_timing_disabled(monkeypatch): #SERVER_TIMING_ENABLED=0 : ni en-tête ni histogramme
+    monkeypatch.setattr(API_Fastapi, "SERVER_TIMING_ENABLED", False)
+    client = TestClient(API_Fastapi.app)
+    response = client.get("/")
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
@@ -0,0 +1,127 @@
+# test_tree_evaluator.py
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from model_loader import load_model
+from sample_data import load_samples
+from scoring import ModelScorer
+from tree_evaluator import CHUNK_ROWS, TreeEnsemble, export_trees
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    return ModelScorer(joblib.load("model.pkl"), backend="xgboost")
+
+
+@pytest.fixture(scope="module")
+def ensemble(scorer):
+    return TreeEnsemble.from_classifier(scorer.classifier)
+
+
+@pytest.fixture(scope="module")
+def encoded_samples(scorer):
+    return scorer.encoder.transform_records(load_samples())
+
+
+def synthetic_batch(ensemble, encoded, n, seed=0):
+    #Lignes réelles perturbées : valeurs manquantes, valeurs aléatoires et valeurs égales aux seuils
+    rng = np.random.default_rng(seed)
+    X = encoded[rng.integers(0, len(encoded), n)].copy()
+    X[rng.random(X.shape) < 0.1] = np.nan
+    noisy = rng.random(X.shape) < 0.1
+    X[noisy] = rng.normal(0, 3, noisy.sum()).astype(np.float32)
+    splits = np.flatnonzero(ensemble.children[::2] != np.arange(len(ensemble.feature)))
+    picked = rng.choice(splits, n)
+    X[np.arange(n), ensemble.feature[picked]] = ensemble.threshold[picked]
+    return X
+
+
+def assert_same_proba(actual, expected):
+    #Sigmoïde : au plus un ulp float32 d'écart (expf de la libm vs exp correctement arrondi)
+    np.testing.assert_allclose(actual, expected, rtol=2 ** -23, atol=0)
+
+# ============================================================
+# Tests de l'évaluateur NumPy
+# ============================================================
+
+def test_parity_on_samples(scorer, ensemble, encoded_samples): #Mêmes marges et probabilités que le booster sur data/samples.json
+    booster = scorer.classifier.get_booster()
+    margin = booster.inplace_predict(encoded_samples, predict_type="margin", missing=np.nan, validate_features=False)
+
+    np.testing.assert_array_equal(ensemble.predict_margin(encoded_samples), margin)
+    assert_same_proba(ensemble.predict_proba(encoded_samples), scorer.predict_encoded(encoded_samples))
+
+# ==============================================================================================
+
+@pytest.mark.parametrize("n_rows", [1, 100, CHUNK_ROWS + 37])
+def test_parity_on_synthetic_batches(scorer, ensemble, encoded_samples, n_rows): #Manquants, seuils exacts et lots découpés
+    X = synthetic_batch(ensemble, encoded_samples, n_rows, seed=n_rows)
+    booster = scorer.classifier.get_booster()
+    margin = booster.inplace_predict(X, predict_type="margin", missing=np.nan, validate_features=False)
+
+    np.testing.assert_array_equal(ensemble.predict_margin(X), margin)
+    assert_same_proba(ensemble.predict_proba(X), scorer.predict_encoded(X))
+
+# ==============================================================================================
+
+def test_save_load_roundtrip(tmp_path, ensemble, encoded_samples): #L'artefact .npz se recharge sans XGBoost
+    loaded = TreeEnsemble.load(ensemble.save(str(tmp_path / "model.trees.npz")))
+
+    assert (loaded.n_trees, loaded.depth, loaded.n_features) == (ensemble.n_trees, ensemble.depth, ensemble.n_features)
+    np.testing.assert_array_equal(loaded.predict_proba(encoded_samples), ensemble.predict_proba(encoded_samples))
+
+# ==============================================================================================
+
+def test_numpy_backend_drop_in(scorer): #ModelScorer(backend="numpy") donne les mêmes classes et probabilités
+    numpy_scorer = ModelScorer(scorer.model, backend="numpy")
+    df = pd.DataFrame(load_samples())
+
+    assert isinstance(numpy_scorer.booster, TreeEnsemble)
+    classes, proba = numpy_scorer.predict(df)
+    expected_classes, expected_proba = scorer.predict(df)
+    np.testing.assert_array_equal(classes, expected_classes)
+    assert_same_proba(proba, expected_proba)
+    with pytest.raises(ValueError):
+        ModelScorer(scorer.model, backend="onnx")
+
+# ==============================================================================================
+
+NUMPY_ONLY_SCRIPT = """
+import json, sys
+sys.modules["xgboost"] = None  # import interdit : ImportError
+sys.modules["sklearn"] = None
+import pandas as pd
+from model_loader import load_model
+from sample_data import load_samples
+from scoring import CompiledModel, ModelScorer
+
+model = load_model(sys.argv[1], backend="numpy")
+assert isinstance(model, CompiledModel)
+classes, proba = ModelScorer(model, backend="numpy").predict(pd.DataFrame(load_samples()))
+print(json.dumps(proba.tolist()))
+"""
+
+def test_numpy_backend_loads_artifacts_without_xgboost(tmp_path, scorer): #Arbres + encodeur relus sans désérialiser le pipeline
+    model_path = str(tmp_path / "model.pkl")
+    shutil.copyfile("model.pkl", model_path)
+    export_trees(model_path)
+    df = pd.DataFrame(load_samples())
+    expected = ModelScorer(scorer.model, backend="numpy").predict_proba(df)
+
+    result = subprocess.run([sys.executable, "-c", NUMPY_ONLY_SCRIPT, model_path], capture_output=True, text=True,
+                            env={**os.environ, "PYTHONPATH": os.getcwd()}, timeout=120)
+    assert result.returncode == 0, result.stderr
+    np.testing.assert_array_equal(json.loads(result.stdout), expected)
+
+    # Sans backend numpy, ou artefacts plus anciens que model.pkl : pipeline complet
+    assert type(load_model(model_path)).__name__ == "Pipeline"
+    os.utime(model_path, (os.path.getmtime(model_path) + 10,) * 2)
+    assert type(load_model(model_path, backend="numpy")).__name__ == "Pipeline"
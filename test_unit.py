@@ -3,7 +3,8 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 import pandas as pd
-from API_Fastapi import app, ClientData, NAME_CONTRACT_TYPE,CODE_GENDER
+from API_Fastapi import app, ClientData
+from schemas import NAME_CONTRACT_TYPE, CODE_GENDER
 from enum import Enum
 
 client = TestClient(app)
@@ -351,4 +352,18 @@ def test_predict_endpoint_model_not_loaded():
     
     response = client.post("/predict", json=test_data)
     assert response.status_code == 500
-    assert "Modèle non chargé" in response.json()["detail"]
\ No newline at end of file
+    assert "Modèle non chargé" in response.json()["detail"]
+# ==============================================================================================
+
+@patch('API_Fastapi.MAX_BATCH_SIZE', 2) #Test du rejet des lots trop volumineux
+def test_predict_batch_too_large():
+
+    response = client.post("/predict/batch", json=[{}, {}, {}])
+    assert response.status_code == 413
+
+# ==============================================================================================
+
+def test_predict_batch_invalid_body(): #Le corps d'un lot doit être une liste
+
+    response = client.post("/predict/batch", json={"CODE_GENDER": "M"})
+    assert response.status_code == 422
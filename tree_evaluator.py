@@ -0,0 +1,202 @@
+"""
+Évaluateur NumPy des arbres du modèle, sans XGBoost à l'exécution.
+
+Les 500 arbres du XGBClassifier de model.pkl sont aplatis dans des tableaux communs
+(un indice global par nœud) :
+
+    feature[n]        variable testée par le nœud n
+    threshold[n]      seuil du test (x < seuil -> gauche) ; valeur de la feuille si n est une feuille
+    children[2n:2n+2] fils (gauche, droit) ; une feuille pointe sur elle-même
+    default_left[n]   branche suivie si la variable est manquante (NaN)
+
+L'évaluation avance tous les arbres d'un lot d'un niveau à la fois (profondeur maximale
+itérations vectorisées), puis somme les feuilles dans l'ordre des arbres, en float32,
+à partir de la marge initiale : mêmes opérations que le prédicteur CPU de XGBoost, donc
+marges identiques au bit près. La sigmoïde arrondit exp en float32 correctement ; l'expf
+de la libm s'en écarte parfois d'un ulp, d'où un écart possible d'un ulp float32 sur
+la probabilité (environ une ligne sur 2000, voir test_tree_evaluator.py).
+
+Les tableaux sont exportés dans model.trees.npz (python tree_evaluator.py, avec les tables
+de l'encodeur compilé dans model.encoder.json), relu avec NumPy seul. SCORER_BACKEND=numpy
+remplace le booster XGBoost par cet évaluateur dans ModelScorer, et charge ces deux
+artefacts à la place de model.pkl : ni scikit-learn ni XGBoost ne sont importés (voir
+scoring.CompiledModel).
+"""
+
+import json
+import os
+
+import numpy as np
+
+# Lignes évaluées par passe : borne la mémoire des tableaux (lignes x arbres)
+CHUNK_ROWS = 256
+
+
+def trees_artifact_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".trees.npz"
+
+
+def iteration_range(classifier) -> tuple:
+    """Arbres utilisés par défaut par XGBClassifier.predict_proba(), via l'API publique : jusqu'à
+    best_iteration si le modèle a été entraîné avec arrêt précoce, sinon tous ((0, 0))."""
+    if classifier.booster == "gblinear":
+        return 0, 0
+    try:
+        return 0, classifier.best_iteration + 1
+    except AttributeError:
+        return 0, 0
+
+
+class TreeEnsemble:
+    """Arbres d'un XGBClassifier binaire (binary:logistic) sous forme de tableaux NumPy."""
+
+    ARRAYS = ("feature", "threshold", "children", "default_left", "roots")
+
+    def __init__(self, feature, threshold, children, default_left, roots, depth: int, base_margin, n_features: int):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.children = np.asarray(children, dtype=np.int32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.depth = int(depth)
+        self.base_margin = np.float32(base_margin)
+        self.n_features = int(n_features)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    # ------------------------------------------------------------------
+    # Conversion depuis XGBoost
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_booster(cls, booster, n_trees: int = None):
+        """Aplatit le dump JSON d'un booster (n_trees : limite éventuelle, cf. best_iteration)."""
+        learner = json.loads(booster.save_raw("json"))["learner"]
+        if learner["objective"]["name"] != "binary:logistic":
+            raise ValueError(f"Objectif non supporté : {learner['objective']['name']}")
+        if learner["gradient_booster"]["name"] != "gbtree":
+            raise ValueError(f"Booster non supporté : {learner['gradient_booster']['name']}")
+        params = learner["learner_model_param"]
+        if int(params.get("num_target", "1")) != 1:
+            raise ValueError("Modèles multi-sorties non supportés")
+
+        trees = learner["gradient_booster"]["model"]["trees"][:n_trees]
+        feature, threshold, children, default_left, roots = [], [], [], [], []
+        depth, offset = 0, 0
+        for tree in trees:
+            if any(tree["split_type"]):
+                raise ValueError("Splits catégoriels non supportés")
+            left = np.asarray(tree["left_children"], dtype=np.int64)
+            right = np.asarray(tree["right_children"], dtype=np.int64)
+            own = np.arange(len(left)) + offset
+            leaf = left == -1
+            feature.append(np.where(leaf, 0, tree["split_indices"]))
+            threshold.append(tree["split_conditions"])
+            children.append(np.stack([np.where(leaf, own, left + offset), np.where(leaf, own, right + offset)], axis=1).ravel())
+            default_left.append(tree["default_left"])
+            roots.append(offset)
+            depth = max(depth, cls._tree_depth(left, right))
+            offset += len(left)
+
+        # Marge initiale : même calcul float32 que XGBoost (ProbToMargin de binary:logistic)
+        base_score = np.float32(float(params["base_score"].strip("[]")))
+        one = np.float32(1)
+        base_margin = -np.log(one / base_score - one)
+        return cls(np.concatenate(feature), np.concatenate(threshold), np.concatenate(children),
+                   np.concatenate(default_left), roots, depth, base_margin, int(params["num_feature"]))
+
+    @classmethod
+    def from_classifier(cls, classifier):
+        """Arbres effectivement utilisés par predict_proba() (iteration_range par défaut)."""
+        begin, end = iteration_range(classifier)
+        if begin != 0:
+            raise ValueError(f"iteration_range non supporté : {(begin, end)}")
+        n_trees = None
+        if end:
+            n_trees = end * int(classifier.get_params().get("num_parallel_tree") or 1)
+        return cls.from_booster(classifier.get_booster(), n_trees)
+
+    @staticmethod
+    def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+        depth, level = 0, np.array([0])
+        while True:
+            level = level[left[level] != -1]
+            if not len(level):
+                return depth
+            level = np.concatenate([left[level], right[level]])
+            depth += 1
+
+    # ------------------------------------------------------------------
+    # Sérialisation (NumPy seul)
+    # ------------------------------------------------------------------
+
+    def save(self, path: str) -> str:
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **{name: getattr(self, name) for name in self.ARRAYS},
+                 meta=np.array([self.depth, self.n_features], dtype=np.int64),
+                 base_margin=np.array([self.base_margin], dtype=np.float32))
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            depth, n_features = (int(v) for v in data["meta"])
+            return cls(*(data[name] for name in cls.ARRAYS), depth, data["base_margin"][0], n_features)
+
+    # ------------------------------------------------------------------
+    # Évaluation
+    # ------------------------------------------------------------------
+
+    def _margin_chunk(self, X: np.ndarray) -> np.ndarray:
+        n = len(X)
+        flat = X.ravel()
+        row_offsets = (np.arange(n, dtype=np.int64) * self.n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n, self.n_trees))
+        for _ in range(self.depth):
+            x = flat[row_offsets + self.feature[node]]
+            go_left = np.where(np.isnan(x), self.default_left[node], x < self.threshold[node])
+            node = self.children[2 * node + ~go_left]
+        # Somme séquentielle en float32 (cumsum), dans l'ordre des arbres, comme XGBoost
+        leaves = np.empty((n, self.n_trees + 1), dtype=np.float32)
+        leaves[:, 0] = self.base_margin
+        leaves[:, 1:] = self.threshold[node]
+        return np.cumsum(leaves, axis=1)[:, -1]
+
+    def predict_margin(self, X: np.ndarray) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Matrice de forme {X.shape}, {self.n_features} colonnes attendues")
+        if len(X) <= CHUNK_ROWS:
+            return self._margin_chunk(X)
+        return np.concatenate([self._margin_chunk(X[i:i + CHUNK_ROWS]) for i in range(0, len(X), CHUNK_ROWS)])
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Probabilité de la classe 1, comme NativeBooster.predict_proba() (float64)."""
+        margin = self.predict_margin(X)
+        # Sigmoïde en float32 ; exp calculé en float64 puis arrondi (expf correctement arrondi)
+        one = np.float32(1)
+        exp = np.exp(-margin.astype(np.float64)).astype(np.float32)
+        return (one / (one + exp)).astype(np.float64)
+
+
+def export_trees(model_path: str) -> str:
+    """Écrit model.trees.npz et model.encoder.json à côté de model.pkl ; retourne le chemin des arbres."""
+    import joblib
+
+    from fast_preprocessing import CompiledEncoder, encoder_artifact_path
+
+    model = joblib.load(model_path)
+    classifier = model.steps[-1][1] if hasattr(model, "steps") else model
+    path = TreeEnsemble.from_classifier(classifier).save(trees_artifact_path(model_path))
+    CompiledEncoder.from_pipeline(model).save(encoder_artifact_path(model_path))
+    return path
+
+
+if __name__ == "__main__":
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "model.pkl"
+    print(f"Arbres exportés : {export_trees(path)}")